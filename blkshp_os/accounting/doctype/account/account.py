@@ -1,7 +1,23 @@
+import frappe
+from frappe import _
 from frappe.model.document import Document
 
 
 class Account(Document):
     """Minimal account master used by BLKSHP OS for metadata links."""
 
-    pass
+    def validate(self):
+        self.validate_intercompany_account()
+
+    def validate_intercompany_account(self):
+        """Due To / Due From accounts must name another company as counterparty."""
+        if not self.intercompany_account_type:
+            self.counterparty_company = None
+            return
+
+        if self.is_group:
+            frappe.throw(_("Group accounts cannot be intercompany accounts"))
+        if not self.counterparty_company:
+            frappe.throw(_("Counterparty Company is required for intercompany accounts"))
+        if self.counterparty_company == self.company:
+            frappe.throw(_("Counterparty Company must differ from the account's company"))
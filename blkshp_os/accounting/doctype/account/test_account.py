@@ -21,6 +21,26 @@ class TestAccount(FrappeTestCase):
         self.assertEqual(doc.account_code, "6100")
         self.assertEqual(doc.company, company)
 
+    def test_intercompany_account_requires_other_company(self):
+        company = _ensure_company()
+
+        doc = frappe.get_doc(
+            {
+                "doctype": "Account",
+                "account_name": "Due To Self",
+                "account_code": "2190",
+                "company": company,
+                "account_type": "Liability",
+                "intercompany_account_type": "Due To",
+            }
+        )
+        with self.assertRaises(frappe.ValidationError):
+            doc.insert()
+
+        doc.counterparty_company = company
+        with self.assertRaises(frappe.ValidationError):
+            doc.insert()
+
 
 def _ensure_company() -> str:
     existing = frappe.db.exists("Company", {"company_name": "Test Company"})
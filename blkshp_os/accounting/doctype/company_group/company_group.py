@@ -5,6 +5,8 @@ from __future__ import annotations
 import frappe
 from frappe.model.document import Document
 
+from blkshp_os.accounting import membership
+
 
 class CompanyGroup(Document):
     """Company Group for intercompany accounting and consolidated reporting.
@@ -56,8 +58,12 @@ class CompanyGroup(Document):
         for row in self.member_companies:
             frappe.db.set_value("Company", row.company, "company_group", self.name)
 
+        membership.clear_membership_cache()
+
     def on_trash(self):
         """Clean up company references when group is deleted."""
         # Clear company_group field from member companies
         for row in self.member_companies:
             frappe.db.set_value("Company", row.company, "company_group", None)
+
+        membership.clear_membership_cache()
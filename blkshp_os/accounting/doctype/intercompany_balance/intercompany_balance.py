@@ -0,0 +1,22 @@
+"""Intercompany Balance DocType controller."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class IntercompanyBalance(Document):
+    """Running balance of one company's intercompany accounts with a counterparty.
+
+    Rows are keyed by (company, counterparty company) and incremented by
+    :mod:`blkshp_os.accounting.intercompany_service` as GL Entries post to
+    Due To / Due From accounts; they are not edited by hand.
+    """
+
+    pass
+
+
+def on_doctype_update() -> None:
+    frappe.db.add_index("Intercompany Balance", ["company", "counterparty_company"])
+    frappe.db.add_index("Intercompany Balance", ["counterparty_company"])
@@ -7,6 +7,8 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import flt, get_datetime, nowdate
 
+from blkshp_os.accounting import membership
+
 
 class IntercompanySettlement(Document):
     """Intercompany Settlement for reconciling and settling balances between companies.
@@ -27,8 +29,8 @@ class IntercompanySettlement(Document):
             frappe.throw(_("Source and target companies cannot be the same"))
 
         # Get company groups for both companies
-        source_group = frappe.db.get_value("Company", self.source_company, "company_group")
-        target_group = frappe.db.get_value("Company", self.target_company, "company_group")
+        source_group = membership.get_company_group(self.source_company)
+        target_group = membership.get_company_group(self.target_company)
 
         if not source_group or not target_group:
             frappe.throw(_("Both companies must belong to a Company Group for intercompany settlements"))
@@ -74,14 +76,7 @@ class IntercompanySettlement(Document):
 
     def _user_has_company_permission(self, user: str, company: str) -> bool:
         """Check if user has permission for the given company."""
-        # Check user permissions for company
-        has_permission = frappe.db.exists({
-            "doctype": "User Permission",
-            "user": user,
-            "allow": "Company",
-            "for_value": company,
-        })
-        return bool(has_permission)
+        return membership.user_has_company_permission(user, company)
 
     def before_submit(self):
         """Set submission details."""
@@ -111,3 +106,10 @@ class IntercompanySettlement(Document):
         """Handle settlement cancellation."""
         # Settlements should be reversed, not cancelled, per decision log
         frappe.throw(_("Settlements cannot be cancelled. Please create a reversal settlement instead."))
+
+
+def on_doctype_update():
+    """Index the per-company settlement listings (see intercompany_service.get_pending_settlements)."""
+    frappe.db.add_index("Intercompany Settlement", ["source_company", "docstatus", "modified"])
+    frappe.db.add_index("Intercompany Settlement", ["target_company", "docstatus", "modified"])
+    frappe.db.add_index("Intercompany Settlement", ["docstatus", "modified"])
@@ -1,12 +1,68 @@
-"""Service layer for intercompany accounting operations."""
+"""Service layer for intercompany accounting operations.
+
+Intercompany balances come from GL Entries posted to accounts flagged as
+"Due To" or "Due From" a counterparty company. Rather than summing the GL on
+every read, each posting increments an ``Intercompany Balance`` row keyed by
+(company, counterparty company):
+
+- ``balance`` is credit minus debit on the company's intercompany accounts for
+  that counterparty, so a positive balance means the company owes the
+  counterparty according to its own books.
+- The counterparty's row holds the mirror image from its books; the two sum to
+  zero when both sides have booked the same transactions.
+
+Rows are upserted with ``INSERT ... ON DUPLICATE KEY UPDATE`` on a name derived
+from the pair, so concurrent postings increment them safely. Dashboards read a
+pair by primary key and a whole group with one query.
+:func:`rebuild_intercompany_balances` recomputes the rows from the GL with a
+single grouped query, e.g. after intercompany accounts are re-pointed.
+"""
 
 from __future__ import annotations
 
+import hashlib
+from collections.abc import Iterable
 from typing import Any
 
 import frappe
 from frappe import _
-from frappe.utils import flt
+from frappe.utils import cint, flt, getdate, now, nowdate
+
+from blkshp_os.accounting import membership
+from blkshp_os.utils.cache import DEFAULT_TTL_SECONDS, bump_cache_version, versioned_key
+
+INTERCOMPANY_BALANCE_DOCTYPE = "Intercompany Balance"
+INTERCOMPANY_ACCOUNTS_NAMESPACE = "blkshp_os:intercompany_accounts"
+INTERCOMPANY_ACCOUNT_TYPES = ("Due To", "Due From")
+DEFAULT_CURRENCY = "USD"
+
+SETTLEMENT_DOCTYPE = "Intercompany Settlement"
+SETTLEMENT_LIST_FIELDS = [
+    "name",
+    "source_company",
+    "target_company",
+    "settlement_amount",
+    "settlement_currency",
+    "settlement_date",
+    "status",
+    "submitted_by",
+    "modified",
+]
+SETTLEMENT_STATUS_DOCSTATUS = {"Draft": 0, "Settled": 1, "Cancelled": 2}
+
+BALANCE_FIELDS = [
+    "name",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "company",
+    "counterparty_company",
+    "balance",
+    "currency",
+    "last_posting_date",
+]
 
 
 def get_intercompany_balance(
@@ -25,29 +81,50 @@ def get_intercompany_balance(
         Dictionary containing:
         - source_company: Source company code
         - target_company: Target company code
-        - balance: Net balance (positive = source owes target)
+        - balance: Net balance from the source's books (positive = source owes target)
+        - counterparty_balance: The same balance according to the target's books
+        - difference: Unreconciled difference between the two books
         - as_of_date: Date the balance was calculated
         - currency: Balance currency
 
-    The balance is calculated from GL Entries with the "Due To" and "Due From"
-    intercompany accounts. This requires the intercompany account structure to
-    be set up.
+    Current balances are read from the maintained Intercompany Balance rows;
+    balances as of a past date are summed from the GL.
     """
     # Validate companies exist and are in same group
     _validate_companies_in_same_group(source_company, target_company)
 
-    # TODO: Implement actual GL Entry query once intercompany accounts exist
-    # For now, return a placeholder structure
-    balance = {
-        "source_company": source_company,
-        "target_company": target_company,
-        "balance": 0.0,
-        "as_of_date": as_of_date or frappe.utils.nowdate(),
-        "currency": "USD",  # TODO: Get from company default currency
-        "note": "Intercompany account structure not yet configured"
-    }
+    as_of_date = as_of_date or nowdate()
+    pair = [source_company, target_company]
+    if getdate(as_of_date) < getdate(nowdate()):
+        rows = _query_gl_balances(pair, as_of_date)
+    else:
+        names = [_balance_name(source_company, target_company), _balance_name(target_company, source_company)]
+        rows = frappe.get_all(
+            INTERCOMPANY_BALANCE_DOCTYPE,
+            filters={"name": ["in", names]},
+            fields=["company", "counterparty_company", "balance", "currency"],
+        )
+
+    matrix, currencies = _build_matrix(rows)
+    currency = currencies.get(source_company) or currencies.get(target_company)
+    if not currency:
+        currency = frappe.db.get_value("Company", source_company, "default_currency") or DEFAULT_CURRENCY
+    return _pair_balance(matrix, source_company, target_company, currency, as_of_date)
 
-    return balance
+
+def get_intercompany_balance_matrix(company_group: str) -> dict[str, dict[str, float]]:
+    """Return every member's balance with every other member of ``company_group``.
+
+    Args:
+        company_group: Company Group code
+
+    Returns:
+        ``{company: {counterparty: balance}}`` from each company's own books,
+        omitting pairs without postings
+    """
+    companies = _get_companies_in_group(company_group)
+    matrix, _currencies = _build_matrix(_load_balance_rows(companies))
+    return matrix
 
 
 def get_all_intercompany_balances(
@@ -56,6 +133,8 @@ def get_all_intercompany_balances(
 ) -> list[dict[str, Any]]:
     """Get all intercompany balances for a company or group.
 
+    The group's balance matrix is loaded once; no per-pair lookups are made.
+
     Args:
         company: Optional company to filter balances for
         company_group: Optional group to get balances within
@@ -67,79 +146,211 @@ def get_all_intercompany_balances(
 
     if company:
         # Get all companies in the same group as the specified company
-        group = frappe.db.get_value("Company", company, "company_group")
+        group = membership.get_company_group(company)
         if not group:
             return balances
 
         companies = _get_companies_in_group(group)
-        companies.remove(company)
-
-        # Get balance with each other company
-        for other_company in companies:
-            balance = get_intercompany_balance(company, other_company)
-            if flt(balance["balance"]) != 0:
-                balances.append(balance)
-
+        pairs = [(company, other) for other in companies if other != company]
     elif company_group:
         # Get all pairwise balances within the group
         companies = _get_companies_in_group(company_group)
+        pairs = [(source, target) for i, source in enumerate(companies) for target in companies[i + 1:]]
+    else:
+        return balances
 
-        for i, source in enumerate(companies):
-            for target in companies[i + 1:]:
-                balance = get_intercompany_balance(source, target)
-                if flt(balance["balance"]) != 0:
-                    balances.append(balance)
+    matrix, currencies = _build_matrix(_load_balance_rows(companies))
+    as_of_date = nowdate()
+    for source, target in pairs:
+        currency = currencies.get(source) or currencies.get(target) or DEFAULT_CURRENCY
+        balance = _pair_balance(matrix, source, target, currency, as_of_date)
+        if flt(balance["balance"]) != 0 or flt(balance["counterparty_balance"]) != 0:
+            balances.append(balance)
 
     return balances
 
 
+def apply_gl_postings(entries: Iterable[Any], reverse: bool = False) -> int:
+    """Add GL postings on intercompany accounts to the Intercompany Balance rows.
+
+    Args:
+        entries: GL Entry documents or dicts with ``account``, ``debit``,
+            ``credit`` and ``posting_date``
+        reverse: Subtract the postings instead (cancellation)
+
+    Returns:
+        Number of balance rows updated
+    """
+    accounts = get_intercompany_accounts()
+    deltas: dict[tuple[str, str], list[Any]] = {}
+    for entry in entries:
+        pair = accounts.get(entry.get("account"))
+        if not pair:
+            continue
+        amount = flt(entry.get("credit")) - flt(entry.get("debit"))
+        if reverse:
+            amount = -amount
+        posting_date = getdate(entry.get("posting_date")) if entry.get("posting_date") else None
+        delta = deltas.get(pair)
+        if delta is None:
+            deltas[pair] = [amount, posting_date]
+        else:
+            delta[0] += amount
+            if posting_date and (not delta[1] or posting_date > delta[1]):
+                delta[1] = posting_date
+
+    _upsert_balances(deltas)
+    return len(deltas)
+
+
+def rebuild_intercompany_balances(company_group: str | None = None) -> int:
+    """Recompute Intercompany Balance rows from the GL.
+
+    Args:
+        company_group: Optional group to rebuild; every company otherwise
+
+    Returns:
+        Number of balance rows written
+    """
+    companies = _get_companies_in_group(company_group) if company_group else None
+    if companies is not None and not companies:
+        return 0
+
+    rows = _query_gl_balances(companies)
+    if companies is None:
+        frappe.db.sql(f"DELETE FROM `tab{INTERCOMPANY_BALANCE_DOCTYPE}`")
+    else:
+        frappe.db.sql(
+            f"DELETE FROM `tab{INTERCOMPANY_BALANCE_DOCTYPE}` WHERE `company` IN %(companies)s",
+            {"companies": tuple(companies)},
+        )
+
+    _upsert_balances(
+        {
+            (row["company"], row["counterparty_company"]): [flt(row["balance"]), row["last_posting_date"]]
+            for row in rows
+        }
+    )
+    return len(rows)
+
+
+def get_intercompany_accounts() -> dict[str, tuple[str, str]]:
+    """Return ``{account: (company, counterparty_company)}`` for intercompany accounts."""
+    key = versioned_key(INTERCOMPANY_ACCOUNTS_NAMESPACE, "all")
+    accounts = frappe.cache().get_value(key)
+    if accounts is None:
+        accounts = {
+            name: (company, counterparty)
+            for name, company, counterparty in frappe.get_all(
+                "Account",
+                filters={
+                    "intercompany_account_type": ["in", INTERCOMPANY_ACCOUNT_TYPES],
+                    "counterparty_company": ["is", "set"],
+                },
+                fields=["name", "company", "counterparty_company"],
+                as_list=True,
+            )
+        }
+        frappe.cache().set_value(key, accounts, expires_in_sec=DEFAULT_TTL_SECONDS)
+    return accounts
+
+
+def clear_intercompany_accounts_cache(*_args: Any, **_kwargs: Any) -> None:
+    """Invalidate the cached intercompany account map."""
+    bump_cache_version(INTERCOMPANY_ACCOUNTS_NAMESPACE)
+
+
+def on_account_change(doc: Any, method: str | None = None) -> None:
+    """Account hook: refresh the intercompany account map.
+
+    Postings already made keep their balances; re-pointing an account that has
+    postings needs :func:`rebuild_intercompany_balances`.
+    """
+    clear_intercompany_accounts_cache()
+
+
+def on_gl_entry_submit(doc: Any, method: str | None = None) -> None:
+    """GL Entry hook: add the posting to the intercompany balances."""
+    apply_gl_postings([doc])
+
+
+def on_gl_entry_cancel(doc: Any, method: str | None = None) -> None:
+    """GL Entry hook: remove the posting from the intercompany balances."""
+    apply_gl_postings([doc], reverse=True)
+
+
 def get_pending_settlements(
     company: str | None = None,
     status: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    after: tuple[str, str] | None = None,
 ) -> list[dict[str, Any]]:
-    """Get pending intercompany settlements.
+    """Get pending intercompany settlements, newest first.
+
+    A company's settlements are read as a ``UNION ALL`` of one branch per
+    (source/target company, docstatus). Each branch is a range scan on the
+    (company, docstatus, modified) index that stops after ``offset + limit``
+    rows, so no branch scans or sorts the whole table.
 
     Args:
-        company: Optional company to filter settlements for
+        company: Optional company to filter settlements for (as source or target)
         status: Optional status filter (Draft, Settled, Cancelled)
+        limit: Optional maximum number of settlements
+        offset: Settlements to skip
+        after: Optional (modified, name) of the last settlement of the previous
+            page (keyset pagination)
 
     Returns:
         List of settlement dictionaries
     """
-    filters = {"docstatus": ["<", 2]}  # Not cancelled
-
-    if company:
-        # Include settlements where company is source or target
-        filters = {
-            "docstatus": ["<", 2],
-        }
-        # Use OR condition for source/target
-        settlements = frappe.db.get_all(
-            "Intercompany Settlement",
-            filters=filters,
-            fields=["name", "source_company", "target_company", "settlement_amount",
-                    "settlement_currency", "settlement_date", "status", "submitted_by"],
-            or_filters={
-                "source_company": company,
-                "target_company": company,
-            },
-            order_by="modified desc",
+    branches = _settlement_branches(company, status)
+    if not branches:
+        return []
+
+    values: dict[str, Any] = {"company": company, "status": status}
+    keyset = ""
+    if after:
+        keyset = (
+            " AND `modified` <= %(after_modified)s"
+            " AND (`modified` < %(after_modified)s OR `name` < %(after_name)s)"
         )
+        values.update(after_modified=after[0], after_name=after[1])
+
+    order_by = "ORDER BY `modified` DESC, `name` DESC"
+    limit_clause = f"LIMIT {cint(offset) + cint(limit)}" if limit else ""
+    columns = ", ".join(f"`{field}`" for field in SETTLEMENT_LIST_FIELDS)
+    queries = [
+        f"SELECT {columns} FROM `tab{SETTLEMENT_DOCTYPE}` "
+        f"WHERE {conditions}{keyset} {order_by} {limit_clause}"
+        for conditions in branches
+    ]
+    if len(queries) == 1:
+        query = queries[0]
     else:
-        if status:
-            filters["status"] = status
-
-        settlements = frappe.db.get_all(
-            "Intercompany Settlement",
-            filters=filters,
-            fields=["name", "source_company", "target_company", "settlement_amount",
-                    "settlement_currency", "settlement_date", "status", "submitted_by"],
-            order_by="modified desc",
-        )
+        query = " UNION ALL ".join(f"({branch})" for branch in queries) + f" {order_by} {limit_clause}"
 
+    settlements = frappe.db.sql(query, values, as_dict=True)
+    if offset:
+        settlements = settlements[cint(offset):]
     return settlements
 
 
+def count_pending_settlements(company: str | None = None, status: str | None = None) -> int:
+    """Count the settlements :func:`get_pending_settlements` would return."""
+    branches = _settlement_branches(company, status)
+    if not branches:
+        return 0
+
+    counts = frappe.db.sql(
+        " UNION ALL ".join(
+            f"SELECT COUNT(*) FROM `tab{SETTLEMENT_DOCTYPE}` WHERE {conditions}" for conditions in branches
+        ),
+        {"company": company, "status": status},
+    )
+    return sum(cint(row[0]) for row in counts)
+
+
 def _validate_companies_in_same_group(company1: str, company2: str) -> None:
     """Validate that two companies are in the same company group.
 
@@ -149,8 +360,8 @@ def _validate_companies_in_same_group(company1: str, company2: str) -> None:
     if company1 == company2:
         frappe.throw(_("Cannot calculate intercompany balance for the same company"))
 
-    group1 = frappe.db.get_value("Company", company1, "company_group")
-    group2 = frappe.db.get_value("Company", company2, "company_group")
+    group1 = membership.get_company_group(company1)
+    group2 = membership.get_company_group(company2)
 
     if not group1 or not group2:
         frappe.throw(_("Both companies must belong to a Company Group"))
@@ -171,10 +382,163 @@ def _get_companies_in_group(group_code: str) -> list[str]:
     Returns:
         List of company codes
     """
-    companies = frappe.db.get_all(
-        "Company Group Member",
-        filters={"parent": group_code},
-        fields=["company"],
-        pluck="company",
+    return membership.get_group_companies(group_code)
+
+
+def _settlement_branches(company: str | None, status: str | None) -> list[str]:
+    """Return the WHERE clause of each index range scan covering the settlements."""
+    if status:
+        if status not in SETTLEMENT_STATUS_DOCSTATUS:
+            frappe.throw(_("Invalid settlement status: {0}").format(status))
+        docstatuses = [SETTLEMENT_STATUS_DOCSTATUS[status]]
+    else:
+        # Not cancelled
+        docstatuses = [0, 1]
+
+    # Source and target never match, so the branches never return the same row
+    company_columns = ["source_company", "target_company"] if company else [None]
+    branches = []
+    for column in company_columns:
+        for docstatus in docstatuses:
+            conditions = [f"`docstatus` = {docstatus}"]
+            if column:
+                conditions.insert(0, f"`{column}` = %(company)s")
+            if status:
+                conditions.append("`status` = %(status)s")
+            branches.append(" AND ".join(conditions))
+    return branches
+
+
+def _load_balance_rows(companies: list[str]) -> list[dict[str, Any]]:
+    """Return the Intercompany Balance rows between ``companies`` in one query."""
+    if not companies:
+        return []
+    return frappe.get_all(
+        INTERCOMPANY_BALANCE_DOCTYPE,
+        filters={"company": ["in", companies], "counterparty_company": ["in", companies]},
+        fields=["company", "counterparty_company", "balance", "currency"],
+    )
+
+
+def _query_gl_balances(
+    companies: list[str] | None = None,
+    as_of_date: str | None = None,
+) -> list[dict[str, Any]]:
+    """Sum intercompany GL postings per (company, counterparty) in one grouped query."""
+    if not frappe.db.table_exists("GL Entry"):
+        return []
+
+    conditions = ["acc.`intercompany_account_type` IN %(account_types)s", "gle.`docstatus` = 1"]
+    values: dict[str, Any] = {"account_types": INTERCOMPANY_ACCOUNT_TYPES}
+    if companies is not None:
+        conditions.append("acc.`company` IN %(companies)s")
+        values["companies"] = tuple(companies)
+    if as_of_date:
+        conditions.append("gle.`posting_date` <= %(as_of_date)s")
+        values["as_of_date"] = as_of_date
+
+    return frappe.db.sql(
+        f"""
+        SELECT
+            acc.`company` AS company,
+            acc.`counterparty_company` AS counterparty_company,
+            SUM(gle.`credit` - gle.`debit`) AS balance,
+            MAX(gle.`posting_date`) AS last_posting_date,
+            co.`default_currency` AS currency
+        FROM `tabGL Entry` gle
+        INNER JOIN `tabAccount` acc ON acc.`name` = gle.`account`
+        LEFT JOIN `tabCompany` co ON co.`name` = acc.`company`
+        WHERE {" AND ".join(conditions)}
+        GROUP BY acc.`company`, acc.`counterparty_company`, co.`default_currency`
+        """,
+        values,
+        as_dict=True,
+    )
+
+
+def _upsert_balances(deltas: dict[tuple[str, str], list[Any]]) -> None:
+    """Add ``{(company, counterparty): [amount, last_posting_date]}`` to the balance rows."""
+    if not deltas:
+        return
+
+    companies = sorted({company for company, _counterparty in deltas})
+    currencies = dict(
+        frappe.get_all(
+            "Company",
+            filters={"name": ["in", companies]},
+            fields=["name", "default_currency"],
+            as_list=True,
+        )
+    )
+    timestamp = now()
+    rows = [
+        (
+            _balance_name(company, counterparty),
+            timestamp,
+            timestamp,
+            "Administrator",
+            "Administrator",
+            0,
+            company,
+            counterparty,
+            amount,
+            currencies.get(company) or DEFAULT_CURRENCY,
+            posting_date,
+        )
+        for (company, counterparty), (amount, posting_date) in deltas.items()
+    ]
+    column_list = ", ".join(f"`{column}`" for column in BALANCE_FIELDS)
+    row_placeholder = "(" + ", ".join(["%s"] * len(BALANCE_FIELDS)) + ")"
+    placeholders = ", ".join([row_placeholder] * len(rows))
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{INTERCOMPANY_BALANCE_DOCTYPE}` ({column_list})
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            `balance` = `balance` + VALUES(`balance`),
+            `last_posting_date` = GREATEST(
+                COALESCE(`last_posting_date`, VALUES(`last_posting_date`)),
+                COALESCE(VALUES(`last_posting_date`), `last_posting_date`)
+            ),
+            `modified` = VALUES(`modified`)
+        """,
+        [value for row in rows for value in row],
     )
-    return companies
+
+
+def _build_matrix(
+    rows: Iterable[dict[str, Any]],
+) -> tuple[dict[str, dict[str, float]], dict[str, str]]:
+    matrix: dict[str, dict[str, float]] = {}
+    currencies: dict[str, str] = {}
+    for row in rows:
+        matrix.setdefault(row["company"], {})[row["counterparty_company"]] = flt(row["balance"])
+        if row.get("currency"):
+            currencies[row["company"]] = row["currency"]
+    return matrix, currencies
+
+
+def _pair_balance(
+    matrix: dict[str, dict[str, float]],
+    source_company: str,
+    target_company: str,
+    currency: str,
+    as_of_date: str,
+) -> dict[str, Any]:
+    balance = flt(matrix.get(source_company, {}).get(target_company))
+    counterparty_balance = -flt(matrix.get(target_company, {}).get(source_company))
+    return {
+        "source_company": source_company,
+        "target_company": target_company,
+        "balance": balance,
+        "counterparty_balance": counterparty_balance,
+        "difference": flt(balance - counterparty_balance),
+        "as_of_date": as_of_date,
+        "currency": currency,
+    }
+
+
+def _balance_name(company: str, counterparty_company: str) -> str:
+    raw_key = f"{company}\x1f{counterparty_company}"
+    digest = hashlib.sha1(raw_key.encode()).hexdigest()
+    return f"ICB-{digest[:20]}"
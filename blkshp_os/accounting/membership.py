@@ -0,0 +1,174 @@
+"""Cached company-group membership graph.
+
+Intercompany validation and listings need to know which group a company
+belongs to, who else is in that group and which companies a user holds User
+Permissions for. Instead of querying Company Group Member and User Permission
+on every call, two maps are cached:
+
+- the membership graph (company → group, group → members), loaded from
+  Company Group Member with one query, versioned globally and invalidated
+  from Company Group ``on_update``/``on_trash`` and Company renames;
+- each user's permitted companies, loaded with one User Permission query,
+  versioned per user and invalidated on User Permission changes.
+
+Both live in ``frappe.cache()`` and are memoized on ``frappe.local`` for the
+request, so repeated checks are dictionary lookups.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import frappe
+
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    on_rollback,
+    versioned_key,
+)
+
+MEMBERSHIP_CACHE_NAMESPACE = "blkshp_os:company_group_membership"
+USER_COMPANIES_CACHE_NAMESPACE = "blkshp_os:user_permitted_companies"
+_LOCAL_GRAPH_ATTR = "blkshp_company_group_graph"
+_LOCAL_USER_COMPANIES_ATTR = "blkshp_user_permitted_companies"
+
+
+def get_membership_graph() -> dict[str, dict[str, Any]]:
+    """Return ``{"groups": {company: group}, "members": {group: [companies]}}``."""
+    graph = getattr(frappe.local, _LOCAL_GRAPH_ATTR, None)
+    if graph is not None:
+        return graph
+
+    key = versioned_key(MEMBERSHIP_CACHE_NAMESPACE, "graph")
+    graph = frappe.cache().get_value(key)
+    if graph is None:
+        graph = load_membership_graph()
+        frappe.cache().set_value(key, graph, expires_in_sec=DEFAULT_TTL_SECONDS)
+
+    setattr(frappe.local, _LOCAL_GRAPH_ATTR, graph)
+    return graph
+
+
+def load_membership_graph() -> dict[str, dict[str, Any]]:
+    """Build the membership graph from the database."""
+    groups: dict[str, str] = {}
+    members: dict[str, list[str]] = {}
+    for group, company in frappe.get_all(
+        "Company Group Member",
+        filters={"parenttype": "Company Group"},
+        fields=["parent", "company"],
+        order_by="parent asc, idx asc",
+        as_list=True,
+    ):
+        groups[company] = group
+        members.setdefault(group, []).append(company)
+    return {"groups": groups, "members": members}
+
+
+def get_company_group(company: str | None) -> str | None:
+    """Return the Company Group ``company`` belongs to, if any."""
+    if not company:
+        return None
+    return get_membership_graph()["groups"].get(company)
+
+
+def get_group_companies(company_group: str | None) -> list[str]:
+    """Return the member companies of ``company_group``."""
+    if not company_group:
+        return []
+    return list(get_membership_graph()["members"].get(company_group, ()))
+
+
+def get_permitted_companies(user: str) -> frozenset[str]:
+    """Return the companies ``user`` holds a User Permission for."""
+    local = _local_user_companies()
+    if user in local:
+        return local[user]
+
+    key = versioned_key(_user_namespace(user), user)
+    companies = frappe.cache().get_value(key)
+    if companies is None:
+        companies = frozenset(
+            frappe.get_all(
+                "User Permission",
+                filters={"user": user, "allow": "Company"},
+                pluck="for_value",
+            )
+        )
+        frappe.cache().set_value(key, companies, expires_in_sec=DEFAULT_TTL_SECONDS)
+
+    local[user] = companies
+    return companies
+
+
+def user_has_company_permission(user: str, company: str) -> bool:
+    """Check whether ``user`` holds a User Permission for ``company``."""
+    return company in get_permitted_companies(user)
+
+
+def clear_membership_cache() -> None:
+    """Invalidate the membership graph.
+
+    Repeated on commit so a graph another worker built from uncommitted
+    data is not kept.
+    """
+    bump_cache_version(MEMBERSHIP_CACHE_NAMESPACE)
+    _clear_local_graph()
+
+
+def clear_user_companies_cache(user: str | None) -> None:
+    """Invalidate the cached permitted companies of ``user``."""
+    if not user:
+        return
+    bump_cache_version(_user_namespace(user))
+    _clear_local_user(user)
+
+
+# ---------------------------------------------------------------------------
+# Document hooks
+# ---------------------------------------------------------------------------
+
+
+def on_company_change(doc: Any, method: str | None = None) -> None:
+    """Company hook: renamed companies are renamed in Company Group Member too."""
+    clear_membership_cache()
+
+
+def on_user_permission_change(doc: Any, method: str | None = None) -> None:
+    """User Permission hook: the user's permitted companies may have changed."""
+    users = {doc.get("user")}
+    before = doc.get_doc_before_save() if hasattr(doc, "get_doc_before_save") else None
+    if before is not None:
+        users.add(before.get("user"))
+    for user in users:
+        clear_user_companies_cache(user)
+
+
+def _user_namespace(user: str) -> str:
+    return f"{USER_COMPANIES_CACHE_NAMESPACE}:user:{user}"
+
+
+def _clear_local_graph() -> None:
+    def clear() -> None:
+        if hasattr(frappe.local, _LOCAL_GRAPH_ATTR):
+            delattr(frappe.local, _LOCAL_GRAPH_ATTR)
+
+    clear()
+    on_rollback(clear)
+
+
+def _clear_local_user(user: str) -> None:
+    def clear() -> None:
+        _local_user_companies().pop(user, None)
+
+    clear()
+    on_rollback(clear)
+
+
+def _local_user_companies() -> dict[str, frozenset[str]]:
+    cache = getattr(frappe.local, _LOCAL_USER_COMPANIES_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(frappe.local, _LOCAL_USER_COMPANIES_ATTR, cache)
+    return cache
@@ -0,0 +1,526 @@
+"""Multilateral netting of intercompany balances.
+
+Settling every pair of a Company Group separately takes one transfer (and one
+pair of journal entries) per non-zero pair. Netting instead reduces the
+group's pairwise balances to one net position per company and proposes the
+transfers that clear those positions:
+
+- Without constraints, creditors and debtors are matched greedily: equal
+  amounts first, then largest debtor against largest creditor. A group of
+  ``n`` companies needs at most ``n - 1`` transfers and a few hundred
+  companies net in milliseconds.
+- When some payer → payee pairs may not transfer directly (``blocked_pairs``)
+  or carry different costs (``pair_costs``), the positions are cleared with a
+  min-cost flow over the allowed pairs instead. Unconstrained debtors share a
+  hub node, so the network stays small when only a few debtors are
+  constrained. Positions no allowed pair can clear are reported as
+  ``unsettled``.
+
+Pairs whose two sides disagree (one company has booked transactions the other
+has not) are left out of the netting and reported as ``unreconciled``.
+Amounts are netted in integer cents.
+"""
+
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import now, nowdate
+
+from blkshp_os.accounting import intercompany_service, membership
+
+SETTLEMENT_DOCTYPE = "Intercompany Settlement"
+SETTLEMENT_SERIES = "SETTLE-.YYYY.-"
+SETTLEMENT_SERIES_DIGITS = 5
+DEFAULT_TOLERANCE = 0.01
+_COST_EPSILON = 1e-9
+
+SETTLEMENT_FIELDS = [
+    "name",
+    "creation",
+    "modified",
+    "owner",
+    "modified_by",
+    "docstatus",
+    "naming_series",
+    "status",
+    "source_company",
+    "target_company",
+    "settlement_amount",
+    "settlement_currency",
+    "reference_number",
+    "payment_method",
+    "description",
+]
+
+Pair = tuple[str, str]
+
+
+def propose_group_netting(
+    company_group: str,
+    blocked_pairs: Iterable[Pair] | None = None,
+    pair_costs: Mapping[Pair, float] | None = None,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> dict[str, Any]:
+    """Propose the settlements that net out ``company_group``'s balances.
+
+    Args:
+        company_group: Company Group code
+        blocked_pairs: (payer, payee) pairs that may not settle directly
+        pair_costs: Cost per unit transferred for (payer, payee) pairs (default 1)
+        tolerance: Largest difference between the two sides of a pair that is
+            still considered reconciled
+
+    Returns:
+        Dictionary with the group's ``currency``, ``net_positions`` (positive =
+        company pays), proposed ``settlements``, ``unreconciled`` pairs,
+        ``unsettled`` positions and gross/net transfer counts and amounts
+    """
+    matrix = intercompany_service.get_intercompany_balance_matrix(company_group)
+    obligations, unreconciled = pairwise_obligations(matrix, tolerance)
+    positions = net_positions(obligations)
+
+    blocked = {tuple(pair) for pair in blocked_pairs or ()}
+    if blocked or pair_costs:
+        transfers, unsettled = min_cost_settlements(positions, blocked, pair_costs)
+        method = "min_cost_flow"
+    else:
+        transfers, unsettled = greedy_settlements(positions), {}
+        method = "greedy"
+
+    return {
+        "company_group": company_group,
+        "currency": _group_currency(company_group, matrix),
+        "method": method,
+        "net_positions": {company: _to_amount(cents) for company, cents in sorted(positions.items())},
+        "settlements": [
+            {"source_company": payer, "target_company": payee, "amount": _to_amount(cents)}
+            for payer, payee, cents in transfers
+        ],
+        "gross_transfers": len(obligations),
+        "gross_amount": _to_amount(sum(obligations.values())),
+        "net_transfers": len(transfers),
+        "net_amount": _to_amount(sum(cents for _payer, _payee, cents in transfers)),
+        "unreconciled": unreconciled,
+        "unsettled": {company: _to_amount(cents) for company, cents in sorted(unsettled.items())},
+    }
+
+
+def create_netting_settlements(
+    company_group: str,
+    blocked_pairs: Iterable[Pair] | None = None,
+    pair_costs: Mapping[Pair, float] | None = None,
+    payment_method: str | None = None,
+    description: str | None = None,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> dict[str, Any]:
+    """Create draft Intercompany Settlements for a netting proposal.
+
+    The drafts are inserted with one bulk insert and share a
+    ``reference_number`` identifying the netting run. Group membership and
+    amounts are validated once for the batch; dual approval still applies
+    when each draft is submitted.
+
+    Balances only change when settlements are submitted, so a group with
+    Draft settlements between its members (from an earlier netting run or
+    entered by hand) is refused: netting again would settle the same
+    balances twice. Runs for the same group are serialized by locking the
+    Company Group row.
+
+    Returns:
+        The proposal from :func:`propose_group_netting` with the created
+        ``settlement_names`` and the run's ``reference_number``
+    """
+    _validate_payment_method(payment_method)
+    frappe.db.sql("SELECT `name` FROM `tabCompany Group` WHERE `name` = %s FOR UPDATE", (company_group,))
+    pending = _pending_group_drafts(company_group)
+    if pending:
+        frappe.throw(
+            _(
+                "Company Group {0} already has Draft settlements ({1}). Submit or delete them before netting again."
+            ).format(company_group, ", ".join(pending)),
+            frappe.DuplicateEntryError,
+        )
+
+    proposal = propose_group_netting(company_group, blocked_pairs, pair_costs, tolerance)
+    settlements = proposal["settlements"]
+    proposal["settlement_names"] = []
+    proposal["reference_number"] = None
+    if not settlements:
+        return proposal
+
+    reference_number = f"NET-{frappe.generate_hash(length=10).upper()}"
+    description = description or _("Multilateral netting of Company Group {0} on {1}").format(
+        company_group, nowdate()
+    )
+    names = _reserve_settlement_names(len(settlements))
+    timestamp = now()
+    user = frappe.session.user
+    values = [
+        (
+            name,
+            timestamp,
+            timestamp,
+            user,
+            user,
+            0,
+            SETTLEMENT_SERIES,
+            "Draft",
+            settlement["source_company"],
+            settlement["target_company"],
+            settlement["amount"],
+            proposal["currency"],
+            reference_number,
+            payment_method,
+            description,
+        )
+        for name, settlement in zip(names, settlements, strict=True)
+    ]
+    frappe.db.bulk_insert(SETTLEMENT_DOCTYPE, SETTLEMENT_FIELDS, values)
+
+    proposal["settlement_names"] = names
+    proposal["reference_number"] = reference_number
+    return proposal
+
+
+def pairwise_obligations(
+    matrix: Mapping[str, Mapping[str, float]],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> tuple[dict[Pair, int], list[dict[str, Any]]]:
+    """Reduce a balance matrix to one obligation per company pair.
+
+    Args:
+        matrix: ``{company: {counterparty: balance}}`` from each company's own
+            books (positive = company owes counterparty)
+        tolerance: Largest difference between the two sides still accepted
+
+    Returns:
+        ``{(payer, payee): cents}`` for reconciled non-zero pairs, and the
+        unreconciled pairs with both sides' view of the balance
+    """
+    pairs = {tuple(sorted((company, counterparty))) for company in matrix for counterparty in matrix[company]}
+    obligations: dict[Pair, int] = {}
+    unreconciled: list[dict[str, Any]] = []
+    for first, second in sorted(pairs):
+        balance = matrix.get(first, {}).get(second, 0.0)
+        counterparty_balance = -matrix.get(second, {}).get(first, 0.0)
+        if abs(balance - counterparty_balance) > tolerance:
+            unreconciled.append(
+                {
+                    "source_company": first,
+                    "target_company": second,
+                    "balance": balance,
+                    "counterparty_balance": counterparty_balance,
+                }
+            )
+            continue
+
+        cents = _to_cents(balance)
+        if cents > 0:
+            obligations[(first, second)] = cents
+        elif cents < 0:
+            obligations[(second, first)] = -cents
+    return obligations, unreconciled
+
+
+def net_positions(obligations: Mapping[Pair, int]) -> dict[str, int]:
+    """Return each company's net position in cents (positive = company pays)."""
+    positions: dict[str, int] = {}
+    for (payer, payee), cents in obligations.items():
+        positions[payer] = positions.get(payer, 0) + cents
+        positions[payee] = positions.get(payee, 0) - cents
+    return {company: cents for company, cents in positions.items() if cents}
+
+
+def greedy_settlements(positions: Mapping[str, int]) -> list[tuple[str, str, int]]:
+    """Clear net positions with at most ``len(positions) - 1`` transfers.
+
+    Debtors and creditors with equal amounts settle each other first; the
+    rest are matched largest against largest.
+
+    Returns:
+        ``(payer, payee, cents)`` transfers
+    """
+    debtors = {company: cents for company, cents in positions.items() if cents > 0}
+    creditors = {company: -cents for company, cents in positions.items() if cents < 0}
+    transfers: list[tuple[str, str, int]] = []
+
+    creditors_by_amount: dict[int, list[str]] = {}
+    for company in sorted(creditors):
+        creditors_by_amount.setdefault(creditors[company], []).append(company)
+    for payer in sorted(debtors):
+        matches = creditors_by_amount.get(debtors[payer])
+        if matches:
+            payee = matches.pop(0)
+            transfers.append((payer, payee, debtors.pop(payer)))
+            del creditors[payee]
+
+    # Max-heaps keyed by amount, then name for a deterministic proposal
+    debtor_heap = [(-cents, company) for company, cents in debtors.items()]
+    creditor_heap = [(-cents, company) for company, cents in creditors.items()]
+    heapq.heapify(debtor_heap)
+    heapq.heapify(creditor_heap)
+    while debtor_heap and creditor_heap:
+        debt, payer = heapq.heappop(debtor_heap)
+        credit, payee = heapq.heappop(creditor_heap)
+        cents = min(-debt, -credit)
+        transfers.append((payer, payee, cents))
+        if -debt > cents:
+            heapq.heappush(debtor_heap, (debt + cents, payer))
+        if -credit > cents:
+            heapq.heappush(creditor_heap, (credit + cents, payee))
+    return transfers
+
+
+def min_cost_settlements(
+    positions: Mapping[str, int],
+    blocked_pairs: Iterable[Pair] = (),
+    pair_costs: Mapping[Pair, float] | None = None,
+) -> tuple[list[tuple[str, str, int]], dict[str, int]]:
+    """Clear net positions over allowed payer → payee pairs at minimum cost.
+
+    Primal-dual min-cost flow on the debtor/creditor network: Dijkstra with
+    potentials finds the current shortest path cost, then a blocking flow
+    saturates every path of that cost at once. Debtors named in ``blocked_pairs`` or ``pair_costs`` get one edge
+    per allowed creditor costing ``pair_costs`` per unit (default 1). Every
+    other debtor may pay any creditor at the default cost, so those debtors
+    share a single hub node instead of a complete set of edges, and the hub's
+    flow is split into transfers with :func:`greedy_settlements`. Run time
+    therefore grows with the number of constrained debtors, not the group size.
+
+    Returns:
+        ``(payer, payee, cents)`` transfers and the positions left unsettled
+    """
+    blocked = set(blocked_pairs)
+    pair_costs = pair_costs or {}
+    debtors = sorted(company for company, cents in positions.items() if cents > 0)
+    creditors = sorted(company for company, cents in positions.items() if cents < 0)
+    constrained = {payer for payer, _payee in blocked | set(pair_costs)}
+
+    # Nodes: 0 = source, debtors, creditors, hub, sink
+    first_creditor = len(debtors) + 1
+    hub = first_creditor + len(creditors)
+    source, sink = 0, hub + 1
+    graph: list[list[list[Any]]] = [[] for _ in range(sink + 1)]
+
+    def add_edge(start: int, end: int, capacity: int, cost: float) -> None:
+        # Edge: [end, capacity, cost, index of reverse edge in graph[end]]
+        graph[start].append([end, capacity, cost, len(graph[end])])
+        graph[end].append([start, 0, -cost, len(graph[start]) - 1])
+
+    for index, payer in enumerate(debtors, start=1):
+        add_edge(source, index, positions[payer], 0.0)
+    for index, payee in enumerate(creditors, start=first_creditor):
+        add_edge(index, sink, -positions[payee], 0.0)
+    for payer_index, payer in enumerate(debtors, start=1):
+        if payer not in constrained:
+            add_edge(payer_index, hub, positions[payer], 0.0)
+            continue
+        for payee_index, payee in enumerate(creditors, start=first_creditor):
+            if (payer, payee) not in blocked:
+                capacity = min(positions[payer], -positions[payee])
+                add_edge(payer_index, payee_index, capacity, float(pair_costs.get((payer, payee), 1.0)))
+    if graph[hub]:
+        for payee_index, payee in enumerate(creditors, start=first_creditor):
+            add_edge(hub, payee_index, -positions[payee], 1.0)
+
+    potential = [0.0] * (sink + 1)
+    while _update_potentials(graph, potential, source, sink):
+        _augment_shortest_paths(graph, potential, source, sink)
+
+    # Reverse edges carry the flow sent along their forward edge
+    transfers: list[tuple[str, str, int]] = []
+    hub_positions: dict[str, int] = {}
+    for payer_index, payer in enumerate(debtors, start=1):
+        for end, _capacity, _cost, reverse in graph[payer_index]:
+            sent = graph[end][reverse][1] if end >= first_creditor else 0
+            if sent <= 0:
+                continue
+            if end == hub:
+                hub_positions[payer] = sent
+            elif end != sink:
+                transfers.append((payer, creditors[end - first_creditor], sent))
+    for end, _capacity, _cost, reverse in graph[hub]:
+        if first_creditor <= end < hub:
+            received = graph[end][reverse][1]
+            if received > 0:
+                hub_positions[creditors[end - first_creditor]] = -received
+    transfers.extend(greedy_settlements(hub_positions))
+
+    unsettled: dict[str, int] = {}
+    for index, payer in enumerate(debtors, start=1):
+        remaining = graph[source][index - 1][1]
+        if remaining:
+            unsettled[payer] = remaining
+    for edge in graph[sink]:
+        # Reverse edges into the sink carry what each creditor received
+        payee = creditors[edge[0] - first_creditor]
+        remaining = -positions[payee] - edge[1]
+        if remaining:
+            unsettled[payee] = -remaining
+    return transfers, unsettled
+
+
+def _update_potentials(graph: list[list[list[Any]]], potential: list[float], source: int, sink: int) -> bool:
+    """Add residual shortest-path distances to ``potential``; False once ``sink`` is unreachable."""
+    distance = [float("inf")] * len(graph)
+    distance[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        dist, node = heapq.heappop(queue)
+        if dist > distance[node]:
+            continue
+        for end, capacity, cost, _reverse in graph[node]:
+            if capacity <= 0:
+                continue
+            candidate = dist + cost + potential[node] - potential[end]
+            if candidate < distance[end] - _COST_EPSILON:
+                distance[end] = candidate
+                heapq.heappush(queue, (candidate, end))
+    if distance[sink] == float("inf"):
+        return False
+    for node, dist in enumerate(distance):
+        if dist < float("inf"):
+            potential[node] += dist
+    return True
+
+
+def _augment_shortest_paths(
+    graph: list[list[list[Any]]], potential: list[float], source: int, sink: int
+) -> None:
+    """Saturate every current shortest path with a blocking flow (Dinic) on zero reduced-cost edges."""
+
+    def admissible(node: int, edge: list[Any]) -> bool:
+        end, capacity, cost, _reverse = edge
+        return capacity > 0 and abs(cost + potential[node] - potential[end]) <= _COST_EPSILON
+
+    while True:
+        level = [-1] * len(graph)
+        level[source] = 0
+        frontier = [source]
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                for edge in graph[node]:
+                    if level[edge[0]] < 0 and admissible(node, edge):
+                        level[edge[0]] = level[node] + 1
+                        next_frontier.append(edge[0])
+            frontier = next_frontier
+        if level[sink] < 0:
+            return
+
+        pointer = [0] * len(graph)
+        path: list[tuple[int, int]] = []
+        node = source
+        while True:
+            if node == sink:
+                flow = min(graph[start][index][1] for start, index in path)
+                for start, index in path:
+                    edge = graph[start][index]
+                    edge[1] -= flow
+                    graph[edge[0]][edge[3]][1] += flow
+                path.clear()
+                node = source
+                continue
+
+            edges = graph[node]
+            while pointer[node] < len(edges):
+                edge = edges[pointer[node]]
+                if level[edge[0]] == level[node] + 1 and admissible(node, edge):
+                    break
+                pointer[node] += 1
+            if pointer[node] < len(edges):
+                path.append((node, pointer[node]))
+                node = edges[pointer[node]][0]
+                continue
+
+            # Dead end: retreat and skip the edge that led here
+            if not path:
+                break
+            level[node] = -1
+            node, _index = path.pop()
+            pointer[node] += 1
+
+
+def _validate_payment_method(payment_method: str | None) -> None:
+    """Refuse a payment method the settlement's Select field does not offer.
+
+    The drafts are bulk inserted, so the controller validation does not run.
+    """
+    if not payment_method:
+        return
+    options = frappe.get_meta(SETTLEMENT_DOCTYPE).get_field("payment_method").options
+    allowed = [option for option in (options or "").split("\n") if option]
+    if payment_method not in allowed:
+        frappe.throw(
+            _("Payment Method {0} is not one of {1}").format(
+                payment_method, ", ".join(allowed)
+            )
+        )
+
+
+def _pending_group_drafts(company_group: str) -> list[str]:
+    """Return the Draft settlements between members of ``company_group``."""
+    companies = membership.get_group_companies(company_group)
+    if len(companies) < 2:
+        return []
+    return frappe.get_all(
+        SETTLEMENT_DOCTYPE,
+        filters={
+            "docstatus": 0,
+            "source_company": ["in", companies],
+            "target_company": ["in", companies],
+        },
+        order_by="name asc",
+        pluck="name",
+    )
+
+
+def _reserve_settlement_names(count: int) -> list[str]:
+    """Reserve ``count`` consecutive names from the settlement naming series."""
+    from frappe.model.naming import parse_naming_series
+
+    prefix = parse_naming_series(SETTLEMENT_SERIES)
+    current = frappe.db.sql("SELECT `current` FROM `tabSeries` WHERE `name` = %s FOR UPDATE", (prefix,))
+    if current and current[0][0] is not None:
+        start = current[0][0]
+        frappe.db.sql("UPDATE `tabSeries` SET `current` = `current` + %s WHERE `name` = %s", (count, prefix))
+    else:
+        start = 0
+        frappe.db.sql("INSERT INTO `tabSeries` (`name`, `current`) VALUES (%s, %s)", (prefix, count))
+    numbers = range(start + 1, start + count + 1)
+    return [f"{prefix}{number:0{SETTLEMENT_SERIES_DIGITS}d}" for number in numbers]
+
+
+def _group_currency(company_group: str, matrix: Mapping[str, Mapping[str, float]]) -> str:
+    """Return the single currency the group's balances can be netted in."""
+    group_currency = frappe.db.get_value("Company Group", company_group, "default_currency")
+    companies = sorted(matrix)
+    currencies = set()
+    if companies:
+        currencies = set(
+            frappe.get_all(
+                "Company",
+                filters={"name": ["in", companies], "default_currency": ["is", "set"]},
+                pluck="default_currency",
+            )
+        )
+    if len(currencies) > 1:
+        frappe.throw(
+            _("Companies in {0} use different currencies ({1}); balances cannot be netted").format(
+                company_group, ", ".join(sorted(currencies))
+            )
+        )
+    return group_currency or next(iter(currencies), intercompany_service.DEFAULT_CURRENCY)
+
+
+def _to_cents(amount: float) -> int:
+    return round(amount * 100)
+
+
+def _to_amount(cents: int) -> float:
+    return cents / 100
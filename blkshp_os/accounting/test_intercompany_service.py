@@ -0,0 +1,147 @@
+"""Tests for intercompany balances maintained from GL postings."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.accounting import intercompany_service
+
+
+class TestIntercompanyBalances(FrappeTestCase):
+    """Validate the balance table upserts and the group matrix reads."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.company1 = self._ensure_company("ICB-CO1", "Intercompany Balance Co 1")
+        self.company2 = self._ensure_company("ICB-CO2", "Intercompany Balance Co 2")
+        self.company3 = self._ensure_company("ICB-CO3", "Intercompany Balance Co 3")
+        self.group = self._ensure_group("ICB-GRP", [self.company1, self.company2, self.company3])
+
+        # Company 1 owes company 2; company 2 records the receivable
+        self.due_to_2 = self._ensure_account("ICB-1-DT-2", self.company1, "Due To", self.company2)
+        self.due_from_1 = self._ensure_account("ICB-2-DF-1", self.company2, "Due From", self.company1)
+        self.due_to_3 = self._ensure_account("ICB-1-DT-3", self.company1, "Due To", self.company3)
+        intercompany_service.clear_intercompany_accounts_cache()
+
+    def tearDown(self) -> None:
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_postings_update_balances_incrementally(self) -> None:
+        updated = intercompany_service.apply_gl_postings(
+            [
+                {"account": self.due_to_2, "credit": 1000, "debit": 0, "posting_date": "2026-10-01"},
+                {"account": self.due_from_1, "credit": 0, "debit": 1000, "posting_date": "2026-10-01"},
+                {"account": "NOT-INTERCOMPANY", "credit": 0, "debit": 1000},
+            ]
+        )
+        self.assertEqual(updated, 2)
+
+        intercompany_service.apply_gl_postings(
+            [{"account": self.due_to_2, "credit": 0, "debit": 250, "posting_date": "2026-10-05"}]
+        )
+
+        balance = intercompany_service.get_intercompany_balance(self.company1, self.company2)
+        self.assertEqual(balance["balance"], 750)
+        self.assertEqual(balance["counterparty_balance"], 1000)
+        self.assertEqual(balance["difference"], -250)
+
+        reverse = intercompany_service.get_intercompany_balance(self.company2, self.company1)
+        self.assertEqual(reverse["balance"], -1000)
+        self.assertEqual(reverse["counterparty_balance"], -750)
+
+        last_posting_date = frappe.db.get_value(
+            "Intercompany Balance",
+            {"company": self.company1, "counterparty_company": self.company2},
+            "last_posting_date",
+        )
+        self.assertEqual(str(last_posting_date), "2026-10-05")
+
+    def test_cancelled_postings_are_removed(self) -> None:
+        posting = {"account": self.due_to_2, "credit": 400, "debit": 0, "posting_date": "2026-10-01"}
+        intercompany_service.apply_gl_postings([posting])
+        intercompany_service.apply_gl_postings([posting], reverse=True)
+
+        balance = intercompany_service.get_intercompany_balance(self.company1, self.company2)
+        self.assertEqual(balance["balance"], 0)
+
+    def test_group_balances_read_matrix_once(self) -> None:
+        intercompany_service.apply_gl_postings(
+            [
+                {"account": self.due_to_2, "credit": 500, "debit": 0},
+                {"account": self.due_to_3, "credit": 300, "debit": 0},
+            ]
+        )
+
+        matrix = intercompany_service.get_intercompany_balance_matrix(self.group)
+        self.assertEqual(matrix[self.company1], {self.company2: 500, self.company3: 300})
+
+        with patch.object(
+            intercompany_service,
+            "get_intercompany_balance",
+            side_effect=AssertionError("pairwise lookup"),
+        ):
+            by_group = intercompany_service.get_all_intercompany_balances(company_group=self.group)
+            by_company = intercompany_service.get_all_intercompany_balances(company=self.company1)
+
+        self.assertEqual(
+            {(row["source_company"], row["target_company"], row["balance"]) for row in by_company},
+            {(self.company1, self.company2, 500), (self.company1, self.company3, 300)},
+        )
+        self.assertEqual(len(by_group), 2)
+
+    def test_account_changes_refresh_account_map(self) -> None:
+        self.assertIn(self.due_to_2, intercompany_service.get_intercompany_accounts())
+
+        account = frappe.get_doc("Account", self.due_to_2)
+        account.intercompany_account_type = None
+        account.save()
+
+        self.assertNotIn(self.due_to_2, intercompany_service.get_intercompany_accounts())
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _ensure_company(self, code: str, name: str) -> str:
+        if not frappe.db.exists("Company", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company",
+                    "company_name": name,
+                    "company_code": code,
+                    "default_currency": "USD",
+                }
+            ).insert(ignore_permissions=True)
+        return code
+
+    def _ensure_group(self, code: str, companies: list[str]) -> str:
+        if not frappe.db.exists("Company Group", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company Group",
+                    "group_name": code,
+                    "group_code": code,
+                    "enable_intercompany_transactions": 1,
+                    "member_companies": [{"company": company} for company in companies],
+                }
+            ).insert(ignore_permissions=True)
+        return code
+
+    def _ensure_account(self, code: str, company: str, account_type: str, counterparty: str) -> str:
+        if not frappe.db.exists("Account", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Account",
+                    "account_name": code,
+                    "account_code": code,
+                    "company": company,
+                    "account_type": "Liability" if account_type == "Due To" else "Asset",
+                    "intercompany_account_type": account_type,
+                    "counterparty_company": counterparty,
+                }
+            ).insert(ignore_permissions=True)
+        return code
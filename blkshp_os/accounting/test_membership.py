@@ -0,0 +1,115 @@
+"""Tests for the cached company-group membership graph."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.accounting import intercompany_service, membership
+
+
+class TestMembershipGraph(FrappeTestCase):
+    """Validate cached group membership and permitted companies."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.company1 = self._ensure_company("MEMB-CO1")
+        self.company2 = self._ensure_company("MEMB-CO2")
+        self.company3 = self._ensure_company("MEMB-CO3")
+        self.group = self._ensure_group("MEMB-GRP", [self.company1, self.company2])
+        self.user = self._ensure_user("membership_test@example.com")
+
+    def tearDown(self) -> None:
+        frappe.db.rollback()
+        membership.clear_membership_cache()
+        membership.clear_user_companies_cache(self.user)
+        super().tearDown()
+
+    def test_graph_maps_companies_and_groups(self) -> None:
+        self.assertEqual(membership.get_company_group(self.company1), self.group)
+        self.assertIsNone(membership.get_company_group(self.company3))
+        self.assertEqual(membership.get_group_companies(self.group), [self.company1, self.company2])
+
+    def test_validation_is_answered_from_the_graph(self) -> None:
+        intercompany_service._validate_companies_in_same_group(self.company1, self.company2)
+
+        with self.assertQueryCount(0):
+            intercompany_service._validate_companies_in_same_group(self.company1, self.company2)
+            self.assertEqual(
+                intercompany_service._get_companies_in_group(self.group), [self.company1, self.company2]
+            )
+
+        with self.assertRaises(frappe.ValidationError):
+            intercompany_service._validate_companies_in_same_group(self.company1, self.company3)
+
+    def test_group_changes_invalidate_graph(self) -> None:
+        self.assertIsNone(membership.get_company_group(self.company3))
+
+        group = frappe.get_doc("Company Group", self.group)
+        group.append("member_companies", {"company": self.company3})
+        group.save(ignore_permissions=True)
+
+        self.assertEqual(membership.get_company_group(self.company3), self.group)
+
+        group.delete(ignore_permissions=True)
+        self.assertIsNone(membership.get_company_group(self.company1))
+
+    def test_user_permission_changes_invalidate_permitted_companies(self) -> None:
+        self.assertFalse(membership.user_has_company_permission(self.user, self.company1))
+
+        permission = frappe.get_doc(
+            {
+                "doctype": "User Permission",
+                "user": self.user,
+                "allow": "Company",
+                "for_value": self.company1,
+            }
+        ).insert(ignore_permissions=True)
+        self.assertTrue(membership.user_has_company_permission(self.user, self.company1))
+
+        with self.assertQueryCount(0):
+            self.assertFalse(membership.user_has_company_permission(self.user, self.company2))
+
+        permission.delete(ignore_permissions=True)
+        self.assertFalse(membership.user_has_company_permission(self.user, self.company1))
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _ensure_company(self, code: str) -> str:
+        if not frappe.db.exists("Company", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company",
+                    "company_name": code,
+                    "company_code": code,
+                    "default_currency": "USD",
+                }
+            ).insert(ignore_permissions=True)
+        return code
+
+    def _ensure_group(self, code: str, companies: list[str]) -> str:
+        if not frappe.db.exists("Company Group", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company Group",
+                    "group_name": code,
+                    "group_code": code,
+                    "member_companies": [{"company": company} for company in companies],
+                }
+            ).insert(ignore_permissions=True)
+        return code
+
+    def _ensure_user(self, email: str) -> str:
+        if not frappe.db.exists("User", email):
+            frappe.get_doc(
+                {
+                    "doctype": "User",
+                    "email": email,
+                    "first_name": "Membership",
+                    "last_name": "Test",
+                    "send_welcome_email": 0,
+                }
+            ).insert(ignore_permissions=True)
+        return email
@@ -0,0 +1,182 @@
+"""Tests for multilateral netting of intercompany balances."""
+
+from __future__ import annotations
+
+import random
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.accounting import intercompany_service, netting
+
+
+class TestNetting(FrappeTestCase):
+    """Validate net positions, proposed transfers and bulk draft creation."""
+
+    def tearDown(self) -> None:
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_greedy_settlements_clear_positions(self) -> None:
+        # A owes B 100, B owes C 100, C owes A 30: one transfer A -> C suffices
+        obligations, unreconciled = netting.pairwise_obligations(
+            {
+                "A": {"B": 100, "C": -30},
+                "B": {"A": -100, "C": 100},
+                "C": {"A": 30, "B": -100},
+            }
+        )
+        self.assertEqual(unreconciled, [])
+
+        positions = netting.net_positions(obligations)
+        self.assertEqual(positions, {"A": 7000, "C": -7000})
+        self.assertEqual(netting.greedy_settlements(positions), [("A", "C", 7000)])
+
+    def test_large_group_needs_at_most_n_minus_one_transfers(self) -> None:
+        rng = random.Random(7)
+        companies = [f"CO-{index:03d}" for index in range(150)]
+        obligations: dict[tuple[str, str], int] = {}
+        for _ in range(2000):
+            payer, payee = rng.sample(companies, 2)
+            obligations[(payer, payee)] = obligations.get((payer, payee), 0) + rng.randint(1, 10**6)
+
+        positions = netting.net_positions(obligations)
+        transfers = netting.greedy_settlements(positions)
+
+        self.assertLessEqual(len(transfers), len(positions) - 1)
+        self.assertEqual(self._settled_positions(transfers), positions)
+
+    def test_min_cost_settlements_respect_blocked_pairs(self) -> None:
+        positions = {"A": 10000, "B": -6000, "C": -4000}
+
+        transfers, unsettled = netting.min_cost_settlements(positions, {("A", "C")})
+        self.assertEqual(transfers, [("A", "B", 6000)])
+        self.assertEqual(unsettled, {"A": 4000, "C": -4000})
+
+        transfers, unsettled = netting.min_cost_settlements(
+            {"A": 5000, "D": 5000, "B": -5000, "C": -5000},
+            pair_costs={("A", "B"): 5, ("D", "C"): 5},
+        )
+        self.assertEqual(sorted(transfers), [("A", "C", 5000), ("D", "B", 5000)])
+        self.assertEqual(unsettled, {})
+
+    def test_min_cost_settlements_scale_to_large_groups(self) -> None:
+        rng = random.Random(11)
+        companies = [f"CO-{index:03d}" for index in range(300)]
+        obligations: dict[tuple[str, str], int] = {}
+        for _ in range(3000):
+            payer, payee = rng.sample(companies, 2)
+            obligations[(payer, payee)] = obligations.get((payer, payee), 0) + rng.randint(1, 10**6)
+        positions = netting.net_positions(obligations)
+        debtors = sorted(company for company, cents in positions.items() if cents > 0)
+        creditors = sorted(company for company, cents in positions.items() if cents < 0)
+        blocked = {(rng.choice(debtors), rng.choice(creditors)) for _ in range(20)}
+
+        transfers, unsettled = netting.min_cost_settlements(positions, blocked)
+
+        self.assertEqual(unsettled, {})
+        self.assertFalse(blocked.intersection((payer, payee) for payer, payee, _cents in transfers))
+        self.assertEqual(self._settled_positions(transfers), positions)
+
+    def test_unreconciled_pairs_are_not_netted(self) -> None:
+        obligations, unreconciled = netting.pairwise_obligations({"A": {"B": 100}, "B": {"A": -80}})
+
+        self.assertEqual(obligations, {})
+        self.assertEqual(unreconciled[0]["balance"], 100)
+        self.assertEqual(unreconciled[0]["counterparty_balance"], 80)
+
+    def test_create_netting_settlements_inserts_drafts(self) -> None:
+        companies = [self._ensure_company(f"NET-CO{index}") for index in range(1, 4)]
+        group = self._ensure_group("NET-GRP", companies)
+        accounts = {
+            (company, counterparty): self._ensure_account(company, counterparty)
+            for company in companies
+            for counterparty in companies
+            if company != counterparty
+        }
+        intercompany_service.clear_intercompany_accounts_cache()
+
+        # CO1 owes CO2 500 and CO2 owes CO3 500, booked on both sides
+        postings = []
+        for payer, payee, amount in ((companies[0], companies[1], 500), (companies[1], companies[2], 500)):
+            postings.append({"account": accounts[(payer, payee)], "credit": amount, "debit": 0})
+            postings.append({"account": accounts[(payee, payer)], "credit": 0, "debit": amount})
+        intercompany_service.apply_gl_postings(postings)
+
+        result = netting.create_netting_settlements(group, payment_method="Wire")
+
+        self.assertEqual(result["gross_transfers"], 2)
+        self.assertEqual(result["net_transfers"], 1)
+        self.assertEqual(len(result["settlement_names"]), 1)
+
+        settlement = frappe.get_doc("Intercompany Settlement", result["settlement_names"][0])
+        self.assertEqual(settlement.status, "Draft")
+        self.assertEqual(settlement.source_company, companies[0])
+        self.assertEqual(settlement.target_company, companies[2])
+        self.assertEqual(settlement.settlement_amount, 500)
+        self.assertEqual(settlement.settlement_currency, "USD")
+        self.assertEqual(settlement.reference_number, result["reference_number"])
+        self.assertTrue(settlement.name.startswith("SETTLE-"))
+
+        # The drafts still await submission, so the same balances are not netted twice
+        with self.assertRaises(frappe.DuplicateEntryError):
+            netting.create_netting_settlements(group)
+
+    def test_create_netting_settlements_rejects_unknown_payment_method(self) -> None:
+        companies = [self._ensure_company(f"NET-CO{index}") for index in range(1, 3)]
+        group = self._ensure_group("NET-GRP-PM", companies)
+
+        with self.assertRaises(frappe.ValidationError):
+            netting.create_netting_settlements(group, payment_method="Barter")
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _settled_positions(self, transfers: list[tuple[str, str, int]]) -> dict[str, int]:
+        settled: dict[str, int] = {}
+        for payer, payee, cents in transfers:
+            settled[payer] = settled.get(payer, 0) + cents
+            settled[payee] = settled.get(payee, 0) - cents
+        return {company: cents for company, cents in settled.items() if cents}
+
+    def _ensure_company(self, code: str) -> str:
+        if not frappe.db.exists("Company", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company",
+                    "company_name": code,
+                    "company_code": code,
+                    "default_currency": "USD",
+                }
+            ).insert(ignore_permissions=True)
+        return code
+
+    def _ensure_group(self, code: str, companies: list[str]) -> str:
+        if not frappe.db.exists("Company Group", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company Group",
+                    "group_name": code,
+                    "group_code": code,
+                    "enable_intercompany_transactions": 1,
+                    "member_companies": [{"company": company} for company in companies],
+                }
+            ).insert(ignore_permissions=True)
+        return code
+
+    def _ensure_account(self, company: str, counterparty: str) -> str:
+        code = f"{company}-IC-{counterparty}"
+        if not frappe.db.exists("Account", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Account",
+                    "account_name": code,
+                    "account_code": code,
+                    "company": company,
+                    "account_type": "Liability",
+                    "intercompany_account_type": "Due To",
+                    "counterparty_company": counterparty,
+                }
+            ).insert(ignore_permissions=True)
+        return code
@@ -64,23 +64,17 @@ def login(username: str, password: str) -> dict[str, Any]:
         frappe.throw(_("User not found"), frappe.AuthenticationError)
 
     # Verify user is enabled
-    user_doc = frappe.get_doc("User", user)
-    if user_doc.enabled == 0:
+    template = jwt_manager.get_token_templates([user]).get(user)
+    if not template:
+        frappe.throw(_("User not found"), frappe.AuthenticationError)
+    if not template["enabled"]:
         frappe.throw(_("User is disabled"), frappe.AuthenticationError)
 
     # Generate tokens
-    access_token = jwt_manager.generate_access_token(user)
+    access_token = jwt_manager.encode_access_token(user, template)
     refresh_token = jwt_manager.generate_refresh_token(user)
 
-    # Get user details
-    companies = frappe.get_all(
-        "User Permission",
-        filters={"user": user, "allow": "Company"},
-        pluck="for_value"
-    )
-
-    roles = [role.role for role in user_doc.roles]
-
+    claims = template["claims"]
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -88,10 +82,10 @@ def login(username: str, password: str) -> dict[str, Any]:
         "expires_in": jwt_manager.ACCESS_TOKEN_EXPIRY_HOURS * 3600,  # in seconds
         "user": {
             "email": user,
-            "full_name": user_doc.full_name,
-            "user_image": user_doc.user_image,
-            "companies": companies,
-            "roles": roles,
+            "full_name": claims["full_name"],
+            "user_image": template["user_image"],
+            "companies": claims["companies"],
+            "roles": claims["roles"],
         }
     }
 
@@ -263,38 +257,40 @@ def token_info(token: str) -> dict[str, Any]:
 
 @frappe.whitelist(allow_guest=True)
 def logout(refresh_token: str | None = None) -> dict[str, Any]:
-    """Logout user and invalidate tokens.
+    """Logout user and revoke their tokens.
 
-    Note: Since JWT tokens are stateless, this is primarily for client-side cleanup.
-    The client should discard both access and refresh tokens.
-
-    In a production implementation, you might want to maintain a token blacklist
-    in the database for added security.
+    The refresh token passed in and the access token from the Authorization
+    header (if any) are added to the revocation set until they expire, so
+    they are rejected by ``verify_token`` even before their expiry.
 
     Args:
-        refresh_token: Optional refresh token to blacklist
+        refresh_token: Optional refresh token to revoke
 
     Returns:
         {
             "success": True,
-            "message": "Logged out successfully"
+            "message": "Logged out successfully",
+            "revoked": int (number of tokens revoked)
         }
 
     Example:
         POST /api/method/blkshp_os.api.auth.logout
+        Headers: Authorization: Bearer <access_token>
         {
             "refresh_token": "eyJ..."
         }
     """
-    # In a full implementation, you would:
-    # 1. Add refresh_token to a blacklist table
-    # 2. Set expiry on the blacklist entry
-    # 3. Check blacklist in refresh() endpoint
+    tokens = [refresh_token] if refresh_token else []
+
+    auth_header = frappe.get_request_header("Authorization")
+    parts = (auth_header or "").split()
+    if len(parts) == 2 and parts[0].lower() == "bearer":
+        tokens.append(parts[1])
 
-    # For now, just return success
-    # The client is responsible for discarding tokens
+    revoked = sum(1 for token in tokens if jwt_manager.revoke_token(token))
 
     return {
         "success": True,
+        "revoked": revoked,
         "message": _("Logged out successfully. Please discard your tokens."),
     }
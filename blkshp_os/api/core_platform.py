@@ -2,33 +2,41 @@
 
 from __future__ import annotations
 
-from typing import Any
-
 import frappe
 from blkshp_os.core_platform.services import (
-    get_feature_matrix_for_user,
-    get_user_profile,
+    get_feature_matrix_overlay,
+    get_user_profile_with_etag,
 )
+from blkshp_os.utils.http import etag_response, extend_json_object
 from frappe.utils import cint
+from werkzeug.wrappers import Response
 
 
 @frappe.whitelist()
-def get_feature_matrix(refresh: int | str | None = None) -> dict[str, Any]:
+def get_feature_matrix(refresh: int | str | None = None) -> Response:
     """Return the feature matrix for the current tenant user.
 
     The response is strictly read-only; feature toggles remain managed solely by
-    BLKSHP Operations. Pass ``refresh=1`` to bypass cached plan data.
+    BLKSHP Operations. Pass ``refresh=1`` to bypass cached plan data. Carries an
+    ETag; returns 304 when If-None-Match matches.
+
+    The cached plan bytes are sent as they are, with the user overlay
+    (``user_module_access``, ``user_accessible_modules``,
+    ``user_feature_access`` and ``user``) appended as extra top-level keys.
     """
     force_refresh = bool(cint(refresh)) if refresh is not None else False
-    return get_feature_matrix_for_user(refresh=force_refresh)
+    body, overlay, etag = get_feature_matrix_overlay(refresh=force_refresh)
+    return etag_response(body=lambda: extend_json_object(body, overlay), etag=etag)
 
 
 @frappe.whitelist()
-def get_profile(refresh: int | str | None = None) -> dict[str, Any]:
+def get_profile(refresh: int | str | None = None) -> Response:
     """Return the authenticated user's profile summary.
 
     Includes tenant company, department access, subscription snapshot, and
-    permission summary. Pass ``refresh=1`` to bypass cached plan data.
+    permission summary. Pass ``refresh=1`` to bypass cached plan data. Carries
+    an ETag; returns 304 when If-None-Match matches.
     """
     force_refresh = bool(cint(refresh)) if refresh is not None else False
-    return get_user_profile(refresh=force_refresh)
+    payload, etag = get_user_profile_with_etag(refresh=force_refresh)
+    return etag_response(payload, etag=etag)
@@ -6,6 +6,7 @@ from typing import Any
 
 import frappe
 from frappe import _
+from frappe.utils import cint
 
 
 @frappe.whitelist()
@@ -94,58 +95,26 @@ def get_accessible_departments(
 
 
 @frappe.whitelist()
-def get_department_hierarchy(department: str | None = None) -> list[dict[str, Any]]:
+def get_department_hierarchy(
+    department: str | None = None, company: str | None = None
+) -> list[dict[str, Any]]:
     """
     Get department hierarchy tree structure.
 
     Args:
             department: Root department (if None, returns all top-level departments)
+            company: Restrict the tree to a single company
 
     Returns:
             List of departments with nested children
     """
+    from blkshp_os.departments.hierarchy import build_department_tree
     from blkshp_os.permissions.service import get_accessible_departments as get_depts
 
     # Get accessible departments for the user
-    accessible = set(get_depts(frappe.session.user, permission_flag="can_read"))
+    accessible = get_depts(frappe.session.user, permission_flag="can_read")
 
-    if not accessible:
-        return []
-
-    # Build filter for root departments
-    filters: dict[str, Any] = {"name": ["in", list(accessible)], "is_active": 1}
-
-    if department:
-        # Get children of specific department
-        filters["parent_department"] = department
-    else:
-        # Get top-level departments (no parent)
-        filters["parent_department"] = ["in", [None, ""]]
-
-    departments = frappe.get_all(
-        "Department",
-        filters=filters,
-        fields=[
-            "name",
-            "department_name",
-            "department_code",
-            "department_type",
-            "parent_department",
-            "is_active",
-        ],
-        order_by="department_name asc",
-    )
-
-    # Recursively get children for each department
-    for dept in departments:
-        children = get_department_hierarchy(dept["name"])
-        if children:
-            dept["children"] = children
-            dept["has_children"] = True
-        else:
-            dept["has_children"] = False
-
-    return departments
+    return build_department_tree(accessible, root=department, company=company)
 
 
 @frappe.whitelist()
@@ -177,42 +146,21 @@ def assign_products_to_department(
             frappe.PermissionError,
         )
 
+    if isinstance(products, str):
+        products = frappe.parse_json(products)
+
     if not products:
         frappe.throw(_("No products specified"))
 
-    results = {"success": [], "failed": [], "total": len(products)}
-
-    for product in products:
-        try:
-            product_doc = frappe.get_doc("Product", product)
-
-            # Check if department already assigned
-            existing = False
-            for row in product_doc.get("departments", []):
-                if row.department == department:
-                    existing = True
-                    break
-
-            if not existing:
-                product_doc.append(
-                    "departments",
-                    {
-                        "department": department,
-                        "is_primary": is_primary,
-                        "par_level": par_level,
-                        "order_quantity": order_quantity,
-                    },
-                )
-                product_doc.save(ignore_permissions=True)
-                results["success"].append(product)
-            else:
-                results["failed"].append(
-                    {"product": product, "reason": "Already assigned to department"}
-                )
-        except Exception as e:
-            results["failed"].append({"product": product, "reason": str(e)})
-
-    return results
+    from blkshp_os.departments.assignment import assign_products
+
+    return assign_products(
+        department,
+        products,
+        is_primary=bool(cint(is_primary)),
+        par_level=par_level,
+        order_quantity=order_quantity,
+    )
 
 
 @frappe.whitelist()
@@ -242,12 +190,9 @@ def get_department_settings(department: str, setting_key: str | None = None) ->
         return get_department_setting(department, setting_key)
     else:
         # Return all settings
-        settings = frappe.db.get_value("Department", department, "settings")
-        if settings:
-            import json
+        from blkshp_os.departments.settings import get_settings
 
-            return json.loads(settings) if isinstance(settings, str) else settings
-        return {}
+        return dict(get_settings(department).raw)
 
 
 @frappe.whitelist()
@@ -314,45 +259,116 @@ def get_department_statistics(department: str) -> dict[str, Any]:
             frappe.PermissionError,
         )
 
-    # Get product count
-    product_count = frappe.db.count(
-        "Product Department",
-        filters={"department": department, "parenttype": "Product"},
+    from blkshp_os.departments.stats import get_department_stats
+
+    stats = get_department_stats(department)
+
+    return {
+        "department": department,
+        "product_count": stats["product_count"],
+        "user_count": stats["user_count"],
+        "inventory_value": stats["inventory_value"],
+        "child_department_count": stats["child_department_count"],
+    }
+
+
+@frappe.whitelist()
+def bulk_grant_department_permissions(
+    users: list[str],
+    departments: list[str],
+    flags: list[str],
+    valid_from: str | None = None,
+    valid_upto: str | None = None,
+) -> dict[str, Any]:
+    """
+    Grant department permissions to many users at once.
+
+    Args:
+            users: List of user IDs
+            departments: List of department names/IDs
+            flags: Permission flags to grant (e.g. can_read, can_write)
+            valid_from: Optional start date for new rows
+            valid_upto: Optional end date for new rows
+
+    Returns:
+            Dictionary with created/updated counts and failed pairs
+    """
+    _require_permission_admin()
+
+    from blkshp_os.permissions.provisioning import grant_department_permissions
+
+    return grant_department_permissions(
+        _parse_list(users),
+        _parse_list(departments),
+        _parse_list(flags),
+        valid_from=valid_from,
+        valid_upto=valid_upto,
     )
 
-    # Get user count
-    user_count = frappe.db.count(
-        "Department Permission",
-        filters={"department": department, "parenttype": "User", "can_read": 1},
+
+@frappe.whitelist()
+def bulk_revoke_department_permissions(
+    users: list[str],
+    departments: list[str],
+    flags: list[str] | None = None,
+) -> dict[str, Any]:
+    """
+    Revoke department permissions from many users at once.
+
+    Args:
+            users: List of user IDs
+            departments: List of department names/IDs
+            flags: Permission flags to revoke (if None, removes the access rows)
+
+    Returns:
+            Dictionary with updated/deleted counts
+    """
+    _require_permission_admin()
+
+    from blkshp_os.permissions.provisioning import revoke_department_permissions
+
+    return revoke_department_permissions(
+        _parse_list(users),
+        _parse_list(departments),
+        _parse_list(flags) if flags else None,
     )
 
-    # Get inventory value (if inventory module exists)
-    inventory_value = 0
-    try:
-        inventory_balance = frappe.db.sql(
-            """
-			SELECT SUM(quantity * unit_cost) as total_value
-			FROM `tabInventory Balance`
-			WHERE department = %s
-		""",
-            department,
-            as_dict=True,
-        )
-        if inventory_balance and inventory_balance[0].get("total_value"):
-            inventory_value = inventory_balance[0]["total_value"]
-    except Exception:
-        # Inventory Balance table might not exist yet
-        pass
-
-    # Get child department count
-    child_count = frappe.db.count(
-        "Department", filters={"parent_department": department}
+
+@frappe.whitelist()
+def clone_department_permissions(
+    source_user: str, target_users: list[str], replace: bool = False
+) -> dict[str, Any]:
+    """
+    Copy one user's department permissions to other users.
+
+    Args:
+            source_user: User whose department access is copied
+            target_users: List of user IDs receiving the access
+            replace: Remove the targets' existing department access first
+
+    Returns:
+            Dictionary with created/updated counts and failed pairs
+    """
+    _require_permission_admin()
+
+    from blkshp_os.permissions import provisioning
+
+    return provisioning.clone_department_permissions(
+        source_user, _parse_list(target_users), replace=bool(cint(replace))
     )
 
-    return {
-        "department": department,
-        "product_count": product_count,
-        "user_count": user_count,
-        "inventory_value": inventory_value,
-        "child_department_count": child_count,
-    }
+
+def _require_permission_admin() -> None:
+    if not frappe.has_role("System Manager"):
+        frappe.throw(
+            _("You do not have permission to manage department permissions"),
+            frappe.PermissionError,
+        )
+
+
+def _parse_list(value: Any) -> list[str]:
+    if isinstance(value, str):
+        value = frappe.parse_json(value)
+    if isinstance(value, str):
+        value = [value]
+    return list(value or [])
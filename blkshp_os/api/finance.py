@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import base64
+import binascii
+import json
 from typing import Any
 
 import frappe
 from frappe import _
+from frappe.utils import cint
 
-from blkshp_os.accounting import intercompany_service
+from blkshp_os.accounting import intercompany_service, membership, netting
 from blkshp_os.permissions import service as permission_service
 
+MAX_SETTLEMENT_PAGE_SIZE = 500
+
 
 @frappe.whitelist()
 def get_intercompany_balance(
@@ -97,11 +103,7 @@ def list_intercompany_balances(
                 )
         elif company_group:
             # User must have access to at least one company in the group
-            companies = frappe.db.get_all(
-                "Company Group Member",
-                filters={"parent": company_group},
-                pluck="company"
-            )
+            companies = membership.get_group_companies(company_group)
             has_access = any(
                 _user_has_company_permission(user, comp) for comp in companies
             )
@@ -122,20 +124,133 @@ def list_intercompany_balances(
     }
 
 
+@frappe.whitelist()
+def propose_netting(
+    company_group: str,
+    blocked_pairs: list[list[str]] | str | None = None,
+    pair_costs: list[dict[str, Any]] | str | None = None,
+) -> dict[str, Any]:
+    """Propose the settlements that net out a company group's balances.
+
+    Args:
+        company_group: Company Group code
+        blocked_pairs: Optional [payer, payee] pairs that may not settle directly
+        pair_costs: Optional cost per unit transferred, as
+            [{"source_company": str, "target_company": str, "cost": float}, ...]
+
+    Returns:
+        {
+            "company_group": str,
+            "currency": str,
+            "method": "greedy" | "min_cost_flow",
+            "net_positions": {company: float},
+            "settlements": [
+                {"source_company": str, "target_company": str, "amount": float},
+                ...
+            ],
+            "gross_transfers": int,
+            "net_transfers": int,
+            "unreconciled": [...],
+            "unsettled": {company: float}
+        }
+
+    Permissions:
+        User must have access to at least one company in the group.
+        System roles bypass permission checks.
+    """
+    user = frappe.session.user
+
+    if not permission_service._user_bypasses_subscription_gates(user):
+        companies = membership.get_group_companies(company_group)
+        if not any(_user_has_company_permission(user, comp) for comp in companies):
+            frappe.throw(
+                _(f"You do not have permission to view balances for group {company_group}"),
+                frappe.PermissionError
+            )
+
+    return netting.propose_group_netting(
+        company_group,
+        blocked_pairs=_parse_blocked_pairs(blocked_pairs),
+        pair_costs=_parse_pair_costs(pair_costs),
+    )
+
+
+@frappe.whitelist()
+def create_netting_settlements(
+    company_group: str,
+    blocked_pairs: list[list[str]] | str | None = None,
+    pair_costs: list[dict[str, Any]] | str | None = None,
+    payment_method: str | None = None,
+    description: str | None = None,
+) -> dict[str, Any]:
+    """Create draft settlements for a company group's netting proposal.
+
+    Args:
+        company_group: Company Group code
+        blocked_pairs: Optional [payer, payee] pairs that may not settle directly
+        pair_costs: Optional cost per unit transferred (see propose_netting)
+        payment_method: Optional payment method for every draft (one of the
+            Intercompany Settlement Payment Method options)
+        description: Optional description for every draft
+
+    Returns:
+        The proposal (see propose_netting) plus "settlement_names" and the
+        shared "reference_number" of the drafts
+
+    Raises:
+        DuplicateEntryError: the group already has Draft settlements between
+            its members, e.g. from an earlier netting run
+        ValidationError: payment_method is not a Payment Method option
+
+    Permissions:
+        User must be allowed to create Intercompany Settlements and hold a
+        User Permission for every company in the group.
+        System roles bypass the company checks.
+    """
+    user = frappe.session.user
+    companies = membership.get_group_companies(company_group)
+    if not companies:
+        frappe.throw(_("Company Group {0} has no member companies").format(company_group))
+
+    if not frappe.has_permission("Intercompany Settlement", "create", user=user):
+        frappe.throw(
+            _("You do not have permission to create Intercompany Settlements"),
+            frappe.PermissionError
+        )
+
+    if not permission_service._user_bypasses_subscription_gates(user):
+        for company in companies:
+            if not _user_has_company_permission(user, company):
+                frappe.throw(
+                    _(f"You do not have permission for {company}"),
+                    frappe.PermissionError
+                )
+
+    return netting.create_netting_settlements(
+        company_group,
+        blocked_pairs=_parse_blocked_pairs(blocked_pairs),
+        pair_costs=_parse_pair_costs(pair_costs),
+        payment_method=payment_method,
+        description=description,
+    )
+
+
 @frappe.whitelist()
 def list_settlements(
     company: str | None = None,
     status: str | None = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: str | None = None,
 ) -> dict[str, Any]:
-    """List intercompany settlements.
+    """List intercompany settlements, newest first.
 
     Args:
         company: Optional company to filter settlements for (as source or target)
         status: Optional status filter (Draft, Settled, Cancelled)
-        limit: Maximum number of results (default: 50)
-        offset: Pagination offset (default: 0)
+        limit: Maximum number of results (default: 50, max: 500)
+        offset: Pagination offset (default: 0); prefer ``cursor`` for deep pages
+        cursor: ``next_cursor`` from the previous page (keyset pagination)
 
     Returns:
         {
@@ -148,22 +263,27 @@ def list_settlements(
                     "settlement_currency": str,
                     "settlement_date": str,
                     "status": str,
-                    "submitted_by": str
+                    "submitted_by": str,
+                    "modified": str
                 },
                 ...
             ],
-            "total": int,
+            "total": int | None,
             "limit": int,
-            "offset": int
+            "offset": int,
+            "has_more": bool,
+            "next_cursor": str | None
         }
 
+        ``total`` is only counted for the first page (no ``cursor``).
+
     Permissions:
         If company is specified, user must have read access to that company.
         System roles bypass permission checks.
     """
     user = frappe.session.user
-    limit = int(limit)
-    offset = int(offset)
+    limit = min(max(cint(limit), 1), MAX_SETTLEMENT_PAGE_SIZE)
+    offset = max(cint(offset), 0)
 
     # Check permissions
     if company and not permission_service._user_bypasses_subscription_gates(user):
@@ -173,23 +293,47 @@ def list_settlements(
                 frappe.PermissionError
             )
 
+    after = decode_settlement_cursor(cursor) if cursor else None
     settlements = intercompany_service.get_pending_settlements(
         company=company,
         status=status,
+        limit=limit + 1,
+        offset=offset,
+        after=after,
     )
-
-    # Apply pagination
-    total = len(settlements)
-    settlements = settlements[offset:offset + limit]
+    has_more = len(settlements) > limit
+    settlements = settlements[:limit]
+    next_cursor = None
+    if has_more:
+        last = settlements[-1]
+        next_cursor = encode_settlement_cursor(str(last["modified"]), last["name"])
 
     return {
         "settlements": settlements,
-        "total": total,
+        "total": None if cursor else intercompany_service.count_pending_settlements(company, status),
         "limit": limit,
         "offset": offset,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
     }
 
 
+def encode_settlement_cursor(modified: str, name: str) -> str:
+    """Encode the last settlement of a page as an opaque URL-safe cursor."""
+    raw = json.dumps([modified, name], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_settlement_cursor(cursor: str) -> tuple[str, str]:
+    """Decode a cursor produced by :func:`encode_settlement_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        modified, name = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return str(modified), str(name)
+    except (binascii.Error, ValueError, TypeError):
+        frappe.throw(_("Invalid settlement cursor."), frappe.ValidationError)
+
+
 @frappe.whitelist()
 def get_settlement(settlement_name: str) -> dict[str, Any]:
     """Get specific settlement details.
@@ -339,14 +483,30 @@ def _user_has_company_permission(user: str, company: str, permission_flag: str =
     """Check if user has permission for a company.
 
     This is a simplified check using User Permissions. In a full implementation,
-    this would integrate with the department permission system.
+    this would integrate with the department permission system. The user's
+    permitted companies are cached (see accounting.membership).
     """
-    # Check if user has explicit user permission for the company
-    has_permission = frappe.db.exists({
-        "doctype": "User Permission",
-        "user": user,
-        "allow": "Company",
-        "for_value": company,
-    })
-
-    return bool(has_permission)
+    return membership.user_has_company_permission(user, company)
+
+
+def _parse_blocked_pairs(blocked_pairs: list[list[str]] | str | None) -> list[tuple[str, str]]:
+    if isinstance(blocked_pairs, str):
+        blocked_pairs = frappe.parse_json(blocked_pairs)
+    pairs = []
+    for pair in blocked_pairs or []:
+        if len(pair) != 2:
+            frappe.throw(_("Blocked pairs must be [payer, payee] lists"))
+        pairs.append((pair[0], pair[1]))
+    return pairs
+
+
+def _parse_pair_costs(pair_costs: list[dict[str, Any]] | str | None) -> dict[tuple[str, str], float]:
+    if isinstance(pair_costs, str):
+        pair_costs = frappe.parse_json(pair_costs)
+    costs = {}
+    for row in pair_costs or []:
+        cost = float(row.get("cost", 1))
+        if cost < 0:
+            frappe.throw(_("Pair costs cannot be negative"))
+        costs[(row["source_company"], row["target_company"])] = cost
+    return costs
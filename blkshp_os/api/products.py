@@ -7,9 +7,16 @@ from typing import Any
 
 import frappe
 from frappe import _
-from frappe.utils import flt
+from frappe.utils import cint, flt
+from werkzeug.wrappers import Response
 
+from blkshp_os.core_platform.enforcement import (
+    require_feature_access,
+    require_module_access,
+)
 from blkshp_os.products import service as product_service
+from blkshp_os.products import sync as product_sync
+from blkshp_os.utils.http import etag_response
 
 
 @frappe.whitelist()
@@ -34,6 +41,27 @@ def list_products(
     )
 
 
+@frappe.whitelist()
+def changes_since(cursor: str | None = None, limit: int = 500) -> Response:
+    """Return products changed or deleted since the supplied sync cursor.
+
+    Args:
+            cursor: Cursor returned by a previous call (omit to bootstrap)
+            limit: Maximum number of products per page
+
+    Returns:
+            Columnar delta payload with an ETag; 304 when If-None-Match matches
+    """
+    payload = product_sync.changes_since(cursor, limit=cint(limit))
+    return etag_response(payload)
+
+
+@frappe.whitelist()
+def export_snapshot() -> Response:
+    """Return the full product catalog snapshot used to bootstrap sync clients."""
+    return etag_response(product_sync.export_snapshot())
+
+
 @frappe.whitelist()
 def get_product(name: str) -> dict[str, Any]:
     """Return the product document."""
@@ -64,6 +92,25 @@ def update_product(name: str, data: dict[str, Any] | str) -> dict[str, Any]:
     return product_service.update_product(name, data)
 
 
+@frappe.whitelist()
+@require_module_access("products")
+@require_feature_access("products.bulk_operations")
+def bulk_update_products(changes: list[dict[str, Any]] | str) -> dict[str, Any]:
+    """Apply updates to many products in one request.
+
+    Args:
+            changes: List of ``{"product": name, "data": {...}}`` entries
+
+    Returns:
+            Per-product results plus updated/failed/total counts
+    """
+    if isinstance(changes, str):
+        changes = frappe.parse_json(changes)
+    if not isinstance(changes, list):
+        frappe.throw(_("Invalid payload for bulk product update."))
+    return product_service.bulk_update_products(changes)
+
+
 @frappe.whitelist()
 def convert_quantity(
     product: str,
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
 
@@ -155,6 +157,90 @@ class TestAuthAPI(FrappeTestCase):
 
         self.assertTrue(result["success"])
         self.assertIn("message", result)
+        self.assertEqual(result["revoked"], 1)
+
+        with self.assertRaises(frappe.AuthenticationError):
+            auth_api.refresh(refresh_token=refresh_token)
+
+    def test_revoked_token_is_rejected(self):
+        """Test revocation applies to one token only."""
+        revoked = jwt_manager.generate_access_token(self.test_user_email)
+        other = jwt_manager.generate_access_token(self.test_user_email)
+
+        self.assertTrue(jwt_manager.revoke_token(revoked))
+        self.assertFalse(jwt_manager.revoke_token("invalid.token.here"))
+
+        with self.assertRaises(frappe.AuthenticationError):
+            jwt_manager.verify_token(revoked, token_type="access")
+        self.assertEqual(jwt_manager.verify_token(other)["user"], self.test_user_email)
+
+    def test_verification_uses_cached_user_status(self):
+        """Test repeated verification reads user status from cache."""
+        jwt_manager.clear_user_status_cache(self.test_user_email)
+        access_token = jwt_manager.generate_access_token(self.test_user_email)
+
+        with patch.object(frappe.db, "get_value", wraps=frappe.db.get_value) as mock_get_value:
+            for _ in range(3):
+                jwt_manager.verify_token(access_token)
+
+        self.assertEqual(mock_get_value.call_count, 1)
+
+    def test_disabled_user_is_rejected(self):
+        """Test disabling a user invalidates the cached status."""
+        access_token = jwt_manager.generate_access_token(self.test_user_email)
+        jwt_manager.verify_token(access_token)
+
+        user = frappe.get_doc("User", self.test_user_email)
+        user.enabled = 0
+        user.save(ignore_permissions=True)
+        try:
+            self.assertEqual(
+                jwt_manager.get_user_status(self.test_user_email), jwt_manager.USER_DISABLED
+            )
+            with self.assertRaises(frappe.AuthenticationError):
+                jwt_manager.verify_token(access_token)
+        finally:
+            user.reload()
+            user.enabled = 1
+            user.save(ignore_permissions=True)
+            frappe.db.commit()
+
+        self.assertEqual(jwt_manager.verify_token(access_token)["user"], self.test_user_email)
+
+    def test_batched_token_issuance(self):
+        """Test issuing tokens for many users from shared templates."""
+        tokens, errors = jwt_manager.generate_access_tokens(
+            [self.test_user_email, "Administrator", "nonexistent@example.com", self.test_user_email]
+        )
+
+        self.assertEqual(set(tokens), {self.test_user_email, "Administrator"})
+        self.assertEqual(list(errors), ["nonexistent@example.com"])
+
+        payload = jwt_manager.verify_token(tokens[self.test_user_email])
+        single = jwt_manager.verify_token(jwt_manager.generate_access_token(self.test_user_email))
+        for claim in ("companies", "roles", "full_name", "pv", "pc", "dp", "mods", "byp"):
+            self.assertEqual(payload[claim], single[claim], claim)
+
+    def test_token_templates_are_reused_until_permissions_change(self):
+        """Test templates are rebuilt only after role or permission changes."""
+        jwt_manager.get_token_templates([self.test_user_email])
+
+        with patch.object(
+            jwt_manager, "_build_token_templates", wraps=jwt_manager._build_token_templates
+        ) as mock_build:
+            jwt_manager.generate_access_tokens([self.test_user_email])
+            mock_build.assert_not_called()
+
+            user = frappe.get_doc("User", self.test_user_email)
+            user.add_roles("Blogger")
+            try:
+                tokens, _errors = jwt_manager.generate_access_tokens([self.test_user_email])
+                mock_build.assert_called_once_with([self.test_user_email])
+                payload = jwt_manager.verify_token(tokens[self.test_user_email])
+                self.assertIn("Blogger", payload["roles"])
+            finally:
+                user.remove_roles("Blogger")
+                frappe.db.commit()
 
     def test_profile_endpoint_requires_auth(self):
         """Test profile endpoint requires authentication."""
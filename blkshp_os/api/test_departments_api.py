@@ -79,6 +79,25 @@ class TestDepartmentsAPI(FrappeTestCase):
         dept_names = [d["name"] for d in hierarchy]
         self.assertIn(self.department_a.name, dept_names)
 
+    def test_get_department_hierarchy_reflects_parent_changes(self) -> None:
+        """Test that the cached tree is rebuilt after a department is re-parented."""
+        child_dept = self._create_department("API-A-SUB", "API Sub Department")
+        self._grant_department_permission(self.user, child_dept.name, can_read=1)
+
+        roots = {d["name"] for d in dept_api.get_department_hierarchy()}
+        self.assertIn(child_dept.name, roots)
+
+        frappe.set_user("Administrator")
+        child_dept.parent_department = self.department_a.name
+        child_dept.save(ignore_permissions=True)
+        frappe.set_user(self.user)
+
+        hierarchy = dept_api.get_department_hierarchy()
+        parent = next(d for d in hierarchy if d["name"] == self.department_a.name)
+        self.assertNotIn(child_dept.name, {d["name"] for d in hierarchy})
+        self.assertTrue(parent["has_children"])
+        self.assertIn(child_dept.name, [d["name"] for d in parent["children"]])
+
     def test_get_department_settings(self) -> None:
         """Test getting department settings."""
         # Set some settings
@@ -133,6 +152,22 @@ class TestDepartmentsAPI(FrappeTestCase):
         self.assertIn("child_department_count", stats)
         self.assertEqual(stats["department"], self.department_a.name)
 
+    def test_get_department_statistics_tracks_changes(self) -> None:
+        """Test that materialized statistics follow department changes."""
+        before = dept_api.get_department_statistics(self.department_a.name)
+        self.assertGreaterEqual(before["user_count"], 1)
+
+        frappe.set_user("Administrator")
+        child_dept = self._create_department("API-A-STATS", "API Stats Child")
+        child_dept.parent_department = self.department_a.name
+        child_dept.save(ignore_permissions=True)
+        frappe.set_user(self.user)
+
+        after = dept_api.get_department_statistics(self.department_a.name)
+        self.assertEqual(
+            after["child_department_count"], before["child_department_count"] + 1
+        )
+
     def test_system_manager_bypass(self) -> None:
         """Test that System Manager can access all departments."""
         frappe.set_user("Administrator")
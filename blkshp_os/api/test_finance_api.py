@@ -92,6 +92,45 @@ class TestFinanceAPI(FrappeTestCase):
         self.assertIn("total", result)
         self.assertGreater(result["total"], 0)
 
+    def test_list_settlements_keyset_pagination(self):
+        """Test paging through settlements with the cursor."""
+        created = set()
+        for amount in range(1, 6):
+            settlement = frappe.get_doc({
+                "doctype": "Intercompany Settlement",
+                "source_company": self.company1 if amount % 2 else self.company2,
+                "target_company": self.company2 if amount % 2 else self.company1,
+                "settlement_amount": amount * 100,
+                "settlement_currency": "USD",
+                "description": "Test API keyset pagination",
+            })
+            settlement.insert(ignore_permissions=True)
+            created.add(settlement.name)
+
+        first_page = finance_api.list_settlements(company=self.company1, limit=2)
+        self.assertEqual(len(first_page["settlements"]), 2)
+        self.assertTrue(first_page["has_more"])
+        self.assertGreaterEqual(first_page["total"], 5)
+
+        seen = [row["name"] for row in first_page["settlements"]]
+        cursor = first_page["next_cursor"]
+        while cursor:
+            page = finance_api.list_settlements(company=self.company1, limit=2, cursor=cursor)
+            self.assertIsNone(page["total"])
+            seen.extend(row["name"] for row in page["settlements"])
+            cursor = page["next_cursor"]
+
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertTrue(created.issubset(seen))
+
+        drafts = finance_api.list_settlements(company=self.company1, status="Draft", limit=10)
+        self.assertTrue(all(row["status"] == "Draft" for row in drafts["settlements"]))
+        settled = finance_api.list_settlements(company=self.company1, status="Settled", limit=10)
+        self.assertFalse(created.intersection(row["name"] for row in settled["settlements"]))
+
+        with self.assertRaises(frappe.ValidationError):
+            finance_api.list_settlements(company=self.company1, cursor="not-a-cursor")
+
     def test_get_settlement(self):
         """Test getting specific settlement details."""
         # Create a test settlement
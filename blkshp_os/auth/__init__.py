@@ -2,18 +2,30 @@
 
 from blkshp_os.auth.jwt_manager import (
     authenticate_request,
+    clear_user_status_cache,
     generate_access_token,
+    generate_access_tokens,
     generate_refresh_token,
     get_token_info,
+    get_token_templates,
+    get_user_status,
+    is_token_revoked,
     refresh_access_token,
+    revoke_token,
     verify_token,
 )
 
 __all__ = [
     "generate_access_token",
+    "generate_access_tokens",
+    "get_token_templates",
     "generate_refresh_token",
     "verify_token",
     "refresh_access_token",
     "authenticate_request",
     "get_token_info",
+    "revoke_token",
+    "is_token_revoked",
+    "get_user_status",
+    "clear_user_status_cache",
 ]
@@ -3,23 +3,57 @@
 Provides JWT-based authentication for single-page applications consuming
 the BLKSHP OS REST APIs. Tokens are stateless and include user, company,
 and permission claims.
+
+Verification does not load the User document. Each user's status (enabled,
+disabled or missing) is cached in Redis for ``USER_STATUS_TTL_SECONDS`` and
+dropped when the User is saved or deleted. Every token carries a ``jti`` that
+``revoke_token`` adds to a Redis revocation set until the token expires. Both
+are read in one pipelined round trip per verification.
+
+Issuance builds payloads from per-user token templates cached in Redis and
+reused while the user's permission version is current, so a login only
+signs a token. ``generate_access_tokens`` rebuilds missing templates for a
+whole batch of users from bulk queries.
 """
 
 from __future__ import annotations
 
 import datetime
+import json
 from typing import Any
 
 import frappe
 import jwt
 from frappe import _
-from frappe.utils import get_datetime, now_datetime
+from frappe.utils import cint, get_datetime, now_datetime
+
+from blkshp_os.permissions.claims import (
+    activate_claims,
+    build_permission_claims_for_users,
+    permission_version_keys,
+    permission_versions_from_values,
+)
+from blkshp_os.utils.cache import on_commit
 
 
 # Token expiration times
 ACCESS_TOKEN_EXPIRY_HOURS = 1  # Short-lived access tokens
 REFRESH_TOKEN_EXPIRY_DAYS = 30  # Long-lived refresh tokens
 
+# Verification cache
+USER_STATUS_TTL_SECONDS = 60
+USER_STATUS_CACHE_KEY = "blkshp_os:auth:user_status"
+REVOKED_TOKEN_CACHE_KEY = "blkshp_os:auth:revoked_jti"
+
+# Access token templates, rebuilt when the permission version changes
+TOKEN_TEMPLATE_CACHE_KEY = "blkshp_os:auth:token_template"
+TOKEN_TEMPLATE_TTL_SECONDS = 24 * 60 * 60
+TOKEN_TEMPLATE_BATCH_SIZE = 500
+
+USER_ENABLED = "enabled"
+USER_DISABLED = "disabled"
+USER_MISSING = "missing"
+
 
 def generate_access_token(user: str) -> str:
     """Generate a short-lived JWT access token for API requests.
@@ -37,23 +71,47 @@ def generate_access_token(user: str) -> str:
         - type: "access"
         - company: User's default company
         - roles: User's roles
+        - pv, pc, dp, mods, byp: versioned permission claims
+          (see :mod:`blkshp_os.permissions.claims`)
     """
-    if not frappe.db.exists("User", user):
+    template = get_token_templates([user]).get(user)
+    if template is None:
         frappe.throw(_("User {0} does not exist").format(user))
 
-    # Get user details
-    user_doc = frappe.get_doc("User", user)
+    return encode_access_token(user, template)
 
-    # Get user's companies and roles
-    companies = frappe.get_all(
-        "User Permission",
-        filters={"user": user, "allow": "Company"},
-        pluck="for_value"
-    )
 
-    roles = [role.role for role in user_doc.roles]
+def generate_access_tokens(users: list[str]) -> tuple[dict[str, str], dict[str, str]]:
+    """Generate access tokens for many users at once (e.g. team accounts at shift start).
 
-    # Generate token payload
+    Payloads are built from cached token templates; templates that are
+    missing or stale are rebuilt together from bulk queries.
+
+    Args:
+        users: User emails
+
+    Returns:
+        Tuple of ``{user: token}`` and ``{user: error}`` for users that do not
+        exist or are disabled
+    """
+    users = list(dict.fromkeys(user for user in users if user))
+    templates = get_token_templates(users)
+
+    tokens: dict[str, str] = {}
+    errors: dict[str, str] = {}
+    for user in users:
+        template = templates.get(user)
+        if template is None:
+            errors[user] = _("User {0} does not exist").format(user)
+        elif not template["enabled"]:
+            errors[user] = _("User is disabled")
+        else:
+            tokens[user] = encode_access_token(user, template)
+    return tokens, errors
+
+
+def encode_access_token(user: str, template: dict[str, Any]) -> str:
+    """Sign an access token for ``user`` from its token template."""
     now = now_datetime()
     expiry = now + datetime.timedelta(hours=ACCESS_TOKEN_EXPIRY_HOURS)
 
@@ -61,10 +119,9 @@ def generate_access_token(user: str) -> str:
         "user": user,
         "exp": int(expiry.timestamp()),
         "iat": int(now.timestamp()),
+        "jti": frappe.generate_hash(length=16),
         "type": "access",
-        "companies": companies or [],
-        "roles": roles,
-        "full_name": user_doc.full_name,
+        **template["claims"],
     }
 
     # Get secret from site config
@@ -73,9 +130,75 @@ def generate_access_token(user: str) -> str:
         frappe.throw(_("JWT secret not configured. Set jwt_secret in site_config.json"))
 
     # Encode token
-    token = jwt.encode(payload, secret, algorithm="HS256")
+    return jwt.encode(payload, secret, algorithm="HS256")
 
-    return token
+
+def get_token_templates(users: list[str]) -> dict[str, dict[str, Any]]:
+    """Return the access token template of each existing user.
+
+    A template holds the user's token claims (companies, roles, full name and
+    permission claims) plus ``enabled`` and ``user_image``. Templates are
+    cached in Redis and reused while their permission version is current,
+    i.e. until the user's roles, permissions or plan change. Missing or stale
+    templates are rebuilt together.
+    """
+    if not users:
+        return {}
+
+    # Templates and the permission versions they are checked against in one round trip
+    cache = frappe.cache()
+    version_keys = permission_version_keys(users)
+    pipe = cache.pipeline()
+    for key in version_keys:
+        pipe.get(cache.make_key(key))
+    for user in users:
+        pipe.get(cache.make_key(f"{TOKEN_TEMPLATE_CACHE_KEY}:{user}"))
+    values = pipe.execute()
+    versions = permission_versions_from_values(users, values[: len(version_keys)])
+    cached = values[len(version_keys) :]
+
+    templates: dict[str, dict[str, Any]] = {}
+    missing: list[str] = []
+    for user, raw in zip(users, cached, strict=True):
+        template = json.loads(raw) if raw else None
+        if template and template["claims"].get("pv") == versions[user]:
+            templates[user] = template
+        else:
+            missing.append(user)
+
+    if missing:
+        built = _build_token_templates(missing)
+        pipe = cache.pipeline()
+        for user, template in built.items():
+            pipe.set(
+                cache.make_key(f"{TOKEN_TEMPLATE_CACHE_KEY}:{user}"),
+                json.dumps(template),
+                ex=TOKEN_TEMPLATE_TTL_SECONDS,
+            )
+        pipe.execute()
+        templates.update(built)
+
+    return templates
+
+
+def warm_team_account_token_templates() -> int:
+    """Prebuild token templates for enabled team accounts (daily scheduler).
+
+    Permission versions roll over at midnight, so warming after that keeps
+    the shift-start logins of shared terminal accounts off the database.
+
+    Returns:
+        Number of templates checked
+    """
+    if not frappe.get_meta("User").has_field("is_team_account"):
+        return 0
+
+    users = frappe.get_all(
+        "User", filters={"is_team_account": 1, "enabled": 1}, pluck="name", order_by="name asc"
+    )
+    for start in range(0, len(users), TOKEN_TEMPLATE_BATCH_SIZE):
+        get_token_templates(users[start : start + TOKEN_TEMPLATE_BATCH_SIZE])
+    return len(users)
 
 
 def generate_refresh_token(user: str) -> str:
@@ -101,6 +224,7 @@ def generate_refresh_token(user: str) -> str:
         "user": user,
         "exp": int(expiry.timestamp()),
         "iat": int(now.timestamp()),
+        "jti": frappe.generate_hash(length=16),
         "type": "refresh",
     }
 
@@ -148,13 +272,17 @@ def verify_token(token: str, token_type: str = "access") -> dict[str, Any]:
                 frappe.AuthenticationError
             )
 
-        # Verify user still exists and is enabled
+        # Verify token is not revoked and user still exists and is enabled
         user = payload.get("user")
-        if not user or not frappe.db.exists("User", user):
+        if not user:
             frappe.throw(_("User from token does not exist"), frappe.AuthenticationError)
 
-        user_doc = frappe.get_doc("User", user)
-        if user_doc.enabled == 0:
+        status, revoked = _get_token_state(user, payload.get("jti"))
+        if revoked:
+            frappe.throw(_("Token has been revoked"), frappe.AuthenticationError)
+        if status == USER_MISSING:
+            frappe.throw(_("User from token does not exist"), frappe.AuthenticationError)
+        if status == USER_DISABLED:
             frappe.throw(_("User is disabled"), frappe.AuthenticationError)
 
         return payload
@@ -165,6 +293,69 @@ def verify_token(token: str, token_type: str = "access") -> dict[str, Any]:
         frappe.throw(_("Invalid token: {0}").format(str(e)), frappe.AuthenticationError)
 
 
+def revoke_token(token: str) -> bool:
+    """Revoke a token until it expires.
+
+    Args:
+        token: JWT token string (access or refresh)
+
+    Returns:
+        True if the token was revoked, False if it is invalid, already
+        expired or was issued without a ``jti``
+    """
+    secret = frappe.conf.get("jwt_secret") or frappe.conf.get("secret_key")
+    if not secret:
+        frappe.throw(_("JWT secret not configured"))
+
+    try:
+        payload = jwt.decode(token, secret, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return False
+
+    jti = payload.get("jti")
+    remaining = int(payload.get("exp") or 0) - int(now_datetime().timestamp())
+    if not jti or remaining <= 0:
+        return False
+
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.set(cache.make_key(f"{REVOKED_TOKEN_CACHE_KEY}:{jti}"), 1, ex=remaining)
+    pipe.execute()
+    return True
+
+
+def is_token_revoked(jti: str) -> bool:
+    """Return whether the token with this ``jti`` has been revoked."""
+    cache = frappe.cache()
+    revoked_key = cache.make_key(f"{REVOKED_TOKEN_CACHE_KEY}:{jti}")
+    (revoked,) = cache.pipeline().exists(revoked_key).execute()
+    return bool(revoked)
+
+
+def get_user_status(user: str) -> str:
+    """Return ``USER_ENABLED``, ``USER_DISABLED`` or ``USER_MISSING`` for a user.
+
+    Read from the Redis status cache, falling back to a single column query.
+    """
+    status, _revoked = _get_token_state(user, None)
+    return status
+
+
+def clear_user_status_cache(user: str) -> None:
+    """Drop the cached status for ``user``.
+
+    Repeated on commit so a status read from the old row by another worker
+    while this transaction was open is not kept.
+    """
+    _delete_user_status(user)
+    on_commit(lambda: _delete_user_status(user))
+
+
+def on_user_change(doc: Any, method: str | None = None) -> None:
+    """Doc event hook: a User was saved or deleted."""
+    clear_user_status_cache(doc.name)
+
+
 def refresh_access_token(refresh_token: str) -> str:
     """Generate a new access token using a refresh token.
 
@@ -223,6 +414,9 @@ def authenticate_request() -> str:
     # Set user in session
     frappe.set_user(user)
 
+    # Trust the token's permission claims for this request if still current
+    activate_claims(user, payload)
+
     return user
 
 
@@ -255,3 +449,80 @@ def get_token_info(token: str) -> dict[str, Any]:
         return payload
     except Exception as e:
         return {"error": str(e)}
+
+
+def _get_token_state(user: str, jti: str | None) -> tuple[str, bool]:
+    """Return ``(user status, revoked)`` using one Redis round trip when cached."""
+    cache = frappe.cache()
+    status_key = cache.make_key(f"{USER_STATUS_CACHE_KEY}:{user}")
+
+    pipe = cache.pipeline()
+    pipe.get(status_key)
+    if jti:
+        pipe.exists(cache.make_key(f"{REVOKED_TOKEN_CACHE_KEY}:{jti}"))
+    results = pipe.execute()
+
+    status = results[0].decode() if isinstance(results[0], bytes) else results[0]
+    revoked = bool(results[1]) if jti else False
+    if status in (USER_ENABLED, USER_DISABLED, USER_MISSING):
+        return status, revoked
+
+    enabled = frappe.db.get_value("User", user, "enabled")
+    if enabled is None:
+        status = USER_MISSING
+    else:
+        status = USER_ENABLED if cint(enabled) else USER_DISABLED
+
+    pipe = cache.pipeline()
+    pipe.set(status_key, status, ex=USER_STATUS_TTL_SECONDS)
+    pipe.execute()
+    return status, revoked
+
+
+def _delete_user_status(user: str) -> None:
+    cache = frappe.cache()
+    cache.pipeline().delete(cache.make_key(f"{USER_STATUS_CACHE_KEY}:{user}")).execute()
+
+
+def _build_token_templates(users: list[str]) -> dict[str, dict[str, Any]]:
+    """Build token templates for ``users`` from bulk queries."""
+    rows = frappe.get_all(
+        "User",
+        filters={"name": ["in", users]},
+        fields=["name", "full_name", "enabled", "user_image"],
+    )
+    found = [row.name for row in rows]
+    if not found:
+        return {}
+
+    roles: dict[str, list[str]] = {}
+    for row in frappe.get_all(
+        "Has Role",
+        filters={"parent": ["in", found], "parenttype": "User"},
+        fields=["parent", "role"],
+        order_by="idx asc",
+    ):
+        roles.setdefault(row.parent, []).append(row.role)
+
+    companies: dict[str, list[str]] = {}
+    for row in frappe.get_all(
+        "User Permission",
+        filters={"user": ["in", found], "allow": "Company"},
+        fields=["user", "for_value"],
+    ):
+        companies.setdefault(row.user, []).append(row.for_value)
+
+    permission_claims = build_permission_claims_for_users(found)
+    return {
+        row.name: {
+            "enabled": cint(row.enabled),
+            "user_image": row.user_image,
+            "claims": {
+                "companies": companies.get(row.name, []),
+                "roles": roles.get(row.name, []),
+                "full_name": row.full_name,
+                **permission_claims[row.name],
+            },
+        }
+        for row in rows
+    }
@@ -0,0 +1,367 @@
+"""Buffered, batched writes of Subscription Access Log entries.
+
+Enforcement helpers record access events with :func:`record_access_event`
+instead of inserting and committing a document inline. During a web request
+events are buffered on ``frappe.local`` and pushed to a bounded Redis list by
+the ``after_request`` hook; elsewhere they are pushed immediately. A
+deduplicated background job drains the list and bulk inserts the rows,
+resolving each user's company in bulk. A batch is moved to a processing list
+while it is written and removed only after the commit, so a failed flush
+leaves it to be retried by the next run instead of losing it.
+
+Admin bypasses are sampled: the first bypass per user and access key is
+logged each :data:`BYPASS_SAMPLE_WINDOW_SECONDS`, and the number of bypasses
+suppressed since is recorded in the next logged entry's context.
+
+Redis commands go through pipelines on keys prefixed with ``make_key`` so they
+bypass ``RedisWrapper``'s own key prefixing.
+
+Every batch of inserted rows also increments the hourly and daily
+Subscription Access Rollup rows for its (company, user, access type, access
+key, action) groups, so reports read pre-aggregated counts instead of
+scanning the log.
+
+Tests exercise the same path: they call :func:`flush_request_buffer` and
+:func:`flush_access_log_queue` before asserting on the log.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any
+
+import frappe
+from frappe.utils import cint, get_datetime, now
+
+from blkshp_os.permissions import service as permission_service
+
+ACCESS_LOG_DOCTYPE = "Subscription Access Log"
+ROLLUP_DOCTYPE = "Subscription Access Rollup"
+ROLLUP_PERIODS = ("Hourly", "Daily")
+ACCESS_LOG_QUEUE_KEY = "blkshp_os:subscription_access_log:queue"
+ACCESS_LOG_PROCESSING_KEY = "blkshp_os:subscription_access_log:processing"
+ACCESS_LOG_DROPPED_KEY = "blkshp_os:subscription_access_log:dropped"
+_BYPASS_SAMPLE_KEY = "blkshp_os:subscription_access_log:bypass"
+_FLUSH_JOB_ID = "blkshp_os:subscription_access_log:flush"
+_LOCAL_BUFFER_ATTR = "blkshp_access_log_buffer"
+
+# Events beyond these bounds are dropped (and counted) rather than queued.
+MAX_QUEUE_LENGTH = 10000
+MAX_BUFFERED_EVENTS = 100
+FLUSH_BATCH_SIZE = 500
+BYPASS_SAMPLE_WINDOW_SECONDS = 300
+
+ROLLUP_GROUP_FIELDS: list[str] = [
+    "period_type",
+    "period_start",
+    "company",
+    "user",
+    "access_type",
+    "access_key",
+    "action",
+]
+
+ROLLUP_FIELDS: list[str] = [
+    "name",
+    "creation",
+    "modified",
+    "modified_by",
+    "owner",
+    "docstatus",
+    *ROLLUP_GROUP_FIELDS,
+    "event_count",
+    "last_event",
+]
+
+ACCESS_LOG_FIELDS: list[str] = [
+    "name",
+    "creation",
+    "modified",
+    "modified_by",
+    "owner",
+    "docstatus",
+    "timestamp",
+    "user",
+    "company",
+    "access_type",
+    "access_key",
+    "action",
+    "bypass_reason",
+    "context_data",
+    "ip_address",
+]
+
+
+def record_access_event(
+    user: str,
+    access_type: str,
+    access_key: str,
+    context: dict[str, Any] | None = None,
+    bypass_reason: str | None = None,
+) -> None:
+    """Queue a denial (or, if ``bypass_reason`` is set, a sampled bypass) event."""
+    context = dict(context or {})
+    suppressed = 0
+    if bypass_reason:
+        suppressed = _sample_bypass(user, access_type, access_key)
+        if suppressed is None:
+            return
+        if suppressed:
+            context["suppressed_bypasses"] = suppressed
+
+    event = {
+        "timestamp": now(),
+        "user": user,
+        "access_type": access_type,
+        "access_key": access_key,
+        "action": "Bypass" if bypass_reason else "Denied",
+        "bypass_reason": bypass_reason,
+        "context_data": json.dumps(context, default=str),
+        "ip_address": getattr(frappe.local, "request_ip", None),
+        # Counted in the rollups, not stored on the log row
+        "suppressed_bypasses": suppressed,
+    }
+
+    if frappe.request:
+        buffer = _local_buffer()
+        if len(buffer) >= MAX_BUFFERED_EVENTS:
+            _count_dropped(1)
+            return
+        buffer.append(event)
+        return
+
+    _push_events([event])
+
+
+def flush_request_buffer(*args: Any, **kwargs: Any) -> None:
+    """``after_request`` hook: push this request's buffered events to Redis."""
+    buffer = getattr(frappe.local, _LOCAL_BUFFER_ATTR, None)
+    if not buffer:
+        return
+    setattr(frappe.local, _LOCAL_BUFFER_ATTR, [])
+    try:
+        _push_events(buffer)
+    except Exception:
+        frappe.log_error(title="Subscription Access Logging Failed")
+
+
+def flush_access_log_queue() -> int:
+    """Drain the Redis queue into Subscription Access Log (background job).
+
+    Each batch is moved to the processing list first and deleted from it
+    only once its rows are committed. A batch left there by a failed run is
+    written before new events are taken. Returns the number of rows inserted.
+    """
+    cache = frappe.cache()
+    queue_key = cache.make_key(ACCESS_LOG_QUEUE_KEY)
+    processing_key = cache.make_key(ACCESS_LOG_PROCESSING_KEY)
+    inserted = 0
+
+    while True:
+        (raw_events,) = cache.pipeline().lrange(processing_key, 0, -1).execute()
+        if not raw_events:
+            pipe = cache.pipeline()
+            for _index in range(FLUSH_BATCH_SIZE):
+                pipe.rpoplpush(queue_key, processing_key)
+            raw_events = [raw for raw in pipe.execute() if raw is not None]
+        if not raw_events:
+            break
+
+        events = []
+        for raw in raw_events:
+            try:
+                events.append(json.loads(raw))
+            except (TypeError, ValueError):
+                continue
+        _insert_events(events)
+        frappe.db.commit()
+        cache.pipeline().delete(processing_key).execute()
+        inserted += len(events)
+
+    dropped = _pop_counter(cache.make_key(ACCESS_LOG_DROPPED_KEY))
+    if dropped:
+        frappe.log_error(
+            title="Subscription Access Log Events Dropped",
+            message=f"{dropped} access log event(s) were dropped while the queue was full.",
+        )
+    return inserted
+
+
+def get_period_start(timestamp: datetime, period_type: str) -> datetime:
+    """Return the start of the hourly or daily rollup bucket containing ``timestamp``."""
+    if period_type == "Daily":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _push_events(events: list[dict[str, Any]]) -> None:
+    cache = frappe.cache()
+    queue_key = cache.make_key(ACCESS_LOG_QUEUE_KEY)
+
+    (queued,) = cache.pipeline().llen(queue_key).execute()
+    available = max(MAX_QUEUE_LENGTH - queued, 0)
+    if available < len(events):
+        _count_dropped(len(events) - available)
+        events = events[:available]
+    if not events:
+        return
+
+    pipe = cache.pipeline()
+    pipe.rpush(queue_key, *(json.dumps(event, default=str) for event in events))
+    pipe.execute()
+    frappe.enqueue(
+        "blkshp_os.core_platform.access_log.flush_access_log_queue",
+        queue="short",
+        job_id=_FLUSH_JOB_ID,
+        deduplicate=True,
+        enqueue_after_commit=False,
+    )
+
+
+def _insert_events(events: list[dict[str, Any]]) -> None:
+    if not events:
+        return
+    companies = permission_service.get_user_companies(
+        sorted({event["user"] for event in events})
+    )
+    for event in events:
+        event.setdefault("company", companies[event["user"]])
+    timestamp = now()
+    values = [
+        (
+            f"SAL-{frappe.generate_hash(length=12)}",
+            timestamp,
+            timestamp,
+            "Administrator",
+            event["user"],
+            0,
+            event["timestamp"],
+            event["user"],
+            event["company"],
+            event["access_type"],
+            event["access_key"],
+            event["action"],
+            event.get("bypass_reason"),
+            event.get("context_data"),
+            event.get("ip_address"),
+        )
+        for event in events
+    ]
+    frappe.db.bulk_insert(ACCESS_LOG_DOCTYPE, ACCESS_LOG_FIELDS, values)
+    _update_rollups(events)
+
+
+def _update_rollups(events: list[dict[str, Any]]) -> None:
+    """Increment the hourly and daily rollup rows covering ``events``.
+
+    Rollup names are derived from the group key, so each group is a single
+    ``INSERT ... ON DUPLICATE KEY UPDATE`` row that concurrent flushes can
+    increment safely. Bypasses suppressed by sampling are counted in the
+    bucket of the entry that reports them.
+    """
+    groups: dict[tuple[Any, ...], list[Any]] = {}
+    for event in events:
+        timestamp = get_datetime(event["timestamp"])
+        weight = 1 + cint(event.get("suppressed_bypasses"))
+        for period_type in ROLLUP_PERIODS:
+            key = (
+                period_type,
+                get_period_start(timestamp, period_type),
+                event.get("company"),
+                event["user"],
+                event["access_type"],
+                event["access_key"],
+                event["action"],
+            )
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [weight, timestamp]
+            else:
+                group[0] += weight
+                group[1] = max(group[1], timestamp)
+    if not groups:
+        return
+
+    timestamp = now()
+    rows = [
+        (
+            _rollup_name(key),
+            timestamp,
+            timestamp,
+            "Administrator",
+            "Administrator",
+            0,
+            *key,
+            count,
+            last,
+        )
+        for key, (count, last) in groups.items()
+    ]
+    column_list = ", ".join(f"`{column}`" for column in ROLLUP_FIELDS)
+    row_placeholder = "(" + ", ".join(["%s"] * len(ROLLUP_FIELDS)) + ")"
+    placeholders = ", ".join([row_placeholder] * len(rows))
+    frappe.db.sql(
+        f"""
+        INSERT INTO `tab{ROLLUP_DOCTYPE}` ({column_list})
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            `event_count` = `event_count` + VALUES(`event_count`),
+            `last_event` = GREATEST(`last_event`, VALUES(`last_event`)),
+            `modified` = VALUES(`modified`)
+        """,
+        [value for row in rows for value in row],
+    )
+
+
+def _rollup_name(key: tuple[Any, ...]) -> str:
+    raw_key = "\x1f".join(str(part or "") for part in key)
+    digest = hashlib.sha1(raw_key.encode()).hexdigest()
+    return f"SAR-{digest[:20]}"
+
+
+def _sample_bypass(user: str, access_type: str, access_key: str) -> int | None:
+    """Return how many bypasses were suppressed if this one should be logged.
+
+    Returns None when an identical bypass was already logged in the window.
+    """
+    cache = frappe.cache()
+    sample_key = cache.make_key(f"{_BYPASS_SAMPLE_KEY}:{user}:{access_type}:{access_key}")
+    counter_key = f"{sample_key}:suppressed"
+
+    pipe = cache.pipeline()
+    pipe.set(sample_key, 1, ex=BYPASS_SAMPLE_WINDOW_SECONDS, nx=True)
+    (is_first,) = pipe.execute()
+    if not is_first:
+        pipe = cache.pipeline()
+        pipe.incr(counter_key)
+        pipe.expire(counter_key, BYPASS_SAMPLE_WINDOW_SECONDS * 2)
+        pipe.execute()
+        return None
+
+    return _pop_counter(counter_key)
+
+
+def _count_dropped(count: int) -> None:
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    pipe.incrby(cache.make_key(ACCESS_LOG_DROPPED_KEY), count)
+    pipe.execute()
+
+
+def _pop_counter(key: str) -> int:
+    """Atomically read and reset the counter stored at the (prefixed) ``key``."""
+    pipe = frappe.cache().pipeline()
+    pipe.get(key)
+    pipe.delete(key)
+    value, _deleted = pipe.execute()
+    return int(value or 0)
+
+
+def _local_buffer() -> list[dict[str, Any]]:
+    buffer = getattr(frappe.local, _LOCAL_BUFFER_ATTR, None)
+    if buffer is None:
+        buffer = []
+        setattr(frappe.local, _LOCAL_BUFFER_ATTR, buffer)
+    return buffer
@@ -12,6 +12,7 @@ from frappe.model.document import Document
 from blkshp_os.core_platform.services import (
     clear_feature_matrix_cache,
     clear_subscription_context_cache,
+    clear_tenant_overview_cache,
 )
 
 
@@ -95,9 +96,14 @@ class ModuleActivation(Document):
                 )
 
     def on_update(self) -> None:
-        clear_subscription_context_cache()
+        previous = self.get_doc_before_save()
+        if previous and previous.plan and previous.plan != self.plan:
+            clear_subscription_context_cache(previous.plan)
+        clear_subscription_context_cache(self.plan)
         clear_feature_matrix_cache()
+        clear_tenant_overview_cache()
 
     def on_trash(self) -> None:
-        clear_subscription_context_cache()
+        clear_subscription_context_cache(self.plan)
         clear_feature_matrix_cache()
+        clear_tenant_overview_cache()
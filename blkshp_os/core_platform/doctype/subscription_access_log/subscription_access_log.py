@@ -16,3 +16,11 @@ class SubscriptionAccessLog(Document):
     """
 
     pass  # Simple audit log, no custom logic needed
+
+
+def on_doctype_update() -> None:
+    # Drill-down queries filter by user or company within a time window
+    frappe.db.add_index("Subscription Access Log", ["user", "timestamp"])
+    frappe.db.add_index("Subscription Access Log", ["company", "timestamp"])
+    # Retention purges walk expired rows in (timestamp, name) order
+    frappe.db.add_index("Subscription Access Log", ["timestamp", "name"])
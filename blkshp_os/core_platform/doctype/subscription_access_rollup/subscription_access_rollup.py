@@ -0,0 +1,24 @@
+"""Subscription Access Rollup DocType controller."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class SubscriptionAccessRollup(Document):
+    """Hourly or daily count of Subscription Access Log events.
+
+    Rows are keyed by (period, company, user, access type, access key, action)
+    and incremented by :mod:`blkshp_os.core_platform.access_log` as events are
+    written; they are not edited by hand.
+    """
+
+    pass
+
+
+def on_doctype_update() -> None:
+    frappe.db.add_index("Subscription Access Rollup", ["period_type", "period_start"])
+    frappe.db.add_index(
+        "Subscription Access Rollup", ["company", "period_type", "period_start"]
+    )
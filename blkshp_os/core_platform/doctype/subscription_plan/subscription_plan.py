@@ -12,6 +12,7 @@ from frappe.model.document import Document
 from blkshp_os.core_platform.services import (
     clear_feature_matrix_cache,
     clear_subscription_context_cache,
+    clear_tenant_overview_cache,
 )
 
 
@@ -61,9 +62,15 @@ class SubscriptionPlan(Document):
                 )
 
     def on_update(self) -> None:
-        clear_subscription_context_cache()
+        # Which plan is the default decides the plan of every unassigned company
+        if self.has_value_changed("is_default") or self.has_value_changed("is_active"):
+            clear_subscription_context_cache()
+        else:
+            clear_subscription_context_cache(self.name)
         clear_feature_matrix_cache()
+        clear_tenant_overview_cache()
 
     def on_trash(self) -> None:
-        clear_subscription_context_cache()
+        clear_subscription_context_cache(None if self.is_default else self.name)
         clear_feature_matrix_cache()
+        clear_tenant_overview_cache()
@@ -12,6 +12,7 @@ from frappe.model.document import Document
 from blkshp_os.core_platform.services import (
     clear_feature_matrix_cache,
     clear_subscription_context_cache,
+    clear_tenant_overview_cache,
 )
 
 
@@ -47,9 +48,11 @@ class TenantBranding(Document):
             )
 
     def on_update(self) -> None:
-        clear_subscription_context_cache()
+        clear_subscription_context_cache(company=self.name)
         clear_feature_matrix_cache()
+        clear_tenant_overview_cache()
 
     def on_trash(self) -> None:
-        clear_subscription_context_cache()
+        clear_subscription_context_cache(company=self.name)
         clear_feature_matrix_cache()
+        clear_tenant_overview_cache()
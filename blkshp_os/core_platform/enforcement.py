@@ -32,17 +32,29 @@ from __future__ import annotations
 import functools
 import json
 from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Any, TypeVar
 
 import frappe
 from frappe import _
-from frappe.utils import now
-
+from frappe.utils import add_days, get_datetime, now_datetime
+
+from blkshp_os.core_platform.access_log import (
+    ROLLUP_GROUP_FIELDS,
+    ROLLUP_PERIODS,
+    get_period_start,
+    record_access_event,
+)
 from blkshp_os.permissions import service as permission_service
 
 # Type variable for generic decorator support
 F = TypeVar("F", bound=Callable[..., Any])
 
+# Default look-back for raw log drill-down and rollup summaries
+ACCESS_LOG_DEFAULT_WINDOW_DAYS = 7
+ACCESS_ROLLUP_DEFAULT_WINDOW_DAYS = 30
+
 
 class SubscriptionAccessDenied(frappe.PermissionError):
     """Custom exception for subscription-based access denial.
@@ -89,9 +101,11 @@ def _log_access_denial(
 ) -> None:
     """Log subscription access denial or admin bypass to audit trail.
 
-    Creates a Subscription Access Log entry for audit and compliance purposes.
-    This function is called automatically by enforcement helpers and should not
-    typically be called directly.
+    Queues a Subscription Access Log entry for audit and compliance purposes;
+    entries are written in batches by a background job (see
+    :mod:`blkshp_os.core_platform.access_log`) and the caller's transaction is
+    never committed. This function is called automatically by enforcement
+    helpers and should not typically be called directly.
 
     Args:
             user: User attempting access
@@ -101,34 +115,24 @@ def _log_access_denial(
             bypass_reason: If admin bypassed, the reason (role) for bypass
     """
     try:
-        context = context or {}
+        # Don't log during install/migrate
+        if frappe.flags.in_install or frappe.flags.in_migrate:
+            return
+
+        context = dict(context or {})
 
         # Get request context if available
         if frappe.request and hasattr(frappe.request, "path"):
             context.setdefault("endpoint", frappe.request.path)
             context.setdefault("method", frappe.request.method)
 
-        # Get DocType context if in document context
-        if frappe.flags.in_install or frappe.flags.in_migrate:
-            return  # Don't log during install/migrate
-
-        log_entry = {
-            "doctype": "Subscription Access Log",
-            "timestamp": now(),
-            "user": user,
-            "access_type": access_type,
-            "access_key": access_key,
-            "action": "Bypass" if bypass_reason else "Denied",
-            "bypass_reason": bypass_reason,
-            "context_data": json.dumps(context, default=str),
-            "ip_address": (
-                frappe.local.request_ip if hasattr(frappe.local, "request_ip") else None
-            ),
-        }
-
-        # Insert without triggering additional validations
-        frappe.get_doc(log_entry).insert(ignore_permissions=True)
-        frappe.db.commit()
+        record_access_event(
+            user=user,
+            access_type=access_type,
+            access_key=access_key,
+            context=context,
+            bypass_reason=bypass_reason,
+        )
 
     except Exception as e:
         # Don't fail the request if logging fails
@@ -138,6 +142,115 @@ def _log_access_denial(
         )
 
 
+_DECISION_CACHE_ATTR = "blkshp_enforcement_decisions"
+
+
+@dataclass(frozen=True)
+class AccessDecision:
+    """Outcome of a subscription check for one (user, access type, key)."""
+
+    allowed: bool
+    bypassed: bool = False
+    bypass_reason: str | None = None
+
+
+def clear_enforcement_cache(user: str | None = None) -> None:
+    """Forget this request's enforcement decisions for ``user``, or all of them.
+
+    Called when plans, module toggles, roles or permissions change so later
+    checks in the same request see the new access. Without ``user`` the
+    hit/miss counters are reset as well.
+    """
+    cache = getattr(frappe.local, _DECISION_CACHE_ATTR, None)
+    if cache is None:
+        return
+    if not user:
+        delattr(frappe.local, _DECISION_CACHE_ATTR)
+        return
+    for key in [key for key in cache["decisions"] if key[0] == user]:
+        del cache["decisions"][key]
+    cache["logged"] = {key for key in cache["logged"] if key[0] != user}
+
+
+def get_enforcement_cache_stats() -> dict[str, int]:
+    """Return hit/miss counters for this request's enforcement decisions."""
+    cache = _decision_cache()
+    return {
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+        "entries": len(cache["decisions"]),
+    }
+
+
+def _get_access_decision(
+    user: str, access_type: str, access_key: str
+) -> tuple[AccessDecision, bool]:
+    """Return the decision for ``user`` and whether it should be logged.
+
+    Within a request or background job, decisions are memoized on
+    ``frappe.local`` until the request ends or :func:`clear_enforcement_cache`
+    runs. Each decision is reported as loggable once, so repeated checks (e.g.
+    a hook firing for every document in a bulk save) log a single entry.
+    Outside a request or job every check is evaluated and logged.
+    """
+    if not _in_request_scope():
+        return _evaluate_access(user, access_type, access_key), True
+
+    cache = _decision_cache()
+    key = (user, access_type, access_key)
+    decision = cache["decisions"].get(key)
+    if decision is not None:
+        cache["hits"] += 1
+    else:
+        cache["misses"] += 1
+        decision = _evaluate_access(user, access_type, access_key)
+        cache["decisions"][key] = decision
+
+    should_log = key not in cache["logged"]
+    return decision, should_log
+
+
+def _mark_logged(user: str, access_type: str, access_key: str) -> None:
+    if _in_request_scope():
+        _decision_cache()["logged"].add((user, access_type, access_key))
+
+
+def _in_request_scope() -> bool:
+    return bool(
+        getattr(frappe.local, "request", None) or getattr(frappe.local, "job", None)
+    )
+
+
+def _evaluate_access(user: str, access_type: str, access_key: str) -> AccessDecision:
+    # Check if user bypasses subscription gates
+    if permission_service._user_bypasses_subscription_gates(user):
+        bypass_roles = set(frappe.get_roles(user))
+        bypass_reason = ", ".join(
+            role
+            for role in permission_service.SUBSCRIPTION_BYPASS_ROLES
+            if role in bypass_roles
+        )
+        return AccessDecision(allowed=True, bypassed=True, bypass_reason=bypass_reason)
+
+    if access_type == "Module":
+        has_access = permission_service.user_has_module_access(
+            user, access_key, refresh=False
+        )
+    else:
+        has_access = permission_service.user_has_feature(
+            user, access_key, refresh=False
+        )
+    return AccessDecision(allowed=bool(has_access))
+
+
+def _decision_cache() -> dict[str, Any]:
+    cache = getattr(frappe.local, _DECISION_CACHE_ATTR, None)
+    if cache is None:
+        cache = {"decisions": {}, "logged": set(), "hits": 0, "misses": 0}
+        setattr(frappe.local, _DECISION_CACHE_ATTR, cache)
+    return cache
+
+
 def require_module_access(
     module_key: str,
     user: str | None = None,
@@ -181,40 +294,31 @@ def require_module_access(
         """Perform the actual access check."""
         checked_user = checked_user or user or frappe.session.user
         check_context = check_context or context or {}
+        decision, should_log = _get_access_decision(checked_user, "Module", module_key)
 
-        # Check if user bypasses subscription gates
-        if permission_service._user_bypasses_subscription_gates(checked_user):
-            # Log bypass for audit trail
-            if log_denial:
-                bypass_roles = set(frappe.get_roles(checked_user))
-                bypass_reason = ", ".join(
-                    role
-                    for role in permission_service.SUBSCRIPTION_BYPASS_ROLES
-                    if role in bypass_roles
-                )
+        # Bypass roles are granted access; log the bypass for audit trail
+        if decision.bypassed:
+            if log_denial and should_log:
                 _log_access_denial(
                     user=checked_user,
                     access_type="Module",
                     access_key=module_key,
                     context=check_context,
-                    bypass_reason=bypass_reason,
+                    bypass_reason=decision.bypass_reason,
                 )
+                _mark_logged(checked_user, "Module", module_key)
             return  # Access granted
 
-        # Check module access
-        has_access = permission_service.user_has_module_access(
-            checked_user, module_key, refresh=False
-        )
-
-        if not has_access:
+        if not decision.allowed:
             # Log denial
-            if log_denial:
+            if log_denial and should_log:
                 _log_access_denial(
                     user=checked_user,
                     access_type="Module",
                     access_key=module_key,
                     context=check_context,
                 )
+                _mark_logged(checked_user, "Module", module_key)
 
             # Raise exception
             raise SubscriptionAccessDenied(
@@ -305,40 +409,31 @@ def require_feature_access(
         """Perform the actual access check."""
         checked_user = checked_user or user or frappe.session.user
         check_context = check_context or context or {}
+        decision, should_log = _get_access_decision(checked_user, "Feature", feature_key)
 
-        # Check if user bypasses subscription gates
-        if permission_service._user_bypasses_subscription_gates(checked_user):
-            # Log bypass for audit trail
-            if log_denial:
-                bypass_roles = set(frappe.get_roles(checked_user))
-                bypass_reason = ", ".join(
-                    role
-                    for role in permission_service.SUBSCRIPTION_BYPASS_ROLES
-                    if role in bypass_roles
-                )
+        # Bypass roles are granted access; log the bypass for audit trail
+        if decision.bypassed:
+            if log_denial and should_log:
                 _log_access_denial(
                     user=checked_user,
                     access_type="Feature",
                     access_key=feature_key,
                     context=check_context,
-                    bypass_reason=bypass_reason,
+                    bypass_reason=decision.bypass_reason,
                 )
+                _mark_logged(checked_user, "Feature", feature_key)
             return  # Access granted
 
-        # Check feature access
-        has_access = permission_service.user_has_feature(
-            checked_user, feature_key, refresh=False
-        )
-
-        if not has_access:
+        if not decision.allowed:
             # Log denial
-            if log_denial:
+            if log_denial and should_log:
                 _log_access_denial(
                     user=checked_user,
                     access_type="Feature",
                     access_key=feature_key,
                     context=check_context,
                 )
+                _mark_logged(checked_user, "Feature", feature_key)
 
             # Raise exception
             raise SubscriptionAccessDenied(
@@ -414,7 +509,7 @@ def enforce_module_access_for_doctype(doc, method=None, module_key: str | None =
     """
     if not module_key:
         # Try to get module from doctype metadata
-        module_key = frappe.db.get_value("DocType", doc.doctype, "module")
+        module_key = frappe.get_meta(doc.doctype).module
         if not module_key:
             frappe.log_error(
                 title="Enforcement Configuration Error",
@@ -481,17 +576,25 @@ def get_access_log_summary(
     access_type: str | None = None,
     action: str | None = None,
     limit: int = 100,
+    from_datetime: str | None = None,
+    to_datetime: str | None = None,
+    company: str | None = None,
 ) -> list[dict[str, Any]]:
-    """Retrieve subscription access log entries for reporting and audit.
+    """Retrieve raw subscription access log entries for audit drill-down.
 
-    This function is useful for administrators to review access patterns,
-    denied access attempts, and admin bypasses.
+    The query is always bounded by time (the last
+    ``ACCESS_LOG_DEFAULT_WINDOW_DAYS`` days unless ``from_datetime`` is given)
+    so it uses the ``timestamp`` indexes. For counts over longer periods use
+    :func:`get_access_rollup_summary`.
 
     Args:
             user: Filter by specific user
             access_type: Filter by "Module" or "Feature"
             action: Filter by "Denied" or "Bypass"
             limit: Maximum number of records to return
+            from_datetime: Start of the window (inclusive)
+            to_datetime: End of the window (inclusive); defaults to now
+            company: Filter by the user's company
 
     Returns:
             List of access log entries with timestamps, users, and context
@@ -499,12 +602,18 @@ def get_access_log_summary(
     Example:
             # Get all denied access attempts in last 24 hours
             from frappe.utils import add_days, now
-            logs = get_access_log_summary(action="Denied", limit=1000)
-            recent = [log for log in logs if log.timestamp > add_days(now(), -1)]
+            logs = get_access_log_summary(
+                    action="Denied", from_datetime=add_days(now(), -1), limit=1000
+            )
     """
-    filters = {}
+    from_datetime, to_datetime = _resolve_window(
+        from_datetime, to_datetime, ACCESS_LOG_DEFAULT_WINDOW_DAYS
+    )
+    filters: dict[str, Any] = {"timestamp": ["between", [from_datetime, to_datetime]]}
     if user:
         filters["user"] = user
+    if company:
+        filters["company"] = company
     if access_type:
         filters["access_type"] = access_type
     if action:
@@ -517,6 +626,7 @@ def get_access_log_summary(
             "name",
             "timestamp",
             "user",
+            "company",
             "access_type",
             "access_key",
             "action",
@@ -541,6 +651,131 @@ def get_access_log_summary(
     return logs
 
 
+def get_access_rollup_summary(
+    period_type: str = "Daily",
+    from_datetime: str | None = None,
+    to_datetime: str | None = None,
+    group_by: list[str] | None = None,
+    company: str | None = None,
+    user: str | None = None,
+    access_type: str | None = None,
+    action: str | None = None,
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    """Return access event counts aggregated from Subscription Access Rollup.
+
+    Args:
+            period_type: "Hourly" or "Daily" buckets to read
+            from_datetime: Start of the window; defaults to
+                    ``ACCESS_ROLLUP_DEFAULT_WINDOW_DAYS`` days ago
+            to_datetime: End of the window; defaults to now
+            group_by: Rollup dimensions to group by (any of period_start,
+                    company, user, access_type, access_key, action); defaults to
+                    access_type, access_key and action
+            company: Filter by company
+            user: Filter by user
+            access_type: Filter by "Module" or "Feature"
+            action: Filter by "Denied" or "Bypass"
+            limit: Maximum number of groups to return
+
+    Returns:
+            List of groups with ``event_count`` and ``last_event``, largest first
+    """
+    if period_type not in ROLLUP_PERIODS:
+        frappe.throw(_("Invalid rollup period: {0}").format(period_type))
+
+    group_by = list(dict.fromkeys(group_by or ["access_type", "access_key", "action"]))
+    invalid = [
+        field
+        for field in group_by
+        if field not in ROLLUP_GROUP_FIELDS or field == "period_type"
+    ]
+    if invalid:
+        frappe.throw(_("Invalid group by field(s): {0}").format(", ".join(invalid)))
+
+    from_datetime, to_datetime = _resolve_window(
+        from_datetime, to_datetime, ACCESS_ROLLUP_DEFAULT_WINDOW_DAYS
+    )
+    # Include the bucket the window starts in
+    from_datetime = get_period_start(get_datetime(from_datetime), period_type)
+
+    filters: dict[str, Any] = {
+        "period_type": period_type,
+        "period_start": ["between", [from_datetime, to_datetime]],
+    }
+    if company:
+        filters["company"] = company
+    if user:
+        filters["user"] = user
+    if access_type:
+        filters["access_type"] = access_type
+    if action:
+        filters["action"] = action
+
+    return frappe.get_all(
+        "Subscription Access Rollup",
+        filters=filters,
+        fields=[
+            *group_by,
+            "sum(event_count) as event_count",
+            "max(last_event) as last_event",
+        ],
+        group_by=", ".join(group_by),
+        order_by="event_count desc",
+        limit=limit,
+    )
+
+
+@frappe.whitelist()
+def get_access_summary(
+    period_type: str = "Daily",
+    from_datetime: str | None = None,
+    to_datetime: str | None = None,
+    group_by: str | list[str] | None = None,
+    company: str | None = None,
+    user: str | None = None,
+    access_type: str | None = None,
+    action: str | None = None,
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    """API endpoint returning aggregated access counts for administrators.
+
+    Reads the hourly/daily rollups; see :func:`get_access_rollup_summary`.
+    ``group_by`` may be a JSON list or a comma-separated string.
+    """
+    frappe.only_for(list(permission_service.SUBSCRIPTION_BYPASS_ROLES))
+
+    if isinstance(group_by, str):
+        group_by = (
+            frappe.parse_json(group_by)
+            if group_by.startswith("[")
+            else [field.strip() for field in group_by.split(",") if field.strip()]
+        )
+    return get_access_rollup_summary(
+        period_type=period_type,
+        from_datetime=from_datetime,
+        to_datetime=to_datetime,
+        group_by=group_by,
+        company=company,
+        user=user,
+        access_type=access_type,
+        action=action,
+        limit=min(int(limit), 1000),
+    )
+
+
+def _resolve_window(
+    from_datetime: str | None, to_datetime: str | None, default_days: int
+) -> tuple[datetime, datetime]:
+    to_value = get_datetime(to_datetime) if to_datetime else now_datetime()
+    from_value = (
+        get_datetime(from_datetime)
+        if from_datetime
+        else add_days(to_value, -default_days)
+    )
+    return from_value, to_value
+
+
 @frappe.whitelist()
 def get_my_access_logs(limit: int = 50) -> list[dict[str, Any]]:
     """API endpoint for users to view their own access log history.
@@ -17,6 +17,60 @@ frappe.pages['subscription-management'].on_page_load = function(wrapper) {
 	// Add descriptive text
 	page.add_inner_message(__('Manage tenant subscriptions, plans, and module activations. This tool is for BLKSHP Operations staff only.'));
 
+	// Server-side filters, sorting and paging
+	page.tenant_query = {
+		plan: null,
+		module: null,
+		search: null,
+		sort_by: 'company_name',
+		sort_order: 'asc',
+		start: 0,
+		page_length: 50
+	};
+
+	const on_filter_change = (key, value) => {
+		page.tenant_query[key] = value || null;
+		page.tenant_query.start = 0;
+		load_tenants(page);
+	};
+
+	page.add_field({
+		fieldname: 'search',
+		label: __('Search'),
+		fieldtype: 'Data',
+		change() { on_filter_change('search', this.get_value()); }
+	});
+	page.add_field({
+		fieldname: 'plan',
+		label: __('Plan'),
+		fieldtype: 'Link',
+		options: 'Subscription Plan',
+		change() { on_filter_change('plan', this.get_value()); }
+	});
+	page.add_field({
+		fieldname: 'module',
+		label: __('Module Key'),
+		fieldtype: 'Data',
+		change() { on_filter_change('module', this.get_value()); }
+	});
+	page.add_field({
+		fieldname: 'sort_by',
+		label: __('Sort By'),
+		fieldtype: 'Select',
+		options: [
+			{value: 'company_name', label: __('Company')},
+			{value: 'plan_name', label: __('Plan')},
+			{value: 'base_price', label: __('Price')},
+			{value: 'module_count', label: __('Modules')}
+		],
+		default: 'company_name',
+		change() {
+			page.tenant_query.sort_by = this.get_value() || 'company_name';
+			page.tenant_query.start = 0;
+			load_tenants(page);
+		}
+	});
+
 	// Add refresh button
 	page.set_secondary_action(__('Refresh'), () => {
 		load_tenants(page);
@@ -33,11 +87,12 @@ frappe.pages['subscription-management'].on_page_load = function(wrapper) {
 };
 
 /**
- * Load and display all tenants
+ * Load and display the current page of tenants
  */
 function load_tenants(page) {
 	frappe.call({
-		method: 'blkshp_os.blkshp_os.core_platform.page.subscription_management.subscription_management.get_all_tenants',
+		method: 'blkshp_os.core_platform.page.subscription_management.subscription_management.get_all_tenants',
+		args: page.tenant_query,
 		callback: function(r) {
 			if (r.message) {
 				render_tenants_table(page, r.message);
@@ -49,14 +104,16 @@ function load_tenants(page) {
 /**
  * Render the tenants table
  */
-function render_tenants_table(page, tenants) {
+function render_tenants_table(page, result) {
 	const $content = $(page.body).find('.main-section');
 	$content.empty();
 
-	// Show summary stats
-	const total_tenants = tenants.length;
-	const tenants_with_plans = tenants.filter(t => t.plan_code).length;
-	const tenants_without_plans = total_tenants - tenants_with_plans;
+	const tenants = result.tenants;
+
+	// Show summary stats (across all tenants, not just this page)
+	const total_tenants = result.summary.total_tenants;
+	const tenants_with_plans = result.summary.with_plans;
+	const tenants_without_plans = result.summary.without_plans;
 
 	$content.append(`
 		<div class="subscription-stats" style="margin-bottom: 20px; display: flex; gap: 20px;">
@@ -119,7 +176,7 @@ function render_tenants_table(page, tenants) {
 			<tr data-company="${frappe.utils.escape_html(tenant.company)}">
 				<td>
 					<strong>${frappe.utils.escape_html(tenant.company_name)}</strong><br>
-					<small class="text-muted">${frappe.utils.escape_html(tenant.company)} (${frappe.utils.escape_html(tenant.abbr)})</small>
+					<small class="text-muted">${frappe.utils.escape_html(tenant.company)} (${frappe.utils.escape_html(tenant.company_code || '')})</small>
 				</td>
 				<td>${plan_badge}</td>
 				<td><small>${billing_info}</small></td>
@@ -151,6 +208,41 @@ function render_tenants_table(page, tenants) {
 	});
 
 	$content.append($table);
+	render_pager(page, $content, result);
+}
+
+/**
+ * Render previous/next paging controls for the tenant table
+ */
+function render_pager(page, $content, result) {
+	const query = page.tenant_query;
+	const first = result.total ? result.start + 1 : 0;
+	const last = result.start + result.tenants.length;
+
+	const $pager = $(`
+		<div class="tenants-pager" style="display: flex; justify-content: space-between; align-items: center; margin-top: 10px;">
+			<small class="text-muted">${__('Showing {0}-{1} of {2}', [first, last, result.total])}</small>
+			<div>
+				<button class="btn btn-xs btn-default btn-prev" style="margin-right: 5px;">${__('Previous')}</button>
+				<button class="btn btn-xs btn-default btn-next">${__('Next')}</button>
+			</div>
+		</div>
+	`);
+
+	$pager.find('.btn-prev')
+		.prop('disabled', result.start === 0)
+		.on('click', () => {
+			query.start = Math.max(query.start - query.page_length, 0);
+			load_tenants(page);
+		});
+	$pager.find('.btn-next')
+		.prop('disabled', last >= result.total)
+		.on('click', () => {
+			query.start += query.page_length;
+			load_tenants(page);
+		});
+
+	$content.append($pager);
 }
 
 /**
@@ -158,7 +250,7 @@ function render_tenants_table(page, tenants) {
  */
 function show_tenant_details(page, company) {
 	frappe.call({
-		method: 'blkshp_os.blkshp_os.core_platform.page.subscription_management.subscription_management.get_tenant_details',
+		method: 'blkshp_os.core_platform.page.subscription_management.subscription_management.get_tenant_details',
 		args: { company: company },
 		callback: function(r) {
 			if (r.message) {
@@ -272,7 +364,7 @@ function render_tenant_details_dialog(page, company, details) {
 function show_change_plan_dialog(page, company, current_plan) {
 	// Get available plans
 	frappe.call({
-		method: 'blkshp_os.blkshp_os.core_platform.page.subscription_management.subscription_management.get_tenant_details',
+		method: 'blkshp_os.core_platform.page.subscription_management.subscription_management.get_tenant_details',
 		args: { company: company },
 		callback: function(r) {
 			if (r.message && r.message.available_plans) {
@@ -300,7 +392,7 @@ function show_change_plan_dialog(page, company, current_plan) {
 					primary_action_label: __('Change Plan'),
 					primary_action: function(values) {
 						frappe.call({
-							method: 'blkshp_os.blkshp_os.core_platform.page.subscription_management.subscription_management.change_tenant_plan',
+							method: 'blkshp_os.core_platform.page.subscription_management.subscription_management.change_tenant_plan',
 							args: {
 								company: company,
 								new_plan: values.new_plan,
@@ -352,7 +444,7 @@ function show_toggle_module_dialog(page, company, module_key, enabled, callback)
 		primary_action_label: action,
 		primary_action: function(values) {
 			frappe.call({
-				method: 'blkshp_os.blkshp_os.core_platform.page.subscription_management.subscription_management.toggle_module',
+				method: 'blkshp_os.core_platform.page.subscription_management.subscription_management.toggle_module',
 				args: {
 					company: company,
 					module_key: module_key,
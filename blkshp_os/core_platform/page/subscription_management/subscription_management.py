@@ -11,68 +11,58 @@ from typing import Any
 import frappe
 from frappe import _
 
-from blkshp_os.blkshp_os.core_platform.services.subscription_context import (
+from blkshp_os.core_platform.services.subscription_context import (
     get_subscription_context,
     resolve_plan_for_company,
 )
+from blkshp_os.core_platform.services.tenant_overview import (
+    DEFAULT_PAGE_LENGTH,
+    query_tenants,
+)
 
 
 @frappe.whitelist()
-def get_all_tenants() -> list[dict[str, Any]]:
+def get_all_tenants(
+    plan: str | None = None,
+    module: str | None = None,
+    search: str | None = None,
+    sort_by: str = "company_name",
+    sort_order: str = "asc",
+    start: int = 0,
+    page_length: int = DEFAULT_PAGE_LENGTH,
+) -> dict[str, Any]:
     """
-    Get all companies with their subscription details.
+    Get a page of companies with their subscription details.
+
+    The tenant list is read from a cached overview that is rebuilt (one query
+    plus one subscription context per plan) when plans or companies change.
+
+    Args:
+            plan: Only tenants on this plan code
+            module: Only tenants with this module enabled
+            search: Filter on company name or code
+            sort_by: Field to sort by (company_name, company, plan_code,
+                    plan_name, base_price, module_count)
+            sort_order: "asc" or "desc"
+            start: Offset of the first tenant
+            page_length: Number of tenants per page
 
     Returns:
-            List of tenant dictionaries with company, plan, and module information.
+            Dictionary with ``tenants`` (company, plan and module information),
+            ``total`` matching tenants and the overall ``summary``.
     """
-    frappe.only_for("BLKSHP Operations", "System Manager")
-
-    # Get all companies
-    companies = frappe.get_all(
-        "Company",
-        fields=["name", "company_name", "abbr", "country"],
-        filters={"is_group": 0},  # Only leaf companies, not parent groups
-        order_by="company_name asc",
+    frappe.only_for(("BLKSHP Operations", "System Manager"))
+
+    return query_tenants(
+        plan=plan,
+        module=module,
+        search=search,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        start=start,
+        page_length=page_length,
     )
 
-    tenants = []
-    for company in companies:
-        # Get plan from Tenant Branding
-        plan_code = resolve_plan_for_company(company.name)
-
-        # Get subscription context
-        context = get_subscription_context(company=company.name)
-
-        # Count enabled modules
-        enabled_modules = [
-            {"key": mod.key, "label": mod.label, "is_required": mod.is_required}
-            for mod in context.modules.values()
-            if mod.is_enabled
-        ]
-
-        tenant_data = {
-            "company": company.name,
-            "company_name": company.company_name,
-            "abbr": company.abbr,
-            "country": company.country,
-            "plan_code": plan_code,
-            "plan_name": context.plan.plan_name if context.plan else None,
-            "billing_frequency": (
-                context.plan.billing_frequency if context.plan else None
-            ),
-            "base_price": context.plan.base_price if context.plan else None,
-            "enabled_modules": enabled_modules,
-            "module_count": len(enabled_modules),
-            "has_overrides": (
-                bool(context.plan and context.plan.default_feature_overrides)
-                if context.plan
-                else False
-            ),
-        }
-        tenants.append(tenant_data)
-
-    return tenants
-
 
 @frappe.whitelist()
 def get_tenant_details(company: str) -> dict[str, Any]:
@@ -85,7 +75,7 @@ def get_tenant_details(company: str) -> dict[str, Any]:
     Returns:
             Detailed tenant information with full module and feature data.
     """
-    frappe.only_for("BLKSHP Operations", "System Manager")
+    frappe.only_for(("BLKSHP Operations", "System Manager"))
 
     if not frappe.db.exists("Company", company):
         frappe.throw(_("Company {0} does not exist").format(company))
@@ -159,7 +149,7 @@ def change_tenant_plan(company: str, new_plan: str, reason: str = "") -> dict[st
     Returns:
             Success message and updated tenant data.
     """
-    frappe.only_for("BLKSHP Operations", "System Manager")
+    frappe.only_for(("BLKSHP Operations", "System Manager"))
 
     if not frappe.db.exists("Company", company):
         frappe.throw(_("Company {0} does not exist").format(company))
@@ -221,7 +211,7 @@ def toggle_module(
     Returns:
             Success message.
     """
-    frappe.only_for("BLKSHP Operations", "System Manager")
+    frappe.only_for(("BLKSHP Operations", "System Manager"))
 
     # Convert enabled to boolean (handles string "true"/"false" from JavaScript)
     enabled = frappe.parse_json(enabled) if isinstance(enabled, str) else bool(enabled)
@@ -0,0 +1,629 @@
+"""Batched tenant provisioning.
+
+:func:`provision_tenants` provisions many tenants in three phases:
+
+1. **Plan.** Companies, plans, module activations, branding, departments,
+   users and role assignments for the whole batch are fetched in a handful of
+   queries, every tenant spec is validated against them, and the records each
+   tenant needs (Company, Tenant Branding, Department, Has Role) are planned as
+   plain rows. Records that already exist are skipped, so re-running a batch
+   is safe.
+2. **Shared changes.** Module activations belong to subscription plans, not
+   tenants, so the modules requested across the batch are enabled once per
+   plan before any tenant runs.
+3. **Tenants.** Each tenant's rows are bulk inserted per doctype in a single
+   transaction, committed on success and rolled back on failure. Independent
+   tenants run in a process pool when ``workers > 1``.
+
+Each tenant's transaction also inserts a Subscription Access Log row with
+``action="provision_tenant"`` as the audit trail of who provisioned it.
+
+Progress is written to a JSON report after each tenant. Passing the same
+``report_path`` again resumes the batch: tenants already marked ``done`` are
+skipped. Caches are invalidated once at the end, since bulk inserts bypass the
+document hooks that normally do it.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now
+
+DEFAULT_TENANT_ROLES: tuple[str, ...] = ("Store Manager",)
+DEFAULT_DEPARTMENTS: tuple[dict[str, str], ...] = (
+    {"department_code": "KITCHEN", "department_name": "Kitchen", "department_type": "Kitchen"},
+    {"department_code": "BAR", "department_name": "Bar", "department_type": "Bar"},
+)
+
+# Order in which a tenant's rows are inserted (referenced records first)
+_INSERT_ORDER: tuple[str, ...] = ("Company", "Tenant Branding", "Department", "Has Role")
+_SAVEPOINT = "tenant_provisioning"
+ACCESS_LOG_DOCTYPE = "Subscription Access Log"
+PROVISION_ACTION = "provision_tenant"
+_STANDARD_FIELDS: tuple[str, ...] = (
+    "name",
+    "creation",
+    "modified",
+    "modified_by",
+    "owner",
+    "docstatus",
+)
+
+
+@dataclass
+class TenantPlan:
+    """Records planned for one tenant; plain data so it can cross processes."""
+
+    company: str
+    plan: str
+    rows: dict[str, list[dict[str, Any]]] = field(default_factory=dict)
+    branding_update: str | None = None
+    departments: list[str] = field(default_factory=list)
+    users: list[str] = field(default_factory=list)
+    modules: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+    def add(self, doctype: str, row: dict[str, Any]) -> None:
+        self.rows.setdefault(doctype, []).append(row)
+
+
+def provision_tenants(
+    tenants: Sequence[dict[str, Any]],
+    workers: int = 1,
+    report_path: str | None = None,
+) -> dict[str, Any]:
+    """Provision a batch of tenants and return the provisioning report.
+
+    Args:
+            tenants: Tenant specs. Each has ``company`` and ``plan`` and may set
+                    ``company_name`` / ``default_currency`` (used when the company
+                    is created), ``modules`` (module keys to enable on the plan),
+                    ``departments`` (dicts with ``department_code``,
+                    ``department_name``, ``department_type`` and an optional
+                    ``parent`` code; defaults to ``DEFAULT_DEPARTMENTS``) and
+                    ``users`` (a list of existing users, given
+                    ``DEFAULT_TENANT_ROLES``, or a mapping of user to roles).
+                    ``enable_all_features`` from the single-tenant script is
+                    not supported; it is reported as a warning and ignored.
+            workers: Number of processes to run tenants in.
+            report_path: JSON report to write; an existing report is resumed.
+
+    Returns:
+            The report: ``batch_id``, ``report_path`` and a ``tenants`` mapping of
+            company to ``status`` ("done", "failed" or "pending"), ``created``
+            counts per doctype, ``warnings`` and ``error``.
+    """
+    report_path = report_path or _default_report_path()
+    report = _load_report(report_path)
+
+    pending_specs = []
+    for spec in tenants:
+        company = (spec.get("company") or "").strip()
+        entry = report["tenants"].get(company)
+        if entry and entry["status"] == "done":
+            continue
+        pending_specs.append(spec)
+        report["tenants"][company] = _report_entry(spec)
+
+    plans, errors = plan_tenants(pending_specs)
+    for company, error in errors.items():
+        report["tenants"][company].update(status="failed", error=error)
+    for plan in plans:
+        report["tenants"][plan.company]["warnings"] = list(plan.warnings)
+    _write_report(report_path, report)
+
+    if plans:
+        _enable_plan_modules(pending_specs, plans)
+        _commit()
+
+    try:
+        for company, result in _run_plans(plans, workers):
+            report["tenants"][company].update(result)
+            _write_report(report_path, report)
+    finally:
+        _invalidate_caches(
+            [plan for plan in plans if report["tenants"][plan.company]["status"] == "done"]
+        )
+
+    return report
+
+
+def plan_tenants(
+    tenants: Sequence[dict[str, Any]],
+) -> tuple[list[TenantPlan], dict[str, str]]:
+    """Validate ``tenants`` and plan the records each one needs.
+
+    Returns the plans for valid tenants and an error message per invalid
+    company. Everything needed is fetched up front; nothing is written.
+    """
+    specs = [_normalize_spec(spec) for spec in tenants]
+    companies = [spec["company"] for spec in specs if spec["company"]]
+    users = {user for spec in specs for user in spec["users"]}
+    roles = {role for spec in specs for user_roles in spec["users"].values() for role in user_roles}
+
+    existing_companies = _rows_by_name("Company", companies, ["name", "company_code"])
+    existing_plans = set(
+        _rows_by_name("Subscription Plan", [spec["plan"] for spec in specs], ["name"])
+    )
+    existing_branding = _rows_by_name("Tenant Branding", companies, ["name", "plan"])
+    existing_users = set(_rows_by_name("User", users, ["name"]))
+    existing_roles = set(_rows_by_name("Role", roles, ["name"]))
+    existing_departments = {
+        (row.company, row.department_code)
+        for row in frappe.get_all(
+            "Department",
+            filters={"company": ["in", companies or [""]]},
+            fields=["company", "department_code"],
+        )
+    }
+    activations = {
+        (row.plan, row.module_key)
+        for row in frappe.get_all(
+            "Module Activation",
+            filters={"plan": ["in", list(existing_plans) or [""]]},
+            fields=["plan", "module_key"],
+        )
+    }
+    assigned_roles, next_role_idx = _existing_role_assignments(existing_users)
+    defaults = {doctype: _field_defaults(doctype) for doctype in _INSERT_ORDER}
+
+    plans: list[TenantPlan] = []
+    errors: dict[str, str] = {}
+    seen: set[str] = set()
+    for spec in specs:
+        company = spec["company"]
+        error = _validate_spec(spec, seen, existing_plans, existing_users, existing_roles)
+        seen.add(company)
+        if error:
+            errors[company] = error
+            continue
+
+        plan = TenantPlan(company=company, plan=spec["plan"], modules=spec["modules"])
+        if spec["enable_all_features"]:
+            plan.warnings.append(
+                _("enable_all_features is not supported by bulk provisioning and was ignored.")
+            )
+        plan.warnings.extend(
+            _("Module {0} not found in plan {1}").format(module_key, spec["plan"])
+            for module_key in spec["modules"]
+            if (spec["plan"], module_key) not in activations
+        )
+
+        company_row = existing_companies.get(company)
+        if company_row:
+            company_code = company_row.company_code or company
+        else:
+            company_code = company
+            plan.add(
+                "Company",
+                {
+                    **defaults["Company"],
+                    "name": company,
+                    "company_name": spec["company_name"] or company,
+                    "company_code": company_code,
+                    "default_currency": spec["default_currency"],
+                },
+            )
+
+        branding = existing_branding.get(company)
+        if not branding:
+            plan.add(
+                "Tenant Branding",
+                {**defaults["Tenant Branding"], "name": company, "company": company, "plan": spec["plan"]},
+            )
+        elif branding.plan != spec["plan"]:
+            plan.branding_update = spec["plan"]
+
+        error = _plan_departments(plan, spec, company_code, existing_departments, defaults["Department"])
+        if error:
+            errors[company] = error
+            continue
+
+        for user, user_roles in spec["users"].items():
+            for role in user_roles:
+                if (user, role) in assigned_roles:
+                    continue
+                # A user listed by several tenants gets each role once
+                assigned_roles.add((user, role))
+                idx = next_role_idx.get(user, 1)
+                next_role_idx[user] = idx + 1
+                plan.add(
+                    "Has Role",
+                    {
+                        "name": frappe.generate_hash(length=10),
+                        "parent": user,
+                        "parenttype": "User",
+                        "parentfield": "roles",
+                        "idx": idx,
+                        "role": role,
+                    },
+                )
+            plan.users.append(user)
+
+        plans.append(plan)
+
+    return plans, errors
+
+
+def provision_tenant_plan(plan: TenantPlan) -> dict[str, Any]:
+    """Write one tenant's planned records in a single transaction.
+
+    Returns the report fields for the tenant. Failures are rolled back and
+    reported rather than raised, so one tenant cannot stop the batch.
+    """
+    frappe.db.savepoint(_SAVEPOINT)
+    try:
+        created = _insert_rows(plan)
+        if plan.branding_update:
+            frappe.db.set_value(
+                "Tenant Branding",
+                plan.company,
+                "plan",
+                plan.branding_update,
+                update_modified=True,
+            )
+        _insert_provisioning_log(plan)
+    except Exception as exc:
+        frappe.db.rollback(save_point=_SAVEPOINT)
+        frappe.log_error(title=f"Tenant Provisioning Failed: {plan.company}")
+        return {"status": "failed", "error": str(exc), "created": {}}
+
+    _commit()
+    return {"status": "done", "error": None, "created": created}
+
+
+def _commit() -> None:
+    # Tests run inside a transaction they roll back themselves
+    if not frappe.flags.in_test:
+        frappe.db.commit()
+
+
+def _run_plans(plans: list[TenantPlan], workers: int) -> Iterable[tuple[str, dict[str, Any]]]:
+    """Yield ``(company, result)`` as each tenant finishes."""
+    workers = max(cint(workers), 1)
+    if workers == 1 or len(plans) < 2 or frappe.flags.in_test:
+        for plan in plans:
+            yield plan.company, provision_tenant_plan(plan)
+        return
+
+    # Spawned workers open their own database and Redis connections
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(plans)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(frappe.local.site, frappe.local.sites_path, frappe.session.user),
+    ) as executor:
+        futures = {executor.submit(provision_tenant_plan, plan): plan.company for plan in plans}
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                yield company, future.result()
+            except Exception as exc:
+                yield company, {"status": "failed", "error": str(exc), "created": {}}
+
+
+def _init_worker(site: str, sites_path: str, user: str) -> None:
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user(user)
+
+
+def _insert_rows(plan: TenantPlan) -> dict[str, int]:
+    timestamp = now()
+    user = frappe.session.user
+    created: dict[str, int] = {}
+    for doctype in _INSERT_ORDER:
+        rows = plan.rows.get(doctype)
+        if not rows:
+            continue
+        fields = list(_STANDARD_FIELDS)
+        for row in rows:
+            fields.extend(key for key in row if key not in fields)
+        standard = {
+            "creation": timestamp,
+            "modified": timestamp,
+            "modified_by": user,
+            "owner": user,
+            "docstatus": 0,
+        }
+        values = [
+            tuple({**standard, **row}.get(fieldname) for fieldname in fields) for row in rows
+        ]
+        frappe.db.bulk_insert(doctype, fields, values)
+        created[doctype] = len(rows)
+    return created
+
+
+def _insert_provisioning_log(plan: TenantPlan) -> None:
+    """Record the provisioning in the Subscription Access Log audit trail."""
+    timestamp = now()
+    user = frappe.session.user
+    details = {
+        "plan": plan.plan,
+        "modules": plan.modules,
+        "departments": plan.departments,
+        "users": plan.users,
+    }
+    frappe.db.bulk_insert(
+        ACCESS_LOG_DOCTYPE,
+        [*_STANDARD_FIELDS, "timestamp", "user", "company", "action", "context_data"],
+        [
+            (
+                f"SAL-{frappe.generate_hash(length=12)}",
+                timestamp,
+                timestamp,
+                user,
+                user,
+                0,
+                timestamp,
+                user,
+                plan.company,
+                PROVISION_ACTION,
+                frappe.as_json(details),
+            )
+        ],
+    )
+
+
+def _enable_plan_modules(specs: Sequence[dict[str, Any]], plans: list[TenantPlan]) -> None:
+    """Enable every requested module on its plan with one update."""
+    planned = {plan.company for plan in plans}
+    pairs = {
+        (spec["plan"], module_key)
+        for spec in map(_normalize_spec, specs)
+        if spec["company"] in planned
+        for module_key in spec["modules"]
+    }
+    if not pairs:
+        return
+
+    names = [
+        row.name
+        for row in frappe.get_all(
+            "Module Activation",
+            filters={
+                "plan": ["in", list({plan for plan, _module in pairs})],
+                "is_enabled": 0,
+            },
+            fields=["name", "plan", "module_key"],
+        )
+        if (row.plan, row.module_key) in pairs
+    ]
+    if names:
+        frappe.db.sql(
+            """
+            UPDATE `tabModule Activation`
+            SET `is_enabled` = 1, `modified` = %(modified)s, `modified_by` = %(user)s
+            WHERE `name` IN %(names)s
+            """,
+            {"modified": now(), "user": frappe.session.user, "names": tuple(names)},
+        )
+
+
+def _invalidate_caches(plans: list[TenantPlan]) -> None:
+    # Imported here: these modules import the core platform services
+    from blkshp_os.core_platform.services import (
+        clear_feature_matrix_cache,
+        clear_subscription_context_cache,
+        clear_tenant_overview_cache,
+    )
+    from blkshp_os.departments.hierarchy import clear_hierarchy_cache
+    from blkshp_os.departments.settings import clear_settings_cache
+    from blkshp_os.departments.stats import refresh_department_stats
+    from blkshp_os.permissions.matrix import clear_permission_matrix_cache
+    from blkshp_os.permissions.roles import clear_compiled_permissions
+
+    clear_subscription_context_cache()
+    clear_feature_matrix_cache()
+    clear_tenant_overview_cache()
+    if not plans:
+        return
+
+    departments = [name for plan in plans for name in plan.departments]
+    if departments:
+        clear_hierarchy_cache()
+        clear_settings_cache()
+        clear_permission_matrix_cache()
+        refresh_department_stats(departments)
+
+    for user in {user for plan in plans for user in plan.users}:
+        frappe.clear_cache(user=user)
+        clear_compiled_permissions(user)
+
+
+def _plan_departments(
+    plan: TenantPlan,
+    spec: dict[str, Any],
+    company_code: str,
+    existing: set[tuple[str, str]],
+    defaults: dict[str, Any],
+) -> str | None:
+    """Plan the tenant's Department rows, named like the Department controller does."""
+    suffix = company_code.strip().upper().replace(" ", "-")
+    names = {
+        (department.get("department_code") or "").strip().upper(): None
+        for department in spec["departments"]
+    }
+    for code in names:
+        names[code] = f"{code}-{suffix}"
+
+    parents = {
+        (department.get("department_code") or "").strip().upper(): (
+            (department.get("parent") or "").strip().upper() or None
+        )
+        for department in spec["departments"]
+    }
+    for code in parents:
+        seen = {code}
+        current = parents.get(code)
+        while current:
+            if current in seen:
+                return _("Circular department hierarchy detected at {0}.").format(code)
+            seen.add(current)
+            current = parents.get(current)
+
+    for department in spec["departments"]:
+        code = (department.get("department_code") or "").strip().upper()
+        department_name = (department.get("department_name") or "").strip()
+        if not code or not department_name:
+            return _("Every department needs a department_code and department_name.")
+
+        parent = (department.get("parent") or "").strip().upper() or None
+        if parent and parent not in names:
+            return _("Parent department {0} is not part of the tenant's departments.").format(parent)
+
+        if (plan.company, code) in existing:
+            continue
+        plan.add(
+            "Department",
+            {
+                **defaults,
+                "name": names[code],
+                "department_code": code,
+                "department_name": department_name,
+                "department_type": department.get("department_type") or "Other",
+                "company": plan.company,
+                "parent_department": names[parent] if parent else None,
+                "settings": (
+                    json.dumps(department["settings"])
+                    if isinstance(department.get("settings"), dict)
+                    else department.get("settings")
+                ),
+            },
+        )
+        plan.departments.append(names[code])
+    return None
+
+
+def _normalize_spec(spec: dict[str, Any]) -> dict[str, Any]:
+    users = spec.get("users") or {}
+    if not isinstance(users, dict):
+        users = {user: list(DEFAULT_TENANT_ROLES) for user in users}
+    return {
+        "company": (spec.get("company") or "").strip(),
+        "company_name": spec.get("company_name"),
+        "default_currency": spec.get("default_currency"),
+        "plan": spec.get("plan"),
+        "modules": list(dict.fromkeys(spec.get("modules") or [])),
+        "enable_all_features": bool(spec.get("enable_all_features")),
+        "departments": list(
+            spec["departments"] if spec.get("departments") is not None else DEFAULT_DEPARTMENTS
+        ),
+        "users": {
+            user: list(dict.fromkeys(roles or DEFAULT_TENANT_ROLES))
+            for user, roles in users.items()
+        },
+    }
+
+
+def _validate_spec(
+    spec: dict[str, Any],
+    seen: set[str],
+    plans: set[str],
+    users: set[str],
+    roles: set[str],
+) -> str | None:
+    if not spec["company"]:
+        return _("Company is required.")
+    if spec["company"] in seen:
+        return _("Company {0} appears more than once in the batch.").format(spec["company"])
+    if spec["plan"] not in plans:
+        return _("Subscription Plan {0} does not exist").format(spec["plan"])
+
+    missing_users = sorted(set(spec["users"]) - users)
+    if missing_users:
+        return _("User(s) do not exist: {0}").format(", ".join(missing_users))
+    missing_roles = sorted(
+        {role for user_roles in spec["users"].values() for role in user_roles} - roles
+    )
+    if missing_roles:
+        return _("Role(s) do not exist: {0}").format(", ".join(missing_roles))
+    return None
+
+
+def _rows_by_name(
+    doctype: str, names: Iterable[str], fields: list[str]
+) -> dict[str, frappe._dict]:
+    names = [name for name in set(names) if name]
+    if not names:
+        return {}
+    return {
+        row.name: row
+        for row in frappe.get_all(doctype, filters={"name": ["in", names]}, fields=fields)
+    }
+
+
+def _existing_role_assignments(
+    users: set[str],
+) -> tuple[set[tuple[str, str]], dict[str, int]]:
+    if not users:
+        return set(), {}
+    rows = frappe.get_all(
+        "Has Role",
+        filters={"parent": ["in", list(users)], "parenttype": "User"},
+        fields=["parent", "role", "idx"],
+    )
+    next_idx: dict[str, int] = {}
+    for row in rows:
+        next_idx[row.parent] = max(next_idx.get(row.parent, 1), cint(row.idx) + 1)
+    return {(row.parent, row.role) for row in rows}, next_idx
+
+
+def _field_defaults(doctype: str) -> dict[str, Any]:
+    """Return the JSON defaults a new document of ``doctype`` would get."""
+    defaults: dict[str, Any] = {}
+    for df in frappe.get_meta(doctype).fields:
+        if df.default is None or df.fieldtype in ("Section Break", "Column Break", "Tab Break"):
+            continue
+        defaults[df.fieldname] = cint(df.default) if df.fieldtype == "Check" else df.default
+    return defaults
+
+
+def _report_entry(spec: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "plan": spec.get("plan"),
+        "status": "pending",
+        "created": {},
+        "warnings": [],
+        "error": None,
+    }
+
+
+def _default_report_path() -> str:
+    return frappe.get_site_path(
+        "private", "files", f"tenant-provisioning-{frappe.generate_hash(length=10)}.json"
+    )
+
+
+def _load_report(path: str) -> dict[str, Any]:
+    if os.path.exists(path):
+        with open(path) as handle:
+            report = json.load(handle)
+        report["report_path"] = path
+        return report
+    return {
+        "batch_id": os.path.splitext(os.path.basename(path))[0],
+        "report_path": path,
+        "started_at": now(),
+        "updated_at": now(),
+        "tenants": {},
+    }
+
+
+def _write_report(path: str, report: dict[str, Any]) -> None:
+    """Write the report atomically so an interrupted run leaves a valid file."""
+    report["updated_at"] = now()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as handle:
+        json.dump(report, handle, indent=1, default=str)
+    os.replace(temp_path, path)
@@ -6,20 +6,36 @@ from .feature_matrix import (
     clear_feature_matrix_cache,
     get_feature_matrix,
     get_feature_matrix_for_user,
+    get_feature_matrix_for_user_with_etag,
+    get_feature_matrix_overlay,
+    get_plan_matrix_bytes,
     get_user_profile,
+    get_user_profile_with_etag,
 )
 from .subscription_context import (
     clear_subscription_context_cache,
     get_subscription_context,
     resolve_plan_for_company,
 )
+from .tenant_overview import (
+    clear_tenant_overview_cache,
+    get_tenant_overview,
+    query_tenants,
+)
 
 __all__ = [
     "clear_feature_matrix_cache",
     "clear_subscription_context_cache",
+    "clear_tenant_overview_cache",
     "get_feature_matrix",
     "get_feature_matrix_for_user",
+    "get_feature_matrix_for_user_with_etag",
+    "get_feature_matrix_overlay",
+    "get_plan_matrix_bytes",
     "get_subscription_context",
+    "get_tenant_overview",
     "get_user_profile",
+    "get_user_profile_with_etag",
+    "query_tenants",
     "resolve_plan_for_company",
 ]
@@ -1,9 +1,18 @@
-"""Feature matrix and profile helpers."""
+"""Feature matrix and profile helpers.
+
+Each plan's matrix payload is serialized once and cached in ``frappe.cache()``
+as ``(body, etag)`` under a versioned per-plan key. Readers parse the bytes
+into a fresh dict instead of copying a shared map. A user's access is a small
+overlay evaluated against the cached subscription context, and the ETag of a
+user's matrix or profile is derived from the plan ETag plus the serialized
+overlay, so unchanged responses can be answered with 304 Not Modified without
+touching the plan bytes.
+"""
 
 from __future__ import annotations
 
-import copy
-from collections.abc import Mapping
+import json
+from collections.abc import Iterable
 from typing import Any
 
 import frappe
@@ -13,6 +22,13 @@ from frappe.utils import now
 # from blkshp_os.permissions import roles as role_service
 # from blkshp_os.permissions import service as permission_service
 
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    versioned_key,
+)
+from blkshp_os.utils.http import compute_etag, serialize_payload
+
 from .subscription_context import (
     ModuleActivationState,
     SubscriptionContext,
@@ -33,21 +49,13 @@ def _normalize_plan_key(plan_code: str | None) -> str:
     return (plan_code or "").strip().lower() or _CACHE_PLAN_FALLBACK
 
 
-def _load_cache() -> dict[str, dict[str, Any]]:
-    """Load the cached feature matrix map from frappe.cache."""
-    cache = frappe.cache()
-    cached = cache.get_value(FEATURE_MATRIX_CACHE_KEY)
-    return cached or {}
-
-
-def _store_cache(cache_map: Mapping[str, dict[str, Any]]) -> None:
-    """Persist the provided cache map."""
-    frappe.cache().set_value(FEATURE_MATRIX_CACHE_KEY, dict(cache_map))
-
-
 def clear_feature_matrix_cache() -> None:
-    """Clear the cached feature matrix payloads."""
-    frappe.cache().delete_value(FEATURE_MATRIX_CACHE_KEY)
+    """Invalidate the cached feature matrix payloads for every plan.
+
+    Repeated on commit so a payload built from uncommitted data by another
+    worker is not kept.
+    """
+    bump_cache_version(FEATURE_MATRIX_CACHE_KEY)
 
 
 def _serialize_plan(plan: SubscriptionPlanState | None) -> dict[str, Any] | None:
@@ -122,39 +130,53 @@ def get_feature_matrix(
 ) -> dict[str, Any]:
     """Return the plan-level feature matrix for the supplied plan/company.
 
-    When refresh is False the serialized payload is cached in frappe.cache()
-    using a normalized plan key. Invalidation is handled via DocType hooks
-    by calling :func:`clear_subscription_context_cache` and
-    :func:`clear_feature_matrix_cache`.
+    The payload is parsed from the cached bytes (see
+    :func:`get_plan_matrix_bytes`), so callers may mutate it freely.
+    """
+    body, _etag = get_plan_matrix_bytes(
+        plan_code=plan_code, company=company, refresh=refresh
+    )
+    return json.loads(body)
+
+
+def get_plan_matrix_bytes(
+    *, plan_code: str | None = None, company: str | None = None, refresh: bool = False
+) -> tuple[bytes, str]:
+    """Return the serialized plan-level feature matrix and its ETag.
+
+    ``generated_at`` records when the payload was built, so the bytes (and
+    ETag) only change when the plan data does. With ``refresh`` the payload
+    is rebuilt from the database and the cache is left untouched.
     """
     resolved_plan = plan_code or resolve_plan_for_company(company)
-    cache_key = _normalize_plan_key(resolved_plan)
-    cache_map = {} if refresh else _load_cache()
-
-    if not refresh and cache_key in cache_map:
-        payload = copy.deepcopy(cache_map[cache_key])
-    else:
-        context = get_subscription_context(
-            company=company, plan_code=resolved_plan, use_cache=not refresh
-        )
-        payload = _build_plan_matrix(context, resolved_plan)
-        if not refresh:
-            cache_map[cache_key] = copy.deepcopy(payload)
-            _store_cache(cache_map)
+    cache_key = versioned_key(FEATURE_MATRIX_CACHE_KEY, _normalize_plan_key(resolved_plan))
+
+    if not refresh:
+        cached = frappe.cache().get_value(cache_key)
+        if cached:
+            return cached
 
+    context = get_subscription_context(
+        company=company, plan_code=resolved_plan, use_cache=not refresh
+    )
+    payload = _build_plan_matrix(context, resolved_plan)
     payload["generated_at"] = now()
-    return payload
+    body = serialize_payload(payload)
+    entry = (body, compute_etag(body))
+
+    if not refresh:
+        frappe.cache().set_value(cache_key, entry, expires_in_sec=DEFAULT_TTL_SECONDS)
+    return entry
 
 
 def _evaluate_module_access(
-    user: str, modules: list[dict[str, Any]], refresh: bool
+    user: str, module_keys: Iterable[str], refresh: bool
 ) -> dict[str, bool]:
     """Return a mapping of module key to access flag for the user."""
     from blkshp_os.permissions import service as permission_service
 
     access_map: dict[str, bool] = {}
-    for module in modules:
-        key = module["key"]
+    for key in module_keys:
         access_map[key] = permission_service.user_has_module_access(
             user, key, refresh=refresh
         )
@@ -163,14 +185,14 @@ def _evaluate_module_access(
 
 def _evaluate_feature_access(
     user: str,
-    registry: Mapping[str, Any],
+    feature_keys: Iterable[str],
     refresh: bool,
 ) -> dict[str, bool]:
     """Return a mapping of feature key to access flag for the user."""
     from blkshp_os.permissions import service as permission_service
 
     access_map: dict[str, bool] = {}
-    for feature_key in registry.keys():
+    for feature_key in feature_keys:
         access_map[feature_key] = permission_service.user_has_feature(
             user, feature_key, refresh=refresh
         )
@@ -184,31 +206,78 @@ def get_feature_matrix_for_user(
     refresh: bool = False,
 ) -> dict[str, Any]:
     """Return the feature matrix augmented with user-specific access flags."""
+    payload, _etag = get_feature_matrix_for_user_with_etag(
+        user, company=company, refresh=refresh
+    )
+    return payload
+
+
+def get_feature_matrix_for_user_with_etag(
+    user: str | None = None,
+    *,
+    company: str | None = None,
+    refresh: bool = False,
+) -> tuple[dict[str, Any], str]:
+    """Return the user's feature matrix and an ETag for it.
+
+    The plan payload is parsed and merged with the user overlay, adding
+    ``user_has_access`` to every module. See
+    :func:`get_feature_matrix_overlay` for the ETag.
+    """
+    body, overlay, etag = get_feature_matrix_overlay(
+        user, company=company, refresh=refresh
+    )
+    result = json.loads(body)
+    module_access = overlay.pop("user_module_access")
+    for module in result["modules"]:
+        module["user_has_access"] = module_access.get(module["key"], False)
+    result.update(overlay)
+    return result, etag
+
+
+def get_feature_matrix_overlay(
+    user: str | None = None,
+    *,
+    company: str | None = None,
+    refresh: bool = False,
+) -> tuple[bytes, dict[str, Any], str]:
+    """Return the cached plan bytes, the user overlay and the user's ETag.
+
+    The overlay holds ``user_module_access``, ``user_accessible_modules``,
+    ``user_feature_access`` and ``user`` (id, company, roles). Module and
+    feature keys come from the cached subscription context, so neither the
+    overlay nor the ETag (plan ETag plus a hash of the overlay) parses the
+    plan bytes.
+    """
     from blkshp_os.permissions import service as permission_service
 
     if not user:
         user = frappe.session.user
 
     user_company = company or permission_service.get_user_company(user)
-    matrix = get_feature_matrix(plan_code=None, company=user_company, refresh=refresh)
-
-    result = copy.deepcopy(matrix)
-    module_access = _evaluate_module_access(user, result["modules"], refresh)
-    feature_access = _evaluate_feature_access(user, result["registry"], refresh)
-
-    for module in result["modules"]:
-        module["user_has_access"] = module_access[module["key"]]
-
-    result["user_accessible_modules"] = [
-        key for key, has_access in module_access.items() if has_access
-    ]
-    result["user_feature_access"] = feature_access
-    result["user"] = {
-        "id": user,
-        "company": user_company,
-        "roles": frappe.get_roles(user),
+    plan_code = resolve_plan_for_company(user_company)
+    body, plan_etag = get_plan_matrix_bytes(
+        plan_code=plan_code, company=user_company, refresh=refresh
+    )
+    context = get_subscription_context(
+        company=user_company, plan_code=plan_code, use_cache=not refresh
+    )
+
+    module_access = _evaluate_module_access(user, sorted(context.modules), refresh)
+    feature_access = _evaluate_feature_access(user, context.registry, refresh)
+    overlay = {
+        "user_module_access": module_access,
+        "user_accessible_modules": [
+            key for key, has_access in module_access.items() if has_access
+        ],
+        "user_feature_access": feature_access,
+        "user": {
+            "id": user,
+            "company": user_company,
+            "roles": frappe.get_roles(user),
+        },
     }
-    return result
+    return body, overlay, compute_etag(plan_etag.encode() + serialize_payload(overlay))
 
 
 def _summarize_permissions(user: str) -> dict[str, Any]:
@@ -230,13 +299,29 @@ def get_user_profile(
     refresh: bool = False,
 ) -> dict[str, Any]:
     """Return a read-only profile summary for the tenant user."""
+    profile, _etag = get_user_profile_with_etag(user, refresh=refresh)
+    return profile
+
+
+def get_user_profile_with_etag(
+    user: str | None = None,
+    *,
+    refresh: bool = False,
+) -> tuple[dict[str, Any], str]:
+    """Return the user's profile summary and an ETag for it.
+
+    The ETag combines the user's feature matrix ETag with a hash of the
+    profile-only fields (user details, departments and permissions).
+    """
     from blkshp_os.permissions import service as permission_service
 
     if not user:
         user = frappe.session.user
 
     user_doc = frappe.get_cached_doc("User", user)
-    matrix = get_feature_matrix_for_user(user=user, refresh=refresh)
+    matrix, matrix_etag = get_feature_matrix_for_user_with_etag(
+        user=user, refresh=refresh
+    )
     departments = permission_service.get_user_department_permissions(user)
 
     permissions = _summarize_permissions(user)
@@ -250,14 +335,15 @@ def get_user_profile(
         for module in matrix["modules"]
     ]
 
-    return {
-        "user": {
-            "id": user_doc.name,
-            "full_name": user_doc.full_name,
-            "email": user_doc.email,
-            "enabled": bool(user_doc.enabled),
-            "roles": permissions["roles"],
-        },
+    user_info = {
+        "id": user_doc.name,
+        "full_name": user_doc.full_name,
+        "email": user_doc.email,
+        "enabled": bool(user_doc.enabled),
+        "roles": permissions["roles"],
+    }
+    profile = {
+        "user": user_info,
         "company": matrix["user"]["company"],
         "departments": departments,
         "permissions": {
@@ -273,3 +359,6 @@ def get_user_profile(
         },
         "generated_at": matrix["generated_at"],
     }
+
+    overlay = serialize_payload([user_info, departments, profile["permissions"]])
+    return profile, compute_etag(matrix_etag.encode() + overlay)
@@ -1,16 +1,45 @@
-"""Subscription and feature matrix helpers."""
+"""Subscription and feature matrix helpers.
+
+Contexts are cached as serialized snapshots in ``frappe.cache()`` under a key
+stamped with a global version (bumped when Feature Toggles change) and a
+per-plan version (bumped when the plan or its Module Activations change), so
+every worker shares one copy. Each process also keeps a short-lived local copy
+that is dropped when an invalidation is published on
+:data:`INVALIDATION_CHANNEL`.
+"""
 
 from __future__ import annotations
 
 import json
+import os
+import threading
+import time
 from collections.abc import Mapping, MutableMapping
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from typing import Any
 
 import frappe
 
+from blkshp_os.permissions.claims import (
+    bump_permission_version,
+    bump_permission_versions,
+)
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    get_cache_version,
+    on_commit,
+    on_rollback,
+)
+
 FeatureValue = Any
 
+CONTEXT_CACHE_NAMESPACE = "blkshp_os:subscription_context"
+INVALIDATION_CHANNEL = "blkshp_os:subscription_context:invalidate"
+# Upper bound on a local copy's age should an invalidation message be missed.
+LOCAL_CONTEXT_TTL_SECONDS = 300
+_NO_PLAN = "__no_plan__"
+
 
 @dataclass(frozen=True)
 class FeatureToggleMetadata:
@@ -60,12 +89,66 @@ class SubscriptionContext:
     registry: Mapping[str, FeatureToggleMetadata]
 
 
-_CONTEXT_CACHE: MutableMapping[str, SubscriptionContext] = {}
+# Per-process copies keyed by (site, plan), with the monotonic time they were loaded.
+_CONTEXT_CACHE: dict[tuple[str, str], tuple[float, SubscriptionContext]] = {}
+_CONTEXT_CACHE_LOCK = threading.Lock()
+_cache_generation = 0
+_listener_pid: int | None = None
+
+
+def clear_subscription_context_cache(
+    plan_code: str | None = None, *, company: str | None = None
+) -> None:
+    """Invalidate cached contexts for ``plan_code``, or for every plan.
+
+    The shared version is bumped (again on commit, by ``bump_cache_version``)
+    and every worker is told to drop its local copy, now and once the
+    transaction commits, so a copy rebuilt from not-yet-committed data by
+    another worker is not kept. This request's enforcement decisions are
+    forgotten.
+
+    Token claims list the enabled modules, so the claims of the plan's users
+    are made stale; a change to the default plan or to every plan makes every
+    user's claims stale. With ``company`` alone only the company's plan
+    assignment changed: contexts are cached per plan and stay valid, and
+    only the claims of the company's users are made stale.
+    """
+    from blkshp_os.core_platform.enforcement import clear_enforcement_cache
+
+    if plan_code or not company:
+        site = frappe.local.site
 
+        def drop_copies() -> None:
+            _drop_local(site, plan_code)
+            _publish_invalidation(site, plan_code)
 
-def clear_subscription_context_cache() -> None:
-    """Clear the in-process cache of subscription contexts."""
-    _CONTEXT_CACHE.clear()
+        if plan_code:
+            bump_cache_version(_plan_namespace(plan_code))
+        else:
+            bump_cache_version(CONTEXT_CACHE_NAMESPACE)
+        drop_copies()
+        on_commit(drop_copies)
+        on_rollback(lambda: _drop_local(site, plan_code))
+
+    clear_enforcement_cache()
+    _bump_claims(plan_code, company)
+
+
+def _bump_claims(plan_code: str | None, company: str | None) -> None:
+    """Make the token claims of the users on ``plan_code`` or in ``company`` stale."""
+    from blkshp_os.permissions.service import get_company_users
+
+    if company:
+        companies = [company]
+    elif plan_code and plan_code != resolve_plan_for_company(None):
+        companies = frappe.get_all(
+            "Tenant Branding", filters={"plan": plan_code}, pluck="name"
+        )
+    else:
+        # Every company without a plan of its own is on the default plan
+        bump_permission_version()
+        return
+    bump_permission_versions(get_company_users(companies))
 
 
 def resolve_plan_for_company(company: str | None) -> str | None:
@@ -94,16 +177,142 @@ def get_subscription_context(
     if not plan_code:
         plan_code = resolve_plan_for_company(company)
 
-    cache_key = plan_code or "__no_plan__"
-    if use_cache and cache_key in _CONTEXT_CACHE:
-        return _CONTEXT_CACHE[cache_key]
+    if not use_cache:
+        return _build_subscription_context(plan_code)
+
+    _ensure_invalidation_listener()
+    plan_key = plan_code or _NO_PLAN
+    local_key = (frappe.local.site, plan_key)
+    entry = _CONTEXT_CACHE.get(local_key)
+    if entry and time.monotonic() - entry[0] < LOCAL_CONTEXT_TTL_SECONDS:
+        return entry[1]
+
+    generation = _cache_generation
+    cache_key = _context_key(plan_key)
+    snapshot = frappe.cache().get_value(cache_key)
+    if snapshot is None:
+        context = _build_subscription_context(plan_code)
+        frappe.cache().set_value(
+            cache_key, _serialize_context(context), expires_in_sec=DEFAULT_TTL_SECONDS
+        )
+    else:
+        context = _deserialize_context(snapshot)
 
-    context = _build_subscription_context(plan_code)
-    if use_cache:
-        _CONTEXT_CACHE[cache_key] = context
+    with _CONTEXT_CACHE_LOCK:
+        # Skip the local copy if an invalidation arrived while loading
+        if generation == _cache_generation:
+            _CONTEXT_CACHE[local_key] = (time.monotonic(), context)
     return context
 
 
+def _context_key(plan_key: str) -> str:
+    return ":".join(
+        (
+            CONTEXT_CACHE_NAMESPACE,
+            get_cache_version(CONTEXT_CACHE_NAMESPACE),
+            get_cache_version(_plan_namespace(plan_key)),
+            plan_key,
+        )
+    )
+
+
+def _plan_namespace(plan_key: str) -> str:
+    return f"{CONTEXT_CACHE_NAMESPACE}:plan:{plan_key}"
+
+
+def _drop_local(site: str | None, plan_key: str | None) -> None:
+    """Drop local copies for ``plan_key`` on ``site`` (every plan if None)."""
+    global _cache_generation
+    with _CONTEXT_CACHE_LOCK:
+        _cache_generation += 1
+        for key in list(_CONTEXT_CACHE):
+            key_site, key_plan = key
+            if key_site == site and (plan_key is None or key_plan == plan_key):
+                _CONTEXT_CACHE.pop(key, None)
+
+
+def _publish_invalidation(site: str, plan_key: str | None) -> None:
+    try:
+        frappe.cache().publish(
+            INVALIDATION_CHANNEL, json.dumps({"site": site, "plan": plan_key})
+        )
+    except Exception:
+        # Other workers fall back to LOCAL_CONTEXT_TTL_SECONDS
+        frappe.log_error(title="Subscription context invalidation publish failed")
+
+
+def _ensure_invalidation_listener() -> None:
+    """Start this process's pub/sub listener thread if it is not running."""
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return
+
+    with _CONTEXT_CACHE_LOCK:
+        if _listener_pid == pid:
+            return
+        # Forked workers inherit their parent's copies but not its listener
+        _CONTEXT_CACHE.clear()
+        try:
+            pubsub = frappe.cache().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+        except Exception:
+            return
+        _listener_pid = pid
+
+    threading.Thread(
+        target=_listen_for_invalidations,
+        args=(pubsub,),
+        name="blkshp-subscription-context-invalidation",
+        daemon=True,
+    ).start()
+
+
+def _listen_for_invalidations(pubsub: Any) -> None:
+    global _listener_pid
+    try:
+        for message in pubsub.listen():
+            try:
+                payload = json.loads(message["data"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if isinstance(payload, dict):
+                _drop_local(payload.get("site"), payload.get("plan"))
+    except Exception:
+        pass
+    finally:
+        # Messages may have been missed; the next lookup restarts the listener
+        # and starts from an empty local cache.
+        _listener_pid = None
+
+
+def _serialize_context(context: SubscriptionContext) -> dict[str, Any]:
+    return {
+        "plan": asdict(context.plan) if context.plan else None,
+        "modules": {key: asdict(module) for key, module in context.modules.items()},
+        "feature_states": dict(context.feature_states),
+        "registry": {key: asdict(meta) for key, meta in context.registry.items()},
+    }
+
+
+def _deserialize_context(snapshot: Mapping[str, Any]) -> SubscriptionContext:
+    plan = snapshot.get("plan")
+    return SubscriptionContext(
+        plan=SubscriptionPlanState(**plan) if plan else None,
+        modules={
+            key: ModuleActivationState(
+                **{**module, "depends_on": tuple(module.get("depends_on") or ())}
+            )
+            for key, module in snapshot.get("modules", {}).items()
+        },
+        feature_states=dict(snapshot.get("feature_states", {})),
+        registry={
+            key: FeatureToggleMetadata(**meta)
+            for key, meta in snapshot.get("registry", {}).items()
+        },
+    )
+
+
 def _build_subscription_context(plan_code: str | None) -> SubscriptionContext:
     registry = _load_feature_registry()
     feature_states: dict[str, FeatureValue] = {
@@ -0,0 +1,207 @@
+"""Tenant overview for the subscription management console.
+
+The overview is built from a single join of Company and Tenant Branding plus
+one subscription context per distinct plan, and cached as a whole under a
+versioned key. Paging, sorting and filtering by plan or module are applied to
+the cached list, so opening or paging the console does not touch the
+database. The cache is invalidated when companies, tenant plan assignments,
+plans or module activations change.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    versioned_key,
+)
+
+from .subscription_context import (
+    SubscriptionContext,
+    get_subscription_context,
+    resolve_plan_for_company,
+)
+
+TENANT_OVERVIEW_CACHE_KEY = "blkshp_os:core_platform:tenant_overview"
+
+TENANT_SORT_FIELDS = (
+    "company_name",
+    "company",
+    "plan_code",
+    "plan_name",
+    "base_price",
+    "module_count",
+)
+DEFAULT_PAGE_LENGTH = 50
+MAX_PAGE_LENGTH = 500
+
+
+def get_tenant_overview(refresh: bool = False) -> dict[str, Any]:
+    """Return the cached ``{"tenants": [...], "summary": {...}}`` payload.
+
+    Tenants are ordered by company name; ``summary`` holds the totals shown
+    above the tenant table.
+    """
+    cache_key = versioned_key(TENANT_OVERVIEW_CACHE_KEY, "all")
+    if not refresh:
+        cached = frappe.cache().get_value(cache_key)
+        if cached is not None:
+            return cached
+
+    overview = _build_tenant_overview()
+    frappe.cache().set_value(cache_key, overview, expires_in_sec=DEFAULT_TTL_SECONDS)
+    return overview
+
+
+def query_tenants(
+    plan: str | None = None,
+    module: str | None = None,
+    search: str | None = None,
+    sort_by: str = "company_name",
+    sort_order: str = "asc",
+    start: int = 0,
+    page_length: int = DEFAULT_PAGE_LENGTH,
+) -> dict[str, Any]:
+    """Return one page of the tenant overview.
+
+    Args:
+            plan: Only tenants on this plan code
+            module: Only tenants whose plan enables this module key
+            search: Case-insensitive match on company name or code
+            sort_by: One of ``TENANT_SORT_FIELDS``
+            sort_order: "asc" or "desc"
+            start: Offset of the first tenant to return
+            page_length: Number of tenants to return (capped at ``MAX_PAGE_LENGTH``)
+
+    Returns:
+            Dictionary with the page of ``tenants``, the ``total`` matching the
+            filters, and the unfiltered ``summary``.
+    """
+    if sort_by not in TENANT_SORT_FIELDS:
+        frappe.throw(_("Cannot sort tenants by {0}").format(sort_by))
+    if sort_order not in ("asc", "desc"):
+        frappe.throw(_("Sort order must be 'asc' or 'desc'"))
+
+    overview = get_tenant_overview()
+    tenants = overview["tenants"]
+    if plan:
+        tenants = [tenant for tenant in tenants if tenant["plan_code"] == plan]
+    if module:
+        tenants = [
+            tenant
+            for tenant in tenants
+            if any(mod["key"] == module for mod in tenant["enabled_modules"])
+        ]
+    if search:
+        needle = search.casefold()
+        tenants = [
+            tenant
+            for tenant in tenants
+            if needle in (tenant["company_name"] or "").casefold()
+            or needle in (tenant["company"] or "").casefold()
+        ]
+
+    if sort_by != "company_name" or sort_order != "asc":
+        # None sorts last in either direction
+        present = [tenant for tenant in tenants if tenant[sort_by] is not None]
+        missing = [tenant for tenant in tenants if tenant[sort_by] is None]
+        present.sort(key=lambda tenant: tenant[sort_by], reverse=sort_order == "desc")
+        tenants = present + missing
+
+    start = max(cint(start), 0)
+    page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+    return {
+        "tenants": tenants[start : start + page_length],
+        "total": len(tenants),
+        "start": start,
+        "page_length": page_length,
+        "summary": overview["summary"],
+    }
+
+
+def clear_tenant_overview_cache() -> None:
+    """Invalidate the cached tenant overview.
+
+    Repeated on commit so an overview built from uncommitted data by another
+    worker is not kept.
+    """
+    bump_cache_version(TENANT_OVERVIEW_CACHE_KEY)
+
+
+def on_company_change(doc, method=None, *args, **kwargs) -> None:
+    """Doc event hook: companies were added, renamed or removed."""
+    clear_tenant_overview_cache()
+
+
+def _build_tenant_overview() -> dict[str, Any]:
+    rows = frappe.db.sql(
+        """
+        SELECT
+            company.`name` AS company,
+            company.`company_name`,
+            company.`company_code`,
+            company.`is_active`,
+            branding.`plan` AS assigned_plan
+        FROM `tabCompany` company
+        LEFT JOIN `tabTenant Branding` branding ON branding.`company` = company.`name`
+        ORDER BY company.`company_name` ASC, company.`name` ASC
+        """,
+        as_dict=True,
+    )
+
+    default_plan = resolve_plan_for_company(None)
+    contexts: dict[str | None, SubscriptionContext] = {}
+    tenants: list[dict[str, Any]] = []
+    plan_counts: dict[str, int] = {}
+
+    for row in rows:
+        plan_code = row.assigned_plan or default_plan
+        context = contexts.get(plan_code)
+        if context is None:
+            context = contexts[plan_code] = get_subscription_context(plan_code=plan_code)
+        tenants.append(_serialize_tenant(row, plan_code, context))
+        if plan_code:
+            plan_counts[plan_code] = plan_counts.get(plan_code, 0) + 1
+
+    with_plans = sum(plan_counts.values())
+    return {
+        "tenants": tenants,
+        "summary": {
+            "total_tenants": len(tenants),
+            "with_plans": with_plans,
+            "without_plans": len(tenants) - with_plans,
+            "with_assigned_plans": sum(1 for row in rows if row.assigned_plan),
+            "by_plan": plan_counts,
+        },
+    }
+
+
+def _serialize_tenant(
+    row: frappe._dict, plan_code: str | None, context: SubscriptionContext
+) -> dict[str, Any]:
+    plan = context.plan
+    enabled_modules = [
+        {"key": mod.key, "label": mod.label, "is_required": mod.is_required}
+        for mod in context.modules.values()
+        if mod.is_enabled
+    ]
+    return {
+        "company": row.company,
+        "company_name": row.company_name,
+        "company_code": row.company_code,
+        "is_active": bool(cint(row.is_active)),
+        "plan_code": plan_code,
+        "is_default_plan": not row.assigned_plan and bool(plan_code),
+        "plan_name": plan.plan_name if plan else None,
+        "billing_frequency": plan.billing_frequency if plan else None,
+        "base_price": plan.base_price if plan else None,
+        "enabled_modules": enabled_modules,
+        "module_count": len(enabled_modules),
+        "has_overrides": bool(plan and plan.default_feature_overrides),
+    }
@@ -0,0 +1,154 @@
+"""Tests for buffered subscription access logging."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.core_platform import access_log, enforcement
+
+
+class TestAccessLog(FrappeTestCase):
+    """Validate bypass sampling, queue draining and rollups."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.access_key = f"test.{frappe.generate_hash(length=8)}"
+
+    def tearDown(self) -> None:
+        frappe.db.delete("Subscription Access Log", {"access_key": self.access_key})
+        frappe.db.delete("Subscription Access Rollup", {"access_key": self.access_key})
+        frappe.db.commit()
+        super().tearDown()
+
+    def test_identical_bypasses_are_sampled(self) -> None:
+        first = access_log._sample_bypass("Administrator", "Module", self.access_key)
+        second = access_log._sample_bypass("Administrator", "Module", self.access_key)
+        third = access_log._sample_bypass("Administrator", "Module", self.access_key)
+
+        self.assertEqual(first, 0)
+        self.assertIsNone(second)
+        self.assertIsNone(third)
+
+        # Once the window expires the next bypass reports what was suppressed
+        cache = frappe.cache()
+        sample_key = cache.make_key(
+            f"{access_log._BYPASS_SAMPLE_KEY}:Administrator:Module:{self.access_key}"
+        )
+        cache.pipeline().delete(sample_key).execute()
+        self.assertEqual(
+            access_log._sample_bypass("Administrator", "Module", self.access_key), 2
+        )
+        cache.pipeline().delete(sample_key).execute()
+
+    def test_queued_events_are_bulk_inserted(self) -> None:
+        events = [
+            {
+                "timestamp": frappe.utils.now(),
+                "user": "Administrator",
+                "access_type": "Feature",
+                "access_key": self.access_key,
+                "action": "Denied",
+                "bypass_reason": None,
+                "context_data": "{}",
+                "ip_address": None,
+            }
+            for _index in range(3)
+        ]
+        with patch("frappe.enqueue") as mock_enqueue:
+            access_log._push_events(events)
+
+        mock_enqueue.assert_called_once()
+        self.assertGreaterEqual(access_log.flush_access_log_queue(), 3)
+        self.assertEqual(
+            frappe.db.count("Subscription Access Log", {"access_key": self.access_key}),
+            3,
+        )
+
+    def test_failed_flush_keeps_the_batch(self) -> None:
+        with patch("frappe.enqueue"):
+            access_log.record_access_event("Administrator", "Feature", self.access_key)
+
+        with patch.object(
+            access_log, "_insert_events", side_effect=frappe.ValidationError
+        ), self.assertRaises(frappe.ValidationError):
+            access_log.flush_access_log_queue()
+
+        self.assertGreaterEqual(access_log.flush_access_log_queue(), 1)
+        self.assertEqual(
+            frappe.db.get_all(
+                "Subscription Access Log",
+                filters={"access_key": self.access_key},
+                pluck="company",
+            ),
+            [
+                access_log.permission_service.get_user_companies(["Administrator"])[
+                    "Administrator"
+                ]
+            ],
+        )
+
+    def test_request_events_are_buffered_until_after_request(self) -> None:
+        with patch("frappe.request", True), patch("frappe.enqueue") as mock_enqueue:
+            access_log.record_access_event("Administrator", "Feature", self.access_key)
+            access_log.record_access_event("Administrator", "Feature", self.access_key)
+            mock_enqueue.assert_not_called()
+
+            access_log.flush_request_buffer()
+        mock_enqueue.assert_called_once()
+
+        access_log.flush_access_log_queue()
+        self.assertEqual(
+            frappe.db.count("Subscription Access Log", {"access_key": self.access_key}),
+            2,
+        )
+
+    def test_events_increment_hourly_and_daily_rollups(self) -> None:
+        with patch("frappe.enqueue") as mock_enqueue:
+            access_log.record_access_event("Administrator", "Module", self.access_key)
+            access_log.record_access_event("Administrator", "Module", self.access_key)
+            access_log.record_access_event(
+                "Administrator", "Module", self.access_key, bypass_reason="System Manager"
+            )
+        mock_enqueue.assert_called()
+        self.assertGreaterEqual(access_log.flush_access_log_queue(), 3)
+
+        rollups = frappe.get_all(
+            "Subscription Access Rollup",
+            filters={"access_key": self.access_key},
+            fields=["period_type", "action", "event_count"],
+        )
+        counts = {(row.period_type, row.action): row.event_count for row in rollups}
+        self.assertEqual(
+            counts,
+            {
+                ("Hourly", "Denied"): 2,
+                ("Daily", "Denied"): 2,
+                ("Hourly", "Bypass"): 1,
+                ("Daily", "Bypass"): 1,
+            },
+        )
+
+        summary = enforcement.get_access_rollup_summary(
+            period_type="Hourly", user="Administrator", group_by=["access_key", "action"]
+        )
+        denied = [
+            row
+            for row in summary
+            if row.access_key == self.access_key and row.action == "Denied"
+        ]
+        self.assertEqual(denied[0].event_count, 2)
+
+        drill_down = enforcement.get_access_log_summary(
+            user="Administrator",
+            action="Denied",
+            from_datetime=frappe.utils.add_days(frappe.utils.now(), -1),
+        )
+        self.assertEqual(
+            len([log for log in drill_down if log.access_key == self.access_key]), 2
+        )
+
+        with self.assertRaises(frappe.ValidationError):
+            enforcement.get_access_rollup_summary(group_by=["ip_address"])
@@ -8,14 +8,18 @@ from unittest.mock import MagicMock, patch
 import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from blkshp_os.core_platform import access_log
 from blkshp_os.core_platform.enforcement import (
     SubscriptionAccessDenied,
+    clear_enforcement_cache,
     enforce_feature_access_for_doctype,
     enforce_module_access_for_doctype,
     get_access_log_summary,
+    get_enforcement_cache_stats,
     require_feature_access,
     require_module_access,
 )
+from blkshp_os.permissions.claims import bump_permission_version
 
 
 class TestSubscriptionEnforcement(FrappeTestCase):
@@ -25,6 +29,9 @@ class TestSubscriptionEnforcement(FrappeTestCase):
         """Set up test fixtures."""
         # Ensure we're running as Administrator
         frappe.set_user("Administrator")
+        clear_enforcement_cache()
+        # Bypasses are sampled per user and key; start every test with a fresh window
+        frappe.cache().delete_keys(access_log._BYPASS_SAMPLE_KEY)
 
         # Clear any existing test users
         for user_email in ["tenant_user@test.com", "admin_user@test.com"]:
@@ -96,6 +103,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
             self.assertEqual(context.exception.user, self.tenant_user.email)
             self.assertIn("inventory", str(context.exception))
 
+            self._flush_access_log()
+
             # Verify access log was created
             logs = frappe.get_all(
                 "Subscription Access Log",
@@ -128,6 +137,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
             self.assertEqual(context.exception.user, self.tenant_user.email)
             self.assertIn("analytics.finance_dashboard", str(context.exception))
 
+            self._flush_access_log()
+
             # Verify access log was created
             logs = frappe.get_all(
                 "Subscription Access Log",
@@ -158,6 +169,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
             except SubscriptionAccessDenied:
                 self.fail("Admin user should bypass enforcement")
 
+            self._flush_access_log()
+
             # Verify bypass was logged
             logs = frappe.get_all(
                 "Subscription Access Log",
@@ -326,6 +339,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
             except SubscriptionAccessDenied:
                 pass
 
+            self._flush_access_log()
+
             # Verify context was logged
             logs = frappe.get_all(
                 "Subscription Access Log",
@@ -367,6 +382,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
                 except SubscriptionAccessDenied:
                     pass
 
+        self._flush_access_log()
+
         # Test retrieval
         logs = get_access_log_summary(
             user=self.tenant_user.email,
@@ -388,6 +405,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
         ) as mock_access:
             mock_access.return_value = False
 
+            self._flush_access_log()
+
             # Count logs before
             logs_before = frappe.db.count("Subscription Access Log")
 
@@ -400,6 +419,8 @@ class TestSubscriptionEnforcement(FrappeTestCase):
             except SubscriptionAccessDenied:
                 pass
 
+            self._flush_access_log()
+
             # Count logs after
             logs_after = frappe.db.count("Subscription Access Log")
 
@@ -520,6 +541,74 @@ class TestSubscriptionEnforcement(FrappeTestCase):
                 complex_operation()
             self.assertIsNotNone(context.exception.feature_key)
 
+    def test_decisions_are_memoized_per_request(self):
+        """Test that repeated checks reuse the decision and log once."""
+        mock_doc = MagicMock()
+        mock_doc.doctype = "Stock Entry"
+        mock_doc.name = "TEST-SE-002"
+
+        with self._job_scope(), patch(
+            "blkshp_os.permissions.service.user_has_module_access"
+        ) as mock_access:
+            mock_access.return_value = False
+            frappe.set_user(self.tenant_user.email)
+
+            for _index in range(5):
+                with self.assertRaises(SubscriptionAccessDenied):
+                    enforce_module_access_for_doctype(
+                        mock_doc, method="before_insert", module_key="inventory"
+                    )
+
+            mock_access.assert_called_once()
+
+        self._flush_access_log()
+        stats = get_enforcement_cache_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 4)
+        self.assertEqual(
+            frappe.db.count(
+                "Subscription Access Log",
+                {"user": self.tenant_user.email, "access_key": "inventory"},
+            ),
+            1,
+        )
+
+        clear_enforcement_cache()
+        self.assertEqual(get_enforcement_cache_stats()["misses"], 0)
+
+    def test_permission_changes_drop_memoized_decisions(self):
+        """Test that a permission version bump re-evaluates memoized decisions."""
+        mock_doc = MagicMock()
+        mock_doc.doctype = "Stock Entry"
+        mock_doc.name = "TEST-SE-003"
+
+        with self._job_scope(), patch(
+            "blkshp_os.permissions.service.user_has_module_access"
+        ) as mock_access:
+            mock_access.return_value = False
+            frappe.set_user(self.tenant_user.email)
+            with self.assertRaises(SubscriptionAccessDenied):
+                enforce_module_access_for_doctype(
+                    mock_doc, method="before_insert", module_key="inventory"
+                )
+
+            mock_access.return_value = True
+            bump_permission_version(self.tenant_user.email)
+            enforce_module_access_for_doctype(
+                mock_doc, method="before_insert", module_key="inventory"
+            )
+
+            self.assertEqual(mock_access.call_count, 2)
+
+    def _job_scope(self):
+        """Run checks as a background job would, where decisions are memoized."""
+        return patch.object(frappe.local, "job", frappe._dict(method="test"), create=True)
+
+    def _flush_access_log(self):
+        """Write queued access events the way the after_request hook and flush job do."""
+        access_log.flush_request_buffer()
+        access_log.flush_access_log_queue()
+
 
 def run_tests():
     """Helper function to run enforcement tests."""
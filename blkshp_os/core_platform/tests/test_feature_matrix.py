@@ -10,9 +10,15 @@ from blkshp_os.core_platform.services import (
     clear_subscription_context_cache,
     get_feature_matrix,
     get_feature_matrix_for_user,
+    get_feature_matrix_for_user_with_etag,
+    get_feature_matrix_overlay,
+    get_plan_matrix_bytes,
     get_user_profile,
+    get_user_profile_with_etag,
 )
 from blkshp_os.core_platform.services.feature_matrix import FEATURE_MATRIX_CACHE_KEY
+from blkshp_os.utils.cache import versioned_key
+from blkshp_os.utils.http import extend_json_object
 
 
 class TestFeatureMatrix(FrappeTestCase):
@@ -79,12 +85,64 @@ class TestFeatureMatrix(FrappeTestCase):
     def test_feature_matrix_cache_cleared(self) -> None:
         """Plan-level cache persists and can be cleared explicitly."""
         get_feature_matrix(plan_code="FOUNDATION")
-        cached = frappe.cache().get_value(FEATURE_MATRIX_CACHE_KEY)
-        self.assertIsInstance(cached, dict)
-        self.assertIn("foundation", cached)
+        cache_key = versioned_key(FEATURE_MATRIX_CACHE_KEY, "foundation")
+        cached = frappe.cache().get_value(cache_key)
+        self.assertIsInstance(cached, tuple)
+        body, etag = cached
+        self.assertIsInstance(body, bytes)
+        self.assertEqual(get_plan_matrix_bytes(plan_code="FOUNDATION"), (body, etag))
 
         clear_feature_matrix_cache()
-        self.assertIsNone(frappe.cache().get_value(FEATURE_MATRIX_CACHE_KEY))
+        self.assertIsNone(
+            frappe.cache().get_value(
+                versioned_key(FEATURE_MATRIX_CACHE_KEY, "foundation")
+            )
+        )
+
+    def test_feature_matrix_payloads_are_independent(self) -> None:
+        """Mutating a returned matrix does not affect later reads."""
+        matrix = get_feature_matrix(plan_code="FOUNDATION")
+        matrix["modules"].clear()
+
+        self.assertTrue(get_feature_matrix(plan_code="FOUNDATION")["modules"])
+
+    def test_user_etags_are_stable(self) -> None:
+        """Unchanged matrix and profile responses keep their ETag."""
+        matrix_a, matrix_etag_a = get_feature_matrix_for_user_with_etag(
+            user=self.standard_user
+        )
+        matrix_b, matrix_etag_b = get_feature_matrix_for_user_with_etag(
+            user=self.standard_user
+        )
+        self.assertEqual(matrix_etag_a, matrix_etag_b)
+        self.assertEqual(matrix_a["generated_at"], matrix_b["generated_at"])
+
+        _profile, profile_etag_a = get_user_profile_with_etag(user=self.standard_user)
+        _profile, profile_etag_b = get_user_profile_with_etag(user=self.standard_user)
+        self.assertEqual(profile_etag_a, profile_etag_b)
+
+        _matrix, operations_etag = get_feature_matrix_for_user_with_etag(
+            user=self.operations_user
+        )
+        self.assertNotEqual(matrix_etag_a, operations_etag)
+
+    def test_overlay_reuses_plan_bytes(self) -> None:
+        """The API body is the cached plan bytes plus the user overlay keys."""
+        body, overlay, etag = get_feature_matrix_overlay(user=self.standard_user)
+        self.assertEqual(body, get_plan_matrix_bytes(plan_code="FOUNDATION")[0])
+
+        matrix, matrix_etag = get_feature_matrix_for_user_with_etag(
+            user=self.standard_user
+        )
+        self.assertEqual(etag, matrix_etag)
+
+        response = frappe.parse_json(extend_json_object(body, overlay))
+        self.assertEqual(response["plan_code"], matrix["plan_code"])
+        self.assertEqual(response["user_feature_access"], matrix["user_feature_access"])
+        self.assertEqual(
+            response["user_module_access"],
+            {module["key"]: module["user_has_access"] for module in matrix["modules"]},
+        )
 
     def test_disabled_module_blocks_user_but_not_operations(self) -> None:
         """Disabled modules remain inaccessible to standard users but bypass roles still see them."""
@@ -0,0 +1,164 @@
+"""Tests for batched tenant provisioning."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.core_platform import provisioning
+
+
+class TestTenantProvisioning(FrappeTestCase):
+    """Validate planning, bulk inserts and resumable reports."""
+
+    _is_loaded = False
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        if not cls._is_loaded:
+            for doctype in ("subscription_plan", "module_activation", "tenant_branding"):
+                frappe.reload_doc("core_platform", "doctype", doctype)
+            cls._is_loaded = True
+
+    def setUp(self) -> None:
+        super().setUp()
+        frappe.set_user("Administrator")
+        self.user = self._ensure_user("provision.tenant@example.com")
+        self._ensure_role("Store Manager")
+        self.report_path = os.path.join(
+            tempfile.mkdtemp(), f"{frappe.generate_hash(length=8)}.json"
+        )
+
+    def tearDown(self) -> None:
+        frappe.db.rollback()
+        if os.path.exists(self.report_path):
+            os.remove(self.report_path)
+        super().tearDown()
+
+    def test_provisions_company_departments_and_roles(self) -> None:
+        report = provisioning.provision_tenants(
+            [
+                {
+                    "company": "PROVT-01",
+                    "company_name": "Provision Tenant One",
+                    "plan": "FOUNDATION",
+                    "modules": ["core"],
+                    "departments": [
+                        {"department_code": "kitchen", "department_name": "Kitchen", "department_type": "Kitchen"},
+                        {"department_code": "PREP", "department_name": "Prep", "parent": "KITCHEN"},
+                    ],
+                    "users": [self.user],
+                }
+            ],
+            report_path=self.report_path,
+        )
+
+        entry = report["tenants"]["PROVT-01"]
+        self.assertEqual(entry["status"], "done", entry)
+        self.assertEqual(
+            entry["created"],
+            {"Company": 1, "Tenant Branding": 1, "Department": 2, "Has Role": 1},
+        )
+        self.assertEqual(frappe.db.get_value("Tenant Branding", "PROVT-01", "plan"), "FOUNDATION")
+        self.assertEqual(
+            frappe.db.get_value("Department", "PREP-PROVT-01", "parent_department"),
+            "KITCHEN-PROVT-01",
+        )
+        self.assertTrue(frappe.db.get_value("Department", "KITCHEN-PROVT-01", "is_active"))
+        self.assertIn("Store Manager", frappe.get_roles(self.user))
+        log = frappe.get_all(
+            "Subscription Access Log",
+            filters={"company": "PROVT-01", "action": "provision_tenant"},
+            fields=["user", "context_data"],
+        )
+        self.assertEqual(len(log), 1)
+        self.assertEqual(json.loads(log[0].context_data)["plan"], "FOUNDATION")
+
+        # Re-planning the same tenant finds nothing left to insert
+        plans, errors = provisioning.plan_tenants(
+            [{"company": "PROVT-01", "plan": "FOUNDATION", "users": [self.user]}]
+        )
+        self.assertEqual(errors, {})
+        self.assertEqual(plans[0].rows, {})
+
+    def test_invalid_tenants_fail_without_stopping_the_batch(self) -> None:
+        report = provisioning.provision_tenants(
+            [
+                {"company": "PROVT-02", "plan": "NO-SUCH-PLAN"},
+                {
+                    "company": "PROVT-03",
+                    "plan": "FOUNDATION",
+                    "departments": [
+                        {"department_code": "A", "department_name": "A", "parent": "B"},
+                        {"department_code": "B", "department_name": "B", "parent": "A"},
+                    ],
+                },
+                {"company": "PROVT-04", "plan": "FOUNDATION", "enable_all_features": True},
+            ],
+            report_path=self.report_path,
+        )
+
+        self.assertEqual(report["tenants"]["PROVT-02"]["status"], "failed")
+        self.assertEqual(report["tenants"]["PROVT-03"]["status"], "failed")
+        self.assertEqual(report["tenants"]["PROVT-04"]["status"], "done")
+        self.assertFalse(frappe.db.exists("Company", "PROVT-03"))
+        self.assertTrue(frappe.db.exists("Department", "KITCHEN-PROVT-04"))
+        self.assertEqual(len(report["tenants"]["PROVT-04"]["warnings"]), 1)
+
+    def test_report_resumes_unfinished_tenants(self) -> None:
+        tenants = [
+            {"company": "PROVT-05", "plan": "FOUNDATION"},
+            {"company": "PROVT-06", "plan": "FOUNDATION"},
+        ]
+        original = provisioning.provision_tenant_plan
+
+        def fail_second(plan):
+            if plan.company == "PROVT-06":
+                return {"status": "failed", "error": "interrupted", "created": {}}
+            return original(plan)
+
+        with patch.object(provisioning, "provision_tenant_plan", side_effect=fail_second):
+            provisioning.provision_tenants(tenants, report_path=self.report_path)
+
+        with open(self.report_path) as handle:
+            saved = json.load(handle)
+        self.assertEqual(saved["tenants"]["PROVT-05"]["status"], "done")
+        self.assertEqual(saved["tenants"]["PROVT-06"]["status"], "failed")
+
+        with patch.object(
+            provisioning, "provision_tenant_plan", wraps=original
+        ) as mock_provision:
+            report = provisioning.provision_tenants(tenants, report_path=self.report_path)
+
+        self.assertEqual(
+            [call.args[0].company for call in mock_provision.call_args_list], ["PROVT-06"]
+        )
+        self.assertEqual(report["tenants"]["PROVT-06"]["status"], "done")
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _ensure_user(self, email: str) -> str:
+        if not frappe.db.exists("User", email):
+            frappe.get_doc(
+                {
+                    "doctype": "User",
+                    "email": email,
+                    "first_name": "Provision",
+                    "send_welcome_email": 0,
+                }
+            ).insert(ignore_permissions=True)
+        return email
+
+    def _ensure_role(self, role_name: str) -> None:
+        if not frappe.db.exists("Role", role_name):
+            frappe.get_doc({"doctype": "Role", "role_name": role_name}).insert(
+                ignore_permissions=True
+            )
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests.utils import FrappeTestCase
 
@@ -9,6 +11,7 @@ from blkshp_os.core_platform.services import (
     clear_subscription_context_cache,
     get_subscription_context,
     resolve_plan_for_company,
+    subscription_context,
 )
 
 
@@ -52,6 +55,29 @@ class TestSubscriptionContext(FrappeTestCase):
         context_b = get_subscription_context(plan_code="FOUNDATION")
         self.assertIs(context_a, context_b)
 
+    def test_context_shared_through_redis(self) -> None:
+        context_a = get_subscription_context(plan_code="FOUNDATION")
+
+        # Another worker has no local copy but reuses the shared snapshot
+        subscription_context._CONTEXT_CACHE.clear()
+        with patch.object(
+            subscription_context, "_build_subscription_context"
+        ) as mock_build:
+            context_b = get_subscription_context(plan_code="FOUNDATION")
+
+        mock_build.assert_not_called()
+        self.assertIsNot(context_a, context_b)
+        self.assertEqual(context_a, context_b)
+
+    def test_plan_clear_drops_only_that_plan(self) -> None:
+        foundation = get_subscription_context(plan_code="FOUNDATION")
+        other = get_subscription_context(plan_code="UNKNOWN-PLAN")
+
+        clear_subscription_context_cache("FOUNDATION")
+
+        self.assertIsNot(get_subscription_context(plan_code="FOUNDATION"), foundation)
+        self.assertIs(get_subscription_context(plan_code="UNKNOWN-PLAN"), other)
+
     def test_cache_cleared_after_module_update(self) -> None:
         context_initial = get_subscription_context(plan_code="FOUNDATION")
         inventory_initial = context_initial.modules["inventory"].is_enabled
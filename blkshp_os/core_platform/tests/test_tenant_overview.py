@@ -0,0 +1,147 @@
+"""Tests for the cached tenant overview."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.core_platform.services import (
+    clear_subscription_context_cache,
+    clear_tenant_overview_cache,
+    query_tenants,
+    tenant_overview,
+)
+
+
+class TestTenantOverview(FrappeTestCase):
+    """Validate the bulk-loaded tenant list used by subscription management."""
+
+    _is_loaded = False
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        if not cls._is_loaded:
+            for doctype in (
+                "feature_toggle",
+                "subscription_plan",
+                "module_activation",
+                "tenant_branding",
+            ):
+                frappe.reload_doc("core_platform", "doctype", doctype)
+            cls._is_loaded = True
+
+    def setUp(self) -> None:
+        super().setUp()
+        frappe.db.rollback()
+        clear_subscription_context_cache()
+        clear_tenant_overview_cache()
+
+        self.plan = self._ensure_plan("OVERVIEW-TEST")
+        self.companies = [
+            self._create_company(f"Overview Tenant {index}", f"OVT{index}")
+            for index in range(3)
+        ]
+        self._assign_plan(self.companies[0], self.plan)
+
+    def tearDown(self) -> None:
+        frappe.db.rollback()
+        clear_tenant_overview_cache()
+        super().tearDown()
+
+    def test_contexts_are_built_once_per_plan(self) -> None:
+        with patch.object(
+            tenant_overview,
+            "get_subscription_context",
+            wraps=tenant_overview.get_subscription_context,
+        ) as mock_context:
+            overview = tenant_overview.get_tenant_overview(refresh=True)
+
+        plans = {tenant["plan_code"] for tenant in overview["tenants"]}
+        self.assertEqual(mock_context.call_count, len(plans))
+
+        tenants = {tenant["company"]: tenant for tenant in overview["tenants"]}
+        self.assertEqual(tenants[self.companies[0]]["plan_code"], self.plan)
+        self.assertEqual(tenants[self.companies[1]]["plan_code"], "FOUNDATION")
+        self.assertTrue(tenants[self.companies[1]]["is_default_plan"])
+
+    def test_query_filters_and_pages(self) -> None:
+        result = query_tenants(search="Overview Tenant", page_length=2)
+        self.assertEqual(result["total"], 3)
+        self.assertEqual(len(result["tenants"]), 2)
+
+        second_page = query_tenants(search="Overview Tenant", start=2, page_length=2)
+        self.assertEqual(
+            [tenant["company"] for tenant in second_page["tenants"]],
+            [self.companies[2]],
+        )
+
+        on_plan = query_tenants(plan=self.plan)
+        self.assertEqual(
+            [tenant["company"] for tenant in on_plan["tenants"]], [self.companies[0]]
+        )
+
+        with_core = query_tenants(module="core", search="Overview Tenant")
+        self.assertEqual(with_core["total"], 2)
+
+        with self.assertRaises(frappe.ValidationError):
+            query_tenants(sort_by="abbr")
+
+    def test_plan_assignment_invalidates_overview(self) -> None:
+        query_tenants(plan=self.plan)
+
+        self._assign_plan(self.companies[1], self.plan)
+
+        on_plan = query_tenants(plan=self.plan)
+        self.assertCountEqual(
+            [tenant["company"] for tenant in on_plan["tenants"]],
+            self.companies[:2],
+        )
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _ensure_plan(self, plan_code: str) -> str:
+        if not frappe.db.exists("Subscription Plan", plan_code):
+            frappe.get_doc(
+                {
+                    "doctype": "Subscription Plan",
+                    "plan_code": plan_code,
+                    "plan_name": "Overview Test",
+                    "is_active": 1,
+                }
+            ).insert(ignore_permissions=True)
+        return plan_code
+
+    def _create_company(self, company_name: str, company_code: str) -> str:
+        existing = frappe.db.exists("Company", {"company_name": company_name})
+        if existing:
+            return existing
+        company = frappe.get_doc(
+            {
+                "doctype": "Company",
+                "company_name": company_name,
+                "company_code": company_code,
+                "default_currency": "USD",
+            }
+        )
+        company.insert(ignore_permissions=True)
+        return company.name
+
+    def _assign_plan(self, company: str, plan: str) -> None:
+        if frappe.db.exists("Tenant Branding", company):
+            branding = frappe.get_doc("Tenant Branding", company)
+            branding.plan = plan
+            branding.save(ignore_permissions=True)
+            return
+        frappe.get_doc(
+            {
+                "doctype": "Tenant Branding",
+                "company": company,
+                "plan": plan,
+                "theme_name": "Default",
+            }
+        ).insert(ignore_permissions=True)
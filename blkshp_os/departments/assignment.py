@@ -0,0 +1,157 @@
+"""Set-based assignment of products to departments."""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now
+
+from blkshp_os.departments.doctype.department.department import (
+    get_default_storage_area,
+)
+from blkshp_os.departments.stats import refresh_department_stats
+
+PRODUCT_DEPARTMENT_FIELDS: list[str] = [
+    "name",
+    "creation",
+    "modified",
+    "modified_by",
+    "owner",
+    "docstatus",
+    "parent",
+    "parenttype",
+    "parentfield",
+    "idx",
+    "department",
+    "is_primary",
+    "default_storage_area",
+    "par_level",
+    "order_quantity",
+]
+
+
+def assign_products(
+    department: str,
+    products: Sequence[str],
+    is_primary: bool = False,
+    par_level: float | None = None,
+    order_quantity: float | None = None,
+) -> dict[str, Any]:
+    """Assign many products to ``department`` without loading Product documents.
+
+    Already-assigned and unknown products are reported in ``failed``. New
+    Product Department rows are bulk inserted after the existing rows of each
+    product, carry the department's default storage area, and the parents'
+    ``modified`` is bumped in one statement.
+
+    ``is_primary`` is only applied to products without a default department;
+    the Product controller derives the primary row from ``default_department``
+    otherwise.
+    """
+    if not frappe.db.exists("Department", department):
+        frappe.throw(
+            _("Department {0} does not exist").format(department),
+            frappe.DoesNotExistError,
+        )
+
+    results: dict[str, Any] = {"success": [], "failed": [], "total": len(products)}
+    requested = list(dict.fromkeys(products))
+    if not requested:
+        return results
+
+    product_rows = {
+        row.name: row
+        for row in frappe.get_all(
+            "Product",
+            filters={"name": ["in", requested]},
+            fields=["name", "default_department"],
+        )
+    }
+    assigned = set(
+        frappe.get_all(
+            "Product Department",
+            filters={
+                "parent": ["in", requested],
+                "parenttype": "Product",
+                "department": department,
+            },
+            pluck="parent",
+        )
+    )
+    next_idx = _get_next_idx(list(product_rows))
+
+    timestamp = now()
+    user = frappe.session.user
+    storage_area = get_default_storage_area(department)
+    values: list[tuple[Any, ...]] = []
+    seen: set[str] = set()
+
+    for product in products:
+        if product not in product_rows:
+            results["failed"].append(
+                {"product": product, "reason": _("Product {0} not found").format(product)}
+            )
+            continue
+        if product in assigned or product in seen:
+            results["failed"].append(
+                {"product": product, "reason": "Already assigned to department"}
+            )
+            continue
+
+        seen.add(product)
+        primary = 1 if is_primary and not product_rows[product].default_department else 0
+        values.append(
+            (
+                frappe.generate_hash(length=10),
+                timestamp,
+                timestamp,
+                user,
+                user,
+                0,
+                product,
+                "Product",
+                "departments",
+                next_idx.get(product, 1),
+                department,
+                primary,
+                storage_area,
+                flt(par_level) if par_level is not None else None,
+                flt(order_quantity) if order_quantity is not None else None,
+            )
+        )
+        results["success"].append(product)
+
+    if values:
+        frappe.db.bulk_insert("Product Department", PRODUCT_DEPARTMENT_FIELDS, values)
+        frappe.db.sql(
+            """
+            UPDATE `tabProduct`
+            SET `modified` = %(modified)s, `modified_by` = %(user)s
+            WHERE `name` IN %(names)s
+            """,
+            {"modified": timestamp, "user": user, "names": tuple(results["success"])},
+        )
+        refresh_department_stats([department])
+
+    return results
+
+
+def _get_next_idx(products: Sequence[str]) -> dict[str, int]:
+    """Return the idx a newly appended departments row should take per product."""
+    if not products:
+        return {}
+
+    rows = frappe.db.sql(
+        """
+        SELECT `parent`, MAX(`idx`)
+        FROM `tabProduct Department`
+        WHERE `parenttype` = 'Product' AND `parentfield` = 'departments'
+            AND `parent` IN %(products)s
+        GROUP BY `parent`
+        """,
+        {"products": tuple(products)},
+    )
+    return {parent: (max_idx or 0) + 1 for parent, max_idx in rows}
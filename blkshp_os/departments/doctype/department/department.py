@@ -10,7 +10,11 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 
+from blkshp_os.departments import stats as department_stats
+from blkshp_os.departments.hierarchy import clear_hierarchy_cache
+from blkshp_os.departments.settings import clear_settings_cache, get_settings
 from blkshp_os.permissions import service as permission_service
+from blkshp_os.permissions.matrix import clear_permission_matrix_cache
 
 SETTINGS_TYPE_MAP: dict[str, type | tuple[type, ...]] = {
     "eoq_enabled": bool,
@@ -93,6 +97,36 @@ class Department(Document):
     def before_save(self) -> None:
         self._normalize_fields()
 
+    def on_update(self) -> None:
+        clear_hierarchy_cache()
+        clear_settings_cache()
+        if self.has_value_changed("is_active"):
+            clear_permission_matrix_cache()
+        before = self.get_doc_before_save()
+        department_stats.refresh_department_stats(
+            [
+                self.name,
+                self.parent_department,
+                before.parent_department if before else None,
+            ]
+        )
+
+    def on_trash(self) -> None:
+        clear_hierarchy_cache()
+        clear_settings_cache()
+        clear_permission_matrix_cache()
+        frappe.db.delete(department_stats.STATS_DOCTYPE, {"department": self.name})
+
+    def after_delete(self) -> None:
+        department_stats.refresh_department_stats([self.parent_department])
+
+    def after_rename(self, old: str, new: str, merge: bool = False) -> None:
+        clear_hierarchy_cache()
+        clear_settings_cache()
+        clear_permission_matrix_cache()
+        frappe.db.delete(department_stats.STATS_DOCTYPE, {"name": old})
+        department_stats.refresh_department_stats([new, self.parent_department])
+
     def _normalize_fields(self) -> None:
         self.department_name = (self.department_name or "").strip()
         if self.department_code:
@@ -257,19 +291,12 @@ def get_default_gl_code(department: str) -> str | None:
 def get_department_setting(
     department: str, setting_key: str, default_value: Any | None = None
 ) -> Any | None:
-    settings = frappe.db.get_value("Department", department, "settings")
-    if not settings:
-        return default_value
-
-    if isinstance(settings, str):
-        try:
-            settings_dict: DepartmentSettings = json.loads(settings)
-        except ValueError:
-            return default_value
-    else:
-        settings_dict = settings
-
-    return settings_dict.get(setting_key, default_value)
+    """Return an explicitly stored setting, or ``default_value`` when unset.
+
+    Use :func:`blkshp_os.departments.settings.get_settings` for typed access
+    with defaults applied.
+    """
+    return get_settings(department).get(setting_key, default_value)
 
 
 def get_accessible_departments(
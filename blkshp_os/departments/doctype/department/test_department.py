@@ -12,6 +12,7 @@ from blkshp_os.departments.doctype.department.department import (
     get_accessible_departments,
     get_department_setting,
 )
+from blkshp_os.departments.settings import get_settings, get_settings_for
 
 
 class TestDepartment(FrappeTestCase):
@@ -77,6 +78,35 @@ class TestDepartment(FrappeTestCase):
             "fallback",
         )
 
+    def test_typed_settings_apply_defaults(self) -> None:
+        department = self._create_department(
+            code="BAR-E",
+            name="Bar E",
+            settings={"eoq_enabled": True, "transfer_approval_roles": ["Manager"]},
+        )
+
+        settings = get_settings(department.name)
+
+        self.assertTrue(settings.eoq_enabled)
+        self.assertEqual(settings.transfer_approval_roles, ("Manager",))
+        self.assertEqual(settings.inventory_count_frequency, "monthly")
+        self.assertFalse(settings.is_set("inventory_count_frequency"))
+
+    def test_settings_cache_invalidated_on_save(self) -> None:
+        kitchen = self._create_department(
+            code="KIT-C", name="Kitchen C", settings={"variance_threshold": 0.1}
+        )
+        bar = self._create_department(code="BAR-F", name="Bar F")
+
+        bulk = get_settings_for([kitchen.name, bar.name])
+        self.assertEqual(bulk[kitchen.name].variance_threshold, 0.1)
+        self.assertEqual(bulk[bar.name].variance_threshold, 0.05)
+
+        kitchen.settings = json.dumps({"variance_threshold": 0.2})
+        kitchen.save(ignore_permissions=True)
+
+        self.assertEqual(get_settings(kitchen.name).variance_threshold, 0.2)
+
     def test_get_accessible_departments_returns_filtered_list(self) -> None:
         user = self._ensure_user("department_tester@example.com")
         kitchen = self._create_department(code="KIT-B", name="Kitchen B")
@@ -0,0 +1 @@
+# Department Stats DocType
@@ -0,0 +1,15 @@
+"""Department Stats DocType controller."""
+
+from __future__ import annotations
+
+from frappe.model.document import Document
+
+
+class DepartmentStats(Document):
+    """Materialized statistics for a department.
+
+    Rows are maintained by :mod:`blkshp_os.departments.stats`; they are not
+    edited by hand.
+    """
+
+    pass
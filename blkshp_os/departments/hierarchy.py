@@ -0,0 +1,136 @@
+"""Cached department hierarchy.
+
+The department tree is loaded with a single query per company and cached in
+``frappe.cache()`` under a versioned key. Department ``on_update``/``on_trash``
+bump the version, so readers never see a stale tree. Each cached node carries
+a materialized ``path`` (``ROOT/CHILD/GRANDCHILD``) and ``depth`` computed in
+memory, which makes subtree lookups a prefix match instead of a recursive
+walk.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+import frappe
+
+from blkshp_os.utils.cache import DEFAULT_TTL_SECONDS, bump_cache_version, versioned_key
+
+HIERARCHY_CACHE_NAMESPACE = "blkshp_os:department_hierarchy"
+
+HIERARCHY_FIELDS: list[str] = [
+    "name",
+    "department_name",
+    "department_code",
+    "department_type",
+    "parent_department",
+    "is_active",
+]
+
+PATH_SEPARATOR = "/"
+
+
+def clear_hierarchy_cache(*_args: Any, **_kwargs: Any) -> None:
+    """Invalidate cached department trees for every company."""
+    bump_cache_version(HIERARCHY_CACHE_NAMESPACE)
+
+
+def get_department_nodes(company: str | None = None) -> list[dict[str, Any]]:
+    """Return every department (optionally for one company) with path metadata."""
+    key = versioned_key(HIERARCHY_CACHE_NAMESPACE, company or "*")
+    nodes = frappe.cache().get_value(key)
+    if nodes is None:
+        nodes = _load_nodes(company)
+        frappe.cache().set_value(key, nodes, expires_in_sec=DEFAULT_TTL_SECONDS)
+    return nodes
+
+
+def build_department_tree(
+    accessible: Iterable[str],
+    root: str | None = None,
+    company: str | None = None,
+) -> list[dict[str, Any]]:
+    """Assemble the nested tree below ``root`` restricted to ``accessible``.
+
+    Only active departments the user can access are included; an inaccessible
+    department hides its whole subtree. With no ``root`` the tree starts at the
+    top-level departments.
+    """
+    accessible = set(accessible)
+    if not accessible:
+        return []
+
+    children_of: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+    for node in get_department_nodes(company):
+        if node["is_active"] and node["name"] in accessible:
+            children_of[node["parent_department"] or None].append(node)
+
+    visited: set[str] = set()
+
+    def assemble(parent: str | None) -> list[dict[str, Any]]:
+        branch: list[dict[str, Any]] = []
+        for node in children_of.get(parent, []):
+            if node["name"] in visited:
+                continue
+            visited.add(node["name"])
+            item = {field: node[field] for field in HIERARCHY_FIELDS}
+            children = assemble(node["name"])
+            if children:
+                item["children"] = children
+            item["has_children"] = bool(children)
+            branch.append(item)
+        return branch
+
+    return assemble(root or None)
+
+
+def get_descendants(
+    department: str, company: str | None = None, include_self: bool = False
+) -> list[str]:
+    """Return the names of every department below ``department``."""
+    nodes = get_department_nodes(company)
+    path = next((node["path"] for node in nodes if node["name"] == department), None)
+    if path is None:
+        return []
+
+    prefix = f"{path}{PATH_SEPARATOR}"
+    return [
+        node["name"]
+        for node in nodes
+        if node["path"].startswith(prefix) or (include_self and node["path"] == path)
+    ]
+
+
+def _load_nodes(company: str | None) -> list[dict[str, Any]]:
+    filters = {"company": company} if company else {}
+    rows = frappe.get_all(
+        "Department",
+        filters=filters,
+        fields=[*HIERARCHY_FIELDS, "company"],
+        order_by="department_name asc",
+    )
+    parents = {row.name: row.parent_department for row in rows}
+
+    nodes: list[dict[str, Any]] = []
+    for row in rows:
+        lineage = _lineage(row.name, parents)
+        node = dict(row)
+        node["path"] = PATH_SEPARATOR.join(lineage)
+        node["depth"] = len(lineage) - 1
+        nodes.append(node)
+    return nodes
+
+
+def _lineage(name: str, parents: dict[str, str | None]) -> list[str]:
+    """Return the chain of names from the top-level ancestor down to ``name``."""
+    chain = [name]
+    seen = {name}
+    parent = parents.get(name)
+    while parent and parent in parents and parent not in seen:
+        chain.append(parent)
+        seen.add(parent)
+        parent = parents.get(parent)
+    chain.reverse()
+    return chain
@@ -0,0 +1,172 @@
+"""Typed, cached access to Department ``settings``.
+
+The JSON ``settings`` blob is parsed once per department into an immutable
+:class:`DepartmentSettingsSnapshot` with defaults applied for every key in
+``SETTINGS_TYPE_MAP``. Parsed settings are shared across workers through
+``frappe.cache()`` under a versioned namespace bumped on Department save, and
+memoized on ``frappe.local`` for the rest of the request.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+import frappe
+
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    get_cache_version,
+    on_rollback,
+)
+
+SETTINGS_CACHE_NAMESPACE = "blkshp_os:department_settings"
+_LOCAL_CACHE_ATTR = "blkshp_department_settings"
+
+
+@dataclass(frozen=True)
+class DepartmentSettingsSnapshot:
+    """Department settings with defaults applied and types normalized."""
+
+    department: str
+    eoq_enabled: bool = False
+    eoq_calculation_method: str = "standard"
+    eoq_safety_stock_factor: float = 1.0
+    reorder_point_buffer: float = 0.0
+    reorder_point_method: str = "par_level_based"
+    default_ordering_day: str | None = None
+    minimum_order_amount: float = 0.0
+    require_order_approval: bool = False
+    allow_inter_department_transfers: bool = True
+    require_approval_for_transfers: bool = False
+    transfer_approval_roles: tuple[str, ...] = ()
+    inventory_count_frequency: str = "monthly"
+    require_count_approval: bool = False
+    variance_threshold: float = 0.05
+    budget_alert_threshold: float = 0.9
+    budget_alert_frequency: str = "weekly"
+    budget_fiscal_year: str = "calendar"
+    custom_settings: dict[str, Any] = field(default_factory=dict)
+    raw: dict[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    def get(self, key: str, default: Any | None = None) -> Any | None:
+        """Return the value stored for ``key``, or ``default`` if it was never set."""
+        return self.raw.get(key, default)
+
+    def is_set(self, key: str) -> bool:
+        return key in self.raw
+
+
+def clear_settings_cache(*_args: Any, **_kwargs: Any) -> None:
+    """Invalidate cached settings for every department."""
+    bump_cache_version(SETTINGS_CACHE_NAMESPACE)
+    _clear_local()
+    on_rollback(_clear_local)
+
+
+def _clear_local() -> None:
+    if hasattr(frappe.local, _LOCAL_CACHE_ATTR):
+        delattr(frappe.local, _LOCAL_CACHE_ATTR)
+
+
+def get_settings(department: str) -> DepartmentSettingsSnapshot:
+    """Return the typed settings for a single department."""
+    return get_settings_for([department])[department]
+
+
+def get_settings_for(
+    departments: Iterable[str],
+) -> dict[str, DepartmentSettingsSnapshot]:
+    """Return typed settings for many departments with at most one DB query.
+
+    Unknown departments resolve to an all-defaults snapshot.
+    """
+    requested = list(dict.fromkeys(department for department in departments if department))
+    local = _local_cache()
+    result = {name: local[name] for name in requested if name in local}
+
+    missing = [name for name in requested if name not in result]
+    if missing:
+        cache = frappe.cache()
+        cache_key = f"{SETTINGS_CACHE_NAMESPACE}:{get_cache_version(SETTINGS_CACHE_NAMESPACE)}"
+        raw_by_department: dict[str, dict[str, Any]] = {}
+        for name in missing:
+            cached = cache.hget(cache_key, name)
+            if cached is not None:
+                raw_by_department[name] = cached
+
+        to_load = [name for name in missing if name not in raw_by_department]
+        if to_load:
+            loaded = _load_raw_settings(to_load)
+            for name in to_load:
+                raw = loaded.get(name, {})
+                raw_by_department[name] = raw
+                cache.hset(cache_key, name, raw)
+            cache.expire(cache.make_key(cache_key), DEFAULT_TTL_SECONDS)
+
+        for name in missing:
+            snapshot = build_snapshot(name, raw_by_department[name])
+            local[name] = snapshot
+            result[name] = snapshot
+
+    return result
+
+
+def build_snapshot(department: str, raw: dict[str, Any]) -> DepartmentSettingsSnapshot:
+    """Build a snapshot from a parsed settings dict, ignoring mistyped values."""
+    from blkshp_os.departments.doctype.department.department import SETTINGS_TYPE_MAP
+
+    values: dict[str, Any] = {}
+    for key, expected_type in SETTINGS_TYPE_MAP.items():
+        if key in raw:
+            coerced = _coerce(raw[key], expected_type)
+            if coerced is not None:
+                values[key] = coerced
+    return DepartmentSettingsSnapshot(department=department, raw=dict(raw), **values)
+
+
+def parse_settings(settings: Any) -> dict[str, Any]:
+    """Parse a stored ``settings`` value into a dict (empty when unset or invalid)."""
+    if not settings:
+        return {}
+    if isinstance(settings, dict):
+        return settings
+    try:
+        parsed = json.loads(settings)
+    except (TypeError, ValueError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def _load_raw_settings(departments: list[str]) -> dict[str, dict[str, Any]]:
+    rows = frappe.get_all(
+        "Department",
+        filters={"name": ["in", departments]},
+        fields=["name", "settings"],
+    )
+    return {row.name: parse_settings(row.settings) for row in rows}
+
+
+def _coerce(value: Any, expected_type: type | tuple[type, ...]) -> Any | None:
+    if expected_type is bool:
+        return bool(value) if isinstance(value, bool | int) else None
+    if isinstance(expected_type, tuple):
+        if isinstance(value, bool) or not isinstance(value, expected_type):
+            return None
+        return float(value)
+    if expected_type is list:
+        return tuple(value) if isinstance(value, list) else None
+    if expected_type is dict:
+        return dict(value) if isinstance(value, dict) else None
+    return value if isinstance(value, expected_type) else None
+
+
+def _local_cache() -> dict[str, DepartmentSettingsSnapshot]:
+    cache = getattr(frappe.local, _LOCAL_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(frappe.local, _LOCAL_CACHE_ATTR, cache)
+    return cache
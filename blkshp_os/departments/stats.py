@@ -0,0 +1,274 @@
+"""Materialized per-department statistics.
+
+``Department Stats`` holds one row per department with product, user and child
+counts plus the inventory value at current valuation (``Inventory Balance``
+quantity times ``Product.valuation_rate``). Document hooks apply deltas
+computed from the saved document and its state before the save, set-based
+paths refresh just the affected departments, and the daily
+:func:`reconcile_department_stats` job rebuilds every row, so the statistics
+endpoint reads a single row.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import frappe
+from frappe.utils import cint, flt, now
+
+STATS_DOCTYPE = "Department Stats"
+STATS_FIELDS: list[str] = [
+    "product_count",
+    "user_count",
+    "child_department_count",
+    "inventory_value",
+]
+
+
+def get_department_stats(department: str) -> dict[str, Any]:
+    """Return the stored statistics for ``department``, computing them if missing."""
+    row = frappe.db.get_value(
+        STATS_DOCTYPE, department, [*STATS_FIELDS, "last_refreshed"], as_dict=True
+    )
+    if not row:
+        refresh_department_stats([department])
+        row = frappe.db.get_value(
+            STATS_DOCTYPE, department, [*STATS_FIELDS, "last_refreshed"], as_dict=True
+        ) or {field: 0 for field in STATS_FIELDS}
+    return dict(row)
+
+
+def refresh_department_stats(departments: Iterable[str | None]) -> None:
+    """Recompute and store statistics for the given departments."""
+    departments = sorted({department for department in departments if department})
+    if not departments:
+        return
+
+    existing = frappe.get_all(
+        "Department",
+        filters={"name": ["in", departments]},
+        fields=["name", "company"],
+    )
+    stats = _compute_stats([row.name for row in existing])
+    timestamp = now()
+
+    for row in existing:
+        values = {**stats[row.name], "company": row.company, "last_refreshed": timestamp}
+        if frappe.db.exists(STATS_DOCTYPE, row.name):
+            frappe.db.set_value(STATS_DOCTYPE, row.name, values, update_modified=False)
+        else:
+            frappe.get_doc(
+                {"doctype": STATS_DOCTYPE, "department": row.name, **values}
+            ).insert(ignore_permissions=True)
+
+    missing = set(departments) - {row.name for row in existing}
+    if missing:
+        frappe.db.delete(STATS_DOCTYPE, {"name": ["in", list(missing)]})
+
+
+def reconcile_department_stats() -> None:
+    """Rebuild statistics for every department (daily scheduler job)."""
+    departments = frappe.get_all("Department", pluck="name")
+    stale = frappe.get_all(
+        STATS_DOCTYPE, filters={"name": ["not in", departments or [""]]}, pluck="name"
+    )
+    refresh_department_stats([*departments, *stale])
+
+
+# ---------------------------------------------------------------------------
+# Document hooks
+# ---------------------------------------------------------------------------
+
+
+def on_product_change(doc: Any, method: str | None = None) -> None:
+    """Apply product count and inventory value deltas for a saved or deleted product."""
+    before, after = _before_and_after(doc, method)
+    deltas: defaultdict[str, Counter] = defaultdict(Counter)
+    _add_row_deltas(
+        deltas, "product_count", before, after, "departments", _has_department
+    )
+
+    old_rate = flt(before.valuation_rate) if before else 0
+    new_rate = flt(after.valuation_rate) if after else 0
+    if before and new_rate != old_rate:
+        # Every balance of the product is revalued at the new rate
+        for department, quantity in frappe.db.sql(
+            """
+            SELECT `department`, SUM(`quantity`)
+            FROM `tabInventory Balance`
+            WHERE `product` = %(product)s
+            GROUP BY `department`
+            """,
+            {"product": doc.name},
+        ):
+            deltas[department]["inventory_value"] += flt(quantity) * (new_rate - old_rate)
+
+    _apply_deltas(deltas)
+
+
+def on_user_change(doc: Any, method: str | None = None) -> None:
+    """Apply user count deltas for a saved or deleted User."""
+    before, after = _before_and_after(doc, method)
+    deltas: defaultdict[str, Counter] = defaultdict(Counter)
+    _add_row_deltas(
+        deltas, "user_count", before, after, "department_permissions", _counts_as_user
+    )
+    _apply_deltas(deltas)
+
+
+def on_department_permission_change(doc: Any, method: str | None = None) -> None:
+    """Apply user count deltas for a directly saved Department Permission row."""
+    before, after = _before_and_after(doc, method)
+    deltas: defaultdict[str, Counter] = defaultdict(Counter)
+    for row, sign in ((before, -1), (after, 1)):
+        if _counts_as_user(row):
+            deltas[row.department]["user_count"] += sign
+    _apply_deltas(deltas)
+
+
+def on_inventory_balance_change(doc: Any, method: str | None = None) -> None:
+    """Apply inventory value deltas for a saved or deleted Inventory Balance.
+
+    The previous value is taken off the department the balance was in before
+    the save, so a balance moved between departments updates both. Stock
+    Ledger Entry submission and cancellation write through Inventory Balance,
+    so this also covers ledger postings.
+    """
+    before, after = _before_and_after(doc, method)
+    deltas: defaultdict[str, Counter] = defaultdict(Counter)
+    rates: dict[str, float] = {}
+    for balance, sign in ((before, -1), (after, 1)):
+        if not (balance and balance.department and balance.product):
+            continue
+        if balance.product not in rates:
+            rates[balance.product] = flt(
+                frappe.db.get_value("Product", balance.product, "valuation_rate")
+            )
+        deltas[balance.department]["inventory_value"] += (
+            sign * flt(balance.quantity) * rates[balance.product]
+        )
+    _apply_deltas(deltas)
+
+
+def _before_and_after(doc: Any, method: str | None) -> tuple[Any, Any]:
+    """Return the document as it was before this event and as it is after it."""
+    if method == "after_delete":
+        return doc, None
+    return doc.get_doc_before_save(), doc
+
+
+def _add_row_deltas(
+    deltas: defaultdict[str, Counter],
+    field: str,
+    before: Any,
+    after: Any,
+    fieldname: str,
+    counted: Callable[[Any], bool],
+) -> None:
+    """Count matching child rows per department before and after, and add the difference."""
+    old = Counter(row.department for row in _rows(before, fieldname) if counted(row))
+    new = Counter(row.department for row in _rows(after, fieldname) if counted(row))
+    for department in old.keys() | new.keys():
+        deltas[department][field] += new[department] - old[department]
+
+
+def _rows(doc: Any, fieldname: str) -> list[Any]:
+    return (doc.get(fieldname) or []) if doc else []
+
+
+def _has_department(row: Any) -> bool:
+    return bool(row and row.department)
+
+
+def _counts_as_user(row: Any) -> bool:
+    """Mirror the ``user_count`` query: read access rows on a User."""
+    return bool(
+        _has_department(row)
+        and (row.parenttype or "User") == "User"
+        and cint(row.can_read)
+    )
+
+
+def _apply_deltas(deltas: dict[str, Counter]) -> None:
+    """Add ``deltas`` to the stored rows; departments without a row are computed."""
+    deltas = {
+        department: {field: value for field, value in values.items() if value}
+        for department, values in deltas.items()
+        if department
+    }
+    deltas = {department: values for department, values in deltas.items() if values}
+    if not deltas:
+        return
+
+    existing = set(
+        frappe.get_all(STATS_DOCTYPE, filters={"name": ["in", list(deltas)]}, pluck="name")
+    )
+    timestamp = now()
+    for department, values in deltas.items():
+        if department not in existing:
+            continue
+        assignments = ", ".join(
+            f"`{field}` = `{field}` + %({field})s" for field in values
+        )
+        frappe.db.sql(
+            f"""
+            UPDATE `tab{STATS_DOCTYPE}`
+            SET {assignments}, `last_refreshed` = %(last_refreshed)s
+            WHERE `name` = %(department)s
+            """,
+            {**values, "last_refreshed": timestamp, "department": department},
+        )
+
+    refresh_department_stats(set(deltas) - existing)
+
+
+# ---------------------------------------------------------------------------
+# Computation
+# ---------------------------------------------------------------------------
+
+
+def _compute_stats(departments: list[str]) -> dict[str, dict[str, Any]]:
+    stats: dict[str, dict[str, Any]] = {
+        department: {field: 0 for field in STATS_FIELDS} for department in departments
+    }
+    if not departments:
+        return stats
+
+    params = {"departments": tuple(departments)}
+    queries = {
+        "product_count": """
+            SELECT `department`, COUNT(*)
+            FROM `tabProduct Department`
+            WHERE `parenttype` = 'Product' AND `department` IN %(departments)s
+            GROUP BY `department`
+        """,
+        "user_count": """
+            SELECT `department`, COUNT(*)
+            FROM `tabDepartment Permission`
+            WHERE `parenttype` = 'User' AND `can_read` = 1
+                AND `department` IN %(departments)s
+            GROUP BY `department`
+        """,
+        "child_department_count": """
+            SELECT `parent_department`, COUNT(*)
+            FROM `tabDepartment`
+            WHERE `parent_department` IN %(departments)s
+            GROUP BY `parent_department`
+        """,
+        "inventory_value": """
+            SELECT balance.`department`,
+                SUM(balance.`quantity` * IFNULL(product.`valuation_rate`, 0))
+            FROM `tabInventory Balance` balance
+            INNER JOIN `tabProduct` product ON product.`name` = balance.`product`
+            WHERE balance.`department` IN %(departments)s
+            GROUP BY balance.`department`
+        """,
+    }
+
+    for field, query in queries.items():
+        cast = flt if field == "inventory_value" else cint
+        for department, value in frappe.db.sql(query, params):
+            stats[department][field] = cast(value)
+    return stats
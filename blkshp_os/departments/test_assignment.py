@@ -0,0 +1,109 @@
+"""Tests for set-based product-to-department assignment."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.departments.assignment import assign_products
+
+
+class TestDepartmentAssignment(FrappeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        frappe.set_user("Administrator")
+        self.company = self._ensure_company("Assignment Test Company", "ASSIGNCO")
+        self.kitchen = self._ensure_department("ASSIGN-KIT", "Assign Kitchen")
+        self.outlet = self._ensure_department("ASSIGN-OUT", "Assign Outlet")
+
+    def tearDown(self) -> None:
+        frappe.set_user("Administrator")
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_assigns_missing_rows_after_existing_ones(self) -> None:
+        first = self._create_product("Assign Flour")
+        second = self._create_product("Assign Sugar")
+
+        result = assign_products(self.outlet, [first, second], par_level=10)
+
+        self.assertEqual(result["success"], [first, second])
+        doc = frappe.get_doc("Product", first)
+        rows = {row.department: row for row in doc.departments}
+        self.assertIn(self.outlet, rows)
+        self.assertEqual(rows[self.outlet].idx, rows[self.kitchen].idx + 1)
+        self.assertEqual(rows[self.outlet].par_level, 10)
+        self.assertEqual(rows[self.outlet].is_primary, 0)
+
+    def test_reports_already_assigned_and_missing_products(self) -> None:
+        product = self._create_product("Assign Salt")
+
+        result = assign_products(self.kitchen, [product, "Missing Product"])
+
+        self.assertEqual(result["success"], [])
+        self.assertEqual(
+            [row["product"] for row in result["failed"]], [product, "Missing Product"]
+        )
+        self.assertEqual(result["total"], 2)
+
+    def test_bumps_parent_modified(self) -> None:
+        product = self._create_product("Assign Pepper")
+        before = frappe.db.get_value("Product", product, "modified")
+
+        assign_products(self.outlet, [product])
+
+        self.assertGreaterEqual(frappe.db.get_value("Product", product, "modified"), before)
+        self.assertEqual(
+            frappe.db.get_value("Product", product, "modified_by"), "Administrator"
+        )
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+    def _ensure_company(self, name: str, code: str) -> str:
+        existing = frappe.db.get_value("Company", {"company_code": code})
+        if existing:
+            return existing
+        company = frappe.get_doc(
+            {
+                "doctype": "Company",
+                "company_name": name,
+                "company_code": code,
+                "default_currency": "USD",
+            }
+        )
+        company.insert(ignore_permissions=True)
+        return company.name
+
+    def _ensure_department(self, code: str, name: str) -> str:
+        existing = frappe.db.exists(
+            "Department", {"department_code": code, "company": self.company}
+        )
+        if existing:
+            return existing
+        department = frappe.get_doc(
+            {
+                "doctype": "Department",
+                "department_code": code,
+                "department_name": name,
+                "department_type": "Food",
+                "company": self.company,
+            }
+        )
+        department.insert(ignore_permissions=True)
+        return department.name
+
+    def _create_product(self, product_name: str) -> str:
+        doc = frappe.get_doc(
+            {
+                "doctype": "Product",
+                "product_name": product_name,
+                "product_code": product_name.upper().replace(" ", "-"),
+                "company": self.company,
+                "product_type": "Food",
+                "primary_count_unit": "each",
+                "default_department": self.kitchen,
+            }
+        )
+        doc.insert(ignore_permissions=True)
+        return doc.name
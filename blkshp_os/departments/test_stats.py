@@ -0,0 +1,137 @@
+"""Tests for incrementally maintained department statistics."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.departments.stats import (
+    STATS_DOCTYPE,
+    STATS_FIELDS,
+    get_department_stats,
+    reconcile_department_stats,
+)
+
+
+class TestDepartmentStats(FrappeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        frappe.set_user("Administrator")
+        self.company = self._ensure_company("Stats Test Company", "STATSCO")
+        self.kitchen = self._ensure_department("STATS-KIT", "Stats Kitchen")
+        self.bar = self._ensure_department("STATS-BAR", "Stats Bar")
+        self.product = self._create_product("Stats Flour", valuation_rate=2)
+        reconcile_department_stats()
+
+    def tearDown(self) -> None:
+        frappe.set_user("Administrator")
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_balance_postings_apply_value_deltas(self) -> None:
+        balance = self._create_balance(self.kitchen, quantity=10)
+        self.assertEqual(self._value(self.kitchen), 20)
+
+        balance.quantity = 4
+        balance.save(ignore_permissions=True)
+        self.assertEqual(self._value(self.kitchen), 8)
+
+        balance.delete(ignore_permissions=True)
+        self.assertEqual(self._value(self.kitchen), 0)
+
+    def test_balance_moved_between_departments_updates_both(self) -> None:
+        balance = self._create_balance(self.kitchen, quantity=5)
+
+        balance.department = self.bar
+        balance.save(ignore_permissions=True)
+
+        self.assertEqual(self._value(self.kitchen), 0)
+        self.assertEqual(self._value(self.bar), 10)
+
+    def test_product_changes_apply_count_and_revaluation(self) -> None:
+        self._create_balance(self.kitchen, quantity=3)
+        count = get_department_stats(self.bar)["product_count"]
+
+        product = frappe.get_doc("Product", self.product)
+        product.valuation_rate = 5
+        product.append("departments", {"department": self.bar})
+        product.save(ignore_permissions=True)
+
+        self.assertEqual(self._value(self.kitchen), 15)
+        self.assertEqual(get_department_stats(self.bar)["product_count"], count + 1)
+
+        incremental = self._stats(self.kitchen, self.bar)
+        reconcile_department_stats()
+        self.assertEqual(self._stats(self.kitchen, self.bar), incremental)
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+    def _stats(self, *departments: str) -> list[dict]:
+        return [
+            {field: get_department_stats(department)[field] for field in STATS_FIELDS}
+            for department in departments
+        ]
+
+    def _value(self, department: str) -> float:
+        return frappe.db.get_value(STATS_DOCTYPE, department, "inventory_value")
+
+    def _create_balance(self, department: str, quantity: float) -> frappe.Document:
+        return frappe.get_doc(
+            {
+                "doctype": "Inventory Balance",
+                "product": self.product,
+                "department": department,
+                "company": self.company,
+                "quantity": quantity,
+            }
+        ).insert(ignore_permissions=True)
+
+    def _ensure_company(self, name: str, code: str) -> str:
+        existing = frappe.db.get_value("Company", {"company_code": code})
+        if existing:
+            return existing
+        company = frappe.get_doc(
+            {
+                "doctype": "Company",
+                "company_name": name,
+                "company_code": code,
+                "default_currency": "USD",
+            }
+        )
+        company.insert(ignore_permissions=True)
+        return company.name
+
+    def _ensure_department(self, code: str, name: str) -> str:
+        existing = frappe.db.exists(
+            "Department", {"department_code": code, "company": self.company}
+        )
+        if existing:
+            return existing
+        department = frappe.get_doc(
+            {
+                "doctype": "Department",
+                "department_code": code,
+                "department_name": name,
+                "department_type": "Food",
+                "company": self.company,
+            }
+        )
+        department.insert(ignore_permissions=True)
+        return department.name
+
+    def _create_product(self, product_name: str, valuation_rate: float) -> str:
+        doc = frappe.get_doc(
+            {
+                "doctype": "Product",
+                "product_name": product_name,
+                "product_code": product_name.upper().replace(" ", "-"),
+                "company": self.company,
+                "product_type": "Food",
+                "primary_count_unit": "each",
+                "default_department": self.kitchen,
+                "valuation_rate": valuation_rate,
+            }
+        )
+        doc.insert(ignore_permissions=True)
+        return doc.name
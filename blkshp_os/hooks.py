@@ -52,6 +52,11 @@ fixtures = [
 # -----------
 permission_query_conditions = {
     "Department": "blkshp_os.permissions.query.department_permission_query",
+    "Inventory Balance": "blkshp_os.permissions.query.inventory_balance_permission_query",
+    "Batch Number": "blkshp_os.permissions.query.batch_number_permission_query",
+    "Stock Ledger Entry": "blkshp_os.permissions.query.stock_ledger_entry_permission_query",
+    "Recipe": "blkshp_os.permissions.query.recipe_permission_query",
+    "Inventory Audit": "blkshp_os.permissions.query.inventory_audit_permission_query",
 }
 
 # Extend DocType Class
@@ -188,40 +193,100 @@ doctype_js = {"User": "public/js/user.js", "Role": "public/js/role.js"}
 # Hook on document methods and events
 
 doc_events = {
+    "Company": {
+        "after_insert": "blkshp_os.core_platform.services.tenant_overview.on_company_change",
+        "on_update": "blkshp_os.core_platform.services.tenant_overview.on_company_change",
+        "after_rename": [
+            "blkshp_os.core_platform.services.tenant_overview.on_company_change",
+            "blkshp_os.accounting.membership.on_company_change",
+        ],
+        "on_trash": "blkshp_os.core_platform.services.tenant_overview.on_company_change",
+    },
     "Department Permission": {
         "validate": "blkshp_os.permissions.doctype.department_permission.department_permission.run_department_permission_validation",
+        "on_update": [
+            "blkshp_os.permissions.matrix.on_department_permission_change",
+            "blkshp_os.departments.stats.on_department_permission_change",
+        ],
+        "after_delete": [
+            "blkshp_os.permissions.matrix.on_department_permission_change",
+            "blkshp_os.departments.stats.on_department_permission_change",
+        ],
     },
     "User": {
         "validate": "blkshp_os.permissions.doctype.department_permission.department_permission.validate_user_department_permissions",
+        "on_update": [
+            "blkshp_os.permissions.matrix.on_user_change",
+            "blkshp_os.permissions.roles.on_user_roles_change",
+            "blkshp_os.departments.stats.on_user_change",
+            "blkshp_os.auth.jwt_manager.on_user_change",
+        ],
+        "after_delete": [
+            "blkshp_os.permissions.matrix.on_user_change",
+            "blkshp_os.permissions.roles.on_user_roles_change",
+            "blkshp_os.departments.stats.on_user_change",
+            "blkshp_os.auth.jwt_manager.on_user_change",
+        ],
+    },
+    "Product": {
+        "on_update": "blkshp_os.departments.stats.on_product_change",
+        "after_delete": "blkshp_os.departments.stats.on_product_change",
+    },
+    "Inventory Balance": {
+        "on_update": "blkshp_os.departments.stats.on_inventory_balance_change",
+        "after_delete": "blkshp_os.departments.stats.on_inventory_balance_change",
     },
     "Role Permission": {
         "validate": "blkshp_os.permissions.doctype.role_permission.role_permission.run_role_permission_validation",
+        "on_update": "blkshp_os.permissions.roles.on_role_change",
+        "after_delete": "blkshp_os.permissions.roles.on_role_change",
     },
     "Role": {
         "validate": "blkshp_os.permissions.doctype.role_permission.role_permission.validate_role_permissions",
+        "on_update": "blkshp_os.permissions.roles.on_role_change",
+        "on_trash": "blkshp_os.permissions.roles.on_role_change",
+        "after_rename": "blkshp_os.permissions.roles.on_role_change",
+    },
+    "User Permission": {
+        "on_update": [
+            "blkshp_os.permissions.claims.on_user_permission_change",
+            "blkshp_os.accounting.membership.on_user_permission_change",
+        ],
+        "after_delete": [
+            "blkshp_os.permissions.claims.on_user_permission_change",
+            "blkshp_os.accounting.membership.on_user_permission_change",
+        ],
+    },
+    "Account": {
+        "on_update": "blkshp_os.accounting.intercompany_service.on_account_change",
+        "after_rename": "blkshp_os.accounting.intercompany_service.on_account_change",
+        "on_trash": "blkshp_os.accounting.intercompany_service.on_account_change",
+    },
+    # Posted by the accounting app that owns the general ledger, where installed
+    "GL Entry": {
+        "on_submit": "blkshp_os.accounting.intercompany_service.on_gl_entry_submit",
+        "on_cancel": "blkshp_os.accounting.intercompany_service.on_gl_entry_cancel",
     },
 }
 
 # Scheduled Tasks
 # ---------------
 
-# scheduler_events = {
-# 	"all": [
-# 		"blkshp_os.tasks.all"
-# 	],
-# 	"daily": [
-# 		"blkshp_os.tasks.daily"
-# 	],
-# 	"hourly": [
-# 		"blkshp_os.tasks.hourly"
-# 	],
-# 	"weekly": [
-# 		"blkshp_os.tasks.weekly"
-# 	],
-# 	"monthly": [
-# 		"blkshp_os.tasks.monthly"
-# 	],
-# }
+scheduler_events = {
+    "all": [
+        "blkshp_os.core_platform.access_log.flush_access_log_queue",
+    ],
+    "daily": [
+        "blkshp_os.departments.stats.reconcile_department_stats",
+        "blkshp_os.auth.jwt_manager.warm_team_account_token_templates",
+    ],
+    "cron": {
+        # Off-peak
+        "0 3 * * *": [
+            "blkshp_os.utils.retention.purge_expired_logs",
+        ],
+    },
+}
 
 # Testing
 # -------
@@ -262,7 +327,7 @@ doc_events = {
 # Request Events
 # ----------------
 # before_request = ["blkshp_os.utils.before_request"]
-# after_request = ["blkshp_os.utils.after_request"]
+after_request = ["blkshp_os.core_platform.access_log.flush_request_buffer"]
 
 # Job Events
 # ----------
@@ -307,7 +372,22 @@ doc_events = {
 # 	"Logging DocType Name": 30  # days to retain logs
 # }
 
-# Subscription Enforcement Log Retention
-# ---------------------------------------
-# Automatically clear old subscription access logs after 90 days
-default_log_clearing_doctypes = {"Subscription Access Log": 90}  # days to retain logs
+# High-Volume Log Retention
+# -------------------------
+# Purged off-peak in bounded chunks by blkshp_os.utils.retention instead of
+# default_log_clearing_doctypes, whose single DELETE locks busy tables
+log_retention_policies = [
+    {"doctype": "Subscription Access Log", "days": 90, "timestamp_field": "timestamp"},
+    {
+        "doctype": "Subscription Access Rollup",
+        "days": 90,
+        "timestamp_field": "period_start",
+        "filters": {"period_type": "Hourly"},
+    },
+    {
+        "doctype": "Subscription Access Rollup",
+        "days": 730,
+        "timestamp_field": "period_start",
+        "filters": {"period_type": "Daily"},
+    },
+]
@@ -0,0 +1,270 @@
+"""Permission claims embedded in JWT access tokens.
+
+An access token carries a compact snapshot of what its user may do:
+
+- ``pv``: permission version the claims were built at
+- ``pc``: granted permission codes as a hex bitmask (``roles.PERMISSION_BITS``)
+- ``dp``: ``{department: flag bitmask}`` from the department permission matrix
+  (``matrix.FLAG_BITS``)
+- ``mods``: module keys enabled by the user's subscription plan
+- ``byp``: bypass bits (:data:`BYPASS_DEPARTMENTS`, :data:`BYPASS_SUBSCRIPTION`,
+  :data:`BYPASS_ROLE_PERMISSIONS`)
+
+The permission version combines a global and a per-user version token with
+today's date. The tokens are bumped wherever compiled role permissions,
+department matrices or subscription contexts are invalidated, and the date
+rolls department validity windows over at midnight.
+
+``authenticate_request`` activates a token's claims for the request only when
+its version is current. Role permission, department and module checks then
+answer from the claims without touching the database; stale or missing claims
+fall back to the regular lookups until the client refreshes its token.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+import frappe
+from frappe.utils import nowdate
+
+from blkshp_os.utils.cache import (
+    bump_cache_version,
+    bump_cache_versions,
+    cache_versions_from_values,
+    get_cache_versions,
+    version_key,
+)
+
+CLAIMS_VERSION_NAMESPACE = "blkshp_os:permission_claims"
+_LOCAL_CLAIMS_ATTR = "blkshp_permission_claims"
+
+BYPASS_DEPARTMENTS = 1
+BYPASS_SUBSCRIPTION = 2
+BYPASS_ROLE_PERMISSIONS = 4
+
+
+@dataclass(frozen=True)
+class PermissionClaims:
+    """Verified permission claims of the request's access token."""
+
+    user: str
+    mask: int
+    departments: dict[str, int] = field(default_factory=dict)
+    modules: frozenset[str] = frozenset()
+    bypass: int = 0
+
+    @property
+    def bypasses_departments(self) -> bool:
+        return bool(self.bypass & BYPASS_DEPARTMENTS)
+
+    @property
+    def bypasses_subscription(self) -> bool:
+        return bool(self.bypass & BYPASS_SUBSCRIPTION)
+
+    @property
+    def is_superuser(self) -> bool:
+        return bool(self.bypass & BYPASS_ROLE_PERMISSIONS)
+
+
+def get_permission_version(user: str) -> str:
+    """Return the user's current permission version."""
+    return _compose_permission_version(
+        *get_cache_versions([CLAIMS_VERSION_NAMESPACE, _user_namespace(user)])
+    )
+
+
+def permission_version_keys(users: Sequence[str]) -> list[str]:
+    """Return the cache keys behind the permission versions of ``users``.
+
+    The global version key comes first, then one key per user, so callers can
+    read them in the same Redis pipeline as their own per-user keys and pass
+    the values to :func:`permission_versions_from_values`.
+    """
+    return [version_key(namespace) for namespace in _version_namespaces(users)]
+
+
+def permission_versions_from_values(
+    users: Sequence[str], values: Sequence[bytes | None]
+) -> dict[str, str]:
+    """Return ``{user: permission version}`` from the raw values of :func:`permission_version_keys`.
+
+    Version tokens not in Redis yet are created, as :func:`get_permission_version` does.
+    """
+    global_version, *user_versions = cache_versions_from_values(_version_namespaces(users), values)
+    return {
+        user: _compose_permission_version(global_version, user_version)
+        for user, user_version in zip(users, user_versions, strict=True)
+    }
+
+
+def _version_namespaces(users: Sequence[str]) -> list[str]:
+    return [CLAIMS_VERSION_NAMESPACE, *(_user_namespace(user) for user in users)]
+
+
+def bump_permission_version(user: str | None = None) -> None:
+    """Make outstanding claims for ``user`` (or every user) stale.
+
+    Enforcement decisions memoized in this request are dropped as well.
+    Repeated on commit so claims built from uncommitted data by another
+    worker are not accepted.
+    """
+    from blkshp_os.core_platform.enforcement import clear_enforcement_cache
+
+    namespace = _user_namespace(user) if user else CLAIMS_VERSION_NAMESPACE
+    bump_cache_version(namespace)
+
+    claims = getattr(frappe.local, _LOCAL_CLAIMS_ATTR, None)
+    if claims is not None and (not user or claims.user == user):
+        clear_request_claims()
+    clear_enforcement_cache(user)
+
+
+def bump_permission_versions(users: Iterable[str]) -> None:
+    """Make outstanding claims of each of ``users`` stale.
+
+    Behaves like :func:`bump_permission_version` per user, with the version
+    tokens bumped together.
+    """
+    from blkshp_os.core_platform.enforcement import clear_enforcement_cache
+
+    users = sorted(set(users))
+    if not users:
+        return
+    bump_cache_versions(_user_namespace(user) for user in users)
+
+    claims = getattr(frappe.local, _LOCAL_CLAIMS_ATTR, None)
+    if claims is not None and claims.user in users:
+        clear_request_claims()
+    for user in users:
+        clear_enforcement_cache(user)
+
+
+def build_permission_claims(user: str) -> dict[str, Any]:
+    """Build the claims to embed in an access token for ``user``."""
+    return build_permission_claims_for_users([user])[user]
+
+
+def build_permission_claims_for_users(users: list[str]) -> dict[str, dict[str, Any]]:
+    """Build access token claims for many users with bulk lookups.
+
+    Role permissions and department matrices come from their caches, with
+    misses compiled in one query each; companies, plan assignments and
+    subscription contexts are resolved once per batch.
+    """
+    from blkshp_os.core_platform.services import get_subscription_context, resolve_plan_for_company
+    from blkshp_os.permissions import matrix, roles, service
+
+    # Read versions first: a concurrent change then leaves these claims stale
+    versions = {user: get_permission_version(user) for user in users}
+    compiled = roles.get_compiled_permissions_for_users(users)
+
+    bypass: dict[str, int] = {}
+    for user in users:
+        bits = 0
+        if service._user_bypasses_department_permissions(user):
+            bits |= BYPASS_DEPARTMENTS
+        if service._user_bypasses_subscription_gates(user):
+            bits |= BYPASS_SUBSCRIPTION
+        if compiled[user].is_superuser:
+            bits |= BYPASS_ROLE_PERMISSIONS
+        bypass[user] = bits
+
+    matrices = matrix.get_permission_matrices(
+        [user for user in users if not bypass[user] & BYPASS_DEPARTMENTS]
+    )
+
+    gated = [user for user in users if not bypass[user] & BYPASS_SUBSCRIPTION]
+    companies = service.get_user_companies(gated, matrices)
+    company_names = sorted({company for company in companies.values() if company})
+    assigned_plans: dict[str, str] = {}
+    if company_names:
+        assigned_plans = dict(
+            frappe.get_all(
+                "Tenant Branding",
+                filters={"name": ["in", company_names]},
+                fields=["name", "plan"],
+                as_list=True,
+            )
+        )
+    default_plan = resolve_plan_for_company(None) if gated else None
+
+    modules_by_plan: dict[str | None, list[str]] = {}
+    claims: dict[str, dict[str, Any]] = {}
+    for user in users:
+        modules: list[str] = []
+        if user in companies:
+            plan = assigned_plans.get(companies[user]) or default_plan
+            if plan not in modules_by_plan:
+                context = get_subscription_context(plan_code=plan)
+                modules_by_plan[plan] = sorted(
+                    key for key, module in context.modules.items() if module.is_enabled
+                )
+            modules = modules_by_plan[plan]
+
+        claims[user] = {
+            "pv": versions[user],
+            "pc": format(compiled[user].mask, "x"),
+            "dp": matrices.get(user, {}),
+            "mods": modules,
+            "byp": bypass[user],
+        }
+    return claims
+
+
+def activate_claims(user: str, payload: dict[str, Any]) -> bool:
+    """Trust ``payload``'s claims for the rest of the request if they are current.
+
+    Returns False (and leaves no claims active) when the token has no claims
+    or they were built at an older permission version.
+    """
+    clear_request_claims()
+    version = payload.get("pv")
+    if not version or version != get_permission_version(user):
+        return False
+
+    try:
+        claims = PermissionClaims(
+            user=user,
+            mask=int(payload.get("pc") or "0", 16),
+            departments={str(dept): int(mask) for dept, mask in (payload.get("dp") or {}).items()},
+            modules=frozenset(payload.get("mods") or ()),
+            bypass=int(payload.get("byp") or 0),
+        )
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+    setattr(frappe.local, _LOCAL_CLAIMS_ATTR, claims)
+    return True
+
+
+def get_request_claims(user: str | None) -> PermissionClaims | None:
+    """Return the request's active claims if they belong to ``user``."""
+    claims = getattr(frappe.local, _LOCAL_CLAIMS_ATTR, None)
+    if claims is None or not user or claims.user != user:
+        return None
+    return claims
+
+
+def clear_request_claims() -> None:
+    """Stop trusting token claims for the rest of the request."""
+    if hasattr(frappe.local, _LOCAL_CLAIMS_ATTR):
+        delattr(frappe.local, _LOCAL_CLAIMS_ATTR)
+
+
+def on_user_permission_change(doc: Any, method: str | None = None) -> None:
+    """User Permission hook: company claims of the user changed."""
+    if doc.get("user"):
+        bump_permission_version(doc.user)
+
+
+def _user_namespace(user: str) -> str:
+    return f"{CLAIMS_VERSION_NAMESPACE}:user:{user}"
+
+
+def _compose_permission_version(global_version: str, user_version: str) -> str:
+    raw = ":".join((global_version, user_version, nowdate()))
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
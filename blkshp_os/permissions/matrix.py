@@ -0,0 +1,194 @@
+"""Compiled per-user department permission matrix.
+
+A user's Department Permission rows are compiled into ``{department: bitmask}``
+where each bit is one of :data:`PERMISSION_FLAGS`. Only active departments and
+rows valid today (``valid_from``/``valid_upto``) are included, so permission
+checks become a dictionary lookup.
+
+Matrices are memoized on ``frappe.local`` for the request and stored in
+``frappe.cache()`` under a key stamped with two versions: a global one bumped
+when any Department changes and a per-user one bumped when the user's
+permissions change. The date is part of the key so validity windows roll over
+at midnight.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import frappe
+from frappe.utils import nowdate
+
+from blkshp_os.permissions.claims import bump_permission_version, get_request_claims
+from blkshp_os.permissions.service import PERMISSION_FLAGS
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    get_cache_version,
+    on_rollback,
+)
+
+MATRIX_CACHE_NAMESPACE = "blkshp_os:department_permission_matrix"
+_LOCAL_CACHE_ATTR = "blkshp_department_permission_matrix"
+
+FLAG_BITS: dict[str, int] = {
+    flag: 1 << index for index, flag in enumerate(PERMISSION_FLAGS)
+}
+
+
+def get_permission_matrix(user: str) -> dict[str, int]:
+    """Return ``{department: bitmask}`` for the user's effective permissions.
+
+    The matrix is trusted for the rest of the request once loaded; the hooks
+    below drop it from the request memo when permissions change. Current
+    access token claims for ``user`` are used as is.
+    """
+    claims = get_request_claims(user)
+    if claims is not None and not claims.bypasses_departments:
+        return claims.departments
+
+    local = _local_cache()
+    if user in local:
+        return local[user]
+
+    key = _matrix_key(user)
+    matrix = frappe.cache().get_value(key)
+    if matrix is None:
+        matrix = compile_permission_matrix(user)
+        frappe.cache().set_value(key, matrix, expires_in_sec=DEFAULT_TTL_SECONDS)
+
+    local[user] = matrix
+    return matrix
+
+
+def get_permission_matrices(users: list[str]) -> dict[str, dict[str, int]]:
+    """Return matrices for many users, compiling uncached ones in one query."""
+    local = _local_cache()
+    result: dict[str, dict[str, int]] = {}
+    missing: list[str] = []
+    for user in users:
+        matrix = local.get(user)
+        if matrix is None:
+            matrix = frappe.cache().get_value(_matrix_key(user))
+        if matrix is None:
+            missing.append(user)
+        else:
+            result[user] = matrix
+
+    for user, matrix in compile_permission_matrices(missing).items():
+        frappe.cache().set_value(_matrix_key(user), matrix, expires_in_sec=DEFAULT_TTL_SECONDS)
+        result[user] = matrix
+    return result
+
+
+def compile_permission_matrix(user: str, on_date: str | None = None) -> dict[str, int]:
+    """Build the matrix for ``user`` from the database."""
+    return compile_permission_matrices([user], on_date)[user]
+
+
+def compile_permission_matrices(
+    users: list[str], on_date: str | None = None
+) -> dict[str, dict[str, int]]:
+    """Build the matrix of each of ``users`` from the database."""
+    matrices: dict[str, dict[str, int]] = {user: {} for user in users}
+    if not users:
+        return matrices
+
+    flag_columns = ", ".join(f"dp.`{flag}`" for flag in PERMISSION_FLAGS)
+    rows = frappe.db.sql(
+        f"""
+        SELECT dp.`parent`, dp.`department`, {flag_columns}
+        FROM `tabDepartment Permission` dp
+        INNER JOIN `tabDepartment` dept ON dept.`name` = dp.`department`
+        WHERE dp.`parent` IN %(users)s
+            AND dp.`parenttype` = 'User'
+            AND dept.`is_active` = 1
+            AND (dp.`valid_from` IS NULL OR dp.`valid_from` <= %(on_date)s)
+            AND (dp.`valid_upto` IS NULL OR dp.`valid_upto` >= %(on_date)s)
+        """,
+        {"users": tuple(users), "on_date": on_date or nowdate()},
+    )
+
+    for user, department, *flags in rows:
+        mask = 0
+        for flag, value in zip(PERMISSION_FLAGS, flags, strict=True):
+            if value:
+                mask |= FLAG_BITS[flag]
+        if mask:
+            matrix = matrices.setdefault(user, {})
+            matrix[department] = matrix.get(department, 0) | mask
+    return matrices
+
+
+def matrix_allows(matrix: dict[str, int], department: str, permission_flag: str) -> bool:
+    return bool(matrix.get(department, 0) & FLAG_BITS[permission_flag])
+
+
+def departments_with_flag(matrix: dict[str, int], permission_flag: str) -> list[str]:
+    bit = FLAG_BITS[permission_flag]
+    return sorted(department for department, mask in matrix.items() if mask & bit)
+
+
+def clear_user_permission_matrix(user: str | None) -> None:
+    """Invalidate the cached matrix for one user."""
+    if not user:
+        return
+    bump_cache_version(_user_namespace(user))
+    bump_permission_version(user)
+    _clear_local(user)
+
+
+def clear_permission_matrix_cache() -> None:
+    """Invalidate cached matrices for every user."""
+    bump_cache_version(MATRIX_CACHE_NAMESPACE)
+    bump_permission_version()
+    _clear_local()
+
+
+# ---------------------------------------------------------------------------
+# Document hooks
+# ---------------------------------------------------------------------------
+
+
+def on_department_permission_change(doc: Any, method: str | None = None) -> None:
+    if doc.get("parenttype") == "User":
+        clear_user_permission_matrix(doc.get("parent"))
+
+
+def on_user_change(doc: Any, method: str | None = None) -> None:
+    clear_user_permission_matrix(doc.name)
+
+
+def _matrix_key(user: str) -> str:
+    return ":".join(
+        (
+            MATRIX_CACHE_NAMESPACE,
+            get_cache_version(MATRIX_CACHE_NAMESPACE),
+            get_cache_version(_user_namespace(user)),
+            user,
+            nowdate(),
+        )
+    )
+
+
+def _user_namespace(user: str) -> str:
+    return f"{MATRIX_CACHE_NAMESPACE}:user:{user}"
+
+
+def _clear_local(user: str | None = None) -> None:
+    def clear() -> None:
+        if user:
+            _local_cache().pop(user, None)
+        else:
+            _local_cache().clear()
+
+    clear()
+    on_rollback(clear)
+
+
+def _local_cache() -> dict[str, dict[str, int]]:
+    cache = getattr(frappe.local, _LOCAL_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(frappe.local, _LOCAL_CACHE_ATTR, cache)
+    return cache
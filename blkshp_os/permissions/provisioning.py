@@ -0,0 +1,420 @@
+"""Set-based provisioning of Department Permission rows.
+
+Granting, revoking and cloning department access for many users at once
+validates every ``(user, department)`` pair against users and departments
+fetched up front, writes the child rows with a handful of statements instead
+of saving each User, and invalidates the permission matrix, the cached User
+documents and department statistics once at the end.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate, now
+
+from blkshp_os.departments.stats import refresh_department_stats
+from blkshp_os.permissions.matrix import clear_user_permission_matrix
+from blkshp_os.permissions.service import PERMISSION_FLAGS
+from blkshp_os.utils.cache import on_commit
+
+DEPARTMENT_PERMISSION_FIELDS: list[str] = [
+    "name",
+    "creation",
+    "modified",
+    "modified_by",
+    "owner",
+    "docstatus",
+    "parent",
+    "parenttype",
+    "parentfield",
+    "idx",
+    "department",
+    "is_active",
+    *PERMISSION_FLAGS,
+    "valid_from",
+    "valid_upto",
+]
+
+
+def grant_department_permissions(
+    users: Sequence[str],
+    departments: Sequence[str],
+    flags: Iterable[str],
+    valid_from: str | None = None,
+    valid_upto: str | None = None,
+) -> dict[str, Any]:
+    """Grant ``flags`` on every department in ``departments`` to every user.
+
+    Existing rows keep their other flags and gain the requested ones; when
+    ``valid_from`` or ``valid_upto`` is given, existing rows also take the new
+    validity window and are reactivated. Missing rows are bulk inserted. Pairs that fail validation (unknown or inactive
+    department, unknown user, company mismatch) are reported in ``failed``.
+    """
+    flags = _normalize_flags(flags)
+    _validate_dates(valid_from, valid_upto)
+
+    users = list(dict.fromkeys(users))
+    departments = list(dict.fromkeys(departments))
+    dates = (
+        {"valid_from": valid_from, "valid_upto": valid_upto}
+        if valid_from or valid_upto
+        else {}
+    )
+    grants = {
+        (user, department): {**dict.fromkeys(flags, 1), **dates}
+        for user in users
+        for department in departments
+    }
+    touched_users: set[str] = set()
+    touched_departments: set[str] = set()
+    results = _apply_grants(grants, touched_users, touched_departments)
+    _finish(touched_users, touched_departments)
+    return results
+
+
+def revoke_department_permissions(
+    users: Sequence[str],
+    departments: Sequence[str],
+    flags: Iterable[str] | None = None,
+) -> dict[str, Any]:
+    """Revoke department access for every ``(user, department)`` pair.
+
+    Without ``flags`` the rows are deleted. With ``flags`` only those flags are
+    cleared, and rows left with no flag set are deleted.
+    """
+    users = list(dict.fromkeys(users))
+    departments = list(dict.fromkeys(departments))
+    results: dict[str, Any] = {"updated": 0, "deleted": 0}
+    if not users or not departments:
+        return results
+
+    rows = _get_existing_rows(users, departments)
+    if not rows:
+        return results
+
+    if flags is None:
+        to_delete = [row.name for row in rows]
+    else:
+        flags = _normalize_flags(flags)
+        to_delete = [
+            row.name
+            for row in rows
+            if not any(
+                cint(row[flag]) for flag in PERMISSION_FLAGS if flag not in flags
+            )
+        ]
+        deleted = set(to_delete)
+        to_update = [row.name for row in rows if row.name not in deleted]
+        if to_update:
+            _update_rows(to_update, dict.fromkeys(flags, 0))
+            results["updated"] = len(to_update)
+
+    if to_delete:
+        frappe.db.delete("Department Permission", {"name": ["in", to_delete]})
+        results["deleted"] = len(to_delete)
+
+    _finish({row.parent for row in rows}, {row.department for row in rows})
+    return results
+
+
+def clone_department_permissions(
+    source_user: str,
+    target_users: Sequence[str],
+    replace: bool = False,
+) -> dict[str, Any]:
+    """Copy ``source_user``'s department access to each of ``target_users``.
+
+    Flags are merged into any rows the targets already have; with ``replace``
+    the targets' existing rows are removed first. Validity dates are copied
+    from the source rows, onto existing target rows as well.
+    """
+    if not frappe.db.exists("User", source_user):
+        frappe.throw(
+            _("User {0} does not exist").format(source_user),
+            frappe.DoesNotExistError,
+        )
+
+    target_users = [user for user in dict.fromkeys(target_users) if user != source_user]
+    source_rows = frappe.get_all(
+        "Department Permission",
+        filters={"parent": source_user, "parenttype": "User"},
+        fields=["department", "valid_from", "valid_upto", *PERMISSION_FLAGS],
+        order_by="idx asc",
+    )
+
+    touched_users: set[str] = set()
+    touched_departments: set[str] = set()
+    if replace and target_users:
+        existing = frappe.get_all(
+            "Department Permission",
+            filters={"parent": ["in", target_users], "parenttype": "User"},
+            fields=["name", "department"],
+        )
+        if existing:
+            frappe.db.delete(
+                "Department Permission", {"name": ["in", [row.name for row in existing]]}
+            )
+            touched_users.update(target_users)
+            touched_departments.update(row.department for row in existing)
+
+    grants: dict[tuple[str, str], dict[str, Any]] = {}
+    for user in target_users:
+        for row in source_rows:
+            values = {flag: 1 for flag in PERMISSION_FLAGS if cint(row[flag])}
+            if not values:
+                continue
+            values["valid_from"] = row.valid_from
+            values["valid_upto"] = row.valid_upto
+            grants[(user, row.department)] = values
+
+    results = _apply_grants(grants, touched_users, touched_departments)
+    _finish(touched_users, touched_departments)
+    return results
+
+
+def _apply_grants(
+    grants: dict[tuple[str, str], dict[str, Any]],
+    touched_users: set[str],
+    touched_departments: set[str],
+) -> dict[str, Any]:
+    """Insert or extend Department Permission rows for validated pairs.
+
+    ``grants`` maps ``(user, department)`` to the flags to set, optionally with
+    ``valid_from``/``valid_upto``. When the dates are present, existing rows
+    take them too and are reactivated; otherwise their window is kept. Written
+    pairs are added to ``touched_users``/``touched_departments`` so the caller
+    can invalidate caches once.
+    """
+    results: dict[str, Any] = {
+        "created": 0,
+        "updated": 0,
+        "failed": [],
+        "total": len(grants),
+    }
+    if not grants:
+        return results
+
+    users = _prefetch_users({user for user, _department in grants})
+    departments = _prefetch_departments({department for _user, department in grants})
+
+    valid: dict[tuple[str, str], dict[str, Any]] = {}
+    for (user, department), values in grants.items():
+        reason = _validate_pair(user, department, users, departments)
+        if reason:
+            results["failed"].append(
+                {"user": user, "department": department, "reason": reason}
+            )
+            continue
+        valid[(user, department)] = values
+    if not valid:
+        return results
+
+    existing = {
+        (row.parent, row.department): row
+        for row in _get_existing_rows(
+            list({user for user, _department in valid}),
+            list({department for _user, department in valid}),
+        )
+    }
+
+    # Group updates of existing rows by the full set of values they receive
+    updates: dict[tuple[tuple[str, Any], ...], list[str]] = {}
+    timestamp = now()
+    session_user = frappe.session.user
+    next_idx = _get_next_idx(list({user for user, _department in valid}))
+    values_to_insert: list[tuple[Any, ...]] = []
+
+    for (user, department), values in valid.items():
+        flags = tuple(flag for flag in PERMISSION_FLAGS if values.get(flag))
+        row = existing.get((user, department))
+        if row:
+            row_values = dict.fromkeys(flags, 1)
+            if "valid_from" in values or "valid_upto" in values:
+                row_values.update(
+                    is_active=1,
+                    valid_from=values.get("valid_from"),
+                    valid_upto=values.get("valid_upto"),
+                )
+            updates.setdefault(tuple(row_values.items()), []).append(row.name)
+            continue
+
+        idx = next_idx.get(user, 1)
+        next_idx[user] = idx + 1
+        values_to_insert.append(
+            (
+                frappe.generate_hash(length=10),
+                timestamp,
+                timestamp,
+                session_user,
+                session_user,
+                0,
+                user,
+                "User",
+                "department_permissions",
+                idx,
+                department,
+                1,
+                *(1 if flag in flags else 0 for flag in PERMISSION_FLAGS),
+                values.get("valid_from"),
+                values.get("valid_upto"),
+            )
+        )
+
+    for row_values, names in updates.items():
+        _update_rows(names, dict(row_values))
+        results["updated"] += len(names)
+
+    if values_to_insert:
+        frappe.db.bulk_insert(
+            "Department Permission", DEPARTMENT_PERMISSION_FIELDS, values_to_insert
+        )
+        results["created"] = len(values_to_insert)
+
+    touched_users.update(user for user, _department in valid)
+    touched_departments.update(department for _user, department in valid)
+    return results
+
+
+def _validate_pair(
+    user: str,
+    department: str,
+    users: dict[str, frappe._dict],
+    departments: dict[str, frappe._dict],
+) -> str | None:
+    """Return why ``user`` may not be granted ``department``, if anything.
+
+    Mirrors the Department Permission row validation against prefetched data.
+    """
+    if user not in users:
+        return _("User {0} does not exist.").format(user)
+    dept = departments.get(department)
+    if not dept:
+        return _("Department {0} does not exist.").format(department)
+    if not cint(dept.is_active):
+        return _("Department {0} is inactive.").format(department)
+
+    user_company = users[user].get("company")
+    if dept.company and user_company and user_company != dept.company:
+        return _(
+            "Department {0} belongs to company {1}, which does not match user company {2}."
+        ).format(department, dept.company, user_company)
+    return None
+
+
+def _prefetch_users(users: Iterable[str]) -> dict[str, frappe._dict]:
+    fields = ["name"]
+    if frappe.db.has_column("User", "company"):
+        fields.append("company")
+    return {
+        row.name: row
+        for row in frappe.get_all(
+            "User", filters={"name": ["in", list(users)]}, fields=fields
+        )
+    }
+
+
+def _prefetch_departments(departments: Iterable[str]) -> dict[str, frappe._dict]:
+    return {
+        row.name: row
+        for row in frappe.get_all(
+            "Department",
+            filters={"name": ["in", list(departments)]},
+            fields=["name", "company", "is_active"],
+        )
+    }
+
+
+def _get_existing_rows(
+    users: Sequence[str], departments: Sequence[str]
+) -> list[frappe._dict]:
+    return frappe.get_all(
+        "Department Permission",
+        filters={
+            "parent": ["in", list(users)],
+            "parenttype": "User",
+            "department": ["in", list(departments)],
+        },
+        fields=["name", "parent", "department", *PERMISSION_FLAGS],
+    )
+
+
+def _get_next_idx(users: Sequence[str]) -> dict[str, int]:
+    """Return the idx a newly appended department_permissions row should take per user."""
+    if not users:
+        return {}
+
+    rows = frappe.db.sql(
+        """
+        SELECT `parent`, MAX(`idx`)
+        FROM `tabDepartment Permission`
+        WHERE `parenttype` = 'User' AND `parentfield` = 'department_permissions'
+            AND `parent` IN %(users)s
+        GROUP BY `parent`
+        """,
+        {"users": tuple(users)},
+    )
+    return {parent: (max_idx or 0) + 1 for parent, max_idx in rows}
+
+
+def _update_rows(names: Sequence[str], values: dict[str, Any]) -> None:
+    assignments = ", ".join(f"`{field}` = %({field})s" for field in values)
+    frappe.db.sql(
+        f"""
+        UPDATE `tabDepartment Permission`
+        SET {assignments}, `modified` = %(modified)s, `modified_by` = %(user)s
+        WHERE `name` IN %(names)s
+        """,
+        {
+            **values,
+            "modified": now(),
+            "user": frappe.session.user,
+            "names": tuple(names),
+        },
+    )
+
+
+def _normalize_flags(flags: Iterable[str]) -> list[str]:
+    if isinstance(flags, str):
+        flags = [flags]
+    flags = list(dict.fromkeys(flags))
+    if not flags:
+        frappe.throw(_("Select at least one permission for the department access."))
+    invalid = [flag for flag in flags if flag not in PERMISSION_FLAGS]
+    if invalid:
+        frappe.throw(_("Invalid permission flag(s): {0}").format(", ".join(invalid)))
+    return flags
+
+
+def _validate_dates(valid_from: str | None, valid_upto: str | None) -> None:
+    if valid_from and valid_upto and getdate(valid_from) > getdate(valid_upto):
+        frappe.throw(_("Valid Upto must be on or after Valid From."))
+
+
+def _finish(users: Iterable[str], departments: Iterable[str]) -> None:
+    """Bump the affected users' ``modified`` and invalidate caches once.
+
+    Cached User documents hold the Department Permission child rows, so they
+    are dropped now and again on commit, in case another request cached the
+    old rows in between.
+    """
+    users = sorted(set(users))
+    if not users:
+        return
+
+    frappe.db.sql(
+        """
+        UPDATE `tabUser`
+        SET `modified` = %(modified)s, `modified_by` = %(user)s
+        WHERE `name` IN %(names)s
+        """,
+        {"modified": now(), "user": frappe.session.user, "names": tuple(users)},
+    )
+    for user in users:
+        clear_user_permission_matrix(user)
+        frappe.clear_document_cache("User", user)
+    on_commit(lambda: [frappe.clear_document_cache("User", user) for user in users])
+    refresh_department_stats(departments)
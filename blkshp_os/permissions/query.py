@@ -8,3 +8,54 @@ from . import service
 def department_permission_query(user: str) -> str:
     """Return permission query condition restricting Department records."""
     return service.get_department_permission_clause(user, permission_flag="can_read")
+
+
+def inventory_balance_permission_query(user: str) -> str:
+    """Return permission query condition restricting Inventory Balance records."""
+    return _department_field_condition(user, "Inventory Balance")
+
+
+def batch_number_permission_query(user: str) -> str:
+    """Return permission query condition restricting Batch Number records."""
+    return _department_field_condition(user, "Batch Number")
+
+
+def stock_ledger_entry_permission_query(user: str) -> str:
+    """Return permission query condition restricting Stock Ledger Entry records."""
+    return _department_field_condition(user, "Stock Ledger Entry")
+
+
+def recipe_permission_query(user: str) -> str:
+    """Return permission query condition restricting Recipe records."""
+    return _department_field_condition(user, "Recipe")
+
+
+def inventory_audit_permission_query(user: str) -> str:
+    """Return permission query condition restricting Inventory Audit records.
+
+    Audits without department rows are company-wide and stay visible; otherwise
+    the user needs read access to at least one of the audited departments.
+    """
+    if service._user_bypasses_department_permissions(user):
+        return ""
+
+    exists = service.build_department_exists_clause(user, "iad.`department`")
+    return f"""(
+        NOT EXISTS (
+            SELECT 1 FROM `tabInventory Audit Department` iad
+            WHERE iad.`parent` = `tabInventory Audit`.`name`
+                AND iad.`parenttype` = 'Inventory Audit'
+        )
+        OR EXISTS (
+            SELECT 1 FROM `tabInventory Audit Department` iad
+            WHERE iad.`parent` = `tabInventory Audit`.`name`
+                AND iad.`parenttype` = 'Inventory Audit'
+                AND {exists}
+        )
+    )"""
+
+
+def _department_field_condition(user: str, doctype: str) -> str:
+    if service._user_bypasses_department_permissions(user):
+        return ""
+    return service.build_department_exists_clause(user, f"`tab{doctype}`.`department`")
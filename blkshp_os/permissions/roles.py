@@ -5,17 +5,64 @@ This module provides functions for managing roles and checking role-based permis
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any
 
 import frappe
 from frappe import _
 
+from blkshp_os.permissions.claims import bump_permission_version, get_request_claims
 from blkshp_os.permissions.constants import (
     ALL_PERMISSIONS,
     PERMISSION_CATEGORIES,
     get_permission,
     is_valid_permission,
 )
+from blkshp_os.utils.cache import (
+    DEFAULT_TTL_SECONDS,
+    bump_cache_version,
+    get_cache_version,
+    on_rollback,
+)
+
+SUPERUSER_ROLES: tuple[str, ...] = ("System Manager", "Administrator")
+
+# Bit position of each permission code follows the registry order.
+PERMISSION_BITS: dict[str, int] = {
+    perm["code"]: 1 << index for index, perm in enumerate(ALL_PERMISSIONS)
+}
+DEPARTMENT_RESTRICTED_MASK = sum(
+    PERMISSION_BITS[perm["code"]]
+    for perm in ALL_PERMISSIONS
+    if perm["department_restricted"]
+)
+
+COMPILED_PERMISSIONS_NAMESPACE = "blkshp_os:role_permissions"
+_LOCAL_CACHE_ATTR = "blkshp_compiled_role_permissions"
+
+
+@dataclass(frozen=True)
+class CompiledPermissions:
+    """A user's role-granted permission codes compiled into a bitmask."""
+
+    user: str
+    roles: tuple[str, ...]
+    mask: int
+    is_superuser: bool
+    grants: tuple[dict[str, Any], ...]
+
+    @property
+    def department_restricted_mask(self) -> int:
+        """Granted permissions that also require a department permission check."""
+        return self.mask & DEPARTMENT_RESTRICTED_MASK
+
+    def allows(self, permission_code: str) -> bool:
+        bit = PERMISSION_BITS.get(permission_code, 0)
+        return bool(self.mask & bit)
+
+    def is_department_restricted(self, permission_code: str) -> bool:
+        bit = PERMISSION_BITS.get(permission_code, 0)
+        return bool(self.department_restricted_mask & bit)
 
 
 def get_user_roles(user: str | None = None) -> list[str]:
@@ -54,39 +101,105 @@ def get_role_permissions(role: str) -> list[dict[str, Any]]:
     )
 
 
-def get_user_permissions(user: str | None = None) -> dict[str, list[dict[str, Any]]]:
-    """
-    Get all permissions for a user from all their roles.
+def get_compiled_permissions(user: str | None = None) -> CompiledPermissions:
+    """Return the user's compiled role permissions.
 
-    Returns dictionary with permission codes as keys and list of roles granting that permission.
+    Memoized for the request and cached in Redis; invalidated when a Role,
+    Role Permission or User (with its Has Role rows) changes, and by code
+    that writes Has Role rows directly.
     """
     if not user:
         user = frappe.session.user
 
-    roles = get_user_roles(user)
-    if not roles:
-        return {}
+    local = _local_cache()
+    if user in local:
+        return local[user]
 
-    # Get all role permissions for user's roles
-    role_perms = frappe.get_all(
-        "Role Permission",
-        filters={"parent": ["in", roles], "parenttype": "Role", "is_granted": 1},
-        fields=[
-            "parent as role",
-            "permission_code",
-            "permission_name",
-            "permission_category",
-            "department_restricted",
-        ],
-    )
+    key = _compiled_key(user)
+    compiled = frappe.cache().get_value(key)
+    if compiled is None:
+        compiled = compile_permissions(user)
+        frappe.cache().set_value(key, compiled, expires_in_sec=DEFAULT_TTL_SECONDS)
+
+    local[user] = compiled
+    return compiled
+
+
+def get_compiled_permissions_for_users(users: list[str]) -> dict[str, CompiledPermissions]:
+    """Return compiled role permissions for many users.
+
+    Cached entries are reused; the rest are compiled together with a single
+    Role Permission query.
+    """
+    local = _local_cache()
+    result: dict[str, CompiledPermissions] = {}
+    missing: list[str] = []
+    for user in users:
+        compiled = local.get(user) or frappe.cache().get_value(_compiled_key(user))
+        if compiled is None:
+            missing.append(user)
+        else:
+            result[user] = compiled
+
+    for user, compiled in compile_permissions_for_users(missing).items():
+        frappe.cache().set_value(_compiled_key(user), compiled, expires_in_sec=DEFAULT_TTL_SECONDS)
+        result[user] = compiled
+    return result
+
+
+def compile_permissions(user: str) -> CompiledPermissions:
+    """Build :class:`CompiledPermissions` for ``user`` from the database."""
+    return compile_permissions_for_users([user])[user]
+
+
+def compile_permissions_for_users(users: list[str]) -> dict[str, CompiledPermissions]:
+    """Build :class:`CompiledPermissions` for each of ``users`` from the database."""
+    user_roles = {user: tuple(sorted(get_user_roles(user))) for user in users}
+    all_roles = sorted({role for roles in user_roles.values() for role in roles})
+
+    grants_by_role: dict[str, list[dict[str, Any]]] = {}
+    if all_roles:
+        grants = frappe.get_all(
+            "Role Permission",
+            filters={"parent": ["in", all_roles], "parenttype": "Role", "is_granted": 1},
+            fields=[
+                "parent as role",
+                "permission_code",
+                "permission_name",
+                "permission_category",
+                "department_restricted",
+            ],
+        )
+        for grant in grants:
+            grants_by_role.setdefault(grant["role"], []).append(dict(grant))
+
+    compiled: dict[str, CompiledPermissions] = {}
+    for user, roles in user_roles.items():
+        grants = [grant for role in roles for grant in grants_by_role.get(role, [])]
+        mask = 0
+        for grant in grants:
+            mask |= PERMISSION_BITS.get(grant["permission_code"], 0)
+
+        compiled[user] = CompiledPermissions(
+            user=user,
+            roles=roles,
+            mask=mask,
+            is_superuser=any(role in roles for role in SUPERUSER_ROLES),
+            grants=tuple(grants),
+        )
+    return compiled
 
+
+def get_user_permissions(user: str | None = None) -> dict[str, list[dict[str, Any]]]:
+    """
+    Get all permissions for a user from all their roles.
+
+    Returns dictionary with permission codes as keys and list of roles granting that permission.
+    """
     # Group by permission code
     permissions: dict[str, list[dict[str, Any]]] = {}
-    for perm in role_perms:
-        code = perm["permission_code"]
-        if code not in permissions:
-            permissions[code] = []
-        permissions[code].append(perm)
+    for perm in get_compiled_permissions(user).grants:
+        permissions.setdefault(perm["permission_code"], []).append(frappe._dict(perm))
 
     return permissions
 
@@ -102,36 +215,17 @@ def has_permission(user: str | None = None, permission_code: str | None = None)
     Returns:
             True if user has the permission through any of their roles
     """
-    if not user:
-        user = frappe.session.user
-
     if not permission_code:
         return False
 
+    mask, is_superuser = _granted_mask(user)
+
     # System Manager and Administrator have all permissions
-    if has_role(user, "System Manager") or has_role(user, "Administrator"):
+    if is_superuser:
         return True
 
-    # Validate permission code
-    if not is_valid_permission(permission_code):
-        return False
-
-    # Check if user has permission through any role
-    roles = get_user_roles(user)
-    if not roles:
-        return False
-
-    count = frappe.db.count(
-        "Role Permission",
-        filters={
-            "parent": ["in", roles],
-            "parenttype": "Role",
-            "permission_code": permission_code,
-            "is_granted": 1,
-        },
-    )
-
-    return count > 0
+    # Unknown codes have no bit and are never granted
+    return bool(mask & PERMISSION_BITS.get(permission_code, 0))
 
 
 def has_any_permission(
@@ -144,15 +238,13 @@ def has_any_permission(
     if not permission_codes:
         return False
 
+    mask, is_superuser = _granted_mask(user)
+
     # System Manager and Administrator have all permissions
-    if has_role(user, "System Manager") or has_role(user, "Administrator"):
+    if is_superuser:
         return True
 
-    for code in permission_codes:
-        if has_permission(user, code):
-            return True
-
-    return False
+    return bool(mask & _mask_for(permission_codes))
 
 
 def has_all_permissions(
@@ -165,15 +257,93 @@ def has_all_permissions(
     if not permission_codes:
         return True
 
+    mask, is_superuser = _granted_mask(user)
+
     # System Manager and Administrator have all permissions
-    if has_role(user, "System Manager") or has_role(user, "Administrator"):
+    if is_superuser:
         return True
 
+    # An unknown code can never be held, matching has_permission
+    if any(code not in PERMISSION_BITS for code in permission_codes):
+        return False
+
+    required = _mask_for(permission_codes)
+    return mask & required == required
+
+
+def clear_compiled_permissions(user: str | None = None) -> None:
+    """Invalidate compiled permissions for one user, or for everyone.
+
+    The version is bumped again when the transaction commits, so grants a
+    concurrent request cached from the pre-commit rows are discarded.
+    """
+    namespace = _user_namespace(user) if user else COMPILED_PERMISSIONS_NAMESPACE
+    bump_cache_version(namespace)
+    bump_permission_version(user)
+
+    def clear_local() -> None:
+        if user:
+            _local_cache().pop(user, None)
+        else:
+            _local_cache().clear()
+
+    clear_local()
+    on_rollback(clear_local)
+
+
+def on_role_change(doc: Any, method: str | None = None) -> None:
+    """Role and Role Permission hook: a role's grants may affect any user."""
+    clear_compiled_permissions()
+
+
+def on_user_roles_change(doc: Any, method: str | None = None) -> None:
+    """User hook: the user's role assignments may have changed.
+
+    Has Role rows are saved through their User, which does not fire child
+    doc_events, so this hook covers them. Code that writes Has Role rows
+    directly calls :func:`clear_compiled_permissions` itself.
+    """
+    clear_compiled_permissions(doc.name)
+
+
+def _granted_mask(user: str | None) -> tuple[int, bool]:
+    """Return ``(permission mask, is superuser)``, from token claims when current."""
+    claims = get_request_claims(user or frappe.session.user)
+    if claims is not None:
+        return claims.mask, claims.is_superuser
+
+    compiled = get_compiled_permissions(user)
+    return compiled.mask, compiled.is_superuser
+
+
+def _mask_for(permission_codes: list[str]) -> int:
+    mask = 0
     for code in permission_codes:
-        if not has_permission(user, code):
-            return False
+        mask |= PERMISSION_BITS.get(code, 0)
+    return mask
+
+
+def _compiled_key(user: str) -> str:
+    return ":".join(
+        (
+            COMPILED_PERMISSIONS_NAMESPACE,
+            get_cache_version(COMPILED_PERMISSIONS_NAMESPACE),
+            get_cache_version(_user_namespace(user)),
+            user,
+        )
+    )
+
+
+def _user_namespace(user: str) -> str:
+    return f"{COMPILED_PERMISSIONS_NAMESPACE}:user:{user}"
+
 
-    return True
+def _local_cache() -> dict[str, CompiledPermissions]:
+    cache = getattr(frappe.local, _LOCAL_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(frappe.local, _LOCAL_CACHE_ATTR, cache)
+    return cache
 
 
 def get_permissions_by_category(
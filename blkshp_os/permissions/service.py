@@ -6,8 +6,10 @@ from collections.abc import Iterable, Sequence
 
 import frappe
 from frappe import _
+from frappe.utils import nowdate
 
 from blkshp_os.core_platform.services import get_subscription_context
+from blkshp_os.permissions.claims import get_request_claims
 
 PERMISSION_FLAGS: tuple[str, ...] = (
     "can_read",
@@ -41,6 +43,9 @@ def _user_bypasses_department_permissions(user: str | None) -> bool:
     """Return True if the user should bypass department permission filtering."""
     if not user or user in ("Administrator", "Guest"):
         return True
+    claims = get_request_claims(user)
+    if claims is not None:
+        return claims.bypasses_departments
     user_roles = set(frappe.get_roles(user))
     return any(role in user_roles for role in SYSTEM_ROLES_BYPASS)
 
@@ -51,6 +56,9 @@ def _user_bypasses_subscription_gates(user: str | None) -> bool:
         return False
     if user == "Administrator":
         return True
+    claims = get_request_claims(user)
+    if claims is not None:
+        return claims.bypasses_subscription
     user_roles = set(frappe.get_roles(user))
     return any(role in user_roles for role in SUBSCRIPTION_BYPASS_ROLES)
 
@@ -66,6 +74,84 @@ def get_user_company(user: str | None) -> str | None:
     return frappe.db.get_value("User", user, "company")
 
 
+def get_company_users(companies: Sequence[str]) -> list[str]:
+    """Return the users whose company may be one of ``companies``.
+
+    Covers both sources :func:`get_user_companies` reads: the user's own
+    ``company`` field and the departments the user holds permissions on. Users
+    with departments in several companies are included for each of them.
+    """
+    if not companies:
+        return []
+
+    users: set[str] = set()
+    if frappe.get_meta("User").has_field("company"):
+        users.update(
+            frappe.get_all("User", filters={"company": ["in", list(companies)]}, pluck="name")
+        )
+    users.update(
+        frappe.db.sql_list(
+            """
+            SELECT DISTINCT dp.`parent`
+            FROM `tabDepartment Permission` dp
+            INNER JOIN `tabDepartment` dept ON dept.`name` = dp.`department`
+            WHERE dp.`parenttype` = 'User' AND dept.`company` IN %(companies)s
+            """,
+            {"companies": tuple(companies)},
+        )
+    )
+    return sorted(users)
+
+
+def get_user_companies(
+    users: Sequence[str], matrices: dict[str, dict[str, int]] | None = None
+) -> dict[str, str | None]:
+    """Return the company of each user, resolved in bulk.
+
+    Follows ``UserPermissionMixin.get_company``: the user's own ``company``
+    field when the User DocType has one, otherwise the company of the first
+    department the user can read. ``matrices`` may pass already loaded
+    permission matrices.
+    """
+    from blkshp_os.permissions import matrix as permission_matrix
+
+    companies: dict[str, str | None] = {user: None for user in users}
+    if not companies:
+        return companies
+
+    if frappe.get_meta("User").has_field("company"):
+        for row in frappe.get_all(
+            "User", filters={"name": ["in", list(companies)]}, fields=["name", "company"]
+        ):
+            companies[row.name] = row.company or None
+
+    pending = [user for user, company in companies.items() if not company]
+    if matrices is None:
+        matrices = {}
+    missing = [user for user in pending if user not in matrices]
+    if missing:
+        matrices = {**matrices, **permission_matrix.get_permission_matrices(missing)}
+
+    first_departments = {}
+    for user in pending:
+        departments = permission_matrix.departments_with_flag(matrices.get(user, {}), "can_read")
+        if departments:
+            first_departments[user] = departments[0]
+
+    if first_departments:
+        department_companies = dict(
+            frappe.get_all(
+                "Department",
+                filters={"name": ["in", sorted(set(first_departments.values()))]},
+                fields=["name", "company"],
+                as_list=True,
+            )
+        )
+        for user, department in first_departments.items():
+            companies[user] = department_companies.get(department) or None
+    return companies
+
+
 def get_user_subscription_context(user: str | None, *, refresh: bool = False):
     """Return the subscription context for the supplied user."""
     if not user:
@@ -87,6 +173,9 @@ def user_has_module_access(
         return False
     if _user_bypasses_subscription_gates(user):
         return True
+    claims = get_request_claims(user)
+    if claims is not None and not refresh:
+        return (module_key or "").strip().lower() in claims.modules
     user_doc = frappe.get_cached_doc("User", user)
     check = getattr(user_doc, "is_module_enabled", None)
     if callable(check):
@@ -121,13 +210,24 @@ def user_has_feature(
 def get_accessible_departments(
     user: str, permission_flag: str = "can_read", include_inactive: bool = False
 ) -> list[str]:
-    """Return the list of departments the user may access for the provided permission flag."""
+    """Return the list of departments the user may access for the provided permission flag.
+
+    Unless ``include_inactive`` is set, this reads the user's compiled
+    permission matrix, which also honours ``valid_from``/``valid_upto``.
+    """
     if _user_bypasses_department_permissions(user):
         active_filter = {} if include_inactive else {"is_active": 1}
         return frappe.get_all("Department", filters=active_filter, pluck="name")
 
     validate_permission_flag(permission_flag)
 
+    if not include_inactive:
+        from blkshp_os.permissions import matrix as permission_matrix
+
+        return permission_matrix.departments_with_flag(
+            permission_matrix.get_permission_matrix(user), permission_flag
+        )
+
     permissions = frappe.get_all(
         "Department Permission",
         filters={
@@ -137,23 +237,7 @@ def get_accessible_departments(
         },
         fields=["department"],
     )
-    departments = {row.department for row in permissions if row.department}
-
-    if not departments:
-        return []
-
-    if include_inactive:
-        return sorted(departments)
-
-    active_departments = frappe.get_all(
-        "Department",
-        filters={
-            "name": ["in", list(departments)],
-            "is_active": 1,
-        },
-        pluck="name",
-    )
-    return sorted(active_departments)
+    return sorted({row.department for row in permissions if row.department})
 
 
 def has_department_permission(
@@ -171,9 +255,11 @@ def has_department_permission(
         return False
 
     if not include_inactive:
-        is_active = frappe.db.get_value("Department", department, "is_active") or 0
-        if not is_active:
-            return False
+        from blkshp_os.permissions import matrix as permission_matrix
+
+        return permission_matrix.matrix_allows(
+            permission_matrix.get_permission_matrix(user), department, permission_flag
+        )
 
     filters = {
         "parent": user,
@@ -254,6 +340,34 @@ def build_department_filter_clause(departments: Sequence[str]) -> str:
     return f"`tabDepartment`.`name` in ({safe_departments})"
 
 
+def build_department_exists_clause(
+    user: str,
+    department_column: str,
+    permission_flag: str = "can_read",
+    on_date: str | None = None,
+) -> str:
+    """Return a correlated EXISTS condition granting rows whose department the user may access.
+
+    ``department_column`` is the fully qualified, backquoted column of the outer
+    query that holds the department. The condition applies the same rules as
+    the permission matrix: active departments and rows valid on ``on_date``
+    (default: today in the site's time zone, not the database server's).
+    """
+    validate_permission_flag(permission_flag)
+    on_date = frappe.db.escape(str(on_date or nowdate()))
+    return f"""EXISTS (
+        SELECT 1 FROM `tabDepartment Permission` dp
+        INNER JOIN `tabDepartment` dept ON dept.`name` = dp.`department`
+        WHERE dp.`parenttype` = 'User'
+            AND dp.`parent` = {frappe.db.escape(user)}
+            AND dp.`department` = {department_column}
+            AND dp.`{permission_flag}` = 1
+            AND dept.`is_active` = 1
+            AND (dp.`valid_from` IS NULL OR dp.`valid_from` <= {on_date})
+            AND (dp.`valid_upto` IS NULL OR dp.`valid_upto` >= {on_date})
+    )"""
+
+
 def get_department_permission_clause(
     user: str, permission_flag: str = "can_read"
 ) -> str:
@@ -261,7 +375,6 @@ def get_department_permission_clause(
     if _user_bypasses_department_permissions(user):
         return ""
 
-    departments = get_accessible_departments(user, permission_flag=permission_flag)
-    if not departments:
-        return "1=2"
-    return build_department_filter_clause(departments)
+    return build_department_exists_clause(
+        user, "`tabDepartment`.`name`", permission_flag=permission_flag
+    )
@@ -0,0 +1,149 @@
+"""Tests for permission claims carried in access tokens."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import frappe  # type: ignore[import]
+from frappe.tests.utils import FrappeTestCase  # type: ignore[import]
+
+from blkshp_os.core_platform.services import clear_subscription_context_cache
+from blkshp_os.permissions import claims as permission_claims
+from blkshp_os.permissions import matrix as permission_matrix
+from blkshp_os.permissions import roles as role_service
+from blkshp_os.permissions import service as permission_service
+
+
+class TestPermissionClaims(FrappeTestCase):
+    """Validate claim building, version checks and zero-query lookups."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.test_user = self._ensure_user("claims_test@example.com")
+        self.other_user = self._ensure_user("claims_other@example.com")
+
+    def tearDown(self) -> None:
+        permission_claims.clear_request_claims()
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_build_claims_for_regular_user(self) -> None:
+        claims = permission_claims.build_permission_claims(self.test_user)
+
+        self.assertEqual(claims["pv"], permission_claims.get_permission_version(self.test_user))
+        self.assertEqual(
+            int(claims["pc"], 16), role_service.get_compiled_permissions(self.test_user).mask
+        )
+        self.assertEqual(claims["byp"], 0)
+        self.assertEqual(claims["dp"], permission_matrix.get_permission_matrix(self.test_user))
+        self.assertIsInstance(claims["mods"], list)
+
+    def test_current_claims_answer_checks_without_lookups(self) -> None:
+        payload = self._payload(
+            pc=format(role_service.PERMISSION_BITS["orders.view"], "x"),
+            dp={"CLAIMS-DEPT": permission_matrix.FLAG_BITS["can_read"]},
+            mods=["inventory"],
+        )
+        self.assertTrue(permission_claims.activate_claims(self.test_user, payload))
+
+        with (
+            patch.object(role_service, "get_compiled_permissions") as mock_compiled,
+            patch.object(permission_matrix, "compile_permission_matrix") as mock_matrix,
+            patch.object(permission_service, "get_subscription_context") as mock_context,
+        ):
+            self.assertTrue(role_service.has_permission(self.test_user, "orders.view"))
+            self.assertFalse(role_service.has_permission(self.test_user, "orders.create"))
+            self.assertTrue(
+                permission_service.has_department_permission(self.test_user, "CLAIMS-DEPT")
+            )
+            self.assertFalse(
+                permission_service.has_department_permission(
+                    self.test_user, "CLAIMS-DEPT", "can_write"
+                )
+            )
+            self.assertTrue(permission_service.user_has_module_access(self.test_user, "inventory"))
+            self.assertFalse(permission_service.user_has_module_access(self.test_user, "recipes"))
+
+        mock_compiled.assert_not_called()
+        mock_matrix.assert_not_called()
+        mock_context.assert_not_called()
+
+        # Claims only apply to the user they were issued for
+        self.assertIsNone(permission_claims.get_request_claims(self.other_user))
+
+    def test_permission_changes_make_claims_stale(self) -> None:
+        payload = self._payload()
+        self.assertTrue(permission_claims.activate_claims(self.test_user, payload))
+
+        role_service.clear_compiled_permissions(self.test_user)
+
+        self.assertIsNone(permission_claims.get_request_claims(self.test_user))
+        self.assertFalse(permission_claims.activate_claims(self.test_user, payload))
+
+        payload = self._payload()
+        permission_matrix.clear_permission_matrix_cache()
+        self.assertFalse(permission_claims.activate_claims(self.test_user, payload))
+
+        # Another user's change leaves these claims current
+        payload = self._payload()
+        permission_matrix.clear_user_permission_matrix(self.other_user)
+        self.assertTrue(permission_claims.activate_claims(self.test_user, payload))
+
+    def test_subscription_changes_only_stale_affected_users(self) -> None:
+        payload = self._payload()
+        clear_subscription_context_cache(company="Claims Unrelated Company")
+        self.assertTrue(permission_claims.activate_claims(self.test_user, payload))
+
+        with patch.object(
+            permission_service, "get_company_users", return_value=[self.test_user]
+        ):
+            clear_subscription_context_cache(company="Claims Unrelated Company")
+        self.assertFalse(permission_claims.activate_claims(self.test_user, payload))
+
+    def test_pipelined_permission_versions_match(self) -> None:
+        users = [self.test_user, self.other_user]
+        permission_claims.bump_permission_version(self.other_user)
+
+        cache = frappe.cache()
+        pipe = cache.pipeline()
+        for key in permission_claims.permission_version_keys(users):
+            pipe.get(cache.make_key(key))
+        versions = permission_claims.permission_versions_from_values(users, pipe.execute())
+
+        self.assertEqual(
+            versions, {user: permission_claims.get_permission_version(user) for user in users}
+        )
+
+    def test_tokens_without_claims_are_not_trusted(self) -> None:
+        self.assertFalse(permission_claims.activate_claims(self.test_user, {"user": self.test_user}))
+        self.assertIsNone(permission_claims.get_request_claims(self.test_user))
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _payload(self, **claims) -> dict:
+        return {
+            "user": self.test_user,
+            "pv": permission_claims.get_permission_version(self.test_user),
+            "pc": "0",
+            "dp": {},
+            "mods": [],
+            "byp": 0,
+            **claims,
+        }
+
+    def _ensure_user(self, email: str) -> str:
+        if frappe.db.exists("User", email):
+            return email
+
+        frappe.get_doc(
+            {
+                "doctype": "User",
+                "email": email,
+                "first_name": "Claims",
+                "last_name": "Test",
+                "send_welcome_email": 0,
+            }
+        ).insert(ignore_permissions=True)
+        return email
@@ -8,7 +8,7 @@ import frappe  # type: ignore[import]
 from frappe.tests.utils import FrappeTestCase  # type: ignore[import]
 
 from blkshp_os.core_platform.services import clear_subscription_context_cache
-from blkshp_os.permissions import service
+from blkshp_os.permissions import matrix, service
 
 
 class TestPermissionService(FrappeTestCase):
@@ -67,6 +67,90 @@ class TestPermissionService(FrappeTestCase):
             service.has_department_permission(self.user, self.kitchen.name, "can_write")
         )
 
+    def test_expired_permissions_are_ignored(self) -> None:
+        self._create_department_permission(self.kitchen.name, can_read=1)
+        expired = frappe.get_doc(
+            {
+                "doctype": "Department Permission",
+                "parent": self.user,
+                "parenttype": "User",
+                "parentfield": "department_permissions",
+                "department": self.bar.name,
+                "can_read": 1,
+                "valid_from": "2000-01-01",
+                "valid_upto": "2000-12-31",
+            }
+        )
+        expired.insert(ignore_permissions=True)
+
+        self.assertEqual(service.get_accessible_departments(self.user), [self.kitchen.name])
+        self.assertFalse(service.has_department_permission(self.user, self.bar.name))
+
+    def test_permission_matrix_refreshes_after_grant(self) -> None:
+        self._create_department_permission(self.kitchen.name, can_read=1)
+        self.assertFalse(
+            service.has_department_permission(self.user, self.bar.name, "can_write")
+        )
+
+        self._create_department_permission(self.bar.name, can_read=1, can_write=1)
+
+        self.assertTrue(
+            service.has_department_permission(self.user, self.bar.name, "can_write")
+        )
+        self.assertEqual(
+            service.get_accessible_departments(self.user, "can_write"), [self.bar.name]
+        )
+
+    def test_permission_matrix_cached_before_commit_is_discarded(self) -> None:
+        self._create_department_permission(self.kitchen.name, can_read=1)
+        stale = matrix.compile_permission_matrix(self.user)
+        matrix.clear_user_permission_matrix(self.user)
+
+        # Another worker reads the committed rows before this transaction commits
+        frappe.cache().set_value(matrix._matrix_key(self.user), stale)
+        frappe.db.after_commit.run()
+
+        self.assertIsNone(frappe.cache().get_value(matrix._matrix_key(self.user)))
+
+    def test_department_permission_clause_uses_exists_subquery(self) -> None:
+        self._create_department_permission(self.kitchen.name, can_read=1)
+
+        clause = service.get_department_permission_clause(self.user)
+        self.assertIn("EXISTS", clause)
+        self.assertNotIn(self.kitchen.name, clause)
+
+        visible = frappe.db.sql_list(
+            f"select `tabDepartment`.`name` from `tabDepartment` where {clause}"
+        )
+        self.assertIn(self.kitchen.name, visible)
+        self.assertNotIn(self.bar.name, visible)
+
+    def test_department_permission_clause_honours_validity_dates(self) -> None:
+        frappe.get_doc(
+            {
+                "doctype": "Department Permission",
+                "parent": self.user,
+                "parenttype": "User",
+                "parentfield": "department_permissions",
+                "department": self.kitchen.name,
+                "can_read": 1,
+                "valid_from": "2030-01-01",
+                "valid_upto": "2030-12-31",
+            }
+        ).insert(ignore_permissions=True)
+
+        def visible(on_date: str) -> list[str]:
+            clause = service.build_department_exists_clause(
+                self.user, "`tabDepartment`.`name`", on_date=on_date
+            )
+            return frappe.db.sql_list(
+                f"select `tabDepartment`.`name` from `tabDepartment` where {clause}"
+            )
+
+        self.assertIn(self.kitchen.name, visible("2030-06-01"))
+        self.assertNotIn(self.kitchen.name, visible("2029-12-31"))
+        self.assertNotIn(self.kitchen.name, visible("2031-01-01"))
+
     def test_system_manager_bypasses_department_restrictions(self) -> None:
         user_doc = frappe.get_doc("User", self.user)
         user_doc.add_roles("System Manager")
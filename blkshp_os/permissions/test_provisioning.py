@@ -0,0 +1,184 @@
+"""Tests for bulk Department Permission provisioning."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, nowdate
+
+from blkshp_os.permissions import provisioning, service
+
+
+class TestDepartmentPermissionProvisioning(FrappeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        frappe.set_user("Administrator")
+        self.company = self._ensure_company("Provisioning Test Company")
+        self.kitchen = self._create_department("PROV-KIT", "Provision Kitchen")
+        self.bar = self._create_department("PROV-BAR", "Provision Bar")
+        self.users = [
+            self._ensure_user(f"provision_{index}@example.com") for index in range(3)
+        ]
+
+    def tearDown(self) -> None:
+        frappe.set_user("Administrator")
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_grant_creates_rows_and_refreshes_access(self) -> None:
+        result = provisioning.grant_department_permissions(
+            self.users, [self.kitchen, self.bar], ["can_read"]
+        )
+
+        self.assertEqual(result["created"], 6)
+        self.assertEqual(result["failed"], [])
+        for user in self.users:
+            self.assertCountEqual(
+                service.get_accessible_departments(user), [self.kitchen, self.bar]
+            )
+
+        result = provisioning.grant_department_permissions(
+            self.users[:1], [self.kitchen], ["can_write"]
+        )
+        self.assertEqual(result["updated"], 1)
+        self.assertTrue(
+            service.has_department_permission(self.users[0], self.kitchen, "can_read")
+        )
+        self.assertTrue(
+            service.has_department_permission(self.users[0], self.kitchen, "can_write")
+        )
+
+    def test_grant_renews_expired_rows(self) -> None:
+        user = self.users[0]
+        provisioning.grant_department_permissions(
+            [user], [self.kitchen], ["can_read"], valid_upto=add_days(nowdate(), -1)
+        )
+        frappe.db.set_value(
+            "Department Permission",
+            {"parent": user, "department": self.kitchen},
+            "is_active",
+            0,
+        )
+        self.assertFalse(
+            service.has_department_permission(user, self.kitchen, "can_read")
+        )
+
+        result = provisioning.grant_department_permissions(
+            [user], [self.kitchen], ["can_read"], valid_upto=add_days(nowdate(), 30)
+        )
+
+        self.assertEqual(result["updated"], 1)
+        self.assertTrue(service.has_department_permission(user, self.kitchen, "can_read"))
+        self.assertEqual(
+            frappe.db.get_value(
+                "Department Permission",
+                {"parent": user, "department": self.kitchen},
+                "is_active",
+            ),
+            1,
+        )
+
+    def test_grant_reports_invalid_pairs(self) -> None:
+        frappe.db.set_value("Department", self.bar, "is_active", 0)
+
+        result = provisioning.grant_department_permissions(
+            [self.users[0], "missing@example.com"], [self.kitchen, self.bar], ["can_read"]
+        )
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(len(result["failed"]), 3)
+
+        with self.assertRaises(frappe.ValidationError):
+            provisioning.grant_department_permissions(
+                self.users, [self.kitchen], ["can_fly"]
+            )
+
+    def test_revoke_flags_and_rows(self) -> None:
+        provisioning.grant_department_permissions(
+            self.users, [self.kitchen], ["can_read", "can_write"]
+        )
+
+        result = provisioning.revoke_department_permissions(
+            self.users, [self.kitchen], ["can_write"]
+        )
+        self.assertEqual(result, {"updated": 3, "deleted": 0})
+        self.assertFalse(
+            service.has_department_permission(self.users[0], self.kitchen, "can_write")
+        )
+
+        result = provisioning.revoke_department_permissions(
+            self.users, [self.kitchen], ["can_read"]
+        )
+        self.assertEqual(result, {"updated": 0, "deleted": 3})
+        self.assertEqual(service.get_accessible_departments(self.users[0]), [])
+
+    def test_clone_copies_source_access(self) -> None:
+        source, *targets = self.users
+        provisioning.grant_department_permissions([source], [self.kitchen], ["can_read"])
+        provisioning.grant_department_permissions(targets[:1], [self.bar], ["can_read"])
+
+        result = provisioning.clone_department_permissions(source, targets, replace=True)
+
+        self.assertEqual(result["created"], 2)
+        for user in targets:
+            self.assertEqual(service.get_accessible_departments(user), [self.kitchen])
+
+    def test_grant_refreshes_cached_user_documents(self) -> None:
+        user = self.users[0]
+        self.assertEqual(frappe.get_cached_doc("User", user).department_permissions, [])
+
+        provisioning.grant_department_permissions([user], [self.kitchen], ["can_read"])
+
+        rows = frappe.get_cached_doc("User", user).department_permissions
+        self.assertEqual([row.department for row in rows], [self.kitchen])
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _ensure_company(self, name: str) -> str:
+        existing = frappe.db.exists("Company", {"company_name": name})
+        if existing:
+            return existing
+
+        company = frappe.get_doc(
+            {
+                "doctype": "Company",
+                "company_name": name,
+                "company_code": "PROVCO",
+                "default_currency": "USD",
+            }
+        )
+        company.insert(ignore_permissions=True)
+        return company.name
+
+    def _ensure_user(self, email: str) -> str:
+        if not frappe.db.exists("User", email):
+            frappe.get_doc(
+                {
+                    "doctype": "User",
+                    "email": email,
+                    "first_name": "Provision",
+                    "send_welcome_email": 0,
+                }
+            ).insert(ignore_permissions=True)
+        return email
+
+    def _create_department(self, code: str, name: str) -> str:
+        existing = frappe.db.exists(
+            "Department", {"department_code": code, "company": self.company}
+        )
+        if existing:
+            return existing
+
+        department = frappe.get_doc(
+            {
+                "doctype": "Department",
+                "department_code": code,
+                "department_name": name,
+                "department_type": "Food",
+                "company": self.company,
+            }
+        )
+        department.insert(ignore_permissions=True)
+        return department.name
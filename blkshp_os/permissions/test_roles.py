@@ -79,6 +79,53 @@ class TestRolesService(FrappeTestCase):
         self.assertTrue(role_service.has_permission(self.test_user, "orders.view"))
         self.assertFalse(role_service.has_permission(self.test_user, "orders.create"))
 
+    def test_compiled_permissions_refresh_after_role_changes(self) -> None:
+        """Test that cached permission checks follow role and assignment changes."""
+        user_doc = frappe.get_doc("User", self.test_user)
+        user_doc.append("roles", {"role": self.test_role})
+        user_doc.save(ignore_permissions=True)
+        self.assertFalse(role_service.has_permission(self.test_user, "orders.view"))
+
+        role_service.update_role_permissions(
+            self.test_role, ["orders.view", "orders.create"], replace=False
+        )
+
+        compiled = role_service.get_compiled_permissions(self.test_user)
+        self.assertTrue(compiled.allows("orders.view"))
+        self.assertTrue(
+            role_service.has_all_permissions(
+                self.test_user, ["orders.view", "orders.create"]
+            )
+        )
+        self.assertFalse(
+            role_service.has_all_permissions(
+                self.test_user, ["orders.view", "unknown.permission"]
+            )
+        )
+        self.assertIn("orders.view", role_service.get_user_permissions(self.test_user))
+
+        role_service.revoke_role_permission(self.test_role, "orders.view")
+        self.assertFalse(role_service.has_permission(self.test_user, "orders.view"))
+        self.assertTrue(
+            role_service.has_any_permission(
+                self.test_user, ["orders.view", "orders.create"]
+            )
+        )
+
+    def test_compiled_permissions_cached_before_commit_are_discarded(self) -> None:
+        """A reader that caches grants between a revocation and its commit is not trusted."""
+        user_doc = frappe.get_doc("User", self.test_user)
+        user_doc.append("roles", {"role": self.test_role})
+        user_doc.save(ignore_permissions=True)
+        role_service.update_role_permissions(self.test_role, ["orders.view"], replace=False)
+        stale = role_service.compile_permissions(self.test_user)
+
+        role_service.revoke_role_permission(self.test_role, "orders.view")
+        frappe.cache().set_value(role_service._compiled_key(self.test_user), stale)
+        frappe.db.after_commit.run()
+
+        self.assertFalse(role_service.has_permission(self.test_user, "orders.view"))
+
     def test_system_manager_has_all_permissions(self) -> None:
         """Test that System Manager has all permissions."""
         admin_user = "Administrator"
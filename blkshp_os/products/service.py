@@ -9,7 +9,9 @@ from typing import Any
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import cint, flt, now
 
+from blkshp_os.departments.stats import refresh_department_stats
 from blkshp_os.permissions.service import (
     get_accessible_departments,
     has_department_permission,
@@ -28,6 +30,26 @@ DEFAULT_LIST_FIELDS: list[str] = [
     "active",
 ]
 
+# Fields that no Product controller logic derives from or cross-validates, so
+# bulk changes can be applied with a single UPDATE. Values are the Link target
+# (validated in one query per doctype) or None for scalar fields.
+BULK_SQL_FIELDS: dict[str, str | None] = {
+    "category": "Product Category",
+    "subcategory": "Product Category",
+    "preferred_vendor": "Vendor",
+    "gl_code": "Account",
+    "active": None,
+    "bin_location": None,
+    "valuation_method": None,
+    "valuation_rate": None,
+    "default_incoming_rate": None,
+}
+BULK_CHECK_FIELDS = ("active",)
+BULK_NON_NEGATIVE_FIELDS = ("valuation_rate", "default_incoming_rate")
+BULK_VALUATION_METHODS = ("Moving Average", "FIFO", "Manual")
+BULK_PAR_LEVEL_KEY = "par_levels"
+BULK_PAR_LEVEL_FIELDS = ("par_level", "order_quantity")
+
 _BYPASS_USERS = {"Administrator", "Guest"}
 _BYPASS_ROLES = {"System Manager"}
 
@@ -204,6 +226,305 @@ def update_product(
     return doc.as_dict()
 
 
+def bulk_update_products(
+    changes: Sequence[dict[str, Any]], user: str | None = None
+) -> dict[str, Any]:
+    """Apply field-level updates to many products with a single validation pass.
+
+    Each change is ``{"product": name, "data": {...}}``. ``data`` may carry a
+    ``par_levels`` mapping of department to ``par_level``/``order_quantity``
+    overrides for existing Product Department rows.
+
+    Changes limited to :data:`BULK_SQL_FIELDS` and existing par-level rows are
+    validated against prefetched data and written with set-based UPDATEs.
+    Anything else falls back to :func:`update_product` so the Product
+    controller runs. Returns one result per change; failures do not abort the
+    rest of the batch.
+    """
+    user = _get_user(user)
+    items = [_normalize_bulk_change(change) for change in changes or []]
+    names = sorted({item["product"] for item in items if item["product"]})
+
+    products: dict[str, Any] = {}
+    if names:
+        products = {
+            row.name: row
+            for row in frappe.get_all(
+                "Product",
+                filters={"name": ["in", names]},
+                fields=["name", "is_non_inventory"],
+            )
+        }
+    department_map = _get_product_departments(names)
+    can_write_products = frappe.has_permission("Product", "write", user=user)
+    bypass = _user_bypasses_department_permissions(user)
+    writable: set[str] = set()
+    if not bypass:
+        writable = set(get_accessible_departments(user, permission_flag="can_write"))
+    existing_links = _prefetch_bulk_links(items)
+
+    results: list[dict[str, Any]] = []
+    sql_items: list[dict[str, Any]] = []
+    document_items: list[dict[str, Any]] = []
+
+    for item in items:
+        result = {"product": item["product"], "status": "failed", "mode": None, "error": None}
+        results.append(result)
+        item["result"] = result
+
+        error = _validate_bulk_change(
+            item,
+            products,
+            department_map,
+            can_write_products=can_write_products,
+            bypass=bypass,
+            writable=writable,
+            existing_links=existing_links,
+        )
+        if error:
+            result["error"] = error
+            continue
+
+        if _is_sql_safe_change(item, department_map):
+            # The document path checks the Product itself in update_product;
+            # set-based writes must apply User Permissions and owner rules here.
+            if not frappe.has_permission("Product", "write", doc=item["product"], user=user):
+                result["error"] = _("You do not have permission to update Product {0}.").format(
+                    item["product"]
+                )
+                continue
+            result["mode"] = "sql"
+            sql_items.append(item)
+        else:
+            result["mode"] = "document"
+            document_items.append(item)
+
+    _apply_sql_changes(sql_items, user)
+    for item in sql_items:
+        item["result"]["status"] = "updated"
+    # Set-based writes skip the Product hooks that keep Department Stats current.
+    refresh_department_stats(
+        department
+        for item in sql_items
+        if "valuation_rate" in item["data"]
+        for department in department_map.get(item["product"], set())
+    )
+
+    for item in document_items:
+        _apply_document_change(item, user)
+
+    updated = sum(1 for result in results if result["status"] == "updated")
+    return {
+        "results": results,
+        "updated": updated,
+        "failed": len(results) - updated,
+        "total": len(results),
+    }
+
+
+def _normalize_bulk_change(change: dict[str, Any]) -> dict[str, Any]:
+    if isinstance(change, str):
+        change = frappe.parse_json(change)
+    change = change if isinstance(change, dict) else {}
+    data = change.get("data") or {}
+    if isinstance(data, str):
+        data = frappe.parse_json(data)
+    return {
+        "product": change.get("product") or change.get("name"),
+        "data": data if isinstance(data, dict) else {},
+    }
+
+
+def _prefetch_bulk_links(items: Sequence[dict[str, Any]]) -> dict[str, set[str]]:
+    """Return the existing names of every Link target referenced by the batch."""
+    requested: dict[str, set[str]] = defaultdict(set)
+    for item in items:
+        for field, value in item["data"].items():
+            target = BULK_SQL_FIELDS.get(field)
+            if target and value:
+                requested[target].add(value)
+
+    return {
+        doctype: set(
+            frappe.get_all(doctype, filters={"name": ["in", list(values)]}, pluck="name")
+        )
+        for doctype, values in requested.items()
+    }
+
+
+def _validate_bulk_change(
+    item: dict[str, Any],
+    products: dict[str, Any],
+    department_map: dict[str, set[str]],
+    *,
+    can_write_products: bool,
+    bypass: bool,
+    writable: set[str],
+    existing_links: dict[str, set[str]],
+) -> str | None:
+    """Return an error message for the change, or None when it may be applied."""
+    product = item["product"]
+    data = item["data"]
+    if not product:
+        return _("Product name is required.")
+    if product not in products:
+        return _("Product {0} does not exist.").format(product)
+    if not data:
+        return _("No changes supplied.")
+    if not can_write_products:
+        return _("You do not have permission to update products.")
+
+    departments = department_map.get(product, set())
+    if not bypass and departments and not products[product].is_non_inventory:
+        denied = sorted(departments - writable)
+        if denied:
+            return _("You lack can_write permission for Department {0}.").format(denied[0])
+
+    error = _coerce_bulk_values(data)
+    if error:
+        return error
+
+    for field, value in data.items():
+        target = BULK_SQL_FIELDS.get(field)
+        if target and value and value not in existing_links.get(target, set()):
+            return _("{0} {1} does not exist.").format(target, value)
+        if field in BULK_NON_NEGATIVE_FIELDS and flt(value) < 0:
+            return _("Field {0} cannot be negative.").format(field)
+        if field == "valuation_method" and value not in BULK_VALUATION_METHODS:
+            return _("Invalid valuation method {0}.").format(value)
+
+    par_levels = data.get(BULK_PAR_LEVEL_KEY) or {}
+    if not isinstance(par_levels, dict):
+        return _("{0} must map departments to par level values.").format(BULK_PAR_LEVEL_KEY)
+    for department, values in par_levels.items():
+        if not isinstance(values, dict):
+            return _("Par levels for Department {0} must be an object.").format(department)
+        if not bypass and department not in writable:
+            return _("You lack can_write permission for Department {0}.").format(department)
+        for field in BULK_PAR_LEVEL_FIELDS:
+            if values.get(field) is not None and flt(values[field]) < 0:
+                return _("Field {0} cannot be negative for department {1}.").format(
+                    field, department
+                )
+    return None
+
+
+def _coerce_bulk_values(data: dict[str, Any]) -> str | None:
+    """Cast :data:`BULK_SQL_FIELDS` values to their column types in place."""
+    for field, value in list(data.items()):
+        if field not in BULK_SQL_FIELDS or value is None:
+            continue
+        if isinstance(value, list | dict):
+            return _("Field {0} must be a single value.").format(field)
+        if field in BULK_CHECK_FIELDS:
+            data[field] = 1 if cint(value) else 0
+        elif field in BULK_NON_NEGATIVE_FIELDS:
+            data[field] = flt(value)
+        else:
+            data[field] = str(value)
+    return None
+
+
+def _is_sql_safe_change(item: dict[str, Any], department_map: dict[str, set[str]]) -> bool:
+    data = item["data"]
+    if any(field not in BULK_SQL_FIELDS and field != BULK_PAR_LEVEL_KEY for field in data):
+        return False
+    assigned = department_map.get(item["product"], set())
+    return all(department in assigned for department in data.get(BULK_PAR_LEVEL_KEY) or {})
+
+
+def _apply_sql_changes(items: Sequence[dict[str, Any]], user: str) -> None:
+    """Write SQL-safe changes with one UPDATE per distinct change set."""
+    if not items:
+        return
+
+    timestamp = now()
+    product_groups: dict[tuple[tuple[str, Any], ...], list[str]] = defaultdict(list)
+    par_groups: dict[tuple[str, tuple[tuple[str, Any], ...]], list[str]] = defaultdict(list)
+
+    for item in items:
+        fields = tuple(
+            sorted(
+                (field, value)
+                for field, value in item["data"].items()
+                if field in BULK_SQL_FIELDS
+            )
+        )
+        product_groups[fields].append(item["product"])
+        for department, values in (item["data"].get(BULK_PAR_LEVEL_KEY) or {}).items():
+            par_values = tuple(
+                (field, flt(values[field]))
+                for field in BULK_PAR_LEVEL_FIELDS
+                if values.get(field) is not None
+            )
+            if par_values:
+                par_groups[(department, par_values)].append(item["product"])
+
+    for (department, par_values), names in par_groups.items():
+        assignments = ", ".join(f"`{field}` = %({field})s" for field, _value in par_values)
+        frappe.db.sql(
+            f"""
+            UPDATE `tabProduct Department`
+            SET {assignments}, `modified` = %(modified)s, `modified_by` = %(user)s
+            WHERE `parenttype` = 'Product' AND `department` = %(department)s
+                AND `parent` IN %(names)s
+            """,
+            {
+                **dict(par_values),
+                "department": department,
+                "modified": timestamp,
+                "user": user,
+                "names": tuple(names),
+            },
+        )
+
+    # Every changed product gets its modified stamp bumped, including
+    # par-level-only changes, so delta sync clients pick them up.
+    for fields, names in product_groups.items():
+        assignments = "".join(f"`{field}` = %(f_{field})s, " for field, _value in fields)
+        frappe.db.sql(
+            f"""
+            UPDATE `tabProduct`
+            SET {assignments}`modified` = %(modified)s, `modified_by` = %(user)s
+            WHERE `name` IN %(names)s
+            """,
+            {
+                **{f"f_{field}": value for field, value in fields},
+                "modified": timestamp,
+                "user": user,
+                "names": tuple(names),
+            },
+        )
+
+
+def _apply_document_change(item: dict[str, Any], user: str) -> None:
+    """Apply a change through the Product controller, isolating failures."""
+    result = item["result"]
+    data = dict(item["data"])
+    par_levels = data.pop(BULK_PAR_LEVEL_KEY, None) or {}
+    savepoint = "bulk_product_update"
+    frappe.db.savepoint(savepoint)
+    try:
+        doc = frappe.get_doc("Product", item["product"])
+        doc.update(data)
+        for department, values in par_levels.items():
+            row = next(
+                (r for r in doc.get("departments", []) if r.department == department),
+                None,
+            )
+            if not row:
+                row = doc.append("departments", {"department": department})
+            for field in BULK_PAR_LEVEL_FIELDS:
+                if values.get(field) is not None:
+                    row.set(field, flt(values[field]))
+        _validate_user_can_modify_product(doc, user, permission_flag="can_write")
+        doc.save(ignore_permissions=True)
+        result["status"] = "updated"
+    except Exception as exc:
+        frappe.db.rollback(save_point=savepoint)
+        result["error"] = str(exc)
+
+
 def user_can_access_product(
     product: Document | str, user: str | None = None, permission_flag: str = "can_read"
 ) -> bool:
@@ -0,0 +1,238 @@
+"""Delta sync of the product catalog for SPA and offline clients.
+
+Clients bootstrap from :func:`export_snapshot` and then poll
+:func:`changes_since` with the cursor returned by the previous call. Rows are
+returned in a columnar layout (``{"columns": [...], "rows": [[...], ...]}``)
+to keep payloads compact.
+
+Changes are detected from ``Product.modified``; any edit to a child table
+(Product Department, purchase units) bumps the parent's ``modified``, so child
+rows are always sent as the complete set for each changed product and clients
+replace them wholesale. Deleted products are read from Frappe's
+``Deleted Document`` log.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from typing import Any
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from blkshp_os.products.service import (
+    DEFAULT_LIST_FIELDS,
+    _filter_rows_by_permission,
+    _get_user,
+)
+
+SYNC_PRODUCT_FIELDS: list[str] = [
+    *DEFAULT_LIST_FIELDS,
+    "category",
+    "subcategory",
+    "volume_conversion_unit",
+    "volume_conversion_factor",
+    "weight_conversion_unit",
+    "weight_conversion_factor",
+    "valuation_method",
+    "valuation_rate",
+    "has_batch_no",
+    "modified",
+]
+
+SYNC_CHILD_TABLES: dict[str, tuple[str, list[str]]] = {
+    "departments": (
+        "Product Department",
+        [
+            "parent",
+            "idx",
+            "department",
+            "is_primary",
+            "default_storage_area",
+            "par_level",
+            "order_quantity",
+        ],
+    ),
+    "purchase_units": (
+        "Product Purchase Unit",
+        [
+            "parent",
+            "idx",
+            "name",
+            "purchase_unit",
+            "vendor",
+            "conversion_to_primary_cu",
+            "price",
+            "is_preferred",
+            "active",
+        ],
+    ),
+}
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+_EPOCH = "1970-01-01 00:00:00"
+
+
+def changes_since(
+    cursor: str | None = None,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    user: str | None = None,
+) -> dict[str, Any]:
+    """Return products changed or deleted after ``cursor``.
+
+    Pass the returned ``cursor`` to the next call. When ``has_more`` is True the
+    client should keep calling until it is False.
+    """
+    user = _get_user(user)
+    limit = max(1, min(cint(limit) or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    state = decode_cursor(cursor)
+
+    products = _fetch_changed_products(state["p"], limit + 1)
+    has_more = len(products) > limit
+    products = products[:limit]
+    if products:
+        state["p"] = [str(products[-1]["modified"]), products[-1]["name"]]
+
+    deletions: list[list[Any]] = []
+    if cursor:
+        deleted = _fetch_deletions(state["d"], limit + 1)
+        has_more = has_more or len(deleted) > limit
+        deleted = deleted[:limit]
+        if deleted:
+            state["d"] = [str(deleted[-1]["creation"]), deleted[-1]["name"]]
+        deletions = [[row["deleted_name"], row["creation"]] for row in deleted]
+    else:
+        # First page of a bootstrap: earlier deletions are irrelevant to the client.
+        state["d"] = _latest_deletion_marker()
+
+    visible = _filter_rows_by_permission(products, user, permission_flag="can_read")
+    return {
+        "cursor": encode_cursor(state),
+        "has_more": has_more,
+        "products": _to_columnar(visible, SYNC_PRODUCT_FIELDS),
+        "children": _fetch_children([row["name"] for row in visible]),
+        "deleted": {"columns": ["name", "deleted_at"], "rows": deletions},
+    }
+
+
+def export_snapshot(*, user: str | None = None) -> dict[str, Any]:
+    """Return the full catalog visible to the user plus a cursor for delta sync."""
+    user = _get_user(user)
+    deletion_marker = _latest_deletion_marker()
+
+    products = _fetch_changed_products([_EPOCH, ""], None)
+    state = {"p": [_EPOCH, ""], "d": deletion_marker}
+    if products:
+        state["p"] = [str(products[-1]["modified"]), products[-1]["name"]]
+
+    visible = _filter_rows_by_permission(products, user, permission_flag="can_read")
+    return {
+        "cursor": encode_cursor(state),
+        "has_more": False,
+        "products": _to_columnar(visible, SYNC_PRODUCT_FIELDS),
+        "children": _fetch_children([row["name"] for row in visible]),
+        "deleted": {"columns": ["name", "deleted_at"], "rows": []},
+    }
+
+
+def encode_cursor(state: dict[str, list[str]]) -> str:
+    """Encode the sync high-water marks as an opaque URL-safe token."""
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> dict[str, list[str]]:
+    """Decode a cursor produced by :func:`encode_cursor`."""
+    if not cursor:
+        return {"p": [_EPOCH, ""], "d": [_EPOCH, ""]}
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return {
+            "p": [str(state["p"][0]), str(state["p"][1])],
+            "d": [str(state["d"][0]), str(state["d"][1])],
+        }
+    except (binascii.Error, ValueError, KeyError, IndexError, TypeError):
+        frappe.throw(_("Invalid sync cursor."), frappe.ValidationError)
+
+
+def _fetch_changed_products(
+    marker: Sequence[str], limit: int | None
+) -> list[dict[str, Any]]:
+    columns = ", ".join(f"`{field}`" for field in SYNC_PRODUCT_FIELDS)
+    limit_clause = f"LIMIT {cint(limit)}" if limit else ""
+    return frappe.db.sql(
+        f"""
+        SELECT {columns}
+        FROM `tabProduct`
+        WHERE `modified` > %(ts)s OR (`modified` = %(ts)s AND `name` > %(name)s)
+        ORDER BY `modified` ASC, `name` ASC
+        {limit_clause}
+        """,
+        {"ts": marker[0], "name": marker[1]},
+        as_dict=True,
+    )
+
+
+def _fetch_deletions(marker: Sequence[str], limit: int) -> list[dict[str, Any]]:
+    return frappe.db.sql(
+        """
+        SELECT `name`, `deleted_name`, `creation`
+        FROM `tabDeleted Document`
+        WHERE `deleted_doctype` = 'Product'
+            AND (`creation` > %(ts)s OR (`creation` = %(ts)s AND `name` > %(name)s))
+        ORDER BY `creation` ASC, `name` ASC
+        LIMIT %(limit)s
+        """,
+        {"ts": marker[0], "name": marker[1], "limit": cint(limit)},
+        as_dict=True,
+    )
+
+
+def _latest_deletion_marker() -> list[str]:
+    rows = frappe.db.sql(
+        """
+        SELECT `name`, `creation`
+        FROM `tabDeleted Document`
+        WHERE `deleted_doctype` = 'Product'
+        ORDER BY `creation` DESC, `name` DESC
+        LIMIT 1
+        """,
+        as_dict=True,
+    )
+    if not rows:
+        return [_EPOCH, ""]
+    return [str(rows[0]["creation"]), rows[0]["name"]]
+
+
+def _fetch_children(product_names: Sequence[str]) -> dict[str, dict[str, Any]]:
+    children: dict[str, dict[str, Any]] = {}
+    for fieldname, (doctype, fields) in SYNC_CHILD_TABLES.items():
+        rows: list[dict[str, Any]] = []
+        if product_names:
+            rows = frappe.get_all(
+                doctype,
+                filters={
+                    "parent": ["in", list(product_names)],
+                    "parenttype": "Product",
+                    "parentfield": fieldname,
+                },
+                fields=fields,
+                order_by="parent asc, idx asc",
+            )
+        children[fieldname] = _to_columnar(rows, fields)
+    return children
+
+
+def _to_columnar(rows: Sequence[dict[str, Any]], fields: Sequence[str]) -> dict[str, Any]:
+    return {
+        "columns": list(fields),
+        "rows": [[row.get(field) for field in fields] for row in rows],
+    }
@@ -73,6 +73,117 @@ class TestProductService(FrappeTestCase):
 
         self.assertAlmostEqual(result["converted_quantity"], 128 / 12, places=4)
 
+    def test_bulk_update_products_applies_sql_safe_changes(self) -> None:
+        frappe.set_user("Administrator")
+        first = self._create_product("Bulk Salt", self.kitchen.name)
+        second = self._create_product("Bulk Pepper", self.kitchen.name)
+
+        response = product_service.bulk_update_products(
+            [
+                {"product": first, "data": {"bin_location": "A1", "valuation_rate": 2}},
+                {"product": second, "data": {"bin_location": "A1", "valuation_rate": 2}},
+                {
+                    "product": first,
+                    "data": {"par_levels": {self.kitchen.name: {"par_level": 12}}},
+                },
+            ]
+        )
+
+        self.assertEqual(response["updated"], 3)
+        self.assertTrue(all(row["mode"] == "sql" for row in response["results"]))
+        self.assertEqual(frappe.db.get_value("Product", second, "bin_location"), "A1")
+        self.assertEqual(
+            frappe.db.get_value(
+                "Product Department",
+                {"parent": first, "department": self.kitchen.name},
+                "par_level",
+            ),
+            12,
+        )
+
+    def test_bulk_update_products_reports_per_item_failures(self) -> None:
+        frappe.set_user("Administrator")
+        kitchen_product = self._create_product("Bulk Kitchen Oil", self.kitchen.name)
+        bar_product = self._create_product("Bulk Bar Lime", self.bar.name)
+        self._grant_department_permission(
+            self.user, self.kitchen.name, can_read=1, can_write=1
+        )
+
+        frappe.set_user(self.user)
+        response = product_service.bulk_update_products(
+            [
+                {"product": kitchen_product, "data": {"valuation_method": "FIFO"}},
+                {"product": bar_product, "data": {"valuation_method": "FIFO"}},
+                {"product": kitchen_product, "data": {"valuation_rate": -1}},
+                {"product": "Missing Product", "data": {"active": 0}},
+            ]
+        )
+
+        statuses = [row["status"] for row in response["results"]]
+        self.assertEqual(statuses, ["updated", "failed", "failed", "failed"])
+        self.assertEqual(
+            frappe.db.get_value("Product", bar_product, "valuation_method"),
+            "Moving Average",
+        )
+
+    def test_bulk_update_products_coerces_scalar_values(self) -> None:
+        frappe.set_user("Administrator")
+        product_name = self._create_product("Bulk Cumin", self.kitchen.name)
+
+        response = product_service.bulk_update_products(
+            [
+                {"product": product_name, "data": {"active": [1]}},
+                {"product": product_name, "data": {"bin_location": {"shelf": 1}}},
+                {"product": product_name, "data": {"active": "0", "bin_location": 7}},
+            ]
+        )
+
+        statuses = [row["status"] for row in response["results"]]
+        self.assertEqual(statuses, ["failed", "failed", "updated"])
+        self.assertEqual(
+            frappe.db.get_value("Product", product_name, ["active", "bin_location"]),
+            (0, "7"),
+        )
+
+    def test_bulk_update_products_applies_user_permissions(self) -> None:
+        frappe.set_user("Administrator")
+        product_name = self._create_product("Bulk Saffron", self.kitchen.name)
+        self._grant_department_permission(
+            self.user, self.kitchen.name, can_read=1, can_write=1
+        )
+        other_company = self._ensure_company("Products Other Company")
+        frappe.get_doc(
+            {
+                "doctype": "User Permission",
+                "user": self.user,
+                "allow": "Company",
+                "for_value": other_company,
+            }
+        ).insert(ignore_permissions=True)
+
+        frappe.set_user(self.user)
+        response = product_service.bulk_update_products(
+            [{"product": product_name, "data": {"bin_location": "Z9"}}]
+        )
+
+        self.assertEqual(response["results"][0]["status"], "failed")
+        self.assertIsNone(frappe.db.get_value("Product", product_name, "bin_location"))
+
+    def test_bulk_update_products_falls_back_to_document_save(self) -> None:
+        frappe.set_user("Administrator")
+        product_name = self._create_product("Bulk Honey", self.kitchen.name)
+
+        response = product_service.bulk_update_products(
+            [{"product": product_name, "data": {"product_name": "Bulk Raw Honey"}}]
+        )
+
+        self.assertEqual(response["results"][0]["mode"], "document")
+        self.assertEqual(response["results"][0]["status"], "updated")
+        self.assertEqual(
+            frappe.db.get_value("Product", product_name, "product_name"),
+            "Bulk Raw Honey",
+        )
+
     # -------------------------------------------------------------------------
     # Helpers
     # -------------------------------------------------------------------------
@@ -0,0 +1,123 @@
+"""Tests for product catalog delta sync."""
+
+from __future__ import annotations
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from blkshp_os.products import sync as product_sync
+
+
+class TestProductSync(FrappeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        frappe.set_user("Administrator")
+        self.company = self._ensure_company("Sync Test Company", "SYNCCO")
+        self.department = self._ensure_department("SYNC-KIT", "Sync Kitchen")
+
+    def tearDown(self) -> None:
+        frappe.set_user("Administrator")
+        frappe.db.rollback()
+        super().tearDown()
+
+    def test_snapshot_then_delta_returns_only_new_changes(self) -> None:
+        first = self._create_product("Sync Flour")
+        snapshot = product_sync.export_snapshot()
+        names = self._product_names(snapshot)
+        self.assertIn(first, names)
+
+        second = self._create_product("Sync Sugar")
+        delta = product_sync.changes_since(snapshot["cursor"])
+        delta_names = self._product_names(delta)
+
+        self.assertIn(second, delta_names)
+        self.assertNotIn(first, delta_names)
+
+        department_rows = delta["children"]["departments"]["rows"]
+        self.assertTrue(any(row[0] == second for row in department_rows))
+
+    def test_deleted_products_are_reported(self) -> None:
+        product = self._create_product("Sync Doomed")
+        cursor = product_sync.export_snapshot()["cursor"]
+
+        frappe.delete_doc("Product", product, ignore_permissions=True)
+        delta = product_sync.changes_since(cursor)
+
+        deleted = [row[0] for row in delta["deleted"]["rows"]]
+        self.assertIn(product, deleted)
+
+    def test_paging_with_cursor_does_not_repeat_rows(self) -> None:
+        created = {self._create_product(f"Sync Page {idx}") for idx in range(3)}
+        cursor = product_sync.export_snapshot()["cursor"]
+        for product in created:
+            frappe.get_doc("Product", product).save(ignore_permissions=True)
+
+        seen: list[str] = []
+        while True:
+            page = product_sync.changes_since(cursor, limit=1)
+            seen.extend(self._product_names(page))
+            cursor = page["cursor"]
+            if not page["has_more"]:
+                break
+
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertTrue(created.issubset(set(seen)))
+
+    def test_invalid_cursor_raises(self) -> None:
+        with self.assertRaises(frappe.ValidationError):
+            product_sync.changes_since("not-a-cursor")
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+    def _product_names(self, payload: dict) -> list[str]:
+        index = payload["products"]["columns"].index("name")
+        return [row[index] for row in payload["products"]["rows"]]
+
+    def _ensure_company(self, name: str, code: str) -> str:
+        existing = frappe.db.get_value("Company", {"company_code": code})
+        if existing:
+            return existing
+        company = frappe.get_doc(
+            {
+                "doctype": "Company",
+                "company_name": name,
+                "company_code": code,
+                "default_currency": "USD",
+            }
+        )
+        company.insert(ignore_permissions=True)
+        return company.name
+
+    def _ensure_department(self, code: str, name: str) -> str:
+        existing = frappe.db.exists(
+            "Department", {"department_code": code, "company": self.company}
+        )
+        if existing:
+            return existing
+        department = frappe.get_doc(
+            {
+                "doctype": "Department",
+                "department_code": code,
+                "department_name": name,
+                "department_type": "Food",
+                "company": self.company,
+            }
+        )
+        department.insert(ignore_permissions=True)
+        return department.name
+
+    def _create_product(self, product_name: str) -> str:
+        doc = frappe.get_doc(
+            {
+                "doctype": "Product",
+                "product_name": product_name,
+                "product_code": product_name.upper().replace(" ", "-"),
+                "company": self.company,
+                "product_type": "Food",
+                "primary_count_unit": "each",
+                "default_department": self.department,
+            }
+        )
+        doc.insert(ignore_permissions=True)
+        return doc.name
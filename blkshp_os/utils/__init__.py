@@ -0,0 +1 @@
+"""Shared utilities for BLKSHP OS."""
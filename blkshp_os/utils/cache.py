@@ -0,0 +1,134 @@
+"""Versioned cache namespaces shared by BLKSHP OS services.
+
+A namespace holds a version token in ``frappe.cache()``. Cached entries embed
+the token in their key, so bumping the version invalidates every entry in the
+namespace at once without scanning Redis; stale entries simply expire.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+import frappe
+
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+
+def get_cache_version(namespace: str) -> str:
+    """Return the current version token for ``namespace``, creating one if needed."""
+    return get_cache_versions([namespace])[0]
+
+
+def get_cache_versions(namespaces: Sequence[str]) -> list[str]:
+    """Return the version tokens of ``namespaces`` in one Redis round trip."""
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    for namespace in namespaces:
+        pipe.get(cache.make_key(version_key(namespace)))
+    return cache_versions_from_values(namespaces, pipe.execute())
+
+
+def cache_versions_from_values(
+    namespaces: Sequence[str], values: Sequence[bytes | None]
+) -> list[str]:
+    """Decode the raw ``GET`` values of each namespace's :func:`version_key`.
+
+    Callers that batch the version reads into their own pipeline pass the
+    results here rather than decoding them. Tokens are stored as plain
+    strings; missing ones are created, keeping any a concurrent writer set
+    first.
+    """
+    versions = [value.decode() if value else "" for value in values]
+    missing = [
+        (index, namespace)
+        for index, (namespace, version) in enumerate(zip(namespaces, versions, strict=True))
+        if not version
+    ]
+    if missing:
+        cache = frappe.cache()
+        pipe = cache.pipeline()
+        for _index, namespace in missing:
+            key = cache.make_key(version_key(namespace))
+            pipe.set(key, frappe.generate_hash(length=12), nx=True)
+            pipe.get(key)
+        stored = pipe.execute()[1::2]
+        for (index, _namespace), value in zip(missing, stored, strict=True):
+            versions[index] = value.decode()
+    return versions
+
+
+def version_key(namespace: str) -> str:
+    """Return the ``frappe.cache()`` key holding ``namespace``'s version token.
+
+    The token is a plain string rather than a pickled value, so it can be read
+    with raw Redis commands; see :func:`cache_versions_from_values`.
+    """
+    return f"{namespace}:version_token"
+
+
+def bump_cache_version(namespace: str) -> str:
+    """Invalidate every entry in ``namespace`` and return the new version token.
+
+    Entries cached after the bump but before the transaction ends may reflect
+    the old data (another worker reading before commit) or uncommitted writes
+    (this worker, before a rollback), so the version is bumped again when the
+    transaction commits or rolls back.
+    """
+    version = _set_new_version(namespace)
+    on_commit(lambda: _set_new_version(namespace))
+    on_rollback(lambda: _set_new_version(namespace))
+    return version
+
+
+def bump_cache_versions(namespaces: Iterable[str]) -> None:
+    """Bump every namespace in ``namespaces``, as :func:`bump_cache_version` does.
+
+    The namespaces share one commit and one rollback callback.
+    """
+    namespaces = list(dict.fromkeys(namespaces))
+    if not namespaces:
+        return
+
+    def bump() -> None:
+        _set_new_versions(namespaces)
+
+    bump()
+    on_commit(bump)
+    on_rollback(bump)
+
+
+def on_rollback(callback: Callable[[], Any]) -> None:
+    """Run ``callback`` if the current transaction is rolled back."""
+    after_rollback = getattr(getattr(frappe.local, "db", None), "after_rollback", None)
+    if after_rollback is not None:
+        after_rollback.add(callback)
+
+
+def on_commit(callback: Callable[[], Any]) -> None:
+    """Run ``callback`` once the current transaction commits."""
+    after_commit = getattr(getattr(frappe.local, "db", None), "after_commit", None)
+    if after_commit is not None:
+        after_commit.add(callback)
+
+
+def _set_new_version(namespace: str) -> str:
+    return _set_new_versions([namespace])[0]
+
+
+def _set_new_versions(namespaces: Sequence[str]) -> list[str]:
+    cache = frappe.cache()
+    pipe = cache.pipeline()
+    versions = []
+    for namespace in namespaces:
+        version = frappe.generate_hash(length=12)
+        pipe.set(cache.make_key(version_key(namespace)), version)
+        versions.append(version)
+    pipe.execute()
+    return versions
+
+
+def versioned_key(namespace: str, *parts: object) -> str:
+    """Build a cache key for ``namespace`` stamped with its current version."""
+    suffix = ":".join(str(part) for part in parts)
+    return f"{namespace}:{get_cache_version(namespace)}:{suffix}"
@@ -0,0 +1,93 @@
+"""HTTP response helpers for conditional (ETag) API responses."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from collections.abc import Callable, Mapping
+from typing import Any
+
+import frappe
+from frappe.utils.response import json_handler
+from werkzeug.wrappers import Response
+
+
+def serialize_payload(payload: Any) -> bytes:
+    """Return the compact JSON encoding used for ETag-aware responses."""
+    return json.dumps(
+        payload, default=json_handler, separators=(",", ":"), sort_keys=True
+    ).encode("utf-8")
+
+
+def extend_json_object(body: bytes, extra: Mapping[str, Any]) -> bytes:
+    """Return the serialized JSON object ``body`` with the keys of ``extra`` added.
+
+    The existing bytes are reused as they are; ``extra`` must not repeat any
+    of their keys.
+    """
+    if not extra:
+        return body
+    tail = serialize_payload(extra)[1:]
+    if body.rstrip() == b"{}":
+        return b"{" + tail
+    return body.rstrip()[:-1] + b"," + tail
+
+
+def compute_etag(body: bytes) -> str:
+    """Return a strong entity tag for the supplied response body."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def request_etag_matches(etag: str) -> bool:
+    """Return True when the request's If-None-Match header matches the ETag."""
+    header = frappe.get_request_header("If-None-Match") if frappe.request else None
+    if not header:
+        return False
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def etag_response(
+    payload: Any = None,
+    *,
+    body: bytes | Callable[[], bytes] | None = None,
+    etag: str | None = None,
+) -> Response:
+    """Return a JSON response carrying an ETag, or 304 when the client copy is current.
+
+    The body is wrapped in Frappe's ``{"message": ...}`` envelope so clients
+    consume it exactly like any other whitelisted method. Either ``payload``
+    or pre-serialized ``body`` bytes may be supplied; ``body`` may also be a
+    callable producing them. When ``etag`` is given, ``payload`` is only
+    serialized (and ``body`` only called) if the client copy is stale.
+    """
+    if etag is None:
+        if callable(body):
+            body = body()
+        if body is None:
+            body = serialize_payload(payload)
+        etag = compute_etag(body)
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "private, no-cache",
+    }
+    if request_etag_matches(etag):
+        return Response(status=304, headers=headers)
+
+    if callable(body):
+        body = body()
+    if body is None:
+        body = serialize_payload(payload)
+    envelope = b'{"message":' + body + b"}"
+    return Response(
+        envelope, status=200, mimetype="application/json", headers=headers
+    )
@@ -0,0 +1,201 @@
+"""Chunked retention purge for high-volume log tables.
+
+Frappe's stock log clearing removes expired rows with one large ``DELETE``,
+which holds locks on the whole range and produces a single huge binlog event
+on busy sites. :func:`purge_expired_logs` instead walks each policy's expired
+rows oldest first, ``LIMIT``-ed chunks at a time, deletes each chunk by name,
+commits, and pauses before the next one. Chunks are read with a keyset on
+``(timestamp_field, name)``, so each one is a range scan of the timestamp
+index that resumes after the previous chunk. A run stops when its time
+budget is spent; the next scheduled run picks up where it left off.
+
+Policies are registered with the ``log_retention_policies`` hook, a list of
+dicts with:
+
+- ``doctype``: table to purge
+- ``days``: retention period
+- ``timestamp_field``: datetime column compared with the cutoff (default
+  ``creation``). It needs an index on ``(filter fields..., timestamp_field,
+  name)``; InnoDB appends the primary key to every secondary index, so an
+  index ending in ``timestamp_field`` also serves.
+- ``filters``: optional equality filters, e.g. ``{"period_type": "Hourly"}``
+- ``archive``: write purged rows to gzip-compressed JSON lines under the
+  site's ``private/archives`` before deleting them
+- ``chunk_size``: rows per chunk (default :data:`DEFAULT_CHUNK_SIZE`)
+
+Metrics for the last run (rows purged, chunks, seconds spent, archive files)
+are kept in Redis and returned by :func:`get_retention_metrics`.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import time
+from typing import Any
+
+import frappe
+from frappe.utils import add_days, cint, now, now_datetime
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PAUSE_SECONDS = 0.5
+# Cron jobs run on the default queue (300s timeout); stop starting chunks well before
+MAX_RUNTIME_SECONDS = 240
+RETENTION_METRICS_KEY = "blkshp_os:retention:last_run"
+ARCHIVE_FOLDER = "archives"
+
+
+def purge_expired_logs(
+    max_runtime: float = MAX_RUNTIME_SECONDS,
+    pause: float = DEFAULT_PAUSE_SECONDS,
+) -> dict[str, Any]:
+    """Purge expired rows for every registered policy (scheduled off-peak).
+
+    Args:
+            max_runtime: Seconds after which no new chunk is started
+            pause: Seconds to sleep between chunks
+
+    Returns:
+            Metrics per policy plus the overall ``seconds`` and ``completed`` flag
+    """
+    started = time.monotonic()
+    deadline = started + max_runtime
+    metrics: dict[str, Any] = {"started_at": now(), "policies": [], "completed": True}
+
+    for policy in get_retention_policies():
+        result = purge_policy(policy, deadline=deadline, pause=pause)
+        metrics["policies"].append(result)
+        if not result["completed"]:
+            metrics["completed"] = False
+            break
+
+    metrics["seconds"] = round(time.monotonic() - started, 3)
+    metrics["rows_purged"] = sum(result["rows_purged"] for result in metrics["policies"])
+    frappe.cache().set_value(RETENTION_METRICS_KEY, metrics)
+    frappe.logger("blkshp_os.retention").info(metrics)
+    return metrics
+
+
+def purge_policy(
+    policy: dict[str, Any],
+    deadline: float | None = None,
+    pause: float = DEFAULT_PAUSE_SECONDS,
+) -> dict[str, Any]:
+    """Delete one policy's expired rows chunk by chunk until done or out of time."""
+    doctype = policy["doctype"]
+    chunk_size = cint(policy.get("chunk_size")) or DEFAULT_CHUNK_SIZE
+    conditions, values = _policy_conditions(policy)
+    started = time.monotonic()
+    result: dict[str, Any] = {
+        "doctype": doctype,
+        "filters": policy.get("filters") or {},
+        "cutoff": str(values["cutoff"]),
+        "rows_purged": 0,
+        "chunks": 0,
+        "archive_files": [],
+        "completed": False,
+    }
+
+    timestamp_field = _timestamp_field(policy)
+    after: tuple[Any, str] | None = None
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+        keyset = ""
+        params = dict(values)
+        if after is not None:
+            keyset = (
+                f" AND (`{timestamp_field}` > %(last_timestamp)s"
+                f" OR (`{timestamp_field}` = %(last_timestamp)s AND `name` > %(last_name)s))"
+            )
+            params.update(last_timestamp=after[0], last_name=after[1])
+        rows = frappe.db.sql(
+            f"""
+            SELECT `name`, `{timestamp_field}` FROM `tab{doctype}`
+            WHERE {conditions}{keyset}
+            ORDER BY `{timestamp_field}`, `name`
+            LIMIT {chunk_size}
+            """,
+            params,
+        )
+        if not rows:
+            result["completed"] = True
+            break
+        names = [name for name, _timestamp in rows]
+
+        if policy.get("archive"):
+            path = _archive_rows(doctype, names)
+            if path not in result["archive_files"]:
+                result["archive_files"].append(path)
+
+        frappe.db.sql(f"DELETE FROM `tab{doctype}` WHERE `name` IN %(names)s", {"names": tuple(names)})
+        _commit()
+        result["rows_purged"] += len(names)
+        result["chunks"] += 1
+        after = (rows[-1][1], rows[-1][0])
+
+        if len(names) < chunk_size:
+            result["completed"] = True
+            break
+        if pause:
+            time.sleep(pause)
+
+    result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def get_retention_policies() -> list[dict[str, Any]]:
+    """Return the policies registered through the ``log_retention_policies`` hook."""
+    return [
+        policy
+        for policy in frappe.get_hooks("log_retention_policies")
+        if isinstance(policy, dict) and policy.get("doctype") and cint(policy.get("days")) > 0
+    ]
+
+
+def get_retention_metrics() -> dict[str, Any] | None:
+    """Return the metrics recorded by the last :func:`purge_expired_logs` run."""
+    return frappe.cache().get_value(RETENTION_METRICS_KEY)
+
+
+def _timestamp_field(policy: dict[str, Any]) -> str:
+    return policy.get("timestamp_field") or "creation"
+
+
+def _policy_conditions(policy: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+    timestamp_field = _timestamp_field(policy)
+    conditions = [f"`{timestamp_field}` < %(cutoff)s"]
+    values: dict[str, Any] = {"cutoff": add_days(now_datetime(), -cint(policy["days"]))}
+    for index, (fieldname, value) in enumerate((policy.get("filters") or {}).items()):
+        conditions.append(f"`{fieldname}` = %(filter_{index})s")
+        values[f"filter_{index}"] = value
+    return " AND ".join(conditions), values
+
+
+def _archive_rows(doctype: str, names: list[str]) -> str:
+    """Append ``names``' rows to today's archive file for ``doctype``.
+
+    Each call adds a gzip member, which ``gzip`` readers decompress as one
+    stream of JSON lines.
+    """
+    rows = frappe.db.sql(
+        f"SELECT * FROM `tab{doctype}` WHERE `name` IN %(names)s ORDER BY `name`",
+        {"names": tuple(names)},
+        as_dict=True,
+    )
+    folder = frappe.get_site_path("private", ARCHIVE_FOLDER, frappe.scrub(doctype))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{now_datetime().strftime('%Y-%m-%d')}.jsonl.gz")
+    with gzip.open(path, "at", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, default=str))
+            handle.write("\n")
+    return path
+
+
+def _commit() -> None:
+    # Tests run inside a transaction they roll back themselves
+    if not frappe.flags.in_test:
+        frappe.db.commit()
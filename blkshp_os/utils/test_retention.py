@@ -0,0 +1,94 @@
+"""Tests for chunked log retention."""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, now_datetime
+
+from blkshp_os.core_platform import access_log
+from blkshp_os.utils import retention
+
+
+class TestRetention(FrappeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.access_key = f"retention.{frappe.generate_hash(length=8)}"
+        self.archive_files: list[str] = []
+
+    def tearDown(self) -> None:
+        frappe.db.rollback()
+        for path in self.archive_files:
+            if os.path.exists(path):
+                os.remove(path)
+        super().tearDown()
+
+    def test_expired_rows_are_purged_in_chunks_and_archived(self) -> None:
+        self._log_events(days_ago=120, count=5)
+        self._log_events(days_ago=1, count=2)
+
+        result = retention.purge_policy(
+            {
+                "doctype": "Subscription Access Log",
+                "days": 90,
+                "timestamp_field": "timestamp",
+                "filters": {"access_key": self.access_key},
+                "archive": 1,
+                "chunk_size": 2,
+            },
+            pause=0,
+        )
+        self.archive_files = result["archive_files"]
+
+        self.assertTrue(result["completed"])
+        self.assertEqual(result["rows_purged"], 5)
+        self.assertEqual(result["chunks"], 3)
+        self.assertEqual(
+            frappe.db.count("Subscription Access Log", {"access_key": self.access_key}), 2
+        )
+
+        with gzip.open(self.archive_files[0], "rt", encoding="utf-8") as handle:
+            archived = [json.loads(line) for line in handle]
+        self.assertEqual(
+            len([row for row in archived if row["access_key"] == self.access_key]), 5
+        )
+
+    def test_purge_stops_when_out_of_time(self) -> None:
+        self._log_events(days_ago=120, count=3)
+
+        result = retention.purge_policy(
+            {
+                "doctype": "Subscription Access Log",
+                "days": 90,
+                "timestamp_field": "timestamp",
+                "filters": {"access_key": self.access_key},
+            },
+            deadline=0,
+        )
+
+        self.assertFalse(result["completed"])
+        self.assertEqual(result["rows_purged"], 0)
+
+    def test_policies_are_registered_from_hooks(self) -> None:
+        doctypes = {policy["doctype"] for policy in retention.get_retention_policies()}
+        self.assertIn("Subscription Access Log", doctypes)
+
+    def _log_events(self, days_ago: int, count: int) -> None:
+        timestamp = str(add_days(now_datetime(), -days_ago))
+        access_log._insert_events(
+            [
+                {
+                    "timestamp": timestamp,
+                    "user": "Administrator",
+                    "access_type": "Feature",
+                    "access_key": self.access_key,
+                    "action": "Denied",
+                    "context_data": "{}",
+                }
+                for _index in range(count)
+            ]
+        )
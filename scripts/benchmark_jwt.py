@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""JWT Verification Benchmark
+
+Measures access token verifications per second in a single worker, comparing
+the previous verification path (``frappe.db.exists`` plus a full User
+document load per call) with ``jwt_manager.verify_token`` (signature check
+plus one pipelined Redis read for the cached user status and revocation set).
+
+Usage:
+    bench --site [site-name] execute blkshp_os.scripts.benchmark_jwt.run
+
+    bench --site [site-name] execute blkshp_os.scripts.benchmark_jwt.run --kwargs "{'user': 'manager@test.com', 'seconds': 10}"
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from typing import Any
+
+import frappe
+import jwt
+from frappe import _
+
+from blkshp_os.auth import jwt_manager
+
+
+def run(user: str = "Administrator", seconds: float = 5.0) -> dict[str, Any]:
+    """Benchmark both verification paths for ``seconds`` each.
+
+    Args:
+        user: User to issue the benchmark token for
+        seconds: Time spent on each path
+
+    Returns:
+        Dictionary with requests per second for each path and the speedup
+    """
+    frappe.only_for(("System Manager", "Administrator"))
+
+    token = jwt_manager.generate_access_token(user)
+    # Warm up both paths so one-off costs (document cache, first status load) are excluded
+    _legacy_verify(token)
+    jwt_manager.verify_token(token)
+
+    before = _measure(lambda: _legacy_verify(token), seconds)
+    after = _measure(lambda: jwt_manager.verify_token(token), seconds)
+
+    results = {
+        "user": user,
+        "seconds": seconds,
+        "before_rps": round(before),
+        "after_rps": round(after),
+        "speedup": round(after / before, 1) if before else None,
+    }
+    print(
+        f"verify_token per worker: before {results['before_rps']} req/s, "
+        f"after {results['after_rps']} req/s ({results['speedup']}x)"
+    )
+    return results
+
+
+def _measure(verify: Callable[[], Any], seconds: float) -> float:
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        verify()
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+
+def _legacy_verify(token: str) -> dict[str, Any]:
+    """The verification path prior to the user status cache, kept for comparison."""
+    secret = frappe.conf.get("jwt_secret") or frappe.conf.get("secret_key")
+    payload = jwt.decode(token, secret, algorithms=["HS256"])
+
+    user = payload.get("user")
+    if not user or not frappe.db.exists("User", user):
+        frappe.throw(_("User from token does not exist"), frappe.AuthenticationError)
+
+    user_doc = frappe.get_doc("User", user)
+    if user_doc.enabled == 0:
+        frappe.throw(_("User is disabled"), frappe.AuthenticationError)
+
+    return payload
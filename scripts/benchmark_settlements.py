@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Intercompany Settlement Listing Benchmark
+
+Loads a large number of synthetic Intercompany Settlements and compares the
+previous settlement listing (``or_filters`` on source/target company, whole
+history fetched and paginated in Python) with the indexed ``UNION ALL``
+range scans and keyset pages of ``intercompany_service.get_pending_settlements``.
+
+Usage:
+    # 1. Load the synthetic settlements (once; ~500k rows)
+    bench --site [site-name] execute blkshp_os.scripts.benchmark_settlements.setup --kwargs "{'count': 500000}"
+
+    # 2. Compare both listing paths
+    bench --site [site-name] execute blkshp_os.scripts.benchmark_settlements.run
+
+    # 3. Remove the synthetic rows
+    bench --site [site-name] execute blkshp_os.scripts.benchmark_settlements.teardown
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Callable
+from typing import Any
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+from blkshp_os.accounting import intercompany_service
+
+SETTLEMENT_DOCTYPE = "Intercompany Settlement"
+NAME_PREFIX = "SETTLE-BENCH-"
+COMPANY_PREFIX = "BENCH-SETTLE-CO"
+CHUNK_SIZE = 10_000
+
+
+def setup(count: int = 500_000, companies: int = 50) -> dict[str, Any]:
+    """Bulk insert ``count`` settlements spread over ``companies`` companies.
+
+    Args:
+        count: Number of settlements
+        companies: Number of synthetic companies settling with each other
+
+    Returns:
+        Dictionary with the number of settlements and companies created
+    """
+    frappe.only_for(("System Manager", "Administrator"))
+
+    codes = [f"{COMPANY_PREFIX}{index:03d}" for index in range(1, companies + 1)]
+    for code in codes:
+        if not frappe.db.exists("Company", code):
+            frappe.get_doc(
+                {
+                    "doctype": "Company",
+                    "company_name": code,
+                    "company_code": code,
+                    "default_currency": "USD",
+                }
+            ).insert(ignore_permissions=True)
+
+    fields = [
+        *intercompany_service.SETTLEMENT_LIST_FIELDS,
+        "creation",
+        "owner",
+        "modified_by",
+        "docstatus",
+        "naming_series",
+    ]
+    rng = random.Random(42)
+    started = now_datetime()
+    start = frappe.db.count(SETTLEMENT_DOCTYPE, {"name": ["like", f"{NAME_PREFIX}%"]})
+    for chunk_start in range(start, count, CHUNK_SIZE):
+        values = []
+        for number in range(chunk_start, min(chunk_start + CHUNK_SIZE, count)):
+            source, target = rng.sample(codes, 2)
+            docstatus = 1 if rng.random() < 0.8 else 0
+            modified = add_to_date(started, seconds=-number)
+            row = {
+                "name": f"{NAME_PREFIX}{number:07d}",
+                "source_company": source,
+                "target_company": target,
+                "settlement_amount": rng.randint(100, 1_000_000) / 100,
+                "settlement_currency": "USD",
+                "settlement_date": modified.date() if docstatus else None,
+                "status": "Settled" if docstatus else "Draft",
+                "submitted_by": "Administrator" if docstatus else None,
+                "modified": modified,
+                "creation": modified,
+                "owner": "Administrator",
+                "modified_by": "Administrator",
+                "docstatus": docstatus,
+                "naming_series": "SETTLE-.YYYY.-",
+            }
+            values.append(tuple(row[field] for field in fields))
+        frappe.db.bulk_insert(SETTLEMENT_DOCTYPE, fields, values)
+        frappe.db.commit()
+
+    return {"settlements": max(count - start, 0), "companies": len(codes)}
+
+
+def run(company: str | None = None, pages: int = 20, limit: int = 50, repeat: int = 5) -> dict[str, Any]:
+    """Time the first page and ``pages`` consecutive pages on both paths.
+
+    Args:
+        company: Company to list settlements for (default: the first synthetic company)
+        pages: Consecutive pages read per run
+        limit: Settlements per page
+        repeat: Runs per measurement (the median is reported)
+
+    Returns:
+        Dictionary with milliseconds per path and the query plans of the new branches
+    """
+    frappe.only_for(("System Manager", "Administrator"))
+    company = company or f"{COMPANY_PREFIX}001"
+
+    def legacy_pages() -> list[list[dict[str, Any]]]:
+        settlements = _legacy_settlements(company)
+        return [settlements[page * limit:(page + 1) * limit] for page in range(pages)]
+
+    def keyset_pages() -> None:
+        after = None
+        for _page in range(pages):
+            settlements = intercompany_service.get_pending_settlements(
+                company=company, limit=limit, after=after
+            )
+            if not settlements:
+                break
+            after = (settlements[-1]["modified"], settlements[-1]["name"])
+
+    results = {
+        "company": company,
+        "settlements": intercompany_service.count_pending_settlements(company),
+        "first_page_before_ms": _median_ms(lambda: _legacy_settlements(company)[:limit], repeat),
+        "first_page_after_ms": _median_ms(
+            lambda: intercompany_service.get_pending_settlements(company=company, limit=limit), repeat
+        ),
+        "pages_before_ms": _median_ms(legacy_pages, repeat),
+        "pages_after_ms": _median_ms(keyset_pages, repeat),
+        "plan": frappe.db.sql(
+            f"""
+            EXPLAIN SELECT `name` FROM `tab{SETTLEMENT_DOCTYPE}`
+            WHERE `source_company` = %(company)s AND `docstatus` = 1
+            ORDER BY `modified` DESC, `name` DESC LIMIT {limit}
+            """,
+            {"company": company},
+            as_dict=True,
+        ),
+    }
+    print(
+        f"{results['settlements']} settlements for {company}: first page "
+        f"{results['first_page_before_ms']} ms -> {results['first_page_after_ms']} ms, "
+        f"{pages} pages {results['pages_before_ms']} ms -> {results['pages_after_ms']} ms"
+    )
+    return results
+
+
+def teardown() -> dict[str, int]:
+    """Delete the synthetic settlements and companies."""
+    frappe.only_for(("System Manager", "Administrator"))
+
+    settlements = frappe.db.count(SETTLEMENT_DOCTYPE, {"name": ["like", f"{NAME_PREFIX}%"]})
+    frappe.db.sql(f"DELETE FROM `tab{SETTLEMENT_DOCTYPE}` WHERE `name` LIKE %s", (f"{NAME_PREFIX}%",))
+    companies = frappe.get_all("Company", filters={"name": ["like", f"{COMPANY_PREFIX}%"]}, pluck="name")
+    for company in companies:
+        frappe.delete_doc("Company", company, ignore_permissions=True, force=True)
+    frappe.db.commit()
+    return {"settlements": settlements, "companies": len(companies)}
+
+
+def _legacy_settlements(company: str) -> list[dict[str, Any]]:
+    """The listing prior to the indexed union, kept for comparison."""
+    return frappe.db.get_all(
+        SETTLEMENT_DOCTYPE,
+        filters={"docstatus": ["<", 2]},
+        fields=intercompany_service.SETTLEMENT_LIST_FIELDS,
+        or_filters={"source_company": company, "target_company": company},
+        order_by="modified desc",
+    )
+
+
+def _median_ms(call: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _run in range(max(repeat, 1)):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return round(timings[len(timings) // 2] * 1000, 2)
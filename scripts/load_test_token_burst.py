@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Shift-Start Login Burst Load Test
+
+Simulates hundreds of terminal/team accounts logging in at the same moment
+against a running local site and reports throughput and latency of the
+``blkshp_os.api.auth.login`` endpoint.
+
+Usage:
+    # 1. Create the team accounts (once)
+    bench --site [site-name] execute blkshp_os.scripts.load_test_token_burst.setup --kwargs "{'count': 300}"
+
+    # 2. Optionally prebuild their token templates (as the daily job does)
+    bench --site [site-name] execute blkshp_os.auth.jwt_manager.warm_team_account_token_templates
+
+    # 3. Fire the burst (from the bench directory, with the site served locally)
+    python apps/blkshp_os/scripts/load_test_token_burst.py --url http://site1.local:8000 --count 300 --concurrency 100
+
+Run step 3 with and without step 2 to compare cold and warm token templates.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+DEFAULT_PREFIX = "shift-terminal"
+DEFAULT_PASSWORD = "Shift-Start-Load-Test-1!"
+LOGIN_PATH = "/api/method/blkshp_os.api.auth.login"
+
+
+def setup(
+    count: int = 300,
+    prefix: str = DEFAULT_PREFIX,
+    password: str = DEFAULT_PASSWORD,
+    role: str | None = "Store Manager",
+) -> dict[str, Any]:
+    """Create ``count`` enabled team accounts sharing ``password``.
+
+    Args:
+        count: Number of accounts
+        prefix: Email prefix; accounts are ``{prefix}-NNN@example.com``
+        password: Password set on every account
+        role: Optional role assigned to every account
+
+    Returns:
+        Dictionary with the number of accounts created and already present
+    """
+    import frappe
+    from frappe.utils.password import update_password
+
+    frappe.only_for(("System Manager", "Administrator"))
+
+    created = 0
+    for email in _account_emails(count, prefix):
+        if frappe.db.exists("User", email):
+            continue
+        user = frappe.get_doc(
+            {
+                "doctype": "User",
+                "email": email,
+                "first_name": "Shift Terminal",
+                "is_team_account": 1,
+                "send_welcome_email": 0,
+                "roles": [{"role": role}] if role else [],
+            }
+        )
+        user.insert(ignore_permissions=True)
+        update_password(email, password)
+        created += 1
+
+    frappe.db.commit()
+    return {"created": created, "existing": count - created}
+
+
+def run_burst(
+    url: str,
+    count: int = 300,
+    concurrency: int = 100,
+    prefix: str = DEFAULT_PREFIX,
+    password: str = DEFAULT_PASSWORD,
+    timeout: float = 30.0,
+) -> dict[str, Any]:
+    """Log every account in at once and summarize the responses.
+
+    All worker threads wait on a barrier so the first ``concurrency`` logins
+    hit the site together, as terminals do at shift start.
+    """
+    import requests
+
+    emails = _account_emails(count, prefix)
+    barrier = threading.Barrier(min(concurrency, len(emails)))
+    local = threading.local()
+
+    def login(email: str) -> tuple[float, int | None, str | None]:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            try:
+                barrier.wait(timeout=timeout)
+            except threading.BrokenBarrierError:
+                pass
+        started = time.perf_counter()
+        try:
+            response = session.post(
+                url.rstrip("/") + LOGIN_PATH,
+                json={"username": email, "password": password},
+                timeout=timeout,
+            )
+            status = response.status_code
+            error = None if status == 200 and "access_token" in response.text else response.text[:200]
+        except requests.RequestException as exc:
+            status, error = None, str(exc)
+        return time.perf_counter() - started, status, error
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(login, emails))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _status, error in results if error is None)
+    errors = [error for _latency, _status, error in results if error is not None]
+    return {
+        "logins": len(results),
+        "succeeded": len(latencies),
+        "failed": len(errors),
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(len(results) / elapsed, 1) if elapsed else None,
+        "latency_ms": _latency_summary(latencies),
+        "sample_errors": errors[:5],
+    }
+
+
+def _latency_summary(latencies: list[float]) -> dict[str, float] | None:
+    if not latencies:
+        return None
+
+    def percentile(fraction: float) -> float:
+        index = min(round(fraction * (len(latencies) - 1)), len(latencies) - 1)
+        return round(latencies[index] * 1000, 1)
+
+    return {
+        "mean": round(statistics.fmean(latencies) * 1000, 1),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": round(latencies[-1] * 1000, 1),
+    }
+
+
+def _account_emails(count: int, prefix: str) -> list[str]:
+    return [f"{prefix}-{index:03d}@example.com" for index in range(1, count + 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Site base URL")
+    parser.add_argument("--count", type=int, default=300, help="Number of team accounts")
+    parser.add_argument("--concurrency", type=int, default=100, help="Simultaneous logins")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="Account email prefix")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD, help="Account password")
+    args = parser.parse_args()
+
+    summary = run_burst(
+        args.url,
+        count=args.count,
+        concurrency=args.concurrency,
+        prefix=args.prefix,
+        password=args.password,
+    )
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
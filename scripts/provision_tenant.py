@@ -141,35 +141,43 @@ def provision(
     return results
 
 
-def bulk_provision(tenants: list[dict]) -> list[dict]:
+def bulk_provision(
+    tenants: list[dict],
+    workers: int = 4,
+    report_path: str | None = None,
+) -> dict:
     """Provision multiple tenants in bulk.
 
+    Records for the whole batch are planned up front and each tenant is
+    written in one transaction, with independent tenants run in parallel.
+    Each tenant gets a ``provision_tenant`` Subscription Access Log entry. See
+    :func:`blkshp_os.core_platform.provisioning.provision_tenants`.
+
     Args:
-        tenants: List of tenant dictionaries with keys: company, plan, modules
+        tenants: List of tenant dictionaries with keys: company, plan, modules,
+            and optionally company_name, departments and users. Unlike
+            provision(), enable_all_features is not supported; tenants that
+            set it get a warning in the report.
+        workers: Number of worker processes
+        report_path: JSON report path; pass a previous report to resume it
 
     Returns:
-        List of provisioning results
+        Provisioning report with a status per tenant
 
     Example:
         tenants = [
-            {"company": "ACME Corp", "plan": "STANDARD", "modules": ["products", "inventory"]},
-            {"company": "Hotel XYZ", "plan": "PREMIUM", "modules": ["products", "inventory", "procurement"]},
+            {"company": "ACME-01", "company_name": "ACME Downtown", "plan": "STANDARD", "modules": ["products", "inventory"]},
+            {"company": "XYZ-01", "plan": "PREMIUM", "users": {"gm@xyz.com": ["Store Manager"]}},
         ]
-        results = bulk_provision(tenants)
+        report = bulk_provision(tenants)
+        # Re-run failed or unfinished tenants
+        report = bulk_provision(tenants, report_path=report["report_path"])
     """
-    frappe.only_for("BLKSHP Operations", "System Manager", "Administrator")
+    frappe.only_for(("BLKSHP Operations", "System Manager", "Administrator"))
 
-    results = []
-    for tenant in tenants:
-        result = provision(
-            company=tenant.get("company"),
-            plan=tenant.get("plan"),
-            modules=tenant.get("modules"),
-            enable_all_features=tenant.get("enable_all_features", False),
-        )
-        results.append(result)
+    from blkshp_os.core_platform.provisioning import provision_tenants
 
-    return results
+    return provision_tenants(tenants, workers=workers, report_path=report_path)
 
 
 def unprovision(company: str, remove_branding: bool = False) -> dict: